@@ -1 +1,2 @@
-# Scheduler/retry/backoff (placeholder)
+# Scheduler/retry/backoff: the policy lives with the queue (services/queue/retry.py).
+from services.queue.retry import RetryPolicy, default_policy, parse_run_at, policy_for  # noqa: F401
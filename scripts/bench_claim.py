@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# scripts/bench_claim.py
+"""
+EXPLAIN-backed benchmark of the jobs_v2 claim path.
+
+Seeds a scratch copy of jobs_v2 (schema ``velu_bench``) with N rows and compares:
+
+  before: OR'd queued/expired-lease claim over idx_jobs_v2_claim (migration 012)
+  after:  queued-only claim over the partial idx_jobs_v2_queued, plus the
+          separate sweeper batch over idx_jobs_v2_lease_expiry (migration 014)
+
+Each query runs under EXPLAIN (ANALYZE, BUFFERS) inside a rolled-back
+transaction, so the seeded data is identical for every run.
+
+    DATABASE_URL=postgresql://... python scripts/bench_claim.py --rows 1000000
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import sys
+from typing import Any
+
+import psycopg
+
+SCHEMA = "velu_bench"
+
+OLD_INDEXES = [
+    "CREATE INDEX idx_jobs_v2_claim ON jobs_v2 (status, priority DESC, created_at ASC)",
+    "CREATE INDEX idx_jobs_v2_lease_reclaim ON jobs_v2 (status, lease_expires_at)",
+]
+NEW_INDEXES = [
+    "CREATE INDEX idx_jobs_v2_queued ON jobs_v2 (priority DESC, created_at ASC) WHERE status = 'queued'",
+    "CREATE INDEX idx_jobs_v2_lease_expiry ON jobs_v2 (lease_expires_at) WHERE status = 'working'",
+]
+COMMON_INDEXES = [
+    "CREATE INDEX ix_jobs_v2_org_created_at ON jobs_v2 (org_id, created_at DESC)",
+    "CREATE INDEX ix_jobs_v2_status ON jobs_v2 (status)",
+]
+
+OLD_CLAIM = """
+WITH picked AS (
+  SELECT id FROM jobs_v2
+  WHERE status = 'queued'
+     OR (status = 'working' AND lease_expires_at IS NOT NULL AND lease_expires_at < now())
+  ORDER BY priority DESC, created_at ASC
+  FOR UPDATE SKIP LOCKED
+  LIMIT 1
+)
+UPDATE jobs_v2 j
+SET status='working', attempts=attempts+1, claimed_by='bench', claimed_at=now(),
+    lease_expires_at=now() + interval '300 seconds', updated_at=now()
+FROM picked WHERE j.id = picked.id
+"""
+
+NEW_CLAIM = """
+WITH picked AS (
+  SELECT id FROM jobs_v2
+  WHERE status = 'queued'
+  ORDER BY priority DESC, created_at ASC
+  FOR UPDATE SKIP LOCKED
+  LIMIT 1
+)
+UPDATE jobs_v2 j
+SET status='working', attempts=attempts+1, claimed_by='bench', claimed_at=now(),
+    lease_expires_at=now() + interval '300 seconds', updated_at=now()
+FROM picked WHERE j.id = picked.id
+"""
+
+SWEEP = """
+WITH expired AS (
+  SELECT id FROM jobs_v2
+  WHERE status = 'working' AND lease_expires_at < now()
+  ORDER BY lease_expires_at ASC
+  FOR UPDATE SKIP LOCKED
+  LIMIT 500
+)
+UPDATE jobs_v2 j
+SET status='queued', claimed_by=NULL, claimed_at=NULL, lease_expires_at=NULL, updated_at=now()
+FROM expired WHERE j.id = expired.id
+"""
+
+
+def _seed(conn: psycopg.Connection, rows: int, queued: float, working: float) -> None:
+    conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    conn.execute(f"CREATE SCHEMA {SCHEMA}")
+    conn.execute(f"SET search_path TO {SCHEMA}, public")
+    conn.execute("CREATE TABLE jobs_v2 (LIKE public.jobs_v2 INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+    conn.execute("ALTER TABLE jobs_v2 ADD PRIMARY KEY (id)")
+    # Mostly finished history, a thin queued head, and some running jobs of which
+    # one in five has an expired lease.
+    conn.execute(
+        """
+        INSERT INTO jobs_v2 (id, org_id, task, status, payload, priority, attempts,
+                             created_at, updated_at, claimed_by, claimed_at, lease_expires_at, finished_at)
+        SELECT gen_random_uuid(),
+               ('00000000-0000-0000-0000-' || lpad((g %% 50)::text, 12, '0'))::uuid,
+               (ARRAY['plan','execute','test','packager','security_scan'])[1 + g %% 5],
+               s.status,
+               '{}'::jsonb,
+               (g %% 3) * 10,
+               CASE WHEN s.status = 'queued' THEN 0 ELSE 1 END,
+               now() - (g || ' seconds')::interval,
+               now(),
+               CASE WHEN s.status = 'working' THEN 'w' END,
+               CASE WHEN s.status <> 'queued' THEN now() - (g || ' seconds')::interval END,
+               CASE WHEN s.status = 'working'
+                    THEN now() + (CASE WHEN g %% 5 = 0 THEN -60 ELSE 300 END) * interval '1 second' END,
+               CASE WHEN s.status IN ('done', 'error') THEN now() END
+        FROM generate_series(1, %(rows)s) g
+        CROSS JOIN LATERAL (
+          SELECT CASE
+            WHEN random() < %(queued)s THEN 'queued'
+            WHEN random() < %(working)s THEN 'working'
+            WHEN g %% 20 = 0 THEN 'error'
+            ELSE 'done'
+          END AS status
+        ) s
+        """,
+        {"rows": rows, "queued": queued, "working": working},
+    )
+    for stmt in COMMON_INDEXES:
+        conn.execute(stmt)
+
+
+def _use_indexes(conn: psycopg.Connection, stmts: list[str]) -> None:
+    for name in ("idx_jobs_v2_claim", "idx_jobs_v2_lease_reclaim", "idx_jobs_v2_queued", "idx_jobs_v2_lease_expiry"):
+        conn.execute(f"DROP INDEX IF EXISTS {SCHEMA}.{name}")
+    for stmt in stmts:
+        conn.execute(stmt)
+    conn.execute("VACUUM ANALYZE jobs_v2")
+
+
+def _scan_nodes(plan: dict[str, Any]) -> list[str]:
+    out: list[str] = []
+    node = plan.get("Node Type", "")
+    if "Scan" in node:
+        out.append(f"{node}({plan.get('Index Name') or plan.get('Relation Name')})")
+    for child in plan.get("Plans") or []:
+        out.extend(_scan_nodes(child))
+    return out
+
+
+def _explain(conn: psycopg.Connection, query: str, runs: int) -> dict[str, Any]:
+    times: list[float] = []
+    buffers: list[int] = []
+    plan: dict[str, Any] = {}
+    for _ in range(runs):
+        with conn.transaction(force_rollback=True):
+            row = conn.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + query).fetchone()
+        doc = row[0][0]
+        plan = doc["Plan"]
+        times.append(float(doc["Execution Time"]))
+        buffers.append(int(plan.get("Shared Hit Blocks", 0)) + int(plan.get("Shared Read Blocks", 0)))
+    return {
+        "ms_p50": statistics.median(times),
+        "ms_max": max(times),
+        "buffers": int(statistics.median(buffers)),
+        "scans": ", ".join(dict.fromkeys(_scan_nodes(plan))),
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--dsn", default=os.getenv("DATABASE_URL", ""))
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--queued", type=float, default=0.02, help="fraction of rows queued")
+    ap.add_argument("--working", type=float, default=0.01, help="fraction of remaining rows working")
+    ap.add_argument("--runs", type=int, default=20)
+    ap.add_argument("--keep", action="store_true", help="keep the velu_bench schema afterwards")
+    args = ap.parse_args(argv)
+
+    if not args.dsn:
+        print("DATABASE_URL (or --dsn) is required", file=sys.stderr)
+        return 2
+
+    dsn = args.dsn.replace("postgresql+psycopg://", "postgresql://", 1)
+    with psycopg.connect(dsn, autocommit=True) as conn:
+        print(f"seeding {args.rows:,} rows into {SCHEMA}.jobs_v2 ...", flush=True)
+        _seed(conn, args.rows, args.queued, args.working)
+        counts = dict(conn.execute("SELECT status, count(*) FROM jobs_v2 GROUP BY status").fetchall())
+        print("rows by status:", counts)
+
+        results: list[tuple[str, str, dict[str, Any]]] = []
+        _use_indexes(conn, OLD_INDEXES)
+        results.append(("before", "claim (queued OR expired)", _explain(conn, OLD_CLAIM, args.runs)))
+        _use_indexes(conn, NEW_INDEXES)
+        results.append(("after", "claim (queued only)", _explain(conn, NEW_CLAIM, args.runs)))
+        results.append(("after", "sweeper batch (500)", _explain(conn, SWEEP, args.runs)))
+
+        print()
+        print(f"{'variant':<8} {'query':<27} {'p50 ms':>9} {'max ms':>9} {'buffers':>8}  scans")
+        for variant, name, r in results:
+            print(f"{variant:<8} {name:<27} {r['ms_p50']:>9.3f} {r['ms_max']:>9.3f} {r['buffers']:>8}  {r['scans']}")
+
+        if not args.keep:
+            conn.execute(f"DROP SCHEMA {SCHEMA} CASCADE")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# scripts/check_import_budget.py
+"""
+Import-time budget for API and worker startup.
+
+Runs ``python -X importtime -c "import <module>"`` in fresh interpreters and
+fails if
+
+  - the module imports anything it must not (agent code in the API: handlers
+    are resolved lazily through services.queue.registry), or
+  - its cumulative import time, best of ``--runs``, exceeds the budget.
+
+    python scripts/check_import_budget.py                  # CI defaults
+    python scripts/check_import_budget.py --budget-ms 900 services.app_server.main
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess  # nosec B404
+import sys
+
+# module -> (budget in ms, module prefixes it must not import)
+CHECKS: dict[str, tuple[float, tuple[str, ...]]] = {
+    "services.app_server.main": (1500.0, ("services.agents", "services.queue.worker_entry", "local_tasks")),
+    "services.queue.worker_entry": (800.0, ("services.agents", "local_tasks")),
+}
+
+
+def import_profile(module: str) -> dict[str, float]:
+    """Cumulative import time in ms of every module ``import module`` loads."""
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    env.setdefault("ENV", "test")
+    proc = subprocess.run(  # nosec B603
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    out: dict[str, float] = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        try:
+            out[name.strip()] = int(cumulative.strip()) / 1000.0
+        except ValueError:
+            continue  # header line
+    return out
+
+
+def forbidden_imports(profile: dict[str, float], prefixes: tuple[str, ...]) -> list[str]:
+    return sorted(m for m in profile if any(m == p or m.startswith(p + ".") for p in prefixes))
+
+
+def check(module: str, budget_ms: float, forbidden: tuple[str, ...], runs: int) -> list[str]:
+    errors: list[str] = []
+    best: float | None = None
+    for _ in range(max(1, runs)):
+        profile = import_profile(module)
+        bad = forbidden_imports(profile, forbidden)
+        if bad:
+            errors.append(f"{module} imports {', '.join(bad[:10])}{' ...' if len(bad) > 10 else ''}")
+            break
+        took = profile.get(module, 0.0)
+        best = took if best is None else min(best, took)
+    if best is not None:
+        status = "ok" if best <= budget_ms else "OVER BUDGET"
+        print(f"{module}: {best:.0f} ms (budget {budget_ms:.0f} ms) {status}")
+        if best > budget_ms:
+            errors.append(f"{module} took {best:.0f} ms to import, budget {budget_ms:.0f} ms")
+    return errors
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("modules", nargs="*", help=f"modules to check (default: {', '.join(CHECKS)})")
+    ap.add_argument("--budget-ms", type=float, default=None, help="override every module's budget")
+    ap.add_argument("--runs", type=int, default=3, help="take the best of N fresh imports")
+    args = ap.parse_args(argv)
+
+    errors: list[str] = []
+    for module in args.modules or list(CHECKS):
+        budget, forbidden = CHECKS.get(module, (1500.0, ()))
+        errors += check(module, args.budget_ms or budget, forbidden, args.runs)
+    for e in errors:
+        print(f"error: {e}", file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,81 +2,47 @@
 from __future__ import annotations
 import subprocess  # nosec B404 - used for internal subprocess calls (pytest, etc.), not user input
 
-from typing import Any, Callable, Dict
-
-from . import (
-    aggregate,
-    ai_features,
-    api_design,
-    architecture,
-    backend_scaffold,
-    codegen,
-    datamodel,
-    executor,
-    gitcommit,
-    intake,
-    lint,
-    pipeline,
-    planner,
-    report,
-    requirements,
-    security_hardening,
-    tester,
-    testgen,
-    ui_scaffold,
-    autodev,
-    hospital_codegen,
-    hospital_apply_patches,
-    packager,
-    ai_architect,
-    code_refiner,
-    test_fix_assistant,
-    debug_pipeline,
-    chatbot_embed,
-    runtime_planner,
-    runtime_script_writer,
-    mobile_scaffold,
-    repo_summary,
-    
-    
-)
+from typing import Any, Dict
 
+from services.queue.registry import LazyHandlers
 
-HANDLERS: dict[str, Callable[[dict[str, Any]], dict[str, Any]]] = {
-    "requirements": requirements.handle,
-    "architecture": architecture.handle,
-    "datamodel": datamodel.handle,
-    "api_design": api_design.handle,
-    "ui_scaffold": ui_scaffold.handle,
-    "backend_scaffold": backend_scaffold.handle,
-    "ai_features": ai_features.handle,
-    "security_hardening": security_hardening.handle,
-    "testgen": testgen.handle,
-    "pipeline": pipeline.handle,
-    "plan": planner.handle,
-    "aggregate": aggregate.handle,
-    "gitcommit": gitcommit.handle,
-    "codegen": codegen.handle,
-    "execute": executor.handle,
-    "test": tester.handle,
-    "report": report.handle,
-    "intake": intake.handle,
-    "lint": lint.handle,
-    "autodev": autodev.handle,
-    "hospital_codegen": hospital_codegen.handle,
-    "hospital_apply_patches": hospital_apply_patches.handle,
-    "packager": packager.handle,
-    "ai_architect": ai_architect.handle,
-    "code_refiner": code_refiner.handle,
-    "test_fix_assistant": test_fix_assistant.handle,
-    "debug_pipeline": debug_pipeline.handle,
-    "chatbot_embed": chatbot_embed.handle,
-    "runtime_planner": runtime_planner.handle,
-    "runtime_script_writer": runtime_script_writer.handle,
-    "mobile_scaffold": mobile_scaffold.handle,
-    "repo_summary": repo_summary.handle,
-     
-}
+# Legacy task registry of services.worker.main; agents are imported on first use.
+HANDLERS = LazyHandlers(
+    {
+        "requirements": "services.agents.requirements:handle",
+        "architecture": "services.agents.architecture:handle",
+        "datamodel": "services.agents.datamodel:handle",
+        "api_design": "services.agents.api_design:handle",
+        "ui_scaffold": "services.agents.ui_scaffold:handle",
+        "backend_scaffold": "services.agents.backend_scaffold:handle",
+        "ai_features": "services.agents.ai_features:handle",
+        "security_hardening": "services.agents.security_hardening:handle",
+        "testgen": "services.agents.testgen:handle",
+        "pipeline": "services.agents.pipeline:handle",
+        "plan": "services.agents.planner:handle",
+        "aggregate": "services.agents.aggregate:handle",
+        "gitcommit": "services.agents.gitcommit:handle",
+        "codegen": "services.agents.codegen:handle",
+        "execute": "services.agents.executor:handle",
+        "test": "services.agents.tester:handle",
+        "report": "services.agents.report:handle",
+        "intake": "services.agents.intake:handle",
+        "lint": "services.agents.lint:handle",
+        "autodev": "services.agents.autodev:handle",
+        "hospital_codegen": "services.agents.hospital_codegen:handle",
+        "hospital_apply_patches": "services.agents.hospital_apply_patches:handle",
+        "packager": "services.agents.packager:handle",
+        "ai_architect": "services.agents.ai_architect:handle",
+        "code_refiner": "services.agents.code_refiner:handle",
+        "test_fix_assistant": "services.agents.test_fix_assistant:handle",
+        "debug_pipeline": "services.agents.debug_pipeline:handle",
+        "chatbot_embed": "services.agents.chatbot_embed:handle",
+        "runtime_planner": "services.agents.runtime_planner:handle",
+        "runtime_script_writer": "services.agents.runtime_script_writer:handle",
+        "mobile_scaffold": "services.agents.mobile_scaffold:handle",
+        "repo_summary": "services.agents.repo_summary:handle",
+    }
+)
 
 
 def run_pytest_legacy(payload: Dict[str, Any]) -> Dict[str, Any]:
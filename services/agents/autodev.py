@@ -1,18 +1,25 @@
 # services/agents/autodev.py
+"""
+Autodev: seed a module via ``pipeline``, then lint -> test -> (codegen -> execute)
+red/green cycles until the tests pass or ``max_cycles`` runs out, then commit.
+
+Each step is its own job. The autodev job is a persisted state machine: after
+enqueueing a step it defers (services.queue.defer) and is re-run once that step
+has settled, with the cycle state in ``payload["_state"]``. A worker is only busy
+while a step is actually being planned, so one worker is enough and a restart
+resumes where the run left off.
+"""
 from __future__ import annotations
 
+import json
+import logging
 import os
 import re
-import sqlite3
 from pathlib import Path
 from typing import Any, Dict, List
 
 from services.queue import get_queue
-from services.queue import jobs_sqlite  # allowed
-
-q = get_queue()
-
-import logging  # noqa: E402
+from services.queue.defer import STATE_KEY, defer
 
 logger = logging.getLogger(__name__)
 
@@ -20,56 +27,39 @@ logger = logging.getLogger(__name__)
 # ---------------------------
 # Queue helpers
 # ---------------------------
-def _enqueue(task: str, payload: dict, priority: int = 0) -> int:
-    """
-    Enqueue a job into the Velu queue using the same mechanism as /tasks.
-    """
-    return get_queue.enqueue(task=task, payload=payload, priority=priority)
-
-
-def _load(job_id: int) -> dict:
-    """
-    Load a job row directly from the jobs DB.
-
-    We read from the same SQLite DB that the worker uses (jobs_sqlite.db_path()).
-    The row includes fields like: id, task, payload, status, result, err, etc.
-    """
-    db_path = jobs_sqlite.db_path()
-    try:
-        conn = sqlite3.connect(db_path)
-        conn.row_factory = sqlite3.Row
-        try:
-            cur = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,))
-            row = cur.fetchone()
-        finally:
-            conn.close()
-    except Exception as exc:
-        return {"ok": False, "error": f"load_failed: {exc}"}
-
-    if not row:
+def _velu(payload: Dict[str, Any]) -> Dict[str, Any]:
+    velu = payload.get("_velu")
+    return dict(velu) if isinstance(velu, dict) else {}
+
+
+def _enqueue(task: str, payload: dict, priority: int, parent: Dict[str, Any]) -> str | int:
+    """Enqueue a step under the autodev job's tenant/actor (taken from its ``_velu`` meta)."""
+    velu = _velu(parent)
+    velu.pop("workspace", None)
+    org_id = velu.get("org_id") or parent.get("_org_id")
+    return get_queue().enqueue(
+        task=task,
+        payload={**payload, "_velu": velu},
+        priority=priority,
+        org_id=str(org_id) if org_id else None,
+        project_id=str(velu["project_id"]) if velu.get("project_id") else None,
+        actor_type=str(velu.get("actor_type") or "api_key"),
+        actor_id=str(velu["actor_id"]) if velu.get("actor_id") else None,
+    )
+
+
+def _load(job_id: Any) -> dict:
+    """A settled step's row, with JSON-text fields (SQLite) decoded."""
+    rec = get_queue().get(job_id)
+    if not isinstance(rec, dict):
         return {"ok": False, "error": "not found"}
-
-    # Convert sqlite Row -> plain dict
-    out = dict(row)
-
-    # If result/err are JSON strings, try to decode them for convenience
-    import json
-
+    out = dict(rec)
     for key in ("result", "err", "payload"):
-        if key in out and isinstance(out[key], str):
-            s = out[key].strip()
-            if s:
-                try:
-                    out[key] = json.loads(s)
-                except Exception:
-                    # keep raw string if not valid JSON, but log for debugging
-                    logger.debug(
-                        "autodev: could not parse JSON for key %s, keeping raw value",
-                        key,
-                        exc_info=True,
-                    )
-                    pass
-
+        if isinstance(out.get(key), str) and out[key].strip():
+            try:
+                out[key] = json.loads(out[key])
+            except ValueError:
+                logger.debug("autodev: could not parse JSON for key %s, keeping raw value", key)
     return out
 
 
@@ -229,153 +219,191 @@ def _build_fix_prompt(
 
 
 # ---------------------------
-# Main handler
+# State machine
 # ---------------------------
-def handle(payload: Dict[str, Any]) -> Dict[str, Any]:
-    """
-    Autodev v2 (deploy-hardened):
-      1) Plan/build once via 'pipeline' (seeds files if needed).
-      2) Lint -> Test.
-      3) If red: parse failures, call 'codegen' to patch -> Execute -> Lint -> Test again.
-      4) Stop when green or max cycles exhausted; commit if green and git repo present.
-    Safe when /workspace or /git are missing: it auto-detects a writable root and
-    skips git commit if no repo.
-    """
+def _config(payload: Dict[str, Any]) -> Dict[str, Any]:
     idea = str(payload.get("idea") or payload.get("plan") or "Improve module")
-    module = str(payload.get("module", "hello_mod"))
-    message = str(payload.get("message", f"feat: {idea}"))
-    run_tests = bool(payload.get("tests", True))
-    max_cycles = int(payload.get("max_cycles", 5))
-    priority_base = int(payload.get("priority", 5))
+    return {
+        "idea": idea,
+        "module": str(payload.get("module", "hello_mod")),
+        "message": str(payload.get("message", f"feat: {idea}")),
+        "run_tests": bool(payload.get("tests", True)),
+        "max_cycles": int(payload.get("max_cycles", 5)),
+        "priority": int(payload.get("priority", 5)),
+    }
+
+
+def _step(state: Dict[str, Any], stage: str, job_id: Any) -> Dict[str, Any]:
+    state["stage"] = stage
+    state["job"] = job_id
+    return defer(state, [job_id])
+
+
+def _begin_cycle(state: Dict[str, Any], payload: Dict[str, Any], cfg: Dict[str, Any]) -> Dict[str, Any]:
+    cycle: Dict[str, Any] = {"index": state["cycle"]}
+    state["steps"]["cycles"].append(cycle)
+    l_id = _enqueue("lint", {"root": state["project_root"]}, cfg["priority"], payload)
+    cycle["lint_job"] = l_id
+    return _step(state, "lint", l_id)
+
+
+def _end_cycle(state: Dict[str, Any], payload: Dict[str, Any], cfg: Dict[str, Any]) -> Dict[str, Any]:
+    state["cycle"] += 1
+    if state["cycle"] < cfg["max_cycles"]:
+        return _begin_cycle(state, payload, cfg)
+    return _finish(state, payload, cfg)
+
 
+def _finish(state: Dict[str, Any], payload: Dict[str, Any], cfg: Dict[str, Any]) -> Dict[str, Any]:
+    git_root = state.get("git_root")
+    commit_info: Dict[str, Any] = state.setdefault("commit", {})
+    if state["green"] and state["stage"] != "commit":
+        if git_root and (Path(git_root) / ".git").exists():
+            gc_id = _enqueue("gitcommit", {"message": cfg["message"]}, 1, payload)
+            commit_info["gitcommit_job"] = gc_id
+            return _step(state, "commit", gc_id)
+        commit_info["skipped"] = True
+        commit_info["reason"] = "no git repo present"
+
+    return {
+        "ok": state["green"],
+        "agent": "autodev",
+        "idea": cfg["idea"],
+        "module": cfg["module"],
+        "max_cycles": cfg["max_cycles"],
+        "green": state["green"],
+        "commit": commit_info,
+        "steps": state["steps"],
+    }
+
+
+def _start(payload: Dict[str, Any], cfg: Dict[str, Any]) -> Dict[str, Any]:
     project_root = _detect_project_root()
     git_root = _detect_git_root()
-
-    steps: Dict[str, Any] = {
+    seed: Dict[str, Any] = {"stage": "seed"}
+    state: Dict[str, Any] = {
+        "stage": "seed",
+        "cycle": 0,
+        "green": False,
         "project_root": str(project_root),
         "git_root": str(git_root) if git_root else None,
-        "cycles": [],
+        "steps": {
+            "project_root": str(project_root),
+            "git_root": str(git_root) if git_root else None,
+            "cycles": [seed],
+        },
     }
-
     # 0) Seed once via pipeline (idempotent in your setup)
-    first_cycle: Dict[str, Any] = {"stage": "seed"}
     try:
         p_id = _enqueue(
             "pipeline",
-            {"idea": idea, "module": module, "tests": run_tests},
-            priority=priority_base + 2,
+            {"idea": cfg["idea"], "module": cfg["module"], "tests": cfg["run_tests"]},
+            cfg["priority"] + 2,
+            payload,
         )
-        first_cycle["pipeline_job"] = p_id
-        p_rec = _load(p_id)
-        first_cycle["pipeline_result"] = p_rec.get("result")
     except Exception as e:
-        first_cycle["error"] = f"seed_failed: {e}"
-
-    steps["cycles"].append(first_cycle)
-
-    # Iterate until tests are green
-    green = False
-    last_stdout = ""
-    cycle_idx = 0
-
-    while cycle_idx < max_cycles:
-        cycle: Dict[str, Any] = {"index": cycle_idx}
-
-        # 1) Lint (use detected root)
-        l_id = _enqueue("lint", {"root": str(project_root)}, priority=priority_base)
-        cycle["lint_job"] = l_id
-        l_rec = _load(l_id)
-        cycle["lint_result"] = l_rec.get("result")
-
-        # 2) Test
-        if run_tests:
-            t_id = _enqueue(
-                "test",
-                {
-                    "rootdir": str(project_root),
-                    "tests_path": "tests",
-                    "args": [
-                        "-q",
-                        "--maxfail=1",
-                        "--disable-warnings",
-                        "--basetemp=/tmp/pytest",
-                    ],
-                },
-                priority=priority_base,
-            )
-            cycle["test_job"] = t_id
-            t_rec = _load(t_id)
-            t_res = t_rec.get("result") or {}
-            cycle["test_result"] = t_res
-
-            rc = int(t_res.get("returncode", 1))
-            last_stdout = (t_res.get("stdout") or "") + "\n" + (t_res.get("stderr") or "")
-
-            if rc == 0:
-                green = True
-                steps["cycles"].append(cycle)
-                break
-
-            # 3) Tests failed → parse & patch
-            failures = _pytest_failures(t_res.get("stdout", ""), t_res.get("stderr", ""))
-            cycle["failures"] = failures
-
-            fix_prompt = _build_fix_prompt(idea, module, failures, last_stdout)
-            cg_id = _enqueue(
-                "codegen",
-                {
-                    "root": str(project_root),
-                    "instructions": fix_prompt,
-                    "allow_files_outside_root": False,
-                },
-                priority=priority_base + 1,
-            )
-            cycle["codegen_job"] = cg_id
-            cg_rec = _load(cg_id)
-            cycle["codegen_result"] = cg_rec.get("result")
-
-            # Normalize output into files list
-            produced_files: List[Dict[str, Any]] = []  # noqa: F841
-            cg = cg_rec.get("result") or {}
-            files = []
-            if isinstance(cg.get("files"), list):
-                files = cg["files"]
-            elif isinstance(cg.get("data"), dict) and isinstance(cg["data"].get("files"), list):
-                files = cg["data"]["files"]
-
-            files = _normalize_codegen_files(project_root, files)
-
-            if files:
-                ex_id = _enqueue("execute", {"files": files}, priority=priority_base + 1)
-                cycle["execute_job"] = ex_id
-                ex_rec = _load(ex_id)
-                cycle["execute_result"] = ex_rec.get("result")
-                ex = ex_rec.get("result") or {}
-                cycle["patched_files"] = ex.get("wrote", [])
-            else:
-                cycle["patched_files"] = []
-
-        steps["cycles"].append(cycle)
-        cycle_idx += 1
-
-    # Commit if green AND repo exists
-    commit_info: Dict[str, Any] = {}
-    if green and git_root and (git_root / ".git").exists():
-        gc_id = _enqueue("gitcommit", {"message": message}, priority=1)
-        commit_info["gitcommit_job"] = gc_id
-        gc_rec = _load(gc_id)
-        commit_info["gitcommit_result"] = gc_rec.get("result")
-    elif green:
-        commit_info["skipped"] = True
-        commit_info["reason"] = "no git repo present"
+        seed["error"] = f"seed_failed: {e}"
+        return _begin_cycle(state, payload, cfg)
+    seed["pipeline_job"] = p_id
+    return _step(state, "seed", p_id)
+
+
+def _advance(state: Dict[str, Any], payload: Dict[str, Any], cfg: Dict[str, Any]) -> Dict[str, Any]:
+    """Record the result of the step that just settled and start the next one."""
+    stage = state.get("stage")
+    rec = _load(state.get("job"))
+    res = rec.get("result") if isinstance(rec.get("result"), dict) else {}
+    cycle = state["steps"]["cycles"][-1]
+    root = state["project_root"]
+
+    if stage == "seed":
+        cycle["pipeline_result"] = rec.get("result")
+        return _begin_cycle(state, payload, cfg)
+
+    if stage == "lint":
+        cycle["lint_result"] = rec.get("result")
+        if not cfg["run_tests"]:
+            return _end_cycle(state, payload, cfg)
+        t_id = _enqueue(
+            "test",
+            {
+                "rootdir": root,
+                "tests_path": "tests",
+                "args": ["-q", "--maxfail=1", "--disable-warnings", "--basetemp=/tmp/pytest"],
+            },
+            cfg["priority"],
+            payload,
+        )
+        cycle["test_job"] = t_id
+        return _step(state, "test", t_id)
+
+    if stage == "test":
+        cycle["test_result"] = res
+        if int(res.get("returncode", 1)) == 0:
+            state["green"] = True
+            return _finish(state, payload, cfg)
+
+        # Tests failed -> parse & patch
+        last_stdout = (res.get("stdout") or "") + "\n" + (res.get("stderr") or "")
+        failures = _pytest_failures(res.get("stdout", ""), res.get("stderr", ""))
+        cycle["failures"] = failures
+        cg_id = _enqueue(
+            "codegen",
+            {
+                "root": root,
+                "instructions": _build_fix_prompt(cfg["idea"], cfg["module"], failures, last_stdout),
+                "allow_files_outside_root": False,
+            },
+            cfg["priority"] + 1,
+            payload,
+        )
+        cycle["codegen_job"] = cg_id
+        return _step(state, "codegen", cg_id)
+
+    if stage == "codegen":
+        cycle["codegen_result"] = rec.get("result")
+        files: List[Dict[str, Any]] = []
+        if isinstance(res.get("files"), list):
+            files = res["files"]
+        elif isinstance(res.get("data"), dict) and isinstance(res["data"].get("files"), list):
+            files = res["data"]["files"]
+        files = _normalize_codegen_files(Path(root), files)
+        if not files:
+            cycle["patched_files"] = []
+            return _end_cycle(state, payload, cfg)
+        ex_id = _enqueue("execute", {"files": files}, cfg["priority"] + 1, payload)
+        cycle["execute_job"] = ex_id
+        return _step(state, "execute", ex_id)
+
+    if stage == "execute":
+        cycle["execute_result"] = rec.get("result")
+        cycle["patched_files"] = res.get("wrote", [])
+        return _end_cycle(state, payload, cfg)
+
+    if stage == "commit":
+        state.setdefault("commit", {})["gitcommit_result"] = rec.get("result")
+        return _finish(state, payload, cfg)
+
+    return {"ok": False, "agent": "autodev", "error": f"unknown autodev stage: {stage!r}", "state": state}
 
-    return {
-        "ok": green,
-        "agent": "autodev",
-        "idea": idea,
-        "module": module,
-        "max_cycles": max_cycles,
-        "green": green,
-        "commit": commit_info,
-        "steps": steps,
-    }
+
+# ---------------------------
+# Main handler
+# ---------------------------
+def handle(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Autodev v3 (resumable):
+      1) Plan/build once via 'pipeline' (seeds files if needed).
+      2) Lint -> Test.
+      3) If red: parse failures, call 'codegen' to patch -> Execute -> Lint -> Test again.
+      4) Stop when green or max cycles exhausted; commit if green and git repo present.
+    Every call starts or advances the run by one step and defers until that step
+    settles. Safe when /workspace or /git are missing: it auto-detects a writable
+    root and skips git commit if no repo.
+    """
+    payload = dict(payload or {})
+    cfg = _config(payload)
+    state = payload.pop(STATE_KEY, None)
+    if not isinstance(state, dict):
+        return _start(payload, cfg)
+    return _advance(dict(state), payload, cfg)
@@ -1,6 +1,7 @@
 # services/agents/chat.py
 from __future__ import annotations
 
+import asyncio
 from asyncio.log import logger
 import os
 import json
@@ -861,42 +862,56 @@ def _call_local_llm(session: Dict[str, Any], msg: str) -> str:
     return _next_question(session, msg)
 
 
+def _remote_messages(msg: str, draft_reply: str) -> list[Dict[str, str]]:
+    system_prompt = (
+        "You are Velu, an AI assistant that helps users design small apps and websites.\n"
+        "You are given an INTERNAL builder reply produced by deterministic rules.\n"
+        "Rewrite that internal reply so it is clear, friendly, and helpful,\n"
+        "WITHOUT changing its meaning or instructions.\n"
+        "Do not add new requirements or contradict the internal reply.\n"
+    )
+
+    user_prompt = (
+        f"User message:\n{msg or '[empty]'}\n\n"
+        f"Internal builder reply (draft):\n{draft_reply}\n\n"
+        "Rewrite the internal builder reply in a clearer, more natural tone.\n"
+        "Keep all steps, examples, and instructions.\n"
+        "Return ONLY the rewritten message text."
+    )
+
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt},
+    ]
+
+
+def _remote_failed(draft_reply: str, e: Exception) -> str:
+    return draft_reply + (
+        f"\n\n(Note: remote LLM backend failed with error: {e!s}. "
+        "Using the basic rules flow for now.)"
+    )
+
+
 def _call_remote_llm(session: Dict[str, Any], msg: str) -> str:
     draft_reply = _next_question(session, msg)
 
     try:
-        system_prompt = (
-            "You are Velu, an AI assistant that helps users design small apps and websites.\n"
-            "You are given an INTERNAL builder reply produced by deterministic rules.\n"
-            "Rewrite that internal reply so it is clear, friendly, and helpful,\n"
-            "WITHOUT changing its meaning or instructions.\n"
-            "Do not add new requirements or contradict the internal reply.\n"
-        )
+        text = llm_client.remote_chat_completion(_remote_messages(msg, draft_reply), temperature=0.2).strip()
+        return text or draft_reply
+    except Exception as e:
+        return _remote_failed(draft_reply, e)
 
-        user_prompt = (
-            f"User message:\n{msg or '[empty]'}\n\n"
-            f"Internal builder reply (draft):\n{draft_reply}\n\n"
-            "Rewrite the internal builder reply in a clearer, more natural tone.\n"
-            "Keep all steps, examples, and instructions.\n"
-            "Return ONLY the rewritten message text."
-        )
 
-        text = llm_client.remote_chat_completion(
-            [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-            temperature=0.2,
-        ).strip()
+async def _call_remote_llm_async(session: Dict[str, Any], msg: str) -> str:
+    draft_reply = await asyncio.to_thread(_next_question, session, msg)
 
-        if not text:
-            return draft_reply
-        return text
+    try:
+        text = (
+            await llm_client.remote_chat_completion_async(_remote_messages(msg, draft_reply), temperature=0.2)
+        ).strip()
+        return text or draft_reply
     except Exception as e:
-        return draft_reply + (
-            f"\n\n(Note: remote LLM backend failed with error: {e!s}. "
-            "Using the basic rules flow for now.)"
-        )
+        return _remote_failed(draft_reply, e)
 
 
 def _run_hospital_command(session: Dict[str, Any], user_message: str) -> str:
@@ -1885,7 +1900,31 @@ def _derive_plan_tier(mode: str, security: str) -> str:
     return "starter"
 
 
-def handle(payload: Mapping[str, Any]) -> Dict[str, Any]:
+def _turn_response(session: Dict[str, Any], session_id: str, backend: str, assistant_msg: str) -> Dict[str, Any]:
+    _add_history(session, "assistant", assistant_msg)
+    spec = session.setdefault("spec", {})
+    _normalize_tier_fields(spec)
+    _save_session(session)
+
+    return {
+        "session_id": session_id,
+        "backend": backend,
+        "stage": session.get("stage"),
+        "spec": spec,
+        "message": assistant_msg,
+        "jobs": session.get("jobs", {}),
+        "history_tail": session.get("history", [])[-HISTORY_TAIL:],
+        "project_summary": _project_summary_or_empty(session),
+    }
+
+
+def _begin_turn(payload: Mapping[str, Any]) -> Tuple[Dict[str, Any] | None, Dict[str, Any], str, str, str]:
+    """
+    Load the session and record the user's message.
+
+    Returns (response, session, session_id, backend, msg); ``response`` is set when
+    the turn needs no backend reply (reset, empty message).
+    """
     data = dict(payload or {})
     msg = str(data.get("message", "")).strip()
     session_id = str(data.get("session_id") or "velu_default").strip() or "velu_default"
@@ -1915,22 +1954,8 @@ def handle(payload: Mapping[str, Any]) -> Dict[str, Any]:
     if reset_flag:
         session = _new_session(session_id)
         session["backend"] = backend
-        assistant_msg = _next_question(session, "")
-        _add_history(session, "assistant", assistant_msg)
-        spec = session.setdefault("spec", {})
-        _normalize_tier_fields(spec)
-        _save_session(session)
-
-        return {
-            "session_id": session_id,
-            "backend": backend,
-            "stage": session.get("stage"),
-            "spec": spec,
-            "message": assistant_msg,
-            "jobs": session.get("jobs", {}),
-            "history_tail": session.get("history", [])[-HISTORY_TAIL:],
-            "project_summary": _project_summary_or_empty(session),
-        }
+        response = _turn_response(session, session_id, backend, _next_question(session, ""))
+        return response, session, session_id, backend, msg
 
     session = _load_session(session_id)
     spec = session.setdefault("spec", {})
@@ -1942,24 +1967,17 @@ def handle(payload: Mapping[str, Any]) -> Dict[str, Any]:
     session["backend"] = backend
 
     if not msg:
-        assistant_msg = _next_question(session, "")
-        _add_history(session, "assistant", assistant_msg)
-        spec = session.setdefault("spec", {})
-        _normalize_tier_fields(spec)
-        _save_session(session)
-
-        return {
-            "session_id": session_id,
-            "backend": backend,
-            "stage": session.get("stage"),
-            "spec": spec,
-            "message": assistant_msg,
-            "jobs": session.get("jobs", {}),
-            "history_tail": session.get("history", [])[-HISTORY_TAIL:],
-            "project_summary": _project_summary_or_empty(session),
-        }
+        response = _turn_response(session, session_id, backend, _next_question(session, ""))
+        return response, session, session_id, backend, msg
 
     _add_history(session, "user", msg)
+    return None, session, session_id, backend, msg
+
+
+def handle(payload: Mapping[str, Any]) -> Dict[str, Any]:
+    response, session, session_id, backend, msg = _begin_turn(payload)
+    if response is not None:
+        return response
 
     if backend == "rules":
         assistant_msg = _run_rules_backend(session, msg)
@@ -1968,18 +1986,19 @@ def handle(payload: Mapping[str, Any]) -> Dict[str, Any]:
     else:
         assistant_msg = _call_remote_llm(session, msg)
 
-    _add_history(session, "assistant", assistant_msg)
-    spec = session.setdefault("spec", {})
-    _normalize_tier_fields(spec)
-    _save_session(session)
+    return _turn_response(session, session_id, backend, assistant_msg)
 
-    return {
-        "session_id": session_id,
-        "backend": backend,
-        "stage": session.get("stage"),
-        "spec": spec,
-        "message": assistant_msg,
-        "jobs": session.get("jobs", {}),
-        "history_tail": session.get("history", [])[-HISTORY_TAIL:],
-        "project_summary": _project_summary_or_empty(session),
-    }
+
+async def handle_async(ctx: Any, payload: Mapping[str, Any]) -> Dict[str, Any]:
+    """
+    Async ``chat`` handler for the asyncio worker: the remote LLM call is awaited,
+    session files and the rules flow run in threads.
+    """
+    if str((payload or {}).get("backend") or DEFAULT_BACKEND).strip().lower() != "remote_llm":
+        return await asyncio.to_thread(handle, payload)
+
+    response, session, session_id, backend, msg = await asyncio.to_thread(_begin_turn, payload)
+    if response is not None:
+        return response
+    assistant_msg = await _call_remote_llm_async(session, msg)
+    return await asyncio.to_thread(_turn_response, session, session_id, backend, assistant_msg)
@@ -2,20 +2,14 @@
 from __future__ import annotations
 
 import os  # noqa: F401
-import subprocess  # nosec B404
 from typing import Any
 
+from services.queue import cancel
+
 
 def _run(cmd: list[str], cwd: str | None = None) -> tuple[int, str, str]:
-    p = subprocess.Popen(  # nosec B603
-        cmd,
-        cwd=cwd,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True,
-    )
-    out, err = p.communicate()
-    return p.returncode, out, err
+    p = cancel.run(cmd, cwd=cwd, capture_output=True, text=True)
+    return p.returncode, p.stdout, p.stderr
 
 
 def handle(payload: dict[str, Any]) -> dict[str, Any]:
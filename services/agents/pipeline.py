@@ -140,7 +140,6 @@ def handle(task_or_payload: Any, payload: Mapping[str, Any] | None = None) -> di
         "files": files,
         "files_json": json.dumps(files),
     }
-    execute_id = q.enqueue(task="execute", payload=execute_payload, priority=0)
 
     # -------------------------
     # Stage 2: test
@@ -150,10 +149,8 @@ def handle(task_or_payload: Any, payload: Mapping[str, Any] | None = None) -> di
         **base_payload,
         "rootdir": ".",
         "tests_path": f"tests/test_{module}.py",
-        "depends_on": [execute_id],
         "args": ["-q", "--maxfail=1", "--disable-warnings", "--basetemp=/tmp/pytest"],
     }
-    test_id = q.enqueue(task="test", payload=test_payload, priority=0)
 
     # -------------------------
     # Stage 3: packager
@@ -161,14 +158,21 @@ def handle(task_or_payload: Any, payload: Mapping[str, Any] | None = None) -> di
     packager_payload: Dict[str, Any] = {
         **base_payload,
         "rootdir": ".",
-        "depends_on": [execute_id, test_id],
     }
-    packager_id = q.enqueue(task="packager", payload=packager_payload, priority=0)
+
+    # depends_on_idx points at earlier entries of the batch; enqueue_many turns
+    # them into payload["depends_on"] job ids.
+    batch: list[Dict[str, Any]] = [
+        {"task": "execute", "payload": execute_payload, "priority": 0},
+        {"task": "test", "payload": test_payload, "priority": 0, "depends_on_idx": [0]},
+        {"task": "packager", "payload": packager_payload, "priority": 0, "depends_on_idx": [0, 1]},
+    ]
 
     # Optional: multi-step agent pipeline
     pipeline_mode = os.getenv("VELU_PIPELINE_MODE", "simple").strip().lower()
     pipeline_subjobs: Dict[str, int] = {}
 
+    steps: list[str] = []
     if pipeline_mode == "multi":
         logger.info("pipeline: multi-step mode enabled for module=%s", module)
 
@@ -185,14 +189,13 @@ def handle(task_or_payload: Any, payload: Mapping[str, Any] | None = None) -> di
             "security_hardening",
             "testgen",
         ]
+        batch.extend({"task": step, "payload": agent_payload, "priority": 0} for step in steps)
 
-        for step in steps:
-            try:
-                jid = q.enqueue(task=step, payload=agent_payload, priority=0)
-                pipeline_subjobs[step] = jid
-                logger.info("pipeline: enqueued step=%s job_id=%s", step, jid)
-            except Exception as e:
-                logger.warning("pipeline: failed to enqueue step=%s for module=%s: %s", step, module, e)
+    # One transaction for the whole run: either every stage is queued or none is.
+    execute_id, test_id, packager_id, *step_ids = q.enqueue_many(batch)
+    for step, jid in zip(steps, step_ids):
+        pipeline_subjobs[step] = jid
+        logger.info("pipeline: enqueued step=%s job_id=%s", step, jid)
 
     result: Dict[str, Any] = {
         "ok": True,
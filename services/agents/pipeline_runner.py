@@ -136,44 +136,46 @@ def handle(task_or_payload: Any, payload: Mapping[str, Any] | None = None) -> di
         "pipeline_waiter": 0,
     }
 
-    stages_out: list[dict[str, Any]] = []
-    subjobs: dict[str, Any] = {}
-
+    batch: list[dict[str, Any]] = []
     for st in stage_names:
         p = dict(stage_payload)
         p["_velu"] = dict(stage_payload.get("_velu") or {})
-        meta = p.get("_velu") if isinstance(p.get("_velu"), dict) else {}
-
-        jid = q.enqueue(
-            task=st,
-            payload=p,
-            priority=int(stage_priority.get(st, 0)),
-            org_id=str(meta.get("org_id")) if meta.get("org_id") else None,
-            project_id=str(meta.get("project_id")) if meta.get("project_id") else None,
-            actor_type=str(meta.get("actor_type") or "api_key"),
-            actor_id=str(meta.get("actor_id")) if meta.get("actor_id") else None,
-        )
-        subjobs[st] = jid
-        stages_out.append({"name": st, "job_id": jid, "status": "queued"})
-
-    waiter_payload: Dict[str, Any] = {
-        "pipeline_name": pipeline_name,
-        "stage_jobs": dict(subjobs),
-        "gates": dict(gates),
-        "idea": idea,
-        "module": module,
-        "_velu": dict(velu_meta),
-    }
+        batch.append({"task": st, "payload": p, "priority": int(stage_priority.get(st, 0))})
+
+    # The waiter is queued in the same batch; its stage ids arrive as depends_on
+    # (resolved from depends_on_idx) and pair up with stage_names. With
+    # wait_for="finished" it stays blocked until every stage has settled, then runs
+    # once to evaluate the gates.
+    batch.append(
+        {
+            "task": "pipeline_waiter",
+            "payload": {
+                "pipeline_name": pipeline_name,
+                "stage_names": list(stage_names),
+                "gates": dict(gates),
+                "idea": idea,
+                "module": module,
+                "_velu": dict(velu_meta),
+            },
+            "priority": int(stage_priority.get("pipeline_waiter", 0)),
+            "depends_on_idx": list(range(len(stage_names))),
+            "wait_for": "finished",
+        }
+    )
 
-    waiter_id = q.enqueue(
-        task="pipeline_waiter",
-        payload=waiter_payload,
-        priority=int(stage_priority.get("pipeline_waiter", 0)),
+    ids = q.enqueue_many(
+        batch,
         org_id=str(velu_meta.get("org_id")) if velu_meta.get("org_id") else None,
         project_id=str(velu_meta.get("project_id")) if velu_meta.get("project_id") else None,
         actor_type=str(velu_meta.get("actor_type") or "api_key"),
         actor_id=str(velu_meta.get("actor_id")) if velu_meta.get("actor_id") else None,
     )
+
+    subjobs: dict[str, Any] = dict(zip(stage_names, ids))
+    stages_out: list[dict[str, Any]] = [
+        {"name": st, "job_id": jid, "status": "queued"} for st, jid in zip(stage_names, ids)
+    ]
+    waiter_id = ids[-1]
     subjobs["pipeline_waiter"] = waiter_id
 
     result: Dict[str, Any] = {
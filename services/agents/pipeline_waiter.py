@@ -1,17 +1,24 @@
+"""
+Pipeline completion hook.
+
+The waiter is enqueued in the same batch as the stages with ``wait_for:
+"finished"``, so it stays ``blocked`` until every stage has settled and is then
+claimed once: it reads each stage a single time, evaluates the catalog gates and
+returns. It never polls or sleeps in a worker slot.
+"""
 from __future__ import annotations
 
-import os
-import time
+import json
 from typing import Any, Dict, Mapping
 
 from services.queue import get_queue
+from services.queue.retry import RetryLater
 
+_SETTLED = {"done", "error", "dead", "cancelled"}
 
-def _as_float(v: Any, default: float) -> float:
-    try:
-        return float(v)
-    except Exception:
-        return default
+
+class StagesPending(RetryLater):
+    """The waiter ran before its stages settled (stages given without dependency edges)."""
 
 
 def _as_job_id(v: Any) -> str | int | None:
@@ -46,6 +53,17 @@ def _extract_stage_jobs(payload: Mapping[str, Any]) -> Dict[str, str | int]:
                 out[name] = jid
         return out
 
+    # enqueue_many batches: stage names in order, ids resolved into depends_on
+    names = payload.get("stage_names")
+    deps = payload.get("depends_on")
+    if isinstance(names, list) and isinstance(deps, list) and len(names) == len(deps):
+        for k, v in zip(names, deps):
+            name = str(k).strip()
+            jid = _as_job_id(v)
+            if name and jid is not None:
+                out[name] = jid
+        return out
+
     stages = payload.get("stages")
     if isinstance(stages, list):
         for item in stages:
@@ -59,6 +77,17 @@ def _extract_stage_jobs(payload: Mapping[str, Any]) -> Dict[str, str | int]:
     return out
 
 
+def _result_of(rec: Mapping[str, Any]) -> Any:
+    res = rec.get("result")
+    if isinstance(res, str):
+        # SQLite rows carry the result as stored JSON text.
+        try:
+            return json.loads(res)
+        except ValueError:
+            return res
+    return res
+
+
 def _ok_of(res: Any) -> bool:
     return isinstance(res, dict) and bool(res.get("ok"))
 
@@ -77,46 +106,19 @@ def handle(task_or_payload: Any, payload: Mapping[str, Any] | None = None) -> Di
     gates_in = payload.get("gates")
     gates: Dict[str, Any] = dict(gates_in) if isinstance(gates_in, dict) else {}
 
-    timeout_s = _as_float(os.getenv("PIPELINE_WAITER_TIMEOUT", "300"), 300.0)
-    interval_s = _as_float(os.getenv("PIPELINE_WAITER_INTERVAL", "0.25"), 0.25)
-    deadline = time.time() + max(1.0, timeout_s)
-
     statuses: Dict[str, Any] = {}
     results: Dict[str, Any] = {}
-
-    while True:
-        all_done = True
-
-        for name, jid in stage_jobs.items():
-            rec = q.get(jid)
-            if not isinstance(rec, dict):
-                all_done = False
-                continue
-
-            st = rec.get("status")
-            statuses[name] = st
-
-            if st != "done":
-                all_done = False
-                continue
-
-            results[name] = rec.get("result")
-
-        if all_done:
-            break
-
-        if time.time() >= deadline:
-            return {
-                "ok": False,
-                "agent": "pipeline_waiter",
-                "error": "timeout",
-                "stage_jobs": stage_jobs,
-                "statuses": statuses,
-                "results": results,
-                "payload": payload,
-            }
-
-        time.sleep(max(0.05, interval_s))
+    for name, jid in stage_jobs.items():
+        rec = q.get(jid)
+        st = rec.get("status") if isinstance(rec, dict) else None
+        statuses[name] = st
+        if st == "done":
+            results[name] = _result_of(rec)
+
+    pending = sorted(n for n, st in statuses.items() if st not in _SETTLED)
+    if pending:
+        # Requeued with backoff by the worker's retry policy instead of holding a slot.
+        raise StagesPending(f"stages not finished: {', '.join(pending)}")
 
     if "unit_tests" in gates:
         gates["unit_tests"] = "pass" if _ok_of(results.get("test")) else "fail"
@@ -125,8 +127,9 @@ def handle(task_or_payload: Any, payload: Mapping[str, Any] | None = None) -> Di
     if "security" in gates:
         gates["security"] = "pass" if _ok_of(results.get("security_scan")) else "fail"
 
+    failed = sorted(n for n, st in statuses.items() if st != "done")
     out: Dict[str, Any] = {
-        "ok": True,
+        "ok": not failed,
         "agent": "pipeline_waiter",
         "pipeline_name": payload.get("pipeline_name"),
         "stage_jobs": stage_jobs,
@@ -135,6 +138,9 @@ def handle(task_or_payload: Any, payload: Mapping[str, Any] | None = None) -> Di
         "results": results,
         "payload": payload,
     }
+    if failed:
+        out["error"] = "stage_failed"
+        out["failed_stages"] = failed
 
     pack = results.get("packager")
     if isinstance(pack, dict):
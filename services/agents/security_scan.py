@@ -9,6 +9,8 @@ import time
 from pathlib import Path
 from typing import Any, Dict, Mapping
 
+from services.queue import cancel
+
 
 MAX_STDIO_CHARS = int(os.getenv("VELU_SECURITY_MAX_STDIO_CHARS", "12000") or "12000")
 
@@ -34,13 +36,12 @@ def _trim(s: str, limit: int = MAX_STDIO_CHARS) -> str:
 
 def _run(cmd: list[str], cwd: Path, timeout_sec: int = 120) -> dict[str, Any]:
     try:
-        p = subprocess.run(
+        p = cancel.run(
             cmd,
             cwd=str(cwd),
             capture_output=True,
             text=True,
             timeout=timeout_sec,
-            check=False,
         )
         return {
             "ok": True,
@@ -52,6 +53,8 @@ def _run(cmd: list[str], cwd: Path, timeout_sec: int = 120) -> dict[str, Any]:
         return {"ok": False, "rc": None, "error": "not_found"}
     except subprocess.TimeoutExpired:
         return {"ok": False, "rc": None, "error": "timeout"}
+    except cancel.JobCancelled:
+        raise
     except Exception as e:
         return {"ok": False, "rc": None, "error": f"{type(e).__name__}: {e}"}
 
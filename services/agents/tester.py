@@ -2,11 +2,12 @@
 from __future__ import annotations
 
 import os
-import subprocess  # nosec B404
 import tempfile
 from pathlib import Path
 from typing import Any, Dict, List, Mapping
 
+from services.queue import cancel
+
 
 def handle(task_or_payload: Any, payload: Mapping[str, Any] | None = None) -> Dict[str, Any]:
     # Support both: handle(payload) and handle(name, payload)
@@ -54,7 +55,7 @@ def handle(task_or_payload: Any, payload: Mapping[str, Any] | None = None) -> Di
     env.setdefault("PYTHONPATH", str(payload.get("pythonpath") or ".:./src"))
 
     try:
-        cp = subprocess.run(  # nosec B603
+        cp = cancel.run(
             cmd,
             cwd=rootdir,
             env=env,
@@ -76,6 +77,8 @@ def handle(task_or_payload: Any, payload: Mapping[str, Any] | None = None) -> Di
             "stdout": (cp.stdout or "")[-20000:],
             "stderr": (cp.stderr or "")[-20000:],
         }
+    except cancel.JobCancelled:
+        raise
     except Exception as e:
         return {
             "ok": False,
@@ -8,9 +8,9 @@ from pydantic import BaseModel, Field
 
 from services.app_server.auth import using_postgres_api_keys
 from services.auth.api_keys import create_api_key, list_api_keys, revoke_api_key, rotate_api_key
-from services.queue import get_queue
+from services.contracts.jobs import normalize_view
+from services.queue import queue_async
 
-q = get_queue()
 router = APIRouter()
 
 
@@ -35,21 +35,41 @@ class ApiKeyCreateIn(BaseModel):
 
 
 @router.get("/jobs")
-def list_jobs(request: Request, limit: int = Query(50, ge=1, le=500)):
+async def list_jobs(
+    request: Request,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: str | None = None,
+    status: str | None = None,
+    task: str | None = None,
+    project_id: str | None = None,
+    view: str = "",
+):
     if not admin_enabled():
         raise HTTPException(status_code=404, detail="Not Found")
 
     org_id = _require_admin_ctx(request)
     if not org_id:
         raise HTTPException(status_code=401, detail="invalid api key or org not found")
-    return {"items": q.list_recent_for_org(org_id=org_id, limit=limit)}
+    try:
+        items, next_cursor = await queue_async.list_page_for_org(
+            org_id=org_id,
+            limit=limit,
+            cursor=cursor,
+            view=normalize_view(view),
+            status=status,
+            task=task,
+            project_id=project_id,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail="invalid cursor") from e
+    return {"items": items, "next_cursor": next_cursor}
 
 
 @router.get("/jobs/{job_id}")
-def get_job(job_id: int):
+async def get_job(job_id: int):
     if not admin_enabled():
         raise HTTPException(status_code=404, detail="Not Found")
-    item = q.load(job_id)
+    item = await queue_async.get(job_id)
     if not item:
         raise HTTPException(status_code=404, detail="Job not found")
     return {"item": item}
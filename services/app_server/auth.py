@@ -7,12 +7,12 @@ from functools import lru_cache
 from typing import Any
 
 from httpx import request  # noqa: F401
-import psycopg
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request
 from starlette.responses import JSONResponse
 
 from services.app_server.models.api_key import hash_key as _canonical_hash_key
+from services.db import pool as db_pool
 
 DEFAULT_LOCAL_API_KEYS = {
     "local:secret123",
@@ -125,12 +125,7 @@ def _db_url() -> str | None:
     if not url:
         return None
 
-    low = url.lower()
-    if low.startswith("postgresql+psycopg://"):
-        url = "postgresql://" + url.split("://", 1)[1]
-    if low.startswith("postgres://"):
-        url = "postgresql://" + url.split("://", 1)[1]
-    return url
+    return db_pool.normalize_dsn(url)
 
 
 def using_postgres_api_keys() -> bool:
@@ -178,7 +173,7 @@ def _db_lookup_org_plan(org_id: str) -> str | None:
     if not oid:
         return None
     try:
-        with psycopg.connect(url) as conn:
+        with db_pool.connection(url) as conn:
             with conn.cursor() as cur:
                 cur.execute(
                     "SELECT plan FROM organizations WHERE id=%s::uuid LIMIT 1;",
@@ -205,7 +200,7 @@ def _db_lookup_api_key(raw_token: str) -> dict[str, Any] | None:
     hashed = _hash_key(raw_token)
 
     try:
-        with psycopg.connect(url) as conn:
+        with db_pool.connection(url) as conn:
             with conn.cursor() as cur:
                 # Enforce: not revoked, not expired (expires_at NULL means "never expires")
                 cur.execute(
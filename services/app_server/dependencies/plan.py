@@ -1,26 +1,20 @@
 from __future__ import annotations
 
-import os
-from contextlib import closing
+from contextlib import AbstractContextManager
 from typing import Callable
 
 import psycopg
 from fastapi import HTTPException, Request, status
 
+from services.db import pool as db_pool
+
 
 def _db_url() -> str:
-    raw = (os.getenv("DATABASE_URL") or "").strip()
-    if not raw:
-        raise RuntimeError("DATABASE_URL is required")
-    if raw.lower().startswith("postgresql+psycopg://"):
-        return "postgresql://" + raw.split("://", 1)[1]
-    if raw.lower().startswith("postgres://"):
-        return "postgresql://" + raw.split("://", 1)[1]
-    return raw
+    return db_pool.dsn()
 
 
-def _pg_connect() -> psycopg.Connection:
-    return psycopg.connect(_db_url(), autocommit=False)
+def _pg_connect() -> AbstractContextManager[psycopg.Connection]:
+    return db_pool.connection(_db_url())
 
 
 def rank_plan(plan: str) -> int:
@@ -38,15 +32,14 @@ def get_org_plan(org_id: str) -> str:
     oid = (org_id or "").strip()
     if not oid:
         return "base"
-    with closing(_pg_connect()) as conn:
-        with conn:
-            row = conn.execute(
-                "SELECT plan FROM organizations WHERE id=%s::uuid",
-                (oid,),
-            ).fetchone()
-            if not row:
-                return "base"
-            return str(row[0] or "base").strip().lower()
+    with _pg_connect() as conn:
+        row = conn.execute(
+            "SELECT plan FROM organizations WHERE id=%s::uuid",
+            (oid,),
+        ).fetchone()
+    if not row:
+        return "base"
+    return str(row[0] or "base").strip().lower()
 
 
 def require_plan(min_plan: str) -> Callable[[Request], None]:
@@ -8,17 +8,18 @@ import os
 import sqlite3
 import time
 from collections import deque
+from datetime import datetime
 from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 from typing import Callable
 from services.app_server.task_policy import allowed_tasks_for_claims
 
 from fastapi import Depends, FastAPI, Header, HTTPException, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse
-from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, generate_latest
 from pydantic import BaseModel, Field
+from starlette.concurrency import run_in_threadpool
 from starlette.responses import JSONResponse
 from services.app_server.routes import tasks_allowed
 from services.app_server import admin as admin_routes
@@ -29,13 +30,17 @@ from services.app_server.routes import jobs as jobs_routes
 from services.app_server.routes import orgs
 from services.app_server.routes import blueprints, i18n, assistant
 from services.app_server.security.headers import SecurityHeadersMiddleware
-from services.contracts.jobs import JobCreate, job_item_from_row, sanitize_json
+from services.contracts.jobs import JobCreate, job_item_from_row, normalize_view, sanitize_json
+from services.db import pool as db_pool
 from services.db.migrate import migrate
-from services.queue.jobs import enqueue_job, get_job, list_recent_for_org, using_postgres
-from services.queue.jobs import list_recent as jobs_list_recent
+from services import metrics as velu_metrics
+from services.queue.idempotency import HEADER as IDEMPOTENCY_HEADER
+from services.queue.idempotency import normalize_key as normalize_idempotency_key
+from services.queue import queue_async
+from services.queue.jobs import using_postgres
 
 
-from services.queue.worker_entry import HANDLERS as WORKER_HANDLERS
+from services.queue.registry import HANDLERS as WORKER_HANDLERS
 
 logger = logging.getLogger(__name__)
 
@@ -61,6 +66,8 @@ def _require_secret(name: str, value: str | None) -> None:
 class TaskIn(BaseModel):
     task: str = Field(min_length=1)
     payload: Dict[str, Any] = Field(default_factory=dict)
+    run_at: Optional[datetime] = None
+    delay_seconds: Optional[float] = Field(default=None, ge=0)
 
 
 def _q():
@@ -197,6 +204,8 @@ def create_app() -> FastAPI:
         migrate()
 
     app = FastAPI(title="VELU API", version="1.0.0")
+    velu_metrics.register_collectors()
+    app.add_event_handler("shutdown", db_pool.close_async_pools)
 
     origins = _cors_origins()
     allow_all = "*" in origins
@@ -255,7 +264,8 @@ def create_app() -> FastAPI:
         # ✅ Parse once, store once (so dependencies see it)
         c = getattr(request.state, "claims", None)
         if not c:
-            c = claims_from_request(request) or {}
+            # API-key lookup may hit the database; keep it off the event loop
+            c = await run_in_threadpool(claims_from_request, request) or {}
             request.state.claims = c
 
         if request.method == "POST" and request.url.path in {"/tasks", "/assistant-chat"}:
@@ -327,9 +337,25 @@ def create_app() -> FastAPI:
             response.headers["server"] = "velu"
         return response
 
+    # Outermost, so rejected (413/429) and failed requests are timed too. Labelled
+    # by route template rather than raw path to keep label cardinality bounded.
+    @app.middleware("http")
+    async def request_metrics(request: Request, call_next):
+        started = time.perf_counter()
+        status_code = 500
+        try:
+            response = await call_next(request)
+            status_code = response.status_code
+            return response
+        finally:
+            route = request.scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            velu_metrics.observe_request(request.method, path, status_code, time.perf_counter() - started)
+
     @app.get("/metrics")
     def metrics() -> Response:
-        return Response(generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
+        body, content_type = velu_metrics.render()
+        return Response(body, media_type=content_type)
 
     @app.get("/health")
     def health():
@@ -345,7 +371,7 @@ def create_app() -> FastAPI:
             with contextlib.suppress(Exception):
                 cur.execute("SELECT 1")
             con.close()
-            return {"ok": True, "db": {"path": db, "reachable": True}}
+            return {"ok": True, "db": {"path": db, "reachable": True}, "db_pools": db_pool.pool_stats()}
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e)) from e
 
@@ -360,14 +386,31 @@ def create_app() -> FastAPI:
         model = {"name": "dummy", "temp": 0.0}
         return {"ok": True, "policy": {"allowed": allowed}, "payload": item.get("payload") or {}, "model": model}
 
+    def _record_submission(task_obj_client: dict[str, Any]) -> None:
+        backend = (os.environ.get("TASK_BACKEND") or "").lower()
+        if backend == "sqlite":
+            store_sqlite.insert(task_obj_client)
+
+        task_log = (os.getenv("TASK_LOG") or "").strip()
+        if task_log:
+            try:
+                log_path = Path(task_log)
+                log_path.parent.mkdir(parents=True, exist_ok=True)
+                with log_path.open("a", encoding="utf-8") as f:
+                    rec = {"task": task_obj_client["task"], "payload": sanitize_json(task_obj_client["payload"])}
+
+                    f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            except Exception as e:
+                logger.warning("Failed to write TASK_LOG: %s", e)
+
     @app.get("/tasks")
     def list_tasks(limit: int = 10):
         items = list(_recent)[-limit:][::-1]
         return {"ok": True, "items": items}
 
     @app.post("/tasks", dependencies=[Depends(require_scopes({"jobs:submit"}))])
-    def post_task(body: TaskIn, request: Request):
-        c = getattr(request.state, "claims", None) or claims_from_request(request) or {}
+    async def post_task(body: TaskIn, request: Request):
+        c = getattr(request.state, "claims", None) or await run_in_threadpool(claims_from_request, request) or {}
         org_id = c.get("org_id")
         project_id = c.get("project_id")
 
@@ -421,42 +464,28 @@ def create_app() -> FastAPI:
         client_payload = body.payload if isinstance(body.payload, dict) else {}
         client_payload = dict(client_payload)
 
-        job_in = JobCreate(task=task_name, payload=payload)
+        job_in = JobCreate(task=task_name, payload=payload, run_at=body.run_at, delay_seconds=body.delay_seconds)
 
-        task_obj_queue = {"task": job_in.task, "payload": payload}
+        task_obj_queue = {"task": job_in.task, "payload": payload, **job_in.schedule()}
         task_obj_client = {"task": job_in.task, "payload": client_payload}
 
 
 
-        raw_key = (request.headers.get("X-API-Key") or "").strip()
-
-        job_id = enqueue_job(
-        task_obj_queue,
-        key=raw_key,
-        org_id=org_id,
-        project_id=project_id,
-        actor_type=c.get("actor_type", "api_key"),
-        actor_id=c.get("actor_id"),
-        
-      )
+        try:
+            idem_key = normalize_idempotency_key(request.headers.get(IDEMPOTENCY_HEADER))
+        except ValueError:
+            raise HTTPException(status_code=400, detail="invalid_idempotency_key")
 
+        job_id = await queue_async.enqueue_job(
+            task_obj_queue,
+            key=idem_key,
+            org_id=org_id,
+            project_id=project_id,
+            actor_type=c.get("actor_type", "api_key"),
+            actor_id=c.get("actor_id"),
+        )
 
-        backend = (os.environ.get("TASK_BACKEND") or "").lower()
-        if backend == "sqlite":
-            store_sqlite.insert(task_obj_client)
-
-        task_log = (os.getenv("TASK_LOG") or "").strip()
-        if task_log:
-            try:
-                log_path = Path(task_log)
-                log_path.parent.mkdir(parents=True, exist_ok=True)
-                with log_path.open("a", encoding="utf-8") as f:
-                    client_payload = body.payload if isinstance(body.payload, dict) else {}
-                    rec = {"task": job_in.task, "payload": sanitize_json(client_payload)}
-
-                    f.write(json.dumps(rec, ensure_ascii=False) + "\n")
-            except Exception as e:
-                logger.warning("Failed to write TASK_LOG: %s", e)
+        await queue_async.run_sync(_record_submission, task_obj_client)
 
         _recent.append({"id": job_id, "task": job_in.task, "payload": client_payload, "status": "queued"})
 
@@ -468,17 +497,19 @@ def create_app() -> FastAPI:
         "/results/{job_id}",
         dependencies=[Depends(require_role("viewer")), Depends(require_scopes({"jobs:read"}))],
     )
-    async def get_result(job_id: str, request: Request, expand: int = 0):
-        row = get_job(job_id)
+    async def get_result(job_id: str, request: Request, expand: int = 0, view: str = ""):
+        # Pollers get the summary (status, ok, error); ?view=full or ?expand=1 returns the result.
+        jv = normalize_view(view, expand=expand)
+        row = await queue_async.get_job(job_id, view=jv)
         if not row:
             return {"ok": False, "error": "not_found"}
 
-        item = job_item_from_row(row)
+        item = job_item_from_row(row, jv)
         if isinstance(item, dict) and "id" in item and item["id"] is not None:
             item["id"] = str(item["id"])
 
         if using_postgres_api_keys():
-            claims = getattr(request.state, "claims", None) or claims_from_request(request) or {}
+            claims = getattr(request.state, "claims", None) or await run_in_threadpool(claims_from_request, request) or {}
 
             req_org = claims.get("org_id")
 
@@ -500,21 +531,27 @@ def create_app() -> FastAPI:
 
 
     @app.get("/tasks/recent")
-    def tasks_recent(limit: int = 20):
+    async def tasks_recent(limit: int = 20, view: str = ""):
         lim = max(1, min(200, int(limit)))
+        jv = normalize_view(view)
         if using_postgres():
-            rows = list_recent_for_org(org_id=str("local"), limit=lim)
+            rows = await queue_async.list_recent_for_org(org_id=str("local"), limit=lim, view=jv)
         else:
-            rows = jobs_list_recent(limit=lim)
+            rows = await queue_async.list_recent(limit=lim, view=jv)
 
         items: list[dict[str, Any]] = []
         for row in rows:
-            item = job_item_from_row(row)
+            item = job_item_from_row(row, jv)
             if "created_at" not in item:
                 item["created_at"] = row.get("created_at") or row.get("ts")
             items.append(item)
         return {"ok": True, "items": items}
 
+    @app.get("/queue/depth", dependencies=[Depends(require_role("viewer"))])
+    async def queue_depth_view():
+        # per-task and per-class (fast/heavy/standard) backlog, for scaling worker lanes
+        return {"ok": True, **(await queue_async.queue_depth())}
+
     @app.get("/version")
     def version():
         return {"ok": True, "app": "velu", "api_version": app.version, "tag": os.getenv("VELU_TAG", "local"), "auth_mode": get_auth_mode()}
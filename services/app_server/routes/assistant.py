@@ -4,14 +4,14 @@ from typing import Any, Dict
 
 from fastapi import APIRouter, Request
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
 
-from services.agents import language_detector
 from services.app_server.schemas.intake import Company, Intake, Product
 from services.app_server.schemas import blueprint_factory
 from services.app_server.routes.i18n import _build_messages
 from services.app_server.auth import claims_from_request
 from services.app_server.task_policy import allowed_tasks_for_claims
-from services.queue.jobs import enqueue_job
+from services.queue import queue_async
 
 
 
@@ -26,7 +26,7 @@ class AssistantIntakeBody(BaseModel):
 
 
 @router.post("/v1/assistant/intake")
-def assistant_intake(body: AssistantIntakeBody, request: Request) -> Dict[str, Any]:
+async def assistant_intake(body: AssistantIntakeBody, request: Request) -> Dict[str, Any]:
     company = Company(**body.company)
     product = Product(**body.product)
 
@@ -35,6 +35,8 @@ def assistant_intake(body: AssistantIntakeBody, request: Request) -> Dict[str, A
     detected_lang: str | None = None
     if body.idea:
         try:
+            from services.agents import language_detector  # agents stay out of API startup
+
             det = language_detector.handle({"text": body.idea})
             detected_lang = str(det.get("language") or "").strip() or None
         except Exception:
@@ -49,7 +51,7 @@ def assistant_intake(body: AssistantIntakeBody, request: Request) -> Dict[str, A
     locales = blueprint.localization.supported_languages
     messages = _build_messages(blueprint.name, locales)
 
-    claims = claims_from_request(request) or {}
+    claims = getattr(request.state, "claims", None) or await run_in_threadpool(claims_from_request, request) or {}
     org_id = claims.get("org_id")
     project_id = claims.get("project_id")
 
@@ -80,7 +82,7 @@ def assistant_intake(body: AssistantIntakeBody, request: Request) -> Dict[str, A
             "_velu": {"source": "assistant_intake"},
         }
 
-        pipeline_job_id = enqueue_job(
+        pipeline_job_id = await queue_async.enqueue_job(
             {"task": "pipeline", "payload": payload},
             org_id=org_id,
             project_id=project_id,
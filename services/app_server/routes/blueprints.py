@@ -17,7 +17,6 @@ from services.app_server.blueprints_sqlite import (
     get_blueprint,
     list_blueprints,
 )
-from services.agents import api_design
 
 router = APIRouter(prefix="/v1/blueprints", tags=["blueprints"])
 
@@ -93,6 +92,8 @@ def design_blueprint(bp: Blueprint) -> dict[str, Any]:
     """
     Take a Blueprint and return an architecture summary via api_design.
     """
+    from services.agents import api_design  # agents stay out of API startup
+
     res = api_design.handle({"blueprint": bp.model_dump()})
     arch = res.get("architecture") or {}
     return {
@@ -6,7 +6,6 @@ from typing import Any, Dict, List, Optional
 from fastapi import APIRouter
 from pydantic import BaseModel, Field
 
-from services.agents import language_detector
 
 router = APIRouter()
 
@@ -154,6 +153,8 @@ def translate(body: TranslateRequest) -> Dict[str, Any]:
     source = body.source_locale
     if not source:
         try:
+            from services.agents import language_detector  # agents stay out of API startup
+
             det = language_detector.handle({"text": body.text})
             source = str(det.get("language") or "en")
         except Exception:
@@ -3,14 +3,16 @@ from __future__ import annotations
 
 import os
 
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 
 from services.app_server.dependencies.scopes import require_scopes
 from services.app_server.task_policy import allowed_tasks_for_claims
-from services.contracts.jobs import JobCreate
+from services.contracts.jobs import JobCreate, normalize_view
 from services.queue import using_postgres_jobs
-from services.queue.jobs import enqueue_job, get_job, project_belongs_to_org
-from services.queue.worker_entry import HANDLERS as WORKER_HANDLERS
+from services.queue.idempotency import HEADER as IDEMPOTENCY_HEADER
+from services.queue.idempotency import normalize_key
+from services.queue import queue_async
+from services.queue.registry import HANDLERS as WORKER_HANDLERS
 
 router = APIRouter()
 ALLOWED_TASKS: set[str] = set(WORKER_HANDLERS.keys())
@@ -47,7 +49,7 @@ def _claims_actor(claims: dict) -> tuple[str, str]:
     "/orgs/{org_id}/projects/{project_id}/jobs",
     dependencies=[Depends(require_scopes({"jobs:submit"}))],
 )
-def create_job(org_id: str, project_id: str, body: JobCreate, request: Request):
+async def create_job(org_id: str, project_id: str, body: JobCreate, request: Request):
     if not using_postgres_jobs():
         raise HTTPException(status_code=400, detail="jobs api requires postgres backend")
 
@@ -59,7 +61,7 @@ def create_job(org_id: str, project_id: str, body: JobCreate, request: Request):
     if str(claims_org) != str(org_id):
         raise HTTPException(status_code=404, detail="not_found_org_mismatch")
 
-    if not project_belongs_to_org(project_id, org_id):
+    if not await queue_async.project_belongs_to_org(project_id, org_id):
         raise HTTPException(status_code=404, detail="not_found_project_not_in_org")
 
     task_name = (body.task or "").strip()
@@ -76,18 +78,25 @@ def create_job(org_id: str, project_id: str, body: JobCreate, request: Request):
     # Phase 2.1: actor attribution is mandatory in Postgres mode
     actor_type, actor_id = _claims_actor(claims)
 
+    try:
+        idem_key = normalize_key(request.headers.get(IDEMPOTENCY_HEADER))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="invalid_idempotency_key")
+
     payload = body.payload if isinstance(body.payload, dict) else {}
-    job_id = enqueue_job(
+    job_id = await queue_async.enqueue_job(
         {
             "task": task_name,
             "payload": payload,
             "actor_type": actor_type,
             "actor_id": actor_id,
+            **body.schedule(),
         },
         org_id=str(org_id),
         project_id=str(project_id),
         actor_type=actor_type,
         actor_id=actor_id,
+        key=idem_key,
     )
 
     return {"ok": True, "job_id": str(job_id)}
@@ -97,7 +106,7 @@ def create_job(org_id: str, project_id: str, body: JobCreate, request: Request):
     "/orgs/{org_id}/jobs/{job_id}",
     dependencies=[Depends(require_scopes({"jobs:read"}))],
 )
-def read_job(org_id: str, job_id: str, request: Request):
+async def read_job(org_id: str, job_id: str, request: Request, view: str = ""):
     if not using_postgres_jobs():
         raise HTTPException(status_code=400, detail="jobs api requires postgres backend")
 
@@ -109,7 +118,7 @@ def read_job(org_id: str, job_id: str, request: Request):
     if str(claims_org) != str(org_id):
         raise HTTPException(status_code=404, detail="not_found")
 
-    row = get_job(job_id)
+    row = await queue_async.get_job(job_id, view=normalize_view(view))
     if not row or str(row.get("org_id")) != str(org_id):
         raise HTTPException(status_code=404, detail="not_found")
 
@@ -117,3 +126,71 @@ def read_job(org_id: str, job_id: str, request: Request):
         row["id"] = str(row["id"])
 
     return {"ok": True, "item": row}
+
+
+@router.post(
+    "/orgs/{org_id}/jobs/{job_id}/cancel",
+    dependencies=[Depends(require_scopes({"jobs:submit"}))],
+)
+async def cancel_job(org_id: str, job_id: str, request: Request):
+    """
+    Cancel a job and the rest of its run. Queued/blocked jobs are cancelled now;
+    running ones are stopped by their worker at its next heartbeat.
+    """
+    if not using_postgres_jobs():
+        raise HTTPException(status_code=400, detail="jobs api requires postgres backend")
+
+    claims = getattr(request.state, "claims", None) or {}
+    claims_org = claims.get("org_id")
+    if not claims_org:
+        raise HTTPException(status_code=401, detail="invalid_api_key_or_org_not_found")
+
+    if str(claims_org) != str(org_id):
+        raise HTTPException(status_code=404, detail="not_found")
+
+    out = await queue_async.cancel_job(job_id, org_id=org_id)
+    if out is None:
+        raise HTTPException(status_code=404, detail="not_found")
+
+    return {"ok": True, **out}
+
+
+@router.get(
+    "/orgs/{org_id}/jobs",
+    dependencies=[Depends(require_scopes({"jobs:read"}))],
+)
+async def list_jobs(
+    org_id: str,
+    request: Request,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: str | None = None,
+    status: str | None = None,
+    task: str | None = None,
+    project_id: str | None = None,
+    view: str = "",
+):
+    if not using_postgres_jobs():
+        raise HTTPException(status_code=400, detail="jobs api requires postgres backend")
+
+    claims = getattr(request.state, "claims", None) or {}
+    claims_org = claims.get("org_id")
+    if not claims_org:
+        raise HTTPException(status_code=401, detail="invalid_api_key_or_org_not_found")
+
+    if str(claims_org) != str(org_id):
+        raise HTTPException(status_code=404, detail="not_found")
+
+    try:
+        items, next_cursor = await queue_async.list_page_for_org(
+            org_id=org_id,
+            limit=limit,
+            cursor=cursor,
+            view=normalize_view(view),
+            status=status,
+            task=task,
+            project_id=project_id,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail="invalid_cursor") from e
+
+    return {"ok": True, "items": items, "next_cursor": next_cursor}
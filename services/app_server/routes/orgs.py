@@ -3,7 +3,7 @@ from __future__ import annotations
 import os
 import time
 import uuid
-from contextlib import closing
+from contextlib import AbstractContextManager
 from typing import Any
 
 import psycopg
@@ -12,6 +12,7 @@ from pydantic import BaseModel, Field
 
 from services.app_server.dependencies.scopes import require_scopes
 from services.auth.api_keys import create_api_key
+from services.db import pool as db_pool
 
 router = APIRouter()
 
@@ -53,14 +54,7 @@ def _mask_key(raw_key: str) -> str:
 
 
 def _db_url_optional() -> str | None:
-    raw = (os.getenv("DATABASE_URL") or "").strip()
-    if not raw:
-        return None
-    if raw.lower().startswith("postgresql+psycopg://"):
-        return "postgresql://" + raw.split("://", 1)[1]
-    if raw.lower().startswith("postgres://"):
-        return "postgresql://" + raw.split("://", 1)[1]
-    return raw
+    return db_pool.dsn_optional()
 
 
 def _db_url_required() -> str:
@@ -72,11 +66,11 @@ def _db_url_required() -> str:
     raise RuntimeError("DATABASE_URL is required")
 
 
-def _pg_connect() -> psycopg.Connection:
+def _pg_connect() -> AbstractContextManager[psycopg.Connection]:
     url = _db_url_optional()
     if not url:
         raise RuntimeError("DATABASE_URL is required")
-    return psycopg.connect(url, autocommit=False)
+    return db_pool.connection(url)
 
 
 def _require_platform_admin(request: Request) -> None:
@@ -161,8 +155,8 @@ def _ensure_project(org_id: str, name: str = "default") -> dict[str, Any]:
         _MEM_ORGS[key] = proj
         return proj
 
-    with closing(_pg_connect()) as conn:
-        with conn:
+    with _pg_connect() as conn:
+        with conn.transaction():
             row = conn.execute(
                 """
                 SELECT id::text, org_id::text, name, slug, created_at
@@ -228,8 +222,8 @@ def _ensure_org(slug: str, name: str, plan: str) -> dict[str, Any]:
         _MEM_ORGS[slug_n] = org
         return org
 
-    with closing(_pg_connect()) as conn:
-        with conn:
+    with _pg_connect() as conn:
+        with conn.transaction():
             row = conn.execute(
                 "SELECT id::text, name, slug, plan FROM organizations WHERE slug=%s LIMIT 1",
                 (slug_n,),
@@ -286,8 +280,8 @@ def list_orgs(limit: int = Query(50, ge=1, le=500), q: str = Query("", max_lengt
         items = sorted(items, key=lambda x: x.get("created_at", 0), reverse=True)[: int(limit)]
         return {"ok": True, "items": items}
 
-    with closing(_pg_connect()) as conn:
-        with conn:
+    with _pg_connect() as conn:
+        with conn.transaction():
             if qn:
                 rows = conn.execute(
                     """
@@ -347,8 +341,8 @@ def update_org_plan(org_id: str, body: OrgUpdatePlanIn, request: Request):
                 return {"ok": True, "plan": plan_n}
         raise HTTPException(status_code=404, detail="not_found")
 
-    with closing(_pg_connect()) as conn:
-        with conn:
+    with _pg_connect() as conn:
+        with conn.transaction():
             cur = conn.execute(
                 "UPDATE organizations SET plan=%s, updated_at=now() WHERE id=%s::uuid",
                 (plan_n, org_id),
@@ -3,7 +3,7 @@ from __future__ import annotations
 import os
 from typing import Any, Dict, List, Set  # noqa: F401
 
-from services.queue.worker_entry import HANDLERS as WORKER_HANDLERS
+from services.queue.registry import HANDLERS as WORKER_HANDLERS
 
 
 def env() -> str:
@@ -1,12 +1,16 @@
 # services/app_server/worker.py
 from __future__ import annotations
 
+import asyncio
 import threading
+import tempfile
 import time
 import inspect
+from pathlib import Path
 from typing import Any
 
-from services.queue.worker_entry import HANDLERS
+from services.queue.context import JobContext
+from services.queue.worker_entry import HANDLERS, is_async_handler
 from services.queue import get_queue
 
 q = get_queue()
@@ -70,7 +74,13 @@ class Worker:
                 sig = inspect.signature(handler)
                 params = list(sig.parameters.values())
 
-                if len(params) == 1:
+                if is_async_handler(handler):
+                    # async def handle(ctx, payload)
+                    ctx = JobContext(
+                        job_id=str(job_id), task=task, workspace=Path.cwd(), tmpdir=Path(tempfile.gettempdir())
+                    )
+                    result = asyncio.run(handler(ctx, payload))
+                elif len(params) == 1:
                     # handle(payload)
                     result = handler(payload)  # type: ignore[arg-type]
                 elif len(params) >= 2:
@@ -1,29 +1,22 @@
 from __future__ import annotations
 
 import secrets
-from contextlib import closing
+from contextlib import AbstractContextManager
 from datetime import datetime, timedelta, timezone
 from typing import Any
 
 import psycopg
 
-from services.api.db import database_url
 from services.app_server.models.api_key import hash_key, mask_key
+from services.db import pool as db_pool
 
 
 def _pg_url() -> str:
-    raw = (database_url() or "").strip()
-    if not raw:
-        raise RuntimeError("DATABASE_URL is required")
-    if raw.lower().startswith("postgresql+psycopg://"):
-        return "postgresql://" + raw.split("://", 1)[1]
-    if raw.lower().startswith("postgres://"):
-        return "postgresql://" + raw.split("://", 1)[1]
-    return raw
+    return db_pool.dsn()
 
 
-def _pg_connect() -> psycopg.Connection:
-    return psycopg.connect(_pg_url(), autocommit=False)
+def _pg_connect() -> AbstractContextManager[psycopg.Connection]:
+    return db_pool.connection(_pg_url())
 
 
 def generate_raw_key() -> str:
@@ -63,8 +56,8 @@ def create_api_key(org_id: str, name: str, scopes: list[str], ttl_days: int | No
     scopes_norm = _normalize_scopes(scopes)
     expires_at = _expires_at_from_ttl(ttl_days)
 
-    with closing(_pg_connect()) as conn:
-        with conn:
+    with _pg_connect() as conn:
+        with conn.transaction():
             row = conn.execute(
                 """
                 INSERT INTO api_keys (org_id, name, hashed_key, scopes, revoked_at, expires_at)
@@ -89,8 +82,8 @@ def create_api_key(org_id: str, name: str, scopes: list[str], ttl_days: int | No
 
 
 def list_api_keys(org_id: str) -> list[dict[str, Any]]:
-    with closing(_pg_connect()) as conn:
-        with conn:
+    with _pg_connect() as conn:
+        with conn.transaction():
             rows = conn.execute(
                 """
                 SELECT id::text, org_id::text, name, scopes, created_at, last_used_at, revoked_at, expires_at
@@ -119,8 +112,8 @@ def list_api_keys(org_id: str) -> list[dict[str, Any]]:
 
 
 def revoke_api_key(org_id: str, key_id: str) -> None:
-    with closing(_pg_connect()) as conn:
-        with conn:
+    with _pg_connect() as conn:
+        with conn.transaction():
             cur = conn.execute(
                 """
                 UPDATE api_keys
@@ -152,8 +145,8 @@ def rotate_api_key(org_id: str, key_id: str, ttl_days: int | None = None) -> dic
     hashed = hash_key(raw)
     expires_at = _expires_at_from_ttl(ttl_days)
 
-    with closing(_pg_connect()) as conn:
-        with conn:
+    with _pg_connect() as conn:
+        with conn.transaction():
             row = conn.execute(
                 """
                 UPDATE api_keys
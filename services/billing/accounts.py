@@ -1,23 +1,17 @@
 from __future__ import annotations
 
-import os
 from typing import Any
 
-import psycopg
+from services.db import pool as db_pool
 
 
 def _db_url() -> str:
-    url = (os.getenv("DATABASE_URL") or "").strip()
-    if url.lower().startswith("postgresql+psycopg://"):
-        url = "postgresql://" + url.split("://", 1)[1]
-    if url.lower().startswith("postgres://"):
-        url = "postgresql://" + url.split("://", 1)[1]
-    return url
+    return db_pool.dsn()
 
 
 def set_org_plan(org_id: str, plan: str) -> None:
     plan = (plan or "").strip().lower() or "base"
-    with psycopg.connect(_db_url()) as conn:
+    with db_pool.connection(_db_url()) as conn:
         with conn.cursor() as cur:
             cur.execute(
                 "UPDATE organizations SET plan=%s, updated_at=now() WHERE id=%s::uuid",
@@ -35,7 +29,7 @@ def upsert_billing_account(
     current_period_end: str | None = None,
 ) -> None:
     status = (status or "inactive").strip().lower()
-    with psycopg.connect(_db_url()) as conn:
+    with db_pool.connection(_db_url()) as conn:
         with conn.cursor() as cur:
             cur.execute(
                 """
@@ -61,7 +55,7 @@ def get_org_by_slug(slug: str) -> dict[str, Any] | None:
     slug = (slug or "").strip()
     if not slug:
         return None
-    with psycopg.connect(_db_url()) as conn:
+    with db_pool.connection(_db_url()) as conn:
         with conn.cursor() as cur:
             cur.execute("SELECT id::text, slug, plan FROM organizations WHERE slug=%s LIMIT 1", (slug,))
             row = cur.fetchone()
@@ -1,16 +1,29 @@
 from __future__ import annotations
 
+import base64
 import json
+from datetime import datetime
 from typing import Any, Literal, Mapping, Optional, Tuple
 
 from pydantic import BaseModel, Field
 
-JobStatus = Literal["queued", "working", "done", "error", "cancelled"]
+JobStatus = Literal["blocked", "queued", "working", "done", "error", "dead", "cancelled"]
+
+# Read projections: "status" (id/status), "summary" (metadata + ok flag + error
+# message, no payload/result bodies) and "full" (the whole row).
+JobView = Literal["status", "summary", "full"]
+JOB_VIEWS: tuple[str, ...] = ("status", "summary", "full")
 
 
 class JobCreate(BaseModel):
     task: str = Field(min_length=1)
     payload: dict[str, Any] = Field(default_factory=dict)
+    # Deferred start: an absolute time or a delay from now (run_at wins).
+    run_at: Optional[datetime] = None
+    delay_seconds: Optional[float] = Field(default=None, ge=0)
+
+    def schedule(self) -> dict[str, Any]:
+        return {k: v for k, v in (("run_at", self.run_at), ("delay_seconds", self.delay_seconds)) if v is not None}
 
 
 class JobCreateResponse(BaseModel):
@@ -153,14 +166,83 @@ def _row_get(row: Any, key: str, default: Any = None) -> Any:
         return default
 
 
-def job_item_from_row(row: Any) -> dict[str, Any]:
-    rid = _row_get(row, "id")
-    status_raw = _row_get(row, "status")
+def normalize_view(view: Any = None, *, expand: Any = 0, default: JobView = "summary") -> JobView:
+    """``expand=1`` is the legacy spelling of ``view=full``; unknown views fall back to ``default``."""
+    v = (str(view or "")).strip().lower()
+    if v in JOB_VIEWS:
+        return v  # type: ignore[return-value]
+    try:
+        if int(expand or 0):
+            return "full"
+    except (TypeError, ValueError):
+        pass
+    return default
+
+
+def encode_cursor(created_at: Any, job_id: Any) -> str:
+    """Opaque keyset cursor for (created_at, id) listings."""
+    ts = created_at.isoformat() if hasattr(created_at, "isoformat") else created_at
+    raw = json.dumps([ts, str(job_id)], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, str]:
+    """Inverse of encode_cursor; raises ValueError for anything malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        ts, job_id = json.loads(raw)
+    except Exception as e:
+        raise ValueError("invalid cursor") from e
+    if not isinstance(ts, (str, int, float)) or not job_id:
+        raise ValueError("invalid cursor")
+    return ts, str(job_id)
+
+
+def error_message(error: Any, limit: int = 500) -> Optional[str]:
+    err = loads_json_maybe(error)
+    if err is None or err == "":
+        return None
+    if isinstance(err, dict):
+        msg = err.get("error") or err.get("message") or err.get("detail")
+        err = msg if msg is not None else json.dumps(err, ensure_ascii=False, default=str)
+    return _clip_str(str(err), limit)
+
+
+def _normalize_status(status_raw: Any) -> str:
     status = (str(status_raw or "")).strip().lower()
     if status == "running":
         status = "working"
     if status == "succeeded":
         status = "done"
+    return status
+
+
+_META_KEYS = ("org_id", "project_id", "actor_type", "actor_id", "created_at", "updated_at", "created_by")
+
+
+def job_item_from_row(row: Any, view: JobView = "full") -> dict[str, Any]:
+    rid = _row_get(row, "id")
+    status = _normalize_status(_row_get(row, "status"))
+
+    if view == "status":
+        return {"id": rid, "status": status}
+
+    if view == "summary":
+        raw_task = _row_get(row, "task")
+        task_name = raw_task if isinstance(raw_task, str) else decode_task_and_payload(raw_task, None)[0]
+        ok = _row_get(row, "ok")
+        if ok is None:
+            result = loads_json_maybe(_row_get(row, "result"))
+            ok = result.get("ok") if isinstance(result, dict) else None
+        err = _row_get(row, "error_message")
+        if err is None:
+            err = error_message(_row_get(row, "error") or _row_get(row, "err") or _row_get(row, "last_error"))
+        item = {"id": rid, "status": status, "task": task_name, "ok": ok, "error": err}
+        for k in _META_KEYS + ("finished_at", "attempts"):
+            v = _row_get(row, k, None)
+            if v is not None:
+                item[k] = v
+        return item
 
     raw_task = _row_get(row, "task")
     raw_payload = _row_get(row, "payload")
@@ -178,7 +260,7 @@ def job_item_from_row(row: Any) -> dict[str, Any]:
         "error": loads_json_maybe(error_val),
     }
 
-    for k in ("org_id", "project_id", "actor_type", "actor_id", "created_at", "updated_at", "created_by"):
+    for k in _META_KEYS:
         v = _row_get(row, k, None)
         if v is not None:
             item[k] = v
@@ -6,9 +6,10 @@ import time
 from pathlib import Path
 from typing import Iterable
 
-import psycopg
 import re
 
+from services.db import pool as db_pool
+
 MIGRATIONS_DIR = Path(__file__).with_name("migrations")
 _MIG_RE = re.compile(r"^(?P<num>\d+)_.*\.sql$")
 
@@ -29,11 +30,7 @@ def _db_url() -> str:
     url = (os.getenv("DATABASE_URL") or "").strip()
     if not url:
         raise RuntimeError("DATABASE_URL is not set")
-    if url.lower().startswith("postgresql+psycopg://"):
-        url = "postgresql://" + url.split("://", 1)[1]
-    if url.lower().startswith("postgres://"):
-        url = "postgresql://" + url.split("://", 1)[1]
-    return url
+    return db_pool.normalize_dsn(url)
 
 
 def _iter_sql_files() -> Iterable[Path]:
@@ -84,7 +81,7 @@ def migrate() -> None:
     last_error = None
     for attempt in range(10):  # ~30s total
         try:
-            with psycopg.connect(url) as conn:
+            with db_pool.connection(url, timeout=5.0) as conn:
                 with conn.cursor() as cur:
                     cur.execute(
                         """
@@ -0,0 +1,6 @@
+-- services/db/migrations/013_jobs_v2_task_runtime.sql
+
+-- Recent successful runs per task (p95 run time -> adaptive lease length)
+CREATE INDEX IF NOT EXISTS idx_jobs_v2_task_done
+  ON jobs_v2 (task, finished_at DESC)
+  WHERE status = 'done';
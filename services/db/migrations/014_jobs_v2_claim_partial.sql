@@ -0,0 +1,18 @@
+-- services/db/migrations/014_jobs_v2_claim_partial.sql
+BEGIN;
+
+-- Claim path: queued rows only, already in claim order.
+CREATE INDEX IF NOT EXISTS idx_jobs_v2_queued
+  ON jobs_v2 (priority DESC, created_at ASC)
+  WHERE status = 'queued';
+
+-- Sweeper path: running rows by lease expiry.
+CREATE INDEX IF NOT EXISTS idx_jobs_v2_lease_expiry
+  ON jobs_v2 (lease_expires_at)
+  WHERE status = 'working';
+
+-- Superseded by the partial indexes above (every write paid for them).
+DROP INDEX IF EXISTS idx_jobs_v2_claim;
+DROP INDEX IF EXISTS idx_jobs_v2_lease_reclaim;
+
+COMMIT;
@@ -0,0 +1,68 @@
+-- services/db/migrations/015_jobs_v2_archive.sql
+BEGIN;
+
+-- Cold storage for finished jobs, range-partitioned by month of finished_at.
+-- Rows are moved here by services.queue.maintenance; retention drops whole partitions.
+CREATE TABLE IF NOT EXISTS jobs_v2_archive (
+  id uuid NOT NULL,
+  org_id uuid NOT NULL REFERENCES organizations(id) ON DELETE CASCADE,
+  project_id uuid,
+  task text NOT NULL,
+  status text NOT NULL,
+  payload jsonb NOT NULL DEFAULT '{}'::jsonb,
+  result jsonb,
+  error jsonb,
+  priority integer NOT NULL DEFAULT 0,
+  attempts integer NOT NULL DEFAULT 0,
+  created_at timestamptz NOT NULL,
+  updated_at timestamptz NOT NULL,
+  actor_type text NOT NULL DEFAULT 'api_key',
+  actor_id text,
+  claimed_by text,
+  claimed_at timestamptz,
+  lease_expires_at timestamptz,
+  finished_at timestamptz NOT NULL,
+  archived_at timestamptz NOT NULL DEFAULT now(),
+  PRIMARY KEY (id, finished_at)
+) PARTITION BY RANGE (finished_at);
+
+CREATE INDEX IF NOT EXISTS ix_jobs_v2_archive_id
+  ON jobs_v2_archive (id);
+
+CREATE INDEX IF NOT EXISTS ix_jobs_v2_archive_org_created_at
+  ON jobs_v2_archive (org_id, created_at DESC);
+
+-- Monthly partitions named jobs_v2_archive_pYYYYMM covering [from_ts, to_ts].
+CREATE OR REPLACE FUNCTION jobs_v2_archive_ensure_partitions(from_ts timestamptz, to_ts timestamptz)
+RETURNS void
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  m date := date_trunc('month', from_ts AT TIME ZONE 'UTC')::date;
+  last_m date := date_trunc('month', to_ts AT TIME ZONE 'UTC')::date;
+BEGIN
+  WHILE m <= last_m LOOP
+    EXECUTE format(
+      'CREATE TABLE IF NOT EXISTS %I PARTITION OF jobs_v2_archive FOR VALUES FROM (%L) TO (%L)',
+      'jobs_v2_archive_p' || to_char(m, 'YYYYMM'),
+      (m::timestamp AT TIME ZONE 'UTC'),
+      ((m + interval '1 month')::timestamp AT TIME ZONE 'UTC')
+    );
+    m := (m + interval '1 month')::date;
+  END LOOP;
+END;
+$$;
+
+SELECT jobs_v2_archive_ensure_partitions(now(), now() + interval '1 month');
+
+-- Terminal rows must carry finished_at (older rows predate migration 012).
+UPDATE jobs_v2
+SET finished_at = updated_at
+WHERE status IN ('done', 'error') AND finished_at IS NULL;
+
+-- Archive candidates, oldest first.
+CREATE INDEX IF NOT EXISTS idx_jobs_v2_terminal_finished
+  ON jobs_v2 (finished_at)
+  WHERE status IN ('done', 'error');
+
+COMMIT;
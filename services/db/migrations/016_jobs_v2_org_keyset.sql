@@ -0,0 +1,12 @@
+-- services/db/migrations/016_jobs_v2_org_keyset.sql
+BEGIN;
+
+-- Keyset paging of an org's jobs: (created_at, id) < cursor, newest first.
+-- id breaks ties between rows of one enqueue_many batch (same created_at).
+CREATE INDEX IF NOT EXISTS ix_jobs_v2_org_created_id
+  ON jobs_v2 (org_id, created_at DESC, id DESC);
+
+-- Prefix of the index above.
+DROP INDEX IF EXISTS ix_jobs_v2_org_created_at;
+
+COMMIT;
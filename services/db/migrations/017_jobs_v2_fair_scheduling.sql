@@ -0,0 +1,26 @@
+-- services/db/migrations/017_jobs_v2_fair_scheduling.sql
+BEGIN;
+
+-- Fair claim (VELU_SCHEDULER=fair): per-org queue heads, also walked as a
+-- skip scan to enumerate orgs with queued work.
+CREATE INDEX IF NOT EXISTS idx_jobs_v2_queued_org
+  ON jobs_v2 (org_id, priority DESC, created_at ASC)
+  WHERE status = 'queued';
+
+-- Oldest queued job per org (priority aging).
+CREATE INDEX IF NOT EXISTS idx_jobs_v2_queued_org_age
+  ON jobs_v2 (org_id, created_at ASC)
+  WHERE status = 'queued';
+
+-- Working jobs per org, counted against the plan's concurrency cap.
+CREATE INDEX IF NOT EXISTS idx_jobs_v2_working_org
+  ON jobs_v2 (org_id)
+  WHERE status = 'working';
+
+-- When each org was last served; round-robin tie-break between equally loaded orgs.
+CREATE TABLE IF NOT EXISTS jobs_v2_org_sched (
+  org_id uuid PRIMARY KEY REFERENCES organizations(id) ON DELETE CASCADE,
+  last_claimed_at timestamptz NOT NULL DEFAULT now()
+);
+
+COMMIT;
@@ -0,0 +1,10 @@
+-- services/db/migrations/018_jobs_v2_task_routing.sql
+BEGIN;
+
+-- Claim path for workers subscribed to a task list (task = ANY(...)), and
+-- per-task queue depth as an index-only count.
+CREATE INDEX IF NOT EXISTS idx_jobs_v2_queued_task
+  ON jobs_v2 (task, priority DESC, created_at ASC)
+  WHERE status = 'queued';
+
+COMMIT;
@@ -0,0 +1,22 @@
+-- services/db/migrations/019_jobs_v2_run_at_dead.sql
+BEGIN;
+
+-- Delayed execution / retry backoff: a queued job is claimable once run_at <= now().
+ALTER TABLE jobs_v2
+  ADD COLUMN IF NOT EXISTS run_at timestamptz NOT NULL DEFAULT now();
+
+ALTER TABLE jobs_v2_archive
+  ADD COLUMN IF NOT EXISTS run_at timestamptz;
+
+-- Due/delayed queued jobs by time; the claim falls back to it when most of the
+-- queue is backing off, and it serves "what is scheduled" reads.
+CREATE INDEX IF NOT EXISTS idx_jobs_v2_status_run_at
+  ON jobs_v2 (status, run_at);
+
+-- 'dead' (retries exhausted / crash loop) is terminal and archived like done/error.
+DROP INDEX IF EXISTS idx_jobs_v2_terminal_finished;
+CREATE INDEX idx_jobs_v2_terminal_finished
+  ON jobs_v2 (finished_at)
+  WHERE status IN ('done', 'error', 'dead');
+
+COMMIT;
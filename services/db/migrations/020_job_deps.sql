@@ -0,0 +1,17 @@
+-- services/db/migrations/020_job_deps.sql
+BEGIN;
+
+-- Job dependency edges: job_id stays 'blocked' until every depends_on parent is
+-- 'done'. Archiving either side drops the edge (a parent is only archived once
+-- it is terminal, by which time its children were promoted or failed).
+CREATE TABLE IF NOT EXISTS job_deps (
+  job_id     uuid NOT NULL REFERENCES jobs_v2(id) ON DELETE CASCADE,
+  depends_on uuid NOT NULL REFERENCES jobs_v2(id) ON DELETE CASCADE,
+  PRIMARY KEY (job_id, depends_on)
+);
+
+-- Children of a finishing/failing parent.
+CREATE INDEX IF NOT EXISTS idx_job_deps_parent
+  ON job_deps (depends_on);
+
+COMMIT;
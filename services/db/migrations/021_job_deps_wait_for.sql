@@ -0,0 +1,10 @@
+-- services/db/migrations/021_job_deps_wait_for.sql
+BEGIN;
+
+-- 'done': the child needs the parent to succeed (a failed parent fails it).
+-- 'finished': the child runs once the parent settles either way (completion
+-- hooks such as the pipeline waiter).
+ALTER TABLE job_deps
+  ADD COLUMN IF NOT EXISTS wait_for text NOT NULL DEFAULT 'done';
+
+COMMIT;
@@ -0,0 +1,20 @@
+-- services/db/migrations/022_jobs_v2_idempotency.sql
+BEGIN;
+
+-- Idempotency-Key submissions: a key maps to one job per org until it expires;
+-- maintenance clears expired keys so they can be reused.
+ALTER TABLE jobs_v2
+  ADD COLUMN IF NOT EXISTS idempotency_key text,
+  ADD COLUMN IF NOT EXISTS idempotency_expires_at timestamptz;
+
+-- Arbiter for INSERT ... ON CONFLICT (org_id, idempotency_key) WHERE idempotency_key IS NOT NULL.
+CREATE UNIQUE INDEX IF NOT EXISTS uq_jobs_v2_org_idempotency_key
+  ON jobs_v2 (org_id, idempotency_key)
+  WHERE idempotency_key IS NOT NULL;
+
+-- Expired-key cleanup.
+CREATE INDEX IF NOT EXISTS idx_jobs_v2_idempotency_expires
+  ON jobs_v2 (idempotency_expires_at)
+  WHERE idempotency_key IS NOT NULL;
+
+COMMIT;
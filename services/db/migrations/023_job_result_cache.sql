@@ -0,0 +1,22 @@
+-- services/db/migrations/023_job_result_cache.sql
+BEGIN;
+
+-- Memoized results of deterministic tasks (services.queue.memo), keyed by
+-- task + handler version + payload hash. TTL/LRU eviction runs in maintenance.
+CREATE TABLE IF NOT EXISTS job_result_cache (
+  key          text PRIMARY KEY,
+  task         text NOT NULL,
+  result       jsonb NOT NULL,
+  size_bytes   integer NOT NULL DEFAULT 0,
+  hits         bigint NOT NULL DEFAULT 0,
+  created_at   timestamptz NOT NULL DEFAULT now(),
+  last_used_at timestamptz NOT NULL DEFAULT now()
+);
+
+-- TTL expiry and least-recently-used eviction.
+CREATE INDEX IF NOT EXISTS idx_job_result_cache_created
+  ON job_result_cache (created_at);
+CREATE INDEX IF NOT EXISTS idx_job_result_cache_last_used
+  ON job_result_cache (last_used_at);
+
+COMMIT;
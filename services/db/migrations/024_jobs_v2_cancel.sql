@@ -0,0 +1,21 @@
+-- services/db/migrations/024_jobs_v2_cancel.sql
+BEGIN;
+
+-- Cooperative cancellation: queued/blocked jobs go straight to 'cancelled'; a
+-- running job is flagged and its worker stops it at the next heartbeat.
+ALTER TABLE jobs_v2
+  ADD COLUMN IF NOT EXISTS cancel_requested boolean NOT NULL DEFAULT false;
+
+-- A run's stages share payload._velu.run_id; cancelling one cancels the rest
+-- of the run that is still live.
+CREATE INDEX IF NOT EXISTS idx_jobs_v2_org_run_live
+  ON jobs_v2 (org_id, ((payload->'_velu'->>'run_id')))
+  WHERE status IN ('queued', 'blocked', 'working');
+
+-- 'cancelled' is terminal and archived like done/error/dead.
+DROP INDEX IF EXISTS idx_jobs_v2_terminal_finished;
+CREATE INDEX idx_jobs_v2_terminal_finished
+  ON jobs_v2 (finished_at)
+  WHERE status IN ('done', 'error', 'dead', 'cancelled');
+
+COMMIT;
@@ -0,0 +1,267 @@
+# services/db/pool.py
+from __future__ import annotations
+
+import asyncio
+import atexit
+import os
+import threading
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Iterator
+
+import psycopg
+from psycopg_pool import AsyncConnectionPool, ConnectionPool
+
+_POSTGRES_PREFIXES = ("postgresql://", "postgresql+psycopg://", "postgres://")
+
+_lock = threading.Lock()
+_pools: dict[str, ConnectionPool] = {}
+# Async pools are bound to the event loop that opened them.
+_async_pools: dict[tuple[str, int], tuple[AsyncConnectionPool, asyncio.AbstractEventLoop]] = {}
+_owner_pid = os.getpid()
+
+
+def normalize_dsn(raw: str) -> str:
+    url = (raw or "").strip()
+    low = url.lower()
+    if low.startswith("postgresql+psycopg://") or low.startswith("postgres://"):
+        return "postgresql://" + url.split("://", 1)[1]
+    return url
+
+
+def dsn_optional() -> str | None:
+    """
+    Postgres DSN from DATABASE_URL (or DB_ENGINE=postgres defaults), or None
+    when the process is running in local/sqlite mode.
+    """
+    raw = (os.getenv("DATABASE_URL") or "").strip()
+    if not raw and (os.getenv("DB_ENGINE") or "").strip().lower() in {"postgres", "postgresql"}:
+        from services.api.db import database_url
+
+        raw = database_url()
+    if not raw or not raw.lower().startswith(_POSTGRES_PREFIXES):
+        return None
+    return normalize_dsn(raw)
+
+
+def dsn() -> str:
+    url = dsn_optional()
+    if not url:
+        raise RuntimeError("DATABASE_URL is required")
+    return url
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int((os.getenv(name) or "").strip() or default)
+    except Exception:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float((os.getenv(name) or "").strip() or default)
+    except Exception:
+        return default
+
+
+def pool_settings() -> dict[str, Any]:
+    min_size = max(0, _env_int("VELU_DB_POOL_MIN_SIZE", 1))
+    max_size = max(1, min_size, _env_int("VELU_DB_POOL_MAX_SIZE", 10))
+    check = (os.getenv("VELU_DB_POOL_CHECK") or "1").strip().lower() not in {"0", "false", "no", "off"}
+    return {
+        "min_size": min_size,
+        "max_size": max_size,
+        "max_idle": max(1.0, _env_float("VELU_DB_POOL_MAX_IDLE_SEC", 300.0)),
+        "max_lifetime": max(60.0, _env_float("VELU_DB_POOL_MAX_LIFETIME_SEC", 3600.0)),
+        "timeout": max(0.1, _env_float("VELU_DB_POOL_TIMEOUT_SEC", 30.0)),
+        "check": check,
+    }
+
+
+def _forget_inherited_pools() -> None:
+    # A forked child must not reuse the parent's sockets; drop (don't close) them.
+    global _owner_pid
+    pid = os.getpid()
+    if pid != _owner_pid:
+        _pools.clear()
+        _async_pools.clear()
+        _owner_pid = pid
+
+
+def get_pool(url: str | None = None) -> ConnectionPool:
+    key = normalize_dsn(url) if url else dsn()
+    with _lock:
+        _forget_inherited_pools()
+        pool = _pools.get(key)
+        if pool is None:
+            cfg = pool_settings()
+            pool = ConnectionPool(
+                key,
+                min_size=cfg["min_size"],
+                max_size=cfg["max_size"],
+                max_idle=cfg["max_idle"],
+                max_lifetime=cfg["max_lifetime"],
+                timeout=cfg["timeout"],
+                check=ConnectionPool.check_connection if cfg["check"] else None,
+                name="velu" if not _pools else f"velu-{len(_pools) + 1}",
+                open=True,
+            )
+            _pools[key] = pool
+        return pool
+
+
+@contextmanager
+def connection(url: str | None = None, *, timeout: float | None = None) -> Iterator[psycopg.Connection]:
+    """
+    Borrow a pooled connection. The transaction is committed when the block
+    exits cleanly and rolled back on error; the connection goes back to the pool.
+    Do not use ``with conn:`` on it (that would close the pooled connection).
+    """
+    with get_pool(url).connection(timeout=timeout) as conn:
+        yield conn
+
+
+async def get_async_pool(url: str | None = None) -> AsyncConnectionPool:
+    key = normalize_dsn(url) if url else dsn()
+    loop = asyncio.get_running_loop()
+    with _lock:
+        _forget_inherited_pools()
+        for k, (_, owner) in list(_async_pools.items()):
+            if owner.is_closed():
+                _async_pools.pop(k, None)
+        entry = _async_pools.get((key, id(loop)))
+        pool = entry[0] if entry else None
+        if pool is None:
+            cfg = pool_settings()
+            pool = AsyncConnectionPool(
+                key,
+                min_size=cfg["min_size"],
+                max_size=cfg["max_size"],
+                max_idle=cfg["max_idle"],
+                max_lifetime=cfg["max_lifetime"],
+                timeout=cfg["timeout"],
+                check=AsyncConnectionPool.check_connection if cfg["check"] else None,
+                name="velu-async" if not _async_pools else f"velu-async-{len(_async_pools) + 1}",
+                open=False,
+            )
+            _async_pools[(key, id(loop))] = (pool, loop)
+    # open() is a no-op once the pool is running, so concurrent first callers are safe.
+    await pool.open()
+    return pool
+
+
+@asynccontextmanager
+async def async_connection(
+    url: str | None = None, *, timeout: float | None = None
+) -> AsyncIterator[psycopg.AsyncConnection]:
+    pool = await get_async_pool(url)
+    async with pool.connection(timeout=timeout) as conn:
+        yield conn
+
+
+def _stats_of(pool: Any) -> dict[str, Any]:
+    raw = pool.get_stats()
+    size = int(raw.get("pool_size", 0))
+    available = int(raw.get("pool_available", 0))
+    return {
+        "name": pool.name,
+        "min_size": int(raw.get("pool_min", 0)),
+        "max_size": int(raw.get("pool_max", 0)),
+        "size": size,
+        "idle": available,
+        "in_use": max(0, size - available),
+        "waiting": int(raw.get("requests_waiting", 0)),
+        "requests": int(raw.get("requests_num", 0)),
+        "requests_queued": int(raw.get("requests_queued", 0)),
+        "wait_ms_total": int(raw.get("requests_wait_ms", 0)),
+        "request_errors": int(raw.get("requests_errors", 0)),
+        "connections_opened": int(raw.get("connections_num", 0)),
+        "connections_lost": int(raw.get("connections_lost", 0)),
+    }
+
+
+def pool_stats() -> list[dict[str, Any]]:
+    """Snapshot of every pool owned by this process (sync and async)."""
+    with _lock:
+        pools: list[Any] = list(_pools.values()) + [p for p, _ in _async_pools.values()]
+    return [_stats_of(p) for p in pools]
+
+
+class PoolStatsCollector:
+    """Prometheus collector exposing pool usage as velu_db_pool_* gauges."""
+
+    def collect(self):
+        from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+        in_use = GaugeMetricFamily("velu_db_pool_in_use", "Connections checked out", labels=["pool"])
+        idle = GaugeMetricFamily("velu_db_pool_idle", "Idle connections in the pool", labels=["pool"])
+        size = GaugeMetricFamily("velu_db_pool_size", "Open connections", labels=["pool"])
+        waiting = GaugeMetricFamily("velu_db_pool_waiting", "Requests waiting for a connection", labels=["pool"])
+        wait_s = CounterMetricFamily(
+            "velu_db_pool_wait_seconds", "Total time spent waiting for a connection", labels=["pool"]
+        )
+        for st in pool_stats():
+            name = str(st["name"])
+            in_use.add_metric([name], st["in_use"])
+            idle.add_metric([name], st["idle"])
+            size.add_metric([name], st["size"])
+            waiting.add_metric([name], st["waiting"])
+            wait_s.add_metric([name], st["wait_ms_total"] / 1000.0)
+        yield from (in_use, idle, size, waiting, wait_s)
+
+
+_collector_registered = False
+
+
+def register_metrics(registry: Any | None = None) -> None:
+    global _collector_registered
+    if _collector_registered:
+        return
+    if registry is None:
+        from prometheus_client import REGISTRY as registry  # noqa: N811
+    registry.register(PoolStatsCollector())
+    _collector_registered = True
+
+
+def close_pools() -> None:
+    with _lock:
+        pools = list(_pools.values())
+        _pools.clear()
+        _async_pools.clear()
+    for p in pools:
+        try:
+            p.close()
+        except Exception:
+            pass
+
+
+async def close_async_pools() -> None:
+    loop = asyncio.get_running_loop()
+    with _lock:
+        mine = [(k, p) for k, (p, owner) in _async_pools.items() if owner is loop]
+        for k, _ in mine:
+            _async_pools.pop(k, None)
+    for _, p in mine:
+        try:
+            await p.close()
+        except Exception:
+            pass
+
+
+atexit.register(close_pools)
+
+
+__all__ = [
+    "async_connection",
+    "close_async_pools",
+    "close_pools",
+    "connection",
+    "dsn",
+    "dsn_optional",
+    "get_async_pool",
+    "get_pool",
+    "normalize_dsn",
+    "pool_settings",
+    "pool_stats",
+    "register_metrics",
+]
@@ -3,8 +3,9 @@ from __future__ import annotations
 import os
 from typing import Any, Dict, List
 
-# cached OpenAI client (lazy init)
+# cached OpenAI clients (lazy init)
 _client_openai: Any | None = None
+_client_openai_async: Any | None = None
 
 
 class RemoteLLMError(Exception):
@@ -39,6 +40,36 @@ def _ensure_openai_client() -> Any:
     return _client_openai
 
 
+def _ensure_openai_async_client() -> Any:
+    """Lazy-initialize a shared AsyncOpenAI client (same rules as the sync one)."""
+    global _client_openai_async
+    if _client_openai_async is not None:
+        return _client_openai_async
+
+    try:
+        from openai import AsyncOpenAI  # type: ignore
+    except Exception as exc:  # pragma: no cover
+        raise RemoteLLMError(
+            "The 'openai' package is not installed. " "Install it with: pip install openai"
+        ) from exc
+
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        raise RemoteLLMError("OPENAI_API_KEY not set")
+
+    _client_openai_async = AsyncOpenAI(api_key=api_key)
+    return _client_openai_async
+
+
+def _chat_temperature(temperature: float | None) -> float:
+    if temperature is not None:
+        return float(temperature)
+    try:
+        return float(os.getenv("VELU_CHAT_TEMP", "0.2"))
+    except Exception:
+        return 0.2
+
+
 def _chat_openai(
     messages: List[Dict[str, str]],
     model: str | None = None,
@@ -53,19 +84,30 @@ def _chat_openai(
     client = _ensure_openai_client()
 
     m = model or os.getenv("VELU_CHAT_MODEL") or "gpt-4.1-mini"
-    if temperature is None:
-        temp_str = os.getenv("VELU_CHAT_TEMP", "0.2")
-        try:
-            temp = float(temp_str)
-        except Exception:
-            temp = 0.2
-    else:
-        temp = float(temperature)
 
     resp = client.chat.completions.create(
         model=m,
         messages=messages,
-        temperature=temp,
+        temperature=_chat_temperature(temperature),
+    )
+    msg = resp.choices[0].message.content
+    return msg or ""
+
+
+async def _chat_openai_async(
+    messages: List[Dict[str, str]],
+    model: str | None = None,
+    temperature: float | None = None,
+) -> str:
+    """_chat_openai without blocking the event loop."""
+    client = _ensure_openai_async_client()
+
+    m = model or os.getenv("VELU_CHAT_MODEL") or "gpt-4.1-mini"
+
+    resp = await client.chat.completions.create(
+        model=m,
+        messages=messages,
+        temperature=_chat_temperature(temperature),
     )
     msg = resp.choices[0].message.content
     return msg or ""
@@ -136,3 +178,20 @@ def remote_chat_completion(
     # For now we only support OpenAI; we reuse the same client + wrapper.
     model_name = model or get_remote_default_model()
     return _chat_openai(messages, model=model_name, temperature=temperature)
+
+
+async def remote_chat_completion_async(
+    messages: List[Dict[str, str]],
+    *,
+    model: str | None = None,
+    temperature: float = 0.2,
+    provider: str | None = None,
+) -> str:
+    """remote_chat_completion for async handlers (the asyncio worker's chat task)."""
+    provider_value = (provider or os.getenv("VELU_REMOTE_LLM_PROVIDER") or "openai").lower()
+
+    if provider_value not in {"openai", ""}:
+        raise RemoteLLMError(f"Unsupported LLM provider: {provider_value!r}")
+
+    model_name = model or get_remote_default_model()
+    return await _chat_openai_async(messages, model=model_name, temperature=temperature)
@@ -0,0 +1,209 @@
+# services/metrics.py
+"""
+Prometheus metrics for the API, the queue and the worker.
+
+Multiple processes (uvicorn workers, queue workers): point
+``PROMETHEUS_MULTIPROC_DIR`` at an empty directory shared by every process on
+the host (wipe it on deploy) before they start. Each process then writes its
+samples there and the API's /metrics merges them. Without it every process has
+its own registry; a worker can serve its own on ``VELU_WORKER_METRICS_PORT``.
+"""
+from __future__ import annotations
+
+import contextlib
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Iterator
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    start_http_server,
+)
+
+logger = logging.getLogger(__name__)
+
+# Jobs run from milliseconds (memo hits) to tens of minutes (tests, scans).
+_JOB_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1200, 1800, 3600)
+_PHASE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+HTTP_REQUESTS = Counter(
+    "http_requests", "HTTP requests by route template and status", ["method", "path", "status"]
+)
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ["method", "path"]
+)
+JOB_WAIT = Histogram(
+    "velu_job_wait_seconds",
+    "Time from enqueue (or run_at, if later) until a worker picked the job up",
+    ["task"],
+    buckets=_JOB_BUCKETS,
+)
+JOB_RUN = Histogram(
+    "velu_job_run_seconds", "Handler run time", ["task", "outcome"], buckets=_JOB_BUCKETS
+)
+JOB_PHASE = Histogram(
+    "velu_job_phase_seconds",
+    "Worker time outside the handler: workspace setup, writing files, finishing the job",
+    ["task", "phase"],
+    buckets=_PHASE_BUCKETS,
+)
+CLAIMS_EMPTY = Counter("velu_worker_claims_empty", "Claim attempts that found no runnable job")
+CLAIMS = Counter("velu_worker_claims", "Jobs claimed", ["task"])
+
+
+def multiprocess_dir() -> str | None:
+    return (os.getenv("PROMETHEUS_MULTIPROC_DIR") or os.getenv("prometheus_multiproc_dir") or "").strip() or None
+
+
+def _epoch(v: Any) -> float | None:
+    if isinstance(v, datetime):
+        return v.timestamp()
+    if isinstance(v, (int, float)) and not isinstance(v, bool):
+        return float(v)
+    return None
+
+
+def observe_request(method: str, path: str, status: int, seconds: float) -> None:
+    HTTP_REQUESTS.labels(method, path, str(status)).inc()
+    HTTP_LATENCY.labels(method, path).observe(seconds)
+
+
+def observe_claim(row: Any, *, now: float | None = None) -> None:
+    """
+    Count a claimed job and record how long it waited (Postgres or SQLite row):
+    since it became claimable, which the backends keep in run_at / next_run_at
+    when a job is promoted, deferred, retried or released back to 'queued'.
+    """
+    task = str(row.get("task") or "")
+    CLAIMS.labels(task).inc()
+    times = [t for t in (_epoch(row.get(k)) for k in ("created_at", "run_at", "next_run_at")) if t]
+    if times:
+        JOB_WAIT.labels(task).observe(max(0.0, (now or time.time()) - max(times)))
+
+
+def claim_empty() -> None:
+    CLAIMS_EMPTY.inc()
+
+
+def observe_run(task: str, outcome: str, seconds: float) -> None:
+    JOB_RUN.labels(task, outcome).observe(seconds)
+
+
+@contextlib.contextmanager
+def phase(task: str, name: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        JOB_PHASE.labels(task, name).observe(time.perf_counter() - started)
+
+
+class QueueDepthCollector:
+    """
+    velu_queue_jobs{task,status} for queued/working jobs, read from the queue at
+    scrape time and cached for ``VELU_METRICS_DEPTH_TTL_SEC`` (default 10).
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._at = 0.0
+        self._depth: dict[str, dict[str, int]] = {}
+
+    def _ttl(self) -> float:
+        try:
+            return float((os.getenv("VELU_METRICS_DEPTH_TTL_SEC") or "").strip() or 10)
+        except ValueError:
+            return 10.0
+
+    def _read(self) -> dict[str, dict[str, int]]:
+        with self._lock:
+            if time.monotonic() - self._at >= self._ttl():
+                from services.queue import queue_api
+
+                try:
+                    self._depth = dict(queue_api.queue_depth()["tasks"])
+                except Exception as exc:
+                    logger.warning("metrics: queue depth unavailable: %s", exc)
+                self._at = time.monotonic()
+            return self._depth
+
+    def collect(self):
+        from prometheus_client.core import GaugeMetricFamily
+
+        g = GaugeMetricFamily("velu_queue_jobs", "Jobs in the queue by task and status", labels=["task", "status"])
+        for task, counts in sorted(self._read().items()):
+            for status, n in sorted(counts.items()):
+                g.add_metric([task, status], n)
+        yield g
+
+
+_depth_collector = QueueDepthCollector()
+_registered = False
+_reg_lock = threading.Lock()
+
+
+def register_collectors(registry: Any | None = None) -> None:
+    """Queue depth and DB pool gauges on the default registry (once per process)."""
+    global _registered
+    with _reg_lock:
+        if _registered:
+            return
+        from services.db import pool as db_pool
+
+        db_pool.register_metrics(registry)
+        (registry or REGISTRY).register(_depth_collector)
+        _registered = True
+
+
+def render() -> tuple[bytes, str]:
+    """Body and content type for /metrics."""
+    path = multiprocess_dir()
+    if not path:
+        return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+    from prometheus_client import multiprocess
+
+    from services.db import pool as db_pool
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry, path=path)
+    registry.register(db_pool.PoolStatsCollector())
+    registry.register(_depth_collector)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def serve_worker_metrics() -> bool:
+    """Expose this worker's metrics on VELU_WORKER_METRICS_PORT, unless they go to the shared dir."""
+    raw = (os.getenv("VELU_WORKER_METRICS_PORT") or "").strip()
+    if not raw or multiprocess_dir():
+        return False
+    from services.db import pool as db_pool
+
+    db_pool.register_metrics()
+    try:
+        start_http_server(int(raw))
+    except (ValueError, OSError) as exc:
+        logger.warning("metrics: cannot serve on %r: %s", raw, exc)
+        return False
+    return True
+
+
+__all__ = [
+    "QueueDepthCollector",
+    "claim_empty",
+    "multiprocess_dir",
+    "observe_claim",
+    "observe_request",
+    "observe_run",
+    "phase",
+    "register_collectors",
+    "render",
+    "serve_worker_metrics",
+]
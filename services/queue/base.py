@@ -1,6 +1,62 @@
 from __future__ import annotations
 from typing import Protocol, Any
 
+# A job whose parent ends in one of these never runs: it fails with the parent.
+FAILED_STATUSES = ("error", "dead", "cancelled")
+
+# How a job waits on its parents: "done" (default) needs every parent to succeed;
+# "finished" only needs them to settle, success or not (completion hooks such as
+# the pipeline waiter, which then reports on the failures).
+WAIT_FOR = ("done", "finished")
+
+
 class Queue(Protocol):
     def list_recent_for_org(self, *, org_id: str, limit: int = 50) -> list[dict[str, Any]]: ...
     def load_for_org(self, *, org_id: str, job_id: str) -> dict[str, Any] | None: ...
+
+
+def payload_with_deps(job: dict[str, Any], ids: list[Any], pos: int) -> dict[str, Any]:
+    """
+    Payload for the ``pos``-th job of an ``enqueue_many`` batch, with any
+    ``depends_on_idx`` (indexes of earlier jobs in the same batch) resolved to ids
+    and merged into ``payload["depends_on"]``.
+    """
+    payload = dict(job.get("payload") or {})
+    idxs = job.get("depends_on_idx") or []
+    if not idxs:
+        return payload
+    deps = list(payload.get("depends_on") or [])
+    for i in idxs:
+        i = int(i)
+        if not 0 <= i < pos:
+            raise ValueError(f"job {pos}: depends_on_idx {i} must reference an earlier job in the batch")
+        deps.append(ids[i])
+    payload["depends_on"] = deps
+    return payload
+
+
+def dependency_ids(payload: Any) -> list[str]:
+    """Parent job ids listed in ``payload["depends_on"]`` (a list or a single id), deduplicated."""
+    raw = payload.get("depends_on") if isinstance(payload, dict) else None
+    if raw is None:
+        return []
+    out: list[str] = []
+    for v in raw if isinstance(raw, (list, tuple)) else [raw]:
+        s = str(v).strip() if v is not None else ""
+        if s and s not in out:
+            out.append(s)
+    return out
+
+
+def wait_for(job: dict[str, Any]) -> str:
+    mode = str(job.get("wait_for") or "done").strip().lower()
+    if mode not in WAIT_FOR:
+        raise ValueError(f"wait_for must be one of {WAIT_FOR}, got {mode!r}")
+    return mode
+
+
+def parent_settled(status: str | None, mode: str) -> bool:
+    """Whether a parent in ``status`` no longer holds back a child waiting with ``mode``."""
+    if status == "done":
+        return True
+    return mode == "finished" and status in FAILED_STATUSES
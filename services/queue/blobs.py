@@ -0,0 +1,253 @@
+# services/queue/blobs.py
+"""
+Compressed blob storage for large job payloads/results.
+
+Documents whose JSON encoding exceeds ``VELU_BLOB_THRESHOLD_BYTES`` (default 64 KiB)
+are stored compressed in a BlobStore; the job row keeps a stub instead:
+
+    {"_blob": {"ref", "codec", "bytes", "stored_bytes"}, "summary": {...}, <small scalars>}
+
+Top-level scalars (``ok``, ``agent``, ``artifact_path`` ...) stay inline so status
+checks never need the blob. ``resolve`` loads the full document on demand.
+
+The store is pluggable: ``VELU_BLOB_STORE`` is ``local`` (default) or a
+``package.module:factory`` path returning an object with put/get/delete.
+"""
+from __future__ import annotations
+
+import hashlib
+import importlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Protocol
+
+logger = logging.getLogger(__name__)
+
+try:  # optional; zlib is always available
+    import zstandard as _zstd
+except ImportError:
+    _zstd = None
+
+BLOB_KEY = "_blob"
+_INLINE_STR_MAX = 200
+_SUMMARY_PATHS = 20
+
+
+class BlobStore(Protocol):
+    def put(self, data: bytes) -> str: ...
+
+    def get(self, ref: str) -> bytes: ...
+
+    def delete(self, ref: str) -> None: ...
+
+
+class LocalBlobStore:
+    """
+    Content-addressed files under ``root`` (``ab/cd/<sha256>``); identical bodies are
+    stored once. Writes are atomic (temp file + rename); re-putting a blob refreshes
+    its mtime, which is what ``prune`` goes by.
+    """
+
+    def __init__(self, root: str | Path) -> None:
+        self.root = Path(root)
+
+    def _path(self, ref: str) -> Path:
+        name = ref.rsplit("/", 1)[-1]
+        if len(name) != 64 or any(c not in "0123456789abcdef" for c in name):
+            raise ValueError(f"invalid blob ref: {ref!r}")
+        return self.root / name[:2] / name[2:4] / name
+
+    def put(self, data: bytes) -> str:
+        ref = hashlib.sha256(data).hexdigest()
+        path = self._path(ref)
+        if path.exists():
+            os.utime(path)
+            return ref
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(data)
+            os.replace(tmp, path)
+        except Exception:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        return ref
+
+    def get(self, ref: str) -> bytes:
+        return self._path(ref).read_bytes()
+
+    def delete(self, ref: str) -> None:
+        self._path(ref).unlink(missing_ok=True)
+
+    def prune(self, *, older_than_seconds: float) -> int:
+        cutoff = time.time() - float(older_than_seconds)
+        removed = 0
+        for path in self.root.glob("*/*/*"):
+            try:
+                if path.is_file() and path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    removed += 1
+            except FileNotFoundError:
+                continue
+        return removed
+
+
+def _default_root() -> Path:
+    v = (os.getenv("VELU_BLOB_DIR") or "").strip()
+    if v:
+        return Path(v)
+    env = (os.getenv("ENV") or "local").strip().lower()
+    if os.getenv("PYTEST_CURRENT_TEST") or env in {"local", "test"}:
+        base = (os.getenv("VELU_TMP") or "").strip()
+        return (Path(base) if base else Path(tempfile.gettempdir())) / "velu-blobs"
+    return Path("/data/blobs")
+
+
+_store_lock = threading.Lock()
+_stores: dict[tuple[str, str], BlobStore] = {}
+
+
+def get_store() -> BlobStore:
+    kind = (os.getenv("VELU_BLOB_STORE") or "local").strip() or "local"
+    root = str(_default_root())
+    key = (kind, root)
+    with _store_lock:
+        store = _stores.get(key)
+        if store is None:
+            if kind == "local":
+                store = LocalBlobStore(root)
+            else:
+                mod_name, _, attr = kind.partition(":")
+                store = getattr(importlib.import_module(mod_name), attr or "create_store")()
+            _stores[key] = store
+        return store
+
+
+def threshold_bytes() -> int:
+    try:
+        return int((os.getenv("VELU_BLOB_THRESHOLD_BYTES") or "").strip() or 64 * 1024)
+    except Exception:
+        return 64 * 1024
+
+
+def _codec() -> str:
+    want = (os.getenv("VELU_BLOB_CODEC") or "").strip().lower()
+    if want == "zlib" or _zstd is None:
+        return "zlib"
+    return "zstd"
+
+
+def _compress(raw: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        return _zstd.ZstdCompressor(level=3).compress(raw)
+    return zlib.compress(raw, 6)
+
+
+def _decompress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if _zstd is None:
+            raise RuntimeError("blob is zstd-compressed but the zstandard package is not installed")
+        return _zstd.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+def is_stub(doc: Any) -> bool:
+    return isinstance(doc, dict) and isinstance(doc.get(BLOB_KEY), dict)
+
+
+def summarize(doc: dict[str, Any]) -> dict[str, Any]:
+    """Shape of the offloaded document: sizes of lists/dicts, file count and first paths."""
+    out: dict[str, Any] = {"keys": sorted(str(k) for k in doc)[:50]}
+    for k, v in doc.items():
+        if k == "files" and isinstance(v, list):
+            paths = [str(f.get("path")) for f in v if isinstance(f, dict) and f.get("path")]
+            out["files"] = {"count": len(v), "paths": paths[:_SUMMARY_PATHS]}
+        elif isinstance(v, (list, dict)):
+            out.setdefault("sizes", {})[str(k)] = len(v)
+    return out
+
+
+def _inline(doc: dict[str, Any]) -> dict[str, Any]:
+    keep: dict[str, Any] = {}
+    for k, v in doc.items():
+        if v is None or isinstance(v, (bool, int, float)):
+            keep[k] = v
+        elif isinstance(v, str) and len(v) <= _INLINE_STR_MAX:
+            keep[k] = v
+    # routing/workspace metadata must survive for the worker and tenancy checks
+    if isinstance(doc.get("_velu"), dict):
+        keep["_velu"] = doc["_velu"]
+    return keep
+
+
+def offload(doc: Any, *, threshold: int | None = None, store: BlobStore | None = None) -> Any:
+    """Return ``doc`` unchanged if small, else a stub pointing at the stored blob."""
+    if not isinstance(doc, dict) or is_stub(doc):
+        return doc
+    limit = threshold_bytes() if threshold is None else int(threshold)
+    if limit <= 0:
+        return doc
+    raw = json.dumps(doc, ensure_ascii=False, default=str).encode("utf-8")
+    if len(raw) <= limit:
+        return doc
+    codec = _codec()
+    body = _compress(raw, codec)
+    try:
+        ref = (store or get_store()).put(body)
+    except Exception as exc:
+        logger.warning("blob offload failed, storing inline: %s", exc)
+        return doc
+    stub = _inline(doc)
+    stub[BLOB_KEY] = {"ref": ref, "codec": codec, "bytes": len(raw), "stored_bytes": len(body)}
+    stub["summary"] = summarize(doc)
+    return stub
+
+
+def resolve(doc: Any, *, store: BlobStore | None = None) -> Any:
+    """Full document for a stub (anything else is returned as-is)."""
+    stub = doc
+    if isinstance(doc, str) and f'"{BLOB_KEY}"' in doc:
+        try:
+            stub = json.loads(doc)
+        except Exception:
+            return doc
+    if not is_stub(stub):
+        return doc
+    meta = stub[BLOB_KEY]
+    data = (store or get_store()).get(str(meta.get("ref")))
+    return json.loads(_decompress(data, str(meta.get("codec") or "zlib")).decode("utf-8"))
+
+
+def resolve_row(row: Any, fields: tuple[str, ...] = ("payload", "result")) -> Any:
+    """Copy of a job row with the given blob-backed fields loaded."""
+    if not isinstance(row, dict):
+        return row
+    out = dict(row)
+    for f in fields:
+        if f in out:
+            try:
+                out[f] = resolve(out[f])
+            except Exception as exc:
+                logger.warning("blob resolve failed for %s.%s: %s", out.get("id"), f, exc)
+    return out
+
+
+__all__ = [
+    "BLOB_KEY",
+    "BlobStore",
+    "LocalBlobStore",
+    "get_store",
+    "is_stub",
+    "offload",
+    "resolve",
+    "resolve_row",
+    "summarize",
+    "threshold_bytes",
+]
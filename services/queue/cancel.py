@@ -0,0 +1,170 @@
+# services/queue/cancel.py
+"""
+Cooperative cancellation of running jobs.
+
+``POST /orgs/{org}/jobs/{id}/cancel`` flags a running job (``cancel_requested``);
+the worker's heartbeat sees the flag and cancels the job's CancelScope. Handlers
+that shell out run their commands through :func:`run`, which registers the
+child with the current scope so a cancel terminates it (SIGTERM to its process
+group, SIGKILL after ``VELU_CANCEL_GRACE_SEC``) and raises JobCancelled.
+Async handlers are cancelled like any asyncio task (see :meth:`CancelScope.on_cancel`).
+Handlers that do not shell out finish normally; the worker still records the
+job as cancelled instead of storing its result.
+"""
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import os
+import signal
+import subprocess  # nosec B404
+import threading
+from typing import Any, Callable, Iterator
+
+
+class JobCancelled(RuntimeError):
+    """The running job was cancelled; handlers must let it propagate."""
+
+
+def _grace_seconds() -> float:
+    try:
+        return max(0.0, float((os.getenv("VELU_CANCEL_GRACE_SEC") or "").strip() or 5))
+    except ValueError:
+        return 5.0
+
+
+def _signal(proc: subprocess.Popen, sig: int) -> None:
+    with contextlib.suppress(ProcessLookupError, PermissionError, OSError):
+        if os.name == "posix":
+            os.killpg(proc.pid, sig)
+        else:
+            proc.send_signal(sig)
+
+
+class CancelScope:
+    """Cancellation state of one running job and the child processes it started."""
+
+    def __init__(self) -> None:
+        self.cancelled = False
+        self._procs: set[subprocess.Popen] = set()
+        self._callbacks: list[Callable[[], None]] = []
+        self._lock = threading.Lock()
+
+    def on_cancel(self, fn: Callable[[], None]) -> None:
+        """Call ``fn`` (from the cancelling thread) when the scope is cancelled."""
+        with self._lock:
+            cancelled = self.cancelled
+            if not cancelled:
+                self._callbacks.append(fn)
+        if cancelled:
+            fn()
+
+    def cancel(self) -> None:
+        with self._lock:
+            self.cancelled = True
+            procs = list(self._procs)
+            callbacks, self._callbacks = self._callbacks, []
+        for fn in callbacks:
+            with contextlib.suppress(Exception):
+                fn()
+        for proc in procs:
+            _signal(proc, signal.SIGTERM)
+        for proc in procs:
+            try:
+                proc.wait(timeout=_grace_seconds())
+            except subprocess.TimeoutExpired:
+                _signal(proc, signal.SIGKILL)
+
+    def kill(self) -> None:
+        """SIGKILL the child processes without cancelling the job (worker shutdown)."""
+        with self._lock:
+            procs = list(self._procs)
+        for proc in procs:
+            _signal(proc, signal.SIGKILL)
+
+    def check(self) -> None:
+        if self.cancelled:
+            raise JobCancelled("job cancelled")
+
+    def _track(self, proc: subprocess.Popen) -> None:
+        with self._lock:
+            self._procs.add(proc)
+            cancelled = self.cancelled
+        if cancelled:
+            _signal(proc, signal.SIGKILL)
+
+    def _untrack(self, proc: subprocess.Popen) -> None:
+        with self._lock:
+            self._procs.discard(proc)
+
+
+_current: contextvars.ContextVar[CancelScope | None] = contextvars.ContextVar("velu_cancel_scope", default=None)
+
+
+def current() -> CancelScope | None:
+    return _current.get()
+
+
+@contextlib.contextmanager
+def scope(s: CancelScope | None) -> Iterator[CancelScope | None]:
+    """Make ``s`` the current job's scope for the duration of the block."""
+    token = _current.set(s)
+    try:
+        yield s
+    finally:
+        _current.reset(token)
+
+
+def check() -> None:
+    """Raise JobCancelled if the current job has been cancelled."""
+    s = current()
+    if s is not None:
+        s.check()
+
+
+def run(
+    cmd: list[str],
+    *,
+    timeout: float | None = None,
+    capture_output: bool = False,
+    text: bool = False,
+    **kwargs: Any,
+) -> subprocess.CompletedProcess:
+    """
+    subprocess.run for handlers: the child runs in its own process group and is
+    terminated if the job is cancelled (raising JobCancelled) or times out
+    (raising subprocess.TimeoutExpired). Inside a job context the command runs
+    in the job's workspace with its temp dir unless ``cwd``/``env`` are given.
+    """
+    from services.queue import context
+
+    ctx = context.current()
+    if ctx is not None:
+        kwargs.setdefault("cwd", str(ctx.workspace))
+        kwargs.setdefault("env", ctx.env())
+    s = current()
+    if s is not None:
+        s.check()
+    if capture_output:
+        kwargs["stdout"] = kwargs["stderr"] = subprocess.PIPE
+    if os.name == "posix":
+        kwargs.setdefault("start_new_session", True)
+    proc = subprocess.Popen(cmd, text=text, **kwargs)  # nosec B603
+    if s is not None:
+        s._track(proc)
+    try:
+        try:
+            out, err = proc.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            _signal(proc, signal.SIGKILL)
+            proc.communicate()
+            raise
+    finally:
+        if s is not None:
+            s._untrack(proc)
+    if s is not None:
+        s.check()
+    return subprocess.CompletedProcess(proc.args, proc.returncode, out, err)
+
+
+__all__ = ["CancelScope", "JobCancelled", "check", "current", "run", "scope"]
@@ -0,0 +1,70 @@
+# services/queue/context.py
+"""
+Per-job context handed to ``async def handle(ctx, payload)`` handlers.
+
+Async handlers share one process (and event loop) with other jobs, so they
+must not rely on the current directory or on TMPDIR in ``os.environ``: paths
+are resolved against ``ctx.workspace`` and subprocesses get ``ctx.env()``.
+:func:`services.queue.cancel.run` does both by default while a context is
+current.
+"""
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterator, Mapping
+
+from services.queue import cancel
+
+
+@dataclass
+class JobContext:
+    job_id: str
+    task: str
+    workspace: Path
+    tmpdir: Path
+    org_id: str | None = None
+    run_id: str | None = None
+    scope: cancel.CancelScope = field(default_factory=cancel.CancelScope)
+
+    def env(self, extra: Mapping[str, str] | None = None) -> dict[str, str]:
+        """A copy of the process environment with the temp dir vars pointing at ``tmpdir``."""
+        out = dict(os.environ)
+        out["TMPDIR"] = out["TEMP"] = out["TMP"] = str(self.tmpdir)
+        if extra:
+            out.update(extra)
+        return out
+
+    def path(self, *parts: str) -> Path:
+        """A path inside the workspace; raises ValueError if it would escape it."""
+        ws = self.workspace.resolve()
+        out = ws.joinpath(*parts).resolve()
+        out.relative_to(ws)
+        return out
+
+    def check(self) -> None:
+        self.scope.check()
+
+
+_current: contextvars.ContextVar[JobContext | None] = contextvars.ContextVar("velu_job_context", default=None)
+
+
+def current() -> JobContext | None:
+    return _current.get()
+
+
+@contextlib.contextmanager
+def bind(ctx: JobContext | None) -> Iterator[JobContext | None]:
+    """Make ``ctx`` the current job's context (and its scope the cancel scope)."""
+    token = _current.set(ctx)
+    try:
+        with cancel.scope(ctx.scope if ctx is not None else cancel.current()):
+            yield ctx
+    finally:
+        _current.reset(token)
+
+
+__all__ = ["JobContext", "bind", "current"]
@@ -0,0 +1,47 @@
+# services/queue/defer.py
+"""
+Resumable handlers.
+
+A handler that has started other jobs and needs their results returns
+``defer(state, wait_on=[...])`` instead of waiting for them. The worker parks the
+job as ``blocked`` on those jobs (``wait_for="finished"`` by default: they only
+have to settle) and stores ``state`` in ``payload["_state"]``; once they settle
+the same job id is queued again and the handler runs with that state. Nothing
+holds a worker between steps and the state survives worker restarts.
+"""
+from __future__ import annotations
+
+from typing import Any, Iterable, Mapping
+
+from services.queue.base import WAIT_FOR
+
+DEFER_KEY = "_defer"
+STATE_KEY = "_state"
+
+
+def defer(state: Mapping[str, Any], wait_on: Iterable[Any], *, wait_for: str = "finished") -> dict[str, Any]:
+    if wait_for not in WAIT_FOR:
+        raise ValueError(f"wait_for must be one of {WAIT_FOR}, got {wait_for!r}")
+    return {
+        "ok": True,
+        DEFER_KEY: {
+            "state": dict(state),
+            "wait_on": [str(j) for j in wait_on if j is not None and str(j).strip()],
+            "wait_for": wait_for,
+        },
+    }
+
+
+def deferral(result: Any) -> dict[str, Any] | None:
+    """The ``defer()`` request carried by a handler result, if any."""
+    d = result.get(DEFER_KEY) if isinstance(result, dict) else None
+    return d if isinstance(d, dict) else None
+
+
+def resumed_payload(payload: Mapping[str, Any], state: Mapping[str, Any]) -> dict[str, Any]:
+    out = dict(payload or {})
+    out[STATE_KEY] = dict(state)
+    return out
+
+
+__all__ = ["DEFER_KEY", "STATE_KEY", "defer", "deferral", "resumed_payload"]
@@ -0,0 +1,147 @@
+# services/queue/drain.py
+"""
+Graceful worker shutdown.
+
+On SIGTERM or SIGINT the worker stops claiming and lets the jobs it is running
+finish for up to ``VELU_WORKER_DRAIN_SEC`` (default 25, under Kubernetes' 30 s
+termination grace). If they have not finished by then (or on a second
+signal), every job the worker still holds is put back to ``queued`` in one
+UPDATE without charging an attempt (release_jobs), the jobs' child processes
+are killed, and the process exits, so another worker can pick the jobs up at
+once instead of after the lease expires.
+"""
+from __future__ import annotations
+
+import contextlib
+import logging
+import os
+import signal
+import sys
+import threading
+from typing import Any, Callable, Iterable, Iterator
+
+from services.queue import cancel
+from services.queue import jobs as jobs_api
+
+logger = logging.getLogger(__name__)
+
+
+def grace_seconds() -> float:
+    try:
+        return max(0.0, float((os.getenv("VELU_WORKER_DRAIN_SEC") or "").strip() or 25))
+    except ValueError:
+        return 25.0
+
+
+class Drain:
+    """Shutdown state of one worker process: stop flag, held jobs and the grace timer."""
+
+    def __init__(self, *, worker_id: str, grace: float | None = None) -> None:
+        self.worker_id = worker_id
+        self.grace_seconds = grace_seconds() if grace is None else max(0.0, float(grace))
+        self.signum: int | None = None
+        self._stop = threading.Event()
+        # Held while a result is reported, so a release never races a finish.
+        self._report_lock = threading.Lock()
+        self._held: dict[str, cancel.CancelScope | None] = {}
+        self._sources: list[Callable[[], Iterable[str]]] = []
+        self._timer: threading.Timer | None = None
+        self._previous: dict[int, Any] = {}
+
+    @property
+    def stopping(self) -> bool:
+        return self._stop.is_set()
+
+    def wait(self, timeout: float) -> bool:
+        """Sleep up to ``timeout``; True as soon as a drain was requested."""
+        return self._stop.wait(timeout)
+
+    def install(self) -> "Drain":
+        """Handle SIGTERM/SIGINT (main thread only; elsewhere this is a no-op)."""
+        if threading.current_thread() is threading.main_thread():
+            for sig in (signal.SIGTERM, signal.SIGINT):
+                self._previous[sig] = signal.signal(sig, self._on_signal)
+        return self
+
+    def restore(self) -> None:
+        for sig, handler in self._previous.items():
+            signal.signal(sig, handler)
+        self._previous.clear()
+        if self._timer is not None:
+            self._timer.cancel()
+
+    def _on_signal(self, signum: int, frame: Any) -> None:
+        if self._stop.is_set():
+            # Second signal: don't wait out the grace period. Not from the handler
+            # itself, which may have interrupted a report holding the lock.
+            print("worker: second signal, releasing jobs now", flush=True)
+            threading.Thread(target=self.expire, name="drain-expire", daemon=True).start()
+            return
+        self.signum = signum
+        self.request()
+
+    def request(self) -> None:
+        """Stop claiming; release whatever is still running after the grace period."""
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        print(f"worker: draining, grace {self.grace_seconds:g}s", flush=True)
+        self._timer = threading.Timer(self.grace_seconds, self.expire)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def add_source(self, ids: Callable[[], Iterable[str]]) -> None:
+        """More job ids this worker holds (e.g. a prefetch buffer) to release on expiry."""
+        self._sources.append(ids)
+
+    @contextlib.contextmanager
+    def track(self, job_id: str, scope: cancel.CancelScope | None = None) -> Iterator[None]:
+        """Mark ``job_id`` as held by this worker until it has been reported."""
+        self._held[job_id] = scope
+        try:
+            yield
+        finally:
+            self._held.pop(job_id, None)
+
+    @contextlib.contextmanager
+    def reporting(self) -> Iterator[None]:
+        with self._report_lock:
+            yield
+
+    def held(self) -> list[str]:
+        ids = list(self._held)
+        for source in self._sources:
+            with contextlib.suppress(Exception):
+                ids.extend(str(j) for j in source() if j)
+        return ids
+
+    def _release_held(self) -> int:
+        ids = self.held()
+        released = 0
+        if ids:
+            try:
+                released = jobs_api.release_jobs(job_ids=ids, worker_id=self.worker_id)
+            except Exception as exc:
+                logger.warning("drain: release of %d jobs failed: %s", len(ids), exc)
+        for scope in list(self._held.values()):
+            if scope is not None:
+                scope.kill()
+        return released
+
+    def release(self) -> int:
+        """Put every held job back to 'queued' (one UPDATE) and stop their child processes."""
+        with self._report_lock:
+            return self._release_held()
+
+    def expire(self) -> None:
+        # Exit with the lock held: no result may be reported for a released job.
+        with self._report_lock:
+            released = self._release_held()
+            print(f"worker: drain grace expired, released {released} job(s)", flush=True)
+            sys.stderr.flush()
+            # The running handler cannot be stopped from here; its jobs are already
+            # back in the queue, so leave without running any more of it.
+            os._exit(128 + int(self.signum or signal.SIGTERM))
+
+
+__all__ = ["Drain", "grace_seconds"]
@@ -0,0 +1,80 @@
+# services/queue/fairness.py
+"""
+Tenant-fair claim policy for the Postgres jobs backend.
+
+``VELU_SCHEDULER=fair`` switches claim_jobs from the global ``priority DESC,
+created_at ASC`` order to weighted-fair selection across orgs:
+
+- an org may hold at most ``cap_for_plan(organizations.plan)`` working jobs;
+- among orgs below their cap, the one using the smallest share of its cap goes
+  next, ties broken by whoever was served longest ago (round-robin);
+- inside an org, a job's effective priority grows by one point every
+  ``VELU_PRIORITY_AGING_SEC`` seconds it waits, so low-priority work is not
+  starved by a steady stream of higher-priority jobs.
+
+Caps default to 2/8/32 for the starter/growth/enterprise tiers and can be set
+with ``VELU_ORG_CAP_STARTER`` / ``_GROWTH`` / ``_ENTERPRISE``.
+"""
+from __future__ import annotations
+
+import os
+
+DEFAULT_CAPS = {"starter": 2, "growth": 8, "enterprise": 32}
+
+# organizations.plan holds either the plan name (base/hero/superhero) or the tier.
+_PLAN_TIERS = {
+    "base": "starter",
+    "basic": "starter",
+    "starter": "starter",
+    "hero": "growth",
+    "standard": "growth",
+    "growth": "growth",
+    "superhero": "enterprise",
+    "premium": "enterprise",
+    "enterprise": "enterprise",
+}
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int((os.getenv(name) or "").strip() or default)
+    except Exception:
+        return default
+
+
+def mode() -> str:
+    v = (os.getenv("VELU_SCHEDULER") or "priority").strip().lower()
+    return "fair" if v in {"fair", "wfq", "weighted"} else "priority"
+
+
+def aging_seconds() -> int:
+    """Seconds of waiting worth one priority point (0 disables aging)."""
+    return max(0, _env_int("VELU_PRIORITY_AGING_SEC", 60))
+
+
+def tier_for_plan(plan: str | None) -> str:
+    return _PLAN_TIERS.get((plan or "").strip().lower(), "starter")
+
+
+def cap_for_plan(plan: str | None) -> int:
+    tier = tier_for_plan(plan)
+    return max(1, _env_int(f"VELU_ORG_CAP_{tier.upper()}", DEFAULT_CAPS[tier]))
+
+
+def fair_order(candidates: list[dict]) -> list[dict]:
+    """
+    Orgs below their cap, most deserving first. Each candidate carries ``working``,
+    ``cap`` and ``last_claimed_at`` (None if never served).
+    """
+    eligible = [c for c in candidates if int(c["working"]) < int(c["cap"])]
+    return sorted(
+        eligible,
+        key=lambda c: (
+            int(c["working"]) / int(c["cap"]),
+            c["last_claimed_at"] is not None,
+            c["last_claimed_at"] or 0,
+        ),
+    )
+
+
+__all__ = ["DEFAULT_CAPS", "aging_seconds", "cap_for_plan", "fair_order", "mode", "tier_for_plan"]
@@ -0,0 +1,50 @@
+# services/queue/idempotency.py
+"""
+Idempotent submission.
+
+Clients send an ``Idempotency-Key`` header with ``POST /tasks`` (or the org jobs
+API); resubmitting the same key within ``VELU_IDEMPOTENCY_TTL_SEC`` (default 24h)
+returns the original job id instead of enqueueing the work again, whatever that
+job's status. Keys are scoped per org.
+
+In Postgres mode the key lives on jobs_v2 behind a unique partial index on
+``(org_id, idempotency_key)`` and enqueue is a single
+``INSERT ... ON CONFLICT DO NOTHING RETURNING``; maintenance clears expired keys.
+SQLite looks the key up inside the enqueue transaction.
+"""
+from __future__ import annotations
+
+import os
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+
+
+def ttl_seconds() -> int:
+    raw = (os.getenv("VELU_IDEMPOTENCY_TTL_SEC") or "").strip()
+    try:
+        return max(1, int(float(raw))) if raw else 24 * 60 * 60
+    except ValueError:
+        return 24 * 60 * 60
+
+
+def normalize_key(raw: str | None) -> str | None:
+    """The key to store, None when absent; ValueError for oversized or unprintable keys."""
+    key = (raw or "").strip()
+    if not key:
+        return None
+    if len(key) > MAX_KEY_LENGTH:
+        raise ValueError(f"{HEADER} must be at most {MAX_KEY_LENGTH} characters")
+    if not key.isprintable():
+        raise ValueError(f"{HEADER} must be printable")
+    return key
+
+
+def scoped_key(org_id: str | None, key: str | None) -> str | None:
+    """Key for stores without an org column (SQLite): ``<org>/<key>``."""
+    if not key:
+        return None
+    return f"{org_id}/{key}" if org_id else key
+
+
+__all__ = ["HEADER", "MAX_KEY_LENGTH", "normalize_key", "scoped_key", "ttl_seconds"]
@@ -65,6 +65,7 @@ def enqueue_job(
     if actor_id is not None:
         created_by = str(actor_id)
     return queue_api.enqueue(
+        task_obj if isinstance(task_obj, dict) else None,
         task=t,
         payload=payload,
         priority=int(priority),
@@ -76,18 +77,68 @@ def enqueue_job(
         actor_id=actor_id,
     )
 
-def claim_one_job(*, worker_id: str = "worker", lease_seconds: int = 300) -> dict[str, Any] | None:
-    return queue_api.claim_one_job(worker_id=worker_id, lease_seconds=lease_seconds)
+
+def enqueue_many(
+    jobs: list[dict[str, Any]],
+    *,
+    org_id: str | None = None,
+    project_id: str | None = None,
+    actor_type: str | None = None,
+    actor_id: str | None = None,
+) -> list[str | int]:
+    return queue_api.enqueue_many(
+        jobs, org_id=org_id, project_id=project_id, actor_type=actor_type, actor_id=actor_id
+    )
+
+
+def claim_one_job(
+    *, worker_id: str = "worker", lease_seconds: int = 300, tasks: list[str] | None = None
+) -> dict[str, Any] | None:
+    return queue_api.claim_one_job(worker_id=worker_id, lease_seconds=lease_seconds, tasks=tasks)
+
+
+def claim_jobs(
+    *, worker_id: str = "worker", n: int = 1, lease_seconds: int = 300, tasks: list[str] | None = None
+) -> list[dict[str, Any]]:
+    return list(queue_api.claim_jobs(worker_id=worker_id, n=int(n), lease_seconds=int(lease_seconds), tasks=tasks))
 
 
-def heartbeat(*, job_id: str, worker_id: str | None = None, lease_seconds: int = 300) -> bool:
-    return bool(queue_api.heartbeat(job_id=str(job_id), worker_id=worker_id, lease_seconds=int(lease_seconds)))
+def queue_depth() -> dict[str, Any]:
+    return queue_api.queue_depth()
+
+
+def renew_leases(*, job_ids: list[str], worker_id: str, lease_seconds: int = 300) -> list[str]:
+    return list(queue_api.renew_leases(job_ids=list(job_ids), worker_id=worker_id, lease_seconds=int(lease_seconds)))
+
+
+def release_jobs(*, job_ids: list[str], worker_id: str) -> int:
+    return int(queue_api.release_jobs(job_ids=list(job_ids), worker_id=worker_id))
+
+
+def heartbeat(*, job_id: str, worker_id: str | None = None, lease_seconds: int = 300) -> str:
+    return str(queue_api.heartbeat(job_id=str(job_id), worker_id=worker_id, lease_seconds=int(lease_seconds)))
 
 
 def requeue_expired(limit: int = 25) -> int:
     return int(queue_api.requeue_expired(limit=int(limit)))
 
 
+def sweep_expired_leases(*, batch_size: int = 500, max_batches: int = 20) -> int | None:
+    return queue_api.sweep_expired_leases(batch_size=batch_size, max_batches=max_batches)
+
+
+def task_run_p95(task: str) -> tuple[float | None, int]:
+    return queue_api.task_run_p95(task)
+
+
+def memo_get(key: str) -> dict[str, Any] | None:
+    return queue_api.memo_get(key)
+
+
+def memo_put(key: str, task: str, result: dict[str, Any]) -> None:
+    queue_api.memo_put(key, task, result)
+
+
 def finish_job(job_id: str | int, result: dict[str, Any]) -> None:
     queue_api.finish_job(job_id, result)
 
@@ -96,12 +147,30 @@ def fail_job(job_id: str | int, error: Any) -> None:
     queue_api.fail_job(job_id, error)
 
 
+def retry_job(job_id: str | int, error: Any, *, task: str | None = None) -> str | None:
+    return queue_api.retry_job(job_id, error, task=task)
+
+
+def cancel_job(job_id: str | int, *, org_id: str | None = None) -> dict[str, Any] | None:
+    return queue_api.cancel_job(job_id, org_id=org_id)
+
+
+def mark_cancelled(job_id: str | int) -> bool:
+    return bool(queue_api.mark_cancelled(job_id))
+
+
+def defer_job(
+    job_id: str | int, *, payload: dict[str, Any], wait_on: list[Any], wait_for: str = "finished"
+) -> str | None:
+    return queue_api.defer_job(job_id, payload=payload, wait_on=wait_on, wait_for=wait_for)
+
+
 def load(job_id: Any) -> dict[str, Any] | None:
     return queue_api.get(job_id)
 
 
-def get_job(job_id: Any) -> dict[str, Any] | None:
-    return queue_api.get(job_id)
+def get_job(job_id: Any, *, view: str = "full") -> dict[str, Any] | None:
+    return queue_api.get(job_id, view=view)
 
 
 def project_belongs_to_org(project_id: str, org_id: str) -> bool:
@@ -112,9 +181,30 @@ def project_belongs_to_org(project_id: str, org_id: str) -> bool:
     return bool(jobs_sqlite.project_belongs_to_org(project_id, org_id))
 
 
-def list_recent_for_org(*, org_id: str, limit: int = 50) -> list[dict[str, Any]]:
-    return list(queue_api.list_recent_for_org(org_id=str(org_id), limit=int(limit)))
+def list_recent_for_org(*, org_id: str, limit: int = 50, view: str = "full") -> list[dict[str, Any]]:
+    return list(queue_api.list_recent_for_org(org_id=str(org_id), limit=int(limit), view=view))
+
+
+def list_page_for_org(
+    *,
+    org_id: str,
+    limit: int = 50,
+    cursor: str | None = None,
+    view: str = "full",
+    status: str | None = None,
+    task: str | None = None,
+    project_id: str | None = None,
+) -> tuple[list[dict[str, Any]], str | None]:
+    return queue_api.list_page_for_org(
+        org_id=str(org_id),
+        limit=int(limit),
+        cursor=cursor,
+        view=view,
+        status=status,
+        task=task,
+        project_id=project_id,
+    )
 
 
-def list_recent(limit: int = 50) -> list[dict[str, Any]]:
-    return list(queue_api.list_recent(limit=int(limit)))
+def list_recent(limit: int = 50, *, view: str = "full") -> list[dict[str, Any]]:
+    return list(queue_api.list_recent(limit=int(limit), view=view))
@@ -1,30 +1,33 @@
 # services/queue/jobs_postgres.py
 from __future__ import annotations
 
-import os
-from contextlib import closing
-from typing import Any
+import re
+import uuid
+from contextlib import AbstractContextManager, contextmanager
+from datetime import datetime, timezone
+from typing import Any, Iterator
 
 import psycopg
+from psycopg import errors as pg_errors
 from psycopg.rows import dict_row
 from psycopg.types.json import Jsonb
 
+from services.db import pool as db_pool
+from services.queue import blobs, fairness, idempotency, memo, retry
+from services.queue.base import FAILED_STATUSES, dependency_ids, parent_settled, payload_with_deps, wait_for
+from services.queue.notify import notify_tasks
+
 
 def _db_url() -> str:
-    raw = (os.getenv("DATABASE_URL") or "").strip()
-    if not raw:
+    url = db_pool.dsn_optional()
+    if not url:
         raise RuntimeError("DATABASE_URL is required for Postgres jobs backend")
-
-    low = raw.lower()
-    if low.startswith("postgresql+psycopg://"):
-        return "postgresql://" + raw.split("://", 1)[1]
-    if low.startswith("postgres://"):
-        return "postgresql://" + raw.split("://", 1)[1]
-    return raw
+    return url
 
 
-def _connect() -> psycopg.Connection:
-    return psycopg.connect(_db_url(), row_factory=dict_row)
+def _connect() -> AbstractContextManager[psycopg.Connection]:
+    """Borrow a pooled connection; commits on clean exit, rolls back on error."""
+    return db_pool.connection(_db_url())
 
 
 def ensure_schema() -> None:
@@ -47,122 +50,511 @@ def enqueue_job(
     actor_type: str = "api_key",
     actor_id: str | None = None,
     priority: int = 0,
+    idempotency_key: str | None = None,
+    memo_key: str | None = None,
 ) -> str:
+    """
+    Insert one job and return its id. With ``idempotency_key`` a live job holding
+    the same key in this org is returned instead (see services.queue.idempotency).
+    A ``memo_key`` hit in the result cache inserts the job already done, unless
+    the cached result has files to write (memo.writes_files).
+    """
     task = (task_obj.get("task") or "").strip()
-    payload = task_obj.get("payload") or {}
+    deps = _uuids(dependency_ids(task_obj.get("payload")))
+    mode = wait_for(task_obj)
+    payload = blobs.offload(task_obj.get("payload") or {})
 
-    with closing(_connect()) as conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                INSERT INTO jobs_v2 (
-                  org_id, project_id, task, status, payload, priority, actor_type, actor_id
-                )
-                VALUES (
-                  %s::uuid, %s::uuid, %s, 'queued', %s::jsonb, %s, %s, %s
-                )
-                RETURNING id::text AS id;
-                """,
-                (
-                    str(org_id),
-                    str(project_id) if project_id else None,
-                    task,
-                    Jsonb(payload),
-                    int(priority),
-                    str(actor_type or "api_key"),
-                    str(actor_id) if actor_id else None,
-                ),
+    with _connect() as conn:
+        with conn.cursor(row_factory=dict_row) as cur:
+            parents = _parent_states(cur, deps)
+            status = "queued" if all(parent_settled(st, mode) for st in parents.values()) else "blocked"
+            cached = _memo_hit(cur, memo_key, at_enqueue=True) if memo_key and status == "queued" else None
+            params = _enqueue_params(
+                task_obj,
+                payload,
+                org_id=org_id,
+                project_id=project_id,
+                actor_type=actor_type,
+                actor_id=actor_id,
+                priority=priority,
+                status="done" if cached is not None else status,
+                idempotency_key=idempotency_key,
+                cached=cached,
             )
-            row = cur.fetchone()
+            row = None
+            for _ in range(3):
+                cur.execute(_ENQUEUE_SQL, params)
+                row = cur.fetchone()
+                if row is not None and not row["expired"]:
+                    break
+                if row is not None:
+                    # Stale key the sweeper has not cleared yet: free it and insert.
+                    cur.execute(_FREE_IDEMPOTENCY_KEY_SQL, (row["id"],))
+                # row is None: the conflicting insert committed after this
+                # statement's snapshot; the next attempt sees it.
+            if row is None or row["expired"]:
+                raise RuntimeError(f"enqueue: could not resolve idempotency key {idempotency_key!r}")
+            if not row["duplicate"]:
+                _link(cur, [(str(row["id"]), p, mode) for p in parents])
+                woken = _settle_failed(cur, [p for p, st in parents.items() if st in FAILED_STATUSES])
+                notify_tasks(cur, ([task] if params["status"] == "queued" else []) + woken)
             conn.commit()
             return str(row["id"])
 
 
-def get_job(job_id: str) -> dict[str, Any] | None:
+def _enqueue_params(
+    task_obj: dict[str, Any],
+    payload: Any,
+    *,
+    org_id: str,
+    project_id: str | None,
+    actor_type: str,
+    actor_id: str | None,
+    priority: int,
+    status: str,
+    idempotency_key: str | None,
+    cached: Any,
+) -> dict[str, Any]:
+    """Bind parameters for ``_ENQUEUE_SQL`` (``payload`` already offloaded)."""
+    return {
+        "org_id": str(org_id),
+        "project_id": str(project_id) if project_id else None,
+        "task": (task_obj.get("task") or "").strip(),
+        "status": status,
+        "payload": Jsonb(payload),
+        "priority": int(priority),
+        "actor_type": str(actor_type or "api_key"),
+        "actor_id": str(actor_id) if actor_id else None,
+        "run_at": retry.parse_run_at(task_obj),
+        "key": idempotency_key or None,
+        "ttl": idempotency.ttl_seconds(),
+        "result": Jsonb(cached) if cached is not None else None,
+    }
+
+
+_FREE_IDEMPOTENCY_KEY_SQL = (
+    "UPDATE jobs_v2 SET idempotency_key = NULL, idempotency_expires_at = NULL WHERE id = %s::uuid;"
+)
+
+# A NULL key never conflicts, so keyless submissions take the same single
+# statement; a duplicate comes back from the second branch in the same round-trip.
+_ENQUEUE_SQL = """
+WITH ins AS (
+  INSERT INTO jobs_v2 (
+    org_id, project_id, task, status, payload, priority, actor_type, actor_id, run_at,
+    idempotency_key, idempotency_expires_at, result, finished_at
+  )
+  VALUES (
+    %(org_id)s::uuid, %(project_id)s::uuid, %(task)s, %(status)s, %(payload)s::jsonb, %(priority)s,
+    %(actor_type)s, %(actor_id)s, COALESCE(%(run_at)s, now()),
+    %(key)s::text, CASE WHEN %(key)s::text IS NULL THEN NULL ELSE now() + %(ttl)s * interval '1 second' END,
+    %(result)s::jsonb, CASE WHEN %(result)s::jsonb IS NULL THEN NULL ELSE now() END
+  )
+  ON CONFLICT (org_id, idempotency_key) WHERE idempotency_key IS NOT NULL DO NOTHING
+  RETURNING id::text AS id, false AS duplicate, false AS expired
+)
+SELECT id, duplicate, expired FROM ins
+UNION ALL
+SELECT id::text, true, idempotency_expires_at <= now()
+FROM jobs_v2
+WHERE %(key)s::text IS NOT NULL
+  AND org_id = %(org_id)s::uuid
+  AND idempotency_key = %(key)s::text
+  AND NOT EXISTS (SELECT 1 FROM ins);
+"""
+
+
+_INSERT_CHUNK = 500
+
+
+def enqueue_many(
+    jobs: list[dict[str, Any]],
+    *,
+    org_id: str,
+    project_id: str | None = None,
+    actor_type: str = "api_key",
+    actor_id: str | None = None,
+) -> list[str]:
+    """
+    Insert a batch of jobs in one transaction with multi-row INSERTs.
+
+    Ids are generated client-side so ``depends_on_idx`` can be resolved before the
+    rows are written; returns the ids in input order. Per-job ``org_id``,
+    ``project_id``, ``actor_type`` and ``actor_id`` override the batch defaults.
+    Jobs with unfinished parents (in or outside the batch) start ``blocked``.
+    """
+    if not jobs:
+        return []
+    ids = [str(uuid.uuid4()) for _ in jobs]
+    batch = set(ids)
+    deps_by_pos: list[list[str]] = []
+    modes: list[str] = []
+    payloads: list[dict[str, Any]] = []
+    for pos, job in enumerate(jobs):
+        payload = payload_with_deps(job, ids, pos)
+        deps_by_pos.append(_uuids(dependency_ids(payload)))
+        modes.append(wait_for(job))
+        payloads.append(payload)
+
+    with _connect() as conn:
+        with conn.cursor(row_factory=dict_row) as cur:
+            outside = sorted({d for deps in deps_by_pos for d in deps if d not in batch})
+            parents = _parent_states(cur, outside)
+            rows: list[tuple[Any, ...]] = []
+            edges: list[tuple[str, str]] = []
+            for pos, job in enumerate(jobs):
+                oid = job.get("org_id") or org_id
+                if not oid:
+                    raise RuntimeError("enqueue_many() requires org_id when using Postgres jobs backend")
+                pid = job.get("project_id") or project_id
+                aid = job.get("actor_id") or actor_id
+                deps = [d for d in deps_by_pos[pos] if d in batch or d in parents]
+                edges.extend((ids[pos], d, modes[pos]) for d in deps)
+                blocked = any(d in batch or not parent_settled(parents[d], modes[pos]) for d in deps)
+                rows.append(
+                    (
+                        ids[pos],
+                        str(oid),
+                        str(pid) if pid else None,
+                        str(job.get("task") or "").strip(),
+                        "blocked" if blocked else "queued",
+                        Jsonb(blobs.offload(payloads[pos])),
+                        int(job.get("priority") or 0),
+                        str(job.get("actor_type") or actor_type or "api_key"),
+                        str(aid) if aid else None,
+                        retry.parse_run_at(job),
+                    )
+                )
+            for start in range(0, len(rows), _INSERT_CHUNK):
+                chunk = rows[start : start + _INSERT_CHUNK]
+                values = ", ".join(
+                    ["(%s::uuid, %s::uuid, %s::uuid, %s, %s, %s::jsonb, %s, %s, %s, COALESCE(%s, now()))"]
+                    * len(chunk)
+                )
+                cur.execute(
+                    "INSERT INTO jobs_v2 "
+                    "(id, org_id, project_id, task, status, payload, priority, actor_type, actor_id, run_at) "
+                    f"VALUES {values};",
+                    [v for row in chunk for v in row],
+                )
+            _link(cur, edges)
+            woken = _settle_failed(cur, [p for p, st in parents.items() if st in FAILED_STATUSES])
+            notify_tasks(cur, [r[3] for r in rows if r[4] == "queued"] + woken)
+            conn.commit()
+    return ids
+
+
+def _uuids(values: list[str]) -> list[str]:
+    out: list[str] = []
+    for v in values:
+        try:
+            out.append(str(uuid.UUID(v)))
+        except ValueError:
+            continue
+    return out
+
+
+def _parent_states(cur: psycopg.Cursor, parent_ids: list[str]) -> dict[str, str]:
+    """
+    Status of the parents that exist, read under FOR SHARE: a concurrent finish or
+    fail of a parent either commits first (and is seen here) or waits until the
+    new edges are committed (and then sees them).
+    """
+    if not parent_ids:
+        return {}
+    cur.execute(
+        "SELECT id::text AS id, status FROM jobs_v2 WHERE id = ANY(%s::uuid[]) ORDER BY id FOR SHARE;",
+        (list(parent_ids),),
+    )
+    return {r["id"]: r["status"] for r in cur.fetchall()}
+
+
+def _link(cur: psycopg.Cursor, edges: list[tuple[str, str, str]]) -> None:
+    if not edges:
+        return
+    cur.execute(
+        """
+        INSERT INTO job_deps (job_id, depends_on, wait_for)
+        SELECT * FROM unnest(%s::uuid[], %s::uuid[], %s::text[])
+        ON CONFLICT DO NOTHING;
+        """,
+        ([e[0] for e in edges], [e[1] for e in edges], [e[2] for e in edges]),
+    )
+
+
+_FAILED_SQL = ", ".join(f"'{s}'" for s in FAILED_STATUSES)
+
+
+def _promote_children(cur: psycopg.Cursor, parent_ids: list[str]) -> list[str]:
+    """
+    Move blocked children of just-settled parents to 'queued' once none of their
+    parents holds them back; returns their tasks. The children are locked first, so
+    of two parents settling concurrently the later one re-checks after the earlier
+    commits.
+    """
+    if not parent_ids:
+        return []
+    cur.execute(
+        """
+        SELECT id
+        FROM jobs_v2
+        WHERE status = 'blocked'
+          AND id IN (SELECT job_id FROM job_deps WHERE depends_on = ANY(%s::uuid[]))
+        ORDER BY id
+        FOR UPDATE;
+        """,
+        ([str(p) for p in parent_ids],),
+    )
+    children = [r["id"] for r in cur.fetchall()]
+    if not children:
+        return []
+    cur.execute(
+        f"""
+        UPDATE jobs_v2 j
+        SET status='queued', run_at=GREATEST(j.run_at, now()), updated_at=now()
+        WHERE j.id = ANY(%s::uuid[])
+          AND j.status = 'blocked'
+          AND NOT EXISTS (
+            SELECT 1 FROM job_deps d JOIN jobs_v2 p ON p.id = d.depends_on
+            WHERE d.job_id = j.id
+              AND p.status <> 'done'
+              AND (d.wait_for = 'done' OR p.status NOT IN ({_FAILED_SQL}))
+          )
+        RETURNING j.task;
+        """,
+        (children,),
+    )
+    return [r["task"] for r in cur.fetchall()]
+
+
+def _fail_dependants(cur: psycopg.Cursor, parent_ids: list[str]) -> list[str]:
+    """Fail every blocked job that needs ``parent_ids`` to succeed; returns their ids."""
+    if not parent_ids:
+        return []
+    cur.execute(
+        """
+        WITH RECURSIVE doomed(id, cause) AS (
+          SELECT job_id, depends_on FROM job_deps
+          WHERE depends_on = ANY(%s::uuid[]) AND wait_for = 'done'
+          UNION
+          SELECT d.job_id, doomed.cause FROM job_deps d JOIN doomed ON d.depends_on = doomed.id
+          WHERE d.wait_for = 'done'
+        ), firsts AS (
+          SELECT DISTINCT ON (id) id, cause FROM doomed ORDER BY id, cause
+        )
+        UPDATE jobs_v2 j
+        SET status='error',
+            error=jsonb_build_object('error', 'dependency failed', 'dependency', f.cause::text),
+            finished_at=now(),
+            updated_at=now()
+        FROM firsts f
+        WHERE j.id = f.id AND j.status = 'blocked'
+        RETURNING j.id::text AS id;
+        """,
+        ([str(p) for p in parent_ids],),
+    )
+    return [r["id"] for r in cur.fetchall()]
+
+
+def _settle_failed(cur: psycopg.Cursor, failed: list[str]) -> list[str]:
+    """
+    After ``failed`` jobs failed: doom what needed them, queue what only waited for
+    them to finish. Returns the tasks of newly queued jobs.
+    """
+    if not failed:
+        return []
+    return _promote_children(cur, list(failed) + _fail_dependants(cur, failed))
+
+
+# Column projections per read view (see services.contracts.jobs.JobView). Only
+# "full" reads the payload/result TOAST; summary pulls just the ok flag and a
+# clipped error message out of the JSON.
+_VIEW_COLUMNS = {
+    "status": "id::text AS id, org_id, status, created_at, updated_at",
+    "summary": (
+        "id::text AS id, org_id, project_id, task, status, attempts, actor_type, actor_id, "
+        "created_at, updated_at, finished_at, (result->'ok') AS ok, "
+        "left(COALESCE(error->>'error', error->>'message', error #>> '{}'), 500) AS error_message"
+    ),
+    "full": "*, id::text AS id",
+}
+
+
+def _columns(view: str) -> str:
+    return _VIEW_COLUMNS.get(view) or _VIEW_COLUMNS["full"]
+
+
+def _get_sql(view: str, *, for_org: bool = False, archive: bool = False) -> str:
+    """Point lookup by id (and org); the archive variant accepts a NULL org."""
+    if archive:
+        return f"""
+            SELECT {_columns(view)}
+            FROM jobs_v2_archive
+            WHERE id=%s::uuid AND (%s::uuid IS NULL OR org_id=%s::uuid)
+            LIMIT 1;
+            """
+    org = " AND org_id=%s::uuid" if for_org else ""
+    return f"SELECT {_columns(view)} FROM jobs_v2 WHERE id=%s::uuid{org} LIMIT 1;"
+
+
+def get_job(job_id: str, *, view: str = "full") -> dict[str, Any] | None:
     if not job_id:
         return None
-    with closing(_connect()) as conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                "SELECT *, id::text AS id FROM jobs_v2 WHERE id=%s::uuid LIMIT 1;",
-                (str(job_id),),
-            )
+    with _connect() as conn:
+        with conn.cursor(row_factory=dict_row) as cur:
+            cur.execute(_get_sql(view), (str(job_id),))
             row = cur.fetchone()
-            return dict(row) if row else None
+            if row:
+                return dict(row)
+            return _get_archived(cur, str(job_id), None, view=view)
 
 
-def get_job_for_org(job_id: str, org_id: str) -> dict[str, Any] | None:
+def get_job_for_org(job_id: str, org_id: str, *, view: str = "full") -> dict[str, Any] | None:
     if not job_id or not org_id:
         return None
-    with closing(_connect()) as conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                SELECT *, id::text AS id
-                FROM jobs_v2
-                WHERE id=%s::uuid AND org_id=%s::uuid
-                LIMIT 1;
-                """,
-                (str(job_id), str(org_id)),
-            )
+    with _connect() as conn:
+        with conn.cursor(row_factory=dict_row) as cur:
+            cur.execute(_get_sql(view, for_org=True), (str(job_id), str(org_id)))
             row = cur.fetchone()
-            return dict(row) if row else None
+            if row:
+                return dict(row)
+            return _get_archived(cur, str(job_id), str(org_id), view=view)
+
+
+def _get_archived(
+    cur: psycopg.Cursor, job_id: str, org_id: str | None, *, view: str = "full"
+) -> dict[str, Any] | None:
+    """Cold-path lookup in jobs_v2_archive (terminal jobs moved out of the hot table)."""
+    try:
+        cur.execute(_get_sql(view, archive=True), (job_id, org_id, org_id))
+    except pg_errors.UndefinedTable:
+        # archive migration not applied yet
+        return None
+    row = cur.fetchone()
+    return dict(row) if row else None
+
+
+_PROJECT_IN_ORG_SQL = "SELECT 1 FROM projects WHERE id=%s::uuid AND org_id=%s::uuid LIMIT 1;"
 
 
 def project_belongs_to_org(project_id: str, org_id: str) -> bool:
     if not project_id or not org_id:
         return False
-    with closing(_connect()) as conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                "SELECT 1 FROM projects WHERE id=%s::uuid AND org_id=%s::uuid LIMIT 1;",
-                (str(project_id), str(org_id)),
-            )
+    with _connect() as conn:
+        with conn.cursor(row_factory=dict_row) as cur:
+            cur.execute(_PROJECT_IN_ORG_SQL, (str(project_id), str(org_id)))
             return cur.fetchone() is not None
 
 
-def list_recent_for_org(*, org_id: str, limit: int = 50) -> list[dict[str, Any]]:
-    with closing(_connect()) as conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                """
-                SELECT *, id::text AS id
-                FROM jobs_v2
-                WHERE org_id=%s::uuid
-                ORDER BY created_at DESC
-                LIMIT %s;
-                """,
-                (str(org_id), int(limit)),
-            )
+def _list_query(
+    *,
+    org_id: str,
+    limit: int,
+    view: str,
+    after: tuple[Any, str] | None,
+    status: str | None,
+    task: str | None,
+    project_id: str | None,
+) -> tuple[str, list[Any]]:
+    where = ["org_id=%s::uuid"]
+    args: list[Any] = [str(org_id)]
+    if after is not None:
+        # malformed cursors surface as ValueError, not as a database error
+        where.append("(created_at, id) < (%s, %s)")
+        args.extend([datetime.fromisoformat(str(after[0])), uuid.UUID(str(after[1]))])
+    if status:
+        where.append("status=%s")
+        args.append(str(status))
+    if task:
+        where.append("task=%s")
+        args.append(str(task))
+    if project_id:
+        where.append("project_id=%s::uuid")
+        args.append(str(project_id))
+    args.append(int(limit))
+    return (
+        f"""
+        SELECT {_columns(view)}
+        FROM jobs_v2
+        WHERE {" AND ".join(where)}
+        ORDER BY jobs_v2.created_at DESC, jobs_v2.id DESC
+        LIMIT %s;
+        """,
+        args,
+    )
+
+
+def list_recent_for_org(
+    *,
+    org_id: str,
+    limit: int = 50,
+    view: str = "full",
+    after: tuple[Any, str] | None = None,
+    status: str | None = None,
+    task: str | None = None,
+    project_id: str | None = None,
+) -> list[dict[str, Any]]:
+    """
+    Newest first, keyset-paged over ix_jobs_v2_org_created_id: ``after`` is the
+    (created_at, id) of the last row of the previous page. The optional filters are
+    plain equality predicates checked while walking that index.
+    """
+    query, args = _list_query(
+        org_id=org_id, limit=limit, view=view, after=after, status=status, task=task, project_id=project_id
+    )
+    with _connect() as conn:
+        with conn.cursor(row_factory=dict_row) as cur:
+            cur.execute(query, args)
             return [dict(r) for r in (cur.fetchall() or [])]
 
 
-def claim_one_job(*, worker_id: str = "worker", lease_seconds: int = 300) -> dict[str, Any] | None:
+def claim_one_job(
+    *, worker_id: str = "worker", lease_seconds: int = 300, tasks: list[str] | None = None
+) -> dict[str, Any] | None:
+    """
+    Atomically claim the next queued job: marks it working and sets lease_expires_at.
+    Expired leases are returned to the queue by sweep_expired_leases, not here.
+    """
+    rows = claim_jobs(worker_id=worker_id, n=1, lease_seconds=lease_seconds, tasks=tasks)
+    return rows[0] if rows else None
+
+
+def _task_filter(tasks: list[str] | None, alias: str = "") -> tuple[str, list[Any]]:
+    """``AND task = ANY(...)`` for subscribed workers; empty for all-task workers."""
+    if tasks is None:
+        return "", []
+    return f" AND {alias}task = ANY(%s::text[])", [list(tasks)]
+
+
+def claim_jobs(
+    *, worker_id: str = "worker", n: int = 1, lease_seconds: int = 300, tasks: list[str] | None = None
+) -> list[dict[str, Any]]:
     """
-    Phase 1: atomic claim + reclaim expired leases.
-    - picks queued jobs OR working jobs whose lease expired
-    - marks as working and sets lease_expires_at
+    Claim up to ``n`` queued jobs in one round-trip. The selection is a range scan
+    of the partial index idx_jobs_v2_queued (idx_jobs_v2_queued_task when the
+    worker subscribes to ``tasks``); rows come back in claim order
+    (priority DESC, created_at ASC). Jobs whose ``run_at`` is still in the future
+    (delayed or backing off) are skipped; with many of those, the planner can
+    switch to idx_jobs_v2_status_run_at instead.
     """
     wid = (worker_id or "").strip() or "worker"
     lease_s = max(5, int(lease_seconds or 300))
+    limit = max(1, min(100, int(n or 1)))
+    if fairness.mode() == "fair":
+        return _claim_fair(worker_id=wid, n=limit, lease_seconds=lease_s, tasks=tasks)
+    task_sql, task_args = _task_filter(tasks)
 
-    with closing(_connect()) as conn:
-        with conn.cursor() as cur:
+    with _connect() as conn:
+        with conn.cursor(row_factory=dict_row) as cur:
             cur.execute(
-                """
+                f"""
                 WITH picked AS (
                   SELECT id
                   FROM jobs_v2
-                  WHERE
-                    status = 'queued'
-                    OR (
-                      status = 'working'
-                      AND lease_expires_at IS NOT NULL
-                      AND lease_expires_at < now()
-                    )
+                  WHERE status = 'queued' AND run_at <= now(){task_sql}
                   ORDER BY priority DESC, created_at ASC
                   FOR UPDATE SKIP LOCKED
-                  LIMIT 1
+                  LIMIT %s
                 )
                 UPDATE jobs_v2 j
                 SET status='working',
@@ -175,18 +567,505 @@ def claim_one_job(*, worker_id: str = "worker", lease_seconds: int = 300) -> dic
                 WHERE j.id = picked.id
                 RETURNING j.*, j.id::text AS id;
                 """,
-                (wid, lease_s),
+                (*task_args, limit, wid, lease_s),
+            )
+            rows = [dict(r) for r in (cur.fetchall() or [])]
+            conn.commit()
+    rows.sort(key=lambda r: (-int(r.get("priority") or 0), r.get("created_at")))
+    return rows
+
+
+# Two-key advisory locks (FAIR_LOCK_CLASS, hashtext(org_id)) serialize claimers per
+# org so the working count checked against the cap cannot race.
+FAIR_LOCK_CLASS = 0x7665
+_FAIR_MAX_ORGS = 1000
+
+# Distinct orgs with queued work via a skip scan of idx_jobs_v2_queued_org: one
+# index probe per org instead of a scan of the queued set.
+_FAIR_CANDIDATES_SQL = """
+WITH RECURSIVE orgs AS (
+  (SELECT org_id FROM jobs_v2 WHERE status = 'queued' AND run_at <= now(){task_sql} ORDER BY org_id LIMIT 1)
+  UNION ALL
+  SELECT (
+    SELECT j.org_id FROM jobs_v2 j
+    WHERE j.status = 'queued' AND j.run_at <= now() AND j.org_id > orgs.org_id{task_sql_j}
+    ORDER BY j.org_id
+    LIMIT 1
+  )
+  FROM orgs
+  WHERE orgs.org_id IS NOT NULL
+)
+SELECT o.org_id::text AS org_id,
+       org.plan,
+       (SELECT count(*) FROM jobs_v2 w WHERE w.org_id = o.org_id AND w.status = 'working') AS working,
+       s.last_claimed_at
+FROM orgs o
+LEFT JOIN organizations org ON org.id = o.org_id
+LEFT JOIN jobs_v2_org_sched s ON s.org_id = o.org_id
+WHERE o.org_id IS NOT NULL
+LIMIT %s;
+"""
+
+# Head of the org's queue by (priority, age) and its oldest job; whichever has the
+# higher aged priority wins. The oldest job's priority grows fastest, which bounds
+# starvation without re-sorting the whole queue.
+_FAIR_PICK_SQL = """
+WITH top AS (
+  SELECT id, priority, created_at FROM jobs_v2
+  WHERE org_id = %(org)s::uuid AND status = 'queued' AND run_at <= now(){task_sql}
+  ORDER BY priority DESC, created_at ASC
+  FOR UPDATE SKIP LOCKED
+  LIMIT 1
+), oldest AS (
+  SELECT id, priority, created_at FROM jobs_v2
+  WHERE org_id = %(org)s::uuid AND status = 'queued' AND run_at <= now(){task_sql}
+  ORDER BY created_at ASC
+  FOR UPDATE SKIP LOCKED
+  LIMIT 1
+)
+SELECT id FROM (SELECT * FROM top UNION ALL SELECT * FROM oldest) c
+ORDER BY c.priority + CASE WHEN %(step)s > 0
+           THEN floor(extract(epoch FROM now() - c.created_at) / %(step)s) ELSE 0 END DESC,
+         c.created_at ASC
+LIMIT 1;
+"""
+
+
+def _claim_fair(
+    *, worker_id: str, n: int, lease_seconds: int, tasks: list[str] | None = None
+) -> list[dict[str, Any]]:
+    """
+    Weighted-fair claim across orgs (see services.queue.fairness). Each job is
+    claimed in its own short transaction holding that org's advisory lock.
+    """
+    step = fairness.aging_seconds()
+    rows: list[dict[str, Any]] = []
+    with _connect() as conn:
+        with conn.cursor(row_factory=dict_row) as cur:
+            task_sql, task_args = _task_filter(tasks)
+            task_sql_j, _ = _task_filter(tasks, "j.")
+            cur.execute(
+                _FAIR_CANDIDATES_SQL.format(task_sql=task_sql, task_sql_j=task_sql_j),
+                (*task_args, *task_args, _FAIR_MAX_ORGS),
+            )
+            candidates = [dict(r, cap=fairness.cap_for_plan(r.get("plan"))) for r in (cur.fetchall() or [])]
+            conn.commit()
+
+            while len(rows) < n:
+                row = None
+                for cand in fairness.fair_order(candidates):
+                    row = _claim_fair_one(
+                        cur, cand, worker_id=worker_id, lease_seconds=lease_seconds, step=step, tasks=tasks
+                    )
+                    conn.commit()
+                    if row is not None:
+                        cand["working"] = int(cand["working"]) + 1
+                        cand["last_claimed_at"] = row.get("claimed_at")
+                        break
+                if row is None:
+                    break
+                rows.append(row)
+    return rows
+
+
+def _claim_fair_one(
+    cur: psycopg.Cursor,
+    cand: dict[str, Any],
+    *,
+    worker_id: str,
+    lease_seconds: int,
+    step: int,
+    tasks: list[str] | None = None,
+) -> dict[str, Any] | None:
+    org = cand["org_id"]
+    cur.execute("SELECT pg_try_advisory_xact_lock(%s, hashtext(%s)) AS ok;", (FAIR_LOCK_CLASS, org))
+    if not cur.fetchone()["ok"]:
+        return None  # another worker is claiming for this org right now
+
+    cur.execute("SELECT count(*) AS n FROM jobs_v2 WHERE org_id=%s::uuid AND status='working';", (org,))
+    cand["working"] = int(cur.fetchone()["n"])
+    if cand["working"] >= int(cand["cap"]):
+        return None
+
+    task_sql = " AND task = ANY(%(tasks)s::text[])" if tasks is not None else ""
+    cur.execute(_FAIR_PICK_SQL.format(task_sql=task_sql), {"org": org, "step": step, "tasks": tasks})
+    picked = cur.fetchone()
+    if not picked:
+        cand["working"] = int(cand["cap"])  # drained; skip it for the rest of this call
+        return None
+
+    cur.execute(
+        """
+        UPDATE jobs_v2
+        SET status='working',
+            attempts=COALESCE(attempts, 0) + 1,
+            claimed_by=%s,
+            claimed_at=now(),
+            lease_expires_at=now() + (%s::int * interval '1 second'),
+            updated_at=now()
+        WHERE id=%s
+        RETURNING *, id::text AS id;
+        """,
+        (worker_id, lease_seconds, picked["id"]),
+    )
+    row = cur.fetchone()
+    cur.execute(
+        """
+        INSERT INTO jobs_v2_org_sched (org_id, last_claimed_at)
+        VALUES (%s::uuid, clock_timestamp())
+        ON CONFLICT (org_id) DO UPDATE SET last_claimed_at = EXCLUDED.last_claimed_at;
+        """,
+        (org,),
+    )
+    return dict(row) if row else None
+
+
+def queue_depth_by_task() -> dict[str, dict[str, int]]:
+    """Queued/working counts per task (index-only over the partial queued/working indexes)."""
+    with _connect() as conn:
+        with conn.cursor(row_factory=dict_row) as cur:
+            cur.execute(
+                """
+                SELECT task, status, count(*) AS n
+                FROM jobs_v2
+                WHERE status IN ('queued', 'working')
+                GROUP BY task, status;
+                """
+            )
+            rows = cur.fetchall() or []
+    out: dict[str, dict[str, int]] = {}
+    for r in rows:
+        out.setdefault(str(r["task"]), {"queued": 0, "working": 0})[str(r["status"])] = int(r["n"])
+    return out
+
+
+def renew_leases(*, job_ids: list[str], worker_id: str, lease_seconds: int = 300) -> list[str]:
+    """
+    Push lease_expires_at out for jobs this worker still owns.
+    Returns the ids that were renewed; anything missing was lost (e.g. reclaimed).
+    """
+    ids = [str(j) for j in (job_ids or []) if j]
+    if not ids:
+        return []
+    lease_s = max(5, int(lease_seconds or 300))
+    with _connect() as conn:
+        with conn.cursor(row_factory=dict_row) as cur:
+            cur.execute(
+                """
+                UPDATE jobs_v2
+                SET lease_expires_at=now() + (%s::int * interval '1 second'),
+                    updated_at=now()
+                WHERE id = ANY(%s::uuid[])
+                  AND status='working'
+                  AND claimed_by=%s
+                RETURNING id::text AS id;
+                """,
+                (lease_s, ids, str(worker_id)),
+            )
+            return [str(r["id"]) for r in (cur.fetchall() or [])]
+
+
+def release_jobs(*, job_ids: list[str], worker_id: str) -> int:
+    """
+    Hand claimed-but-unstarted jobs back to the queue without charging an attempt.
+    """
+    ids = [str(j) for j in (job_ids or []) if j]
+    if not ids:
+        return 0
+    with _connect() as conn:
+        with conn.cursor(row_factory=dict_row) as cur:
+            cur.execute(
+                """
+                UPDATE jobs_v2
+                SET status='queued',
+                    attempts=GREATEST(COALESCE(attempts, 0) - 1, 0),
+                    run_at=GREATEST(run_at, now()),
+                    claimed_by=NULL,
+                    claimed_at=NULL,
+                    lease_expires_at=NULL,
+                    updated_at=now()
+                WHERE id = ANY(%s::uuid[])
+                  AND status='working'
+                  AND claimed_by=%s
+                RETURNING task;
+                """,
+                (ids, str(worker_id)),
+            )
+            released = cur.fetchall() or []
+            notify_tasks(cur, [r["task"] for r in released])
+            return len(released)
+
+
+def heartbeat(*, job_id: str, worker_id: str | None = None, lease_seconds: int = 300) -> str:
+    """
+    Extend the lease of a running job. Returns "ok", "cancel" (still ours, but a
+    cancel was requested) or "lost" (finished, failed, or reclaimed by another
+    worker after the lease lapsed).
+    """
+    if not job_id:
+        return "lost"
+    lease_s = max(5, int(lease_seconds or 300))
+    with _connect() as conn:
+        with conn.cursor(row_factory=dict_row) as cur:
+            cur.execute(
+                """
+                UPDATE jobs_v2
+                SET lease_expires_at=now() + (%s::int * interval '1 second'),
+                    updated_at=now()
+                WHERE id=%s::uuid
+                  AND status='working'
+                  AND (%s::text IS NULL OR claimed_by=%s::text)
+                RETURNING cancel_requested;
+                """,
+                (lease_s, str(job_id), worker_id, worker_id),
             )
             row = cur.fetchone()
+    if row is None:
+        return "lost"
+    return "cancel" if row["cancel_requested"] else "ok"
+
+
+# The target, everything downstream of it (any edge) and, when the target
+# carries a run id, the rest of its org's run; live members only, locked in id
+# order. Queued/blocked ones are cancelled outright, running ones are flagged
+# for their worker.
+_CANCEL_SQL = """
+WITH RECURSIVE tree(id) AS (
+  SELECT %(id)s::uuid
+  UNION
+  SELECT d.job_id FROM job_deps d JOIN tree t ON d.depends_on = t.id
+), members AS (
+  SELECT id FROM tree
+  UNION
+  SELECT id FROM jobs_v2
+  WHERE %(run_id)s::text IS NOT NULL
+    AND org_id = %(org_id)s::uuid
+    AND (payload->'_velu'->>'run_id') = %(run_id)s::text
+    AND status IN ('queued', 'blocked', 'working')
+), locked AS (
+  SELECT j.id, j.status
+  FROM jobs_v2 j JOIN members m ON m.id = j.id
+  WHERE j.status IN ('queued', 'blocked', 'working')
+  ORDER BY j.id
+  FOR UPDATE OF j
+)
+UPDATE jobs_v2 j
+SET status = CASE WHEN l.status = 'working' THEN 'working' ELSE 'cancelled' END,
+    cancel_requested = true,
+    error = CASE WHEN l.status = 'working' THEN j.error
+                 ELSE jsonb_build_object('error', 'cancelled', 'cancelled_by', %(id)s::text) END,
+    finished_at = CASE WHEN l.status = 'working' THEN j.finished_at ELSE now() END,
+    updated_at = now()
+FROM locked l
+WHERE j.id = l.id
+RETURNING j.id::text AS id, j.status;
+"""
+
+
+def cancel_job(job_id: str, *, org_id: str | None = None) -> dict[str, Any] | None:
+    """
+    Cancel a job and what remains of its run: queued/blocked members become
+    'cancelled' now, running ones get cancel_requested and are stopped by their
+    worker at the next heartbeat. Returns the target's status and the affected
+    ids, or None if the job does not exist (in ``org_id``).
+    """
+    ids = _uuids([job_id])
+    if not ids:
+        return None
+    with _connect() as conn:
+        with conn.cursor(row_factory=dict_row) as cur:
+            cur.execute(
+                """
+                SELECT id::text AS id, org_id::text AS org_id, status,
+                       payload->'_velu'->>'run_id' AS run_id
+                FROM jobs_v2
+                WHERE id=%s::uuid AND (%s::uuid IS NULL OR org_id=%s::uuid);
+                """,
+                (ids[0], org_id, org_id),
+            )
+            job = cur.fetchone()
+            if job is None:
+                return None
+            cur.execute(_CANCEL_SQL, {"id": job["id"], "org_id": job["org_id"], "run_id": job["run_id"]})
+            rows = cur.fetchall() or []
+            cancelled = [r["id"] for r in rows if r["status"] == "cancelled"]
+            notify_tasks(cur, _settle_failed(cur, cancelled))
             conn.commit()
-            return dict(row) if row else None
+    status = next((r["status"] for r in rows if r["id"] == job["id"]), job["status"])
+    return {
+        "id": job["id"],
+        "status": status,
+        "cancelled": cancelled,
+        "cancel_requested": [r["id"] for r in rows if r["status"] == "working"],
+    }
+
+
+def mark_cancelled(job_id: str) -> bool:
+    """Record a running job whose cancel the worker acted on as 'cancelled'."""
+    if not job_id:
+        return False
+    with _connect() as conn:
+        with conn.cursor(row_factory=dict_row) as cur:
+            cur.execute(
+                """
+                UPDATE jobs_v2
+                SET status='cancelled',
+                    error=jsonb_build_object('error', 'cancelled'),
+                    finished_at=now(),
+                    lease_expires_at=NULL,
+                    updated_at=now()
+                WHERE id=%s::uuid AND status='working' AND cancel_requested
+                RETURNING id::text AS id;
+                """,
+                (str(job_id),),
+            )
+            done = [r["id"] for r in cur.fetchall() or []]
+            notify_tasks(cur, _settle_failed(cur, done))
+            conn.commit()
+    return bool(done)
+
+
+def _requeue_expired(cur: psycopg.Cursor, limit: int) -> int:
+    # A lease that lapsed max_attempts times is a crash loop: dead-letter it
+    # instead of handing it to yet another worker. A job whose cancel was
+    # requested is cancelled rather than rerun.
+    policies = retry.task_policies()
+    cur.execute(
+        """
+        WITH expired AS (
+          SELECT id, task
+          FROM jobs_v2
+          WHERE status = 'working'
+            AND lease_expires_at < now()
+          ORDER BY lease_expires_at ASC
+          FOR UPDATE SKIP LOCKED
+          LIMIT %s
+        ), expired_limits AS (
+          SELECT e.id, COALESCE(p.max_attempts, %s) AS max_attempts
+          FROM expired e
+          LEFT JOIN unnest(%s::text[], %s::int[]) AS p(task, max_attempts) ON p.task = e.task
+        )
+        UPDATE jobs_v2 j
+        SET status = CASE WHEN j.cancel_requested THEN 'cancelled'
+                          WHEN j.attempts >= x.max_attempts THEN 'dead' ELSE 'queued' END,
+            error = CASE WHEN j.cancel_requested THEN jsonb_build_object('error', 'cancelled')
+                         WHEN j.attempts >= x.max_attempts
+                         THEN jsonb_build_object('error', 'lease expired', 'attempts', j.attempts)
+                         ELSE j.error END,
+            finished_at = CASE WHEN j.cancel_requested OR j.attempts >= x.max_attempts THEN now() END,
+            run_at = now(),
+            claimed_by=NULL,
+            claimed_at=NULL,
+            lease_expires_at=NULL,
+            updated_at=now()
+        FROM expired_limits x
+        WHERE j.id = x.id
+        RETURNING j.id::text AS id, j.task, j.status;
+        """,
+        (
+            max(1, int(limit)),
+            retry.default_policy().max_attempts,
+            list(policies),
+            [p.max_attempts for p in policies.values()],
+        ),
+    )
+    requeued = cur.fetchall() or []
+    notify_tasks(cur, [r["task"] for r in requeued if r["status"] == "queued"])
+    notify_tasks(cur, _settle_failed(cur, [r["id"] for r in requeued if r["status"] != "queued"]))
+    return len(requeued)
+
+
+def requeue_expired(limit: int = 25) -> int:
+    """
+    Move 'working' jobs whose lease has lapsed back to 'queued' (or 'dead' once
+    their attempts are used up, 'cancelled' if a cancel was requested) and wake
+    listeners. The attempt was already
+    charged when the job was claimed.
+    """
+    with _connect() as conn:
+        with conn.cursor(row_factory=dict_row) as cur:
+            return _requeue_expired(cur, int(limit or 25))
+
+
+# pg advisory lock keys (any constant bigints; "velu" + n).
+SWEEPER_LOCK_KEY = 0x76656C7501
+MAINTENANCE_LOCK_KEY = 0x76656C7502
+
+
+@contextmanager
+def _leader(conn: psycopg.Connection, key: int) -> Iterator[bool]:
+    """
+    Try (never wait) for a session-level advisory lock on a pooled connection and
+    release it on exit, so the connection goes back to the pool unlocked.
+    """
+    got = bool(conn.execute("SELECT pg_try_advisory_lock(%s);", (key,)).fetchone()[0])
+    conn.commit()
+    try:
+        yield got
+    finally:
+        if got:
+            conn.rollback()
+            conn.execute("SELECT pg_advisory_unlock(%s);", (key,))
+            conn.commit()
+
+
+def sweep_expired_leases(*, batch_size: int = 500, max_batches: int = 20) -> int | None:
+    """
+    Requeue expired leases in batches, one transaction per batch.
+
+    Only one node sweeps at a time: the session-level advisory lock is tried,
+    never waited on. Returns the number of jobs requeued, or None when another
+    node holds the lock.
+    """
+    with _connect() as conn:
+        with _leader(conn, SWEEPER_LOCK_KEY) as leader:
+            if not leader:
+                return None
+            total = 0
+            with conn.cursor(row_factory=dict_row) as cur:
+                for _ in range(max(1, int(max_batches))):
+                    n = _requeue_expired(cur, batch_size)
+                    conn.commit()
+                    total += n
+                    if n < batch_size:
+                        break
+            return total
+
+
+def task_run_p95(task: str, *, sample: int = 500) -> tuple[float | None, int]:
+    """
+    p95 wall time (seconds, claim -> finish) over the task's most recent successful
+    runs, and the number of runs it was computed from.
+    """
+    with _connect() as conn:
+        with conn.cursor(row_factory=dict_row) as cur:
+            cur.execute(
+                """
+                SELECT
+                  percentile_cont(0.95) WITHIN GROUP (ORDER BY secs) AS p95,
+                  count(*) AS n
+                FROM (
+                  SELECT extract(epoch FROM finished_at - claimed_at) AS secs
+                  FROM jobs_v2
+                  WHERE task=%s
+                    AND status='done'
+                    AND claimed_at IS NOT NULL
+                  ORDER BY finished_at DESC
+                  LIMIT %s
+                ) recent;
+                """,
+                (str(task), max(1, int(sample))),
+            )
+            row = cur.fetchone() or {}
+    p95 = row.get("p95")
+    return (float(p95) if p95 is not None else None), int(row.get("n") or 0)
 
 
 def finish_job(job_id: str, result: dict[str, Any]) -> None:
     if not job_id:
         return
-    with closing(_connect()) as conn:
-        with conn.cursor() as cur:
+    with _connect() as conn:
+        with conn.cursor(row_factory=dict_row) as cur:
             cur.execute(
                 """
                 UPDATE jobs_v2
@@ -198,8 +1077,9 @@ def finish_job(job_id: str, result: dict[str, Any]) -> None:
                     updated_at=now()
                 WHERE id=%s::uuid;
                 """,
-                (Jsonb(result or {}), str(job_id)),
+                (Jsonb(blobs.offload(result or {})), str(job_id)),
             )
+            notify_tasks(cur, _promote_children(cur, [str(job_id)]))
             conn.commit()
 
 
@@ -207,8 +1087,8 @@ def fail_job(job_id: str, error: Any) -> None:
     if not job_id:
         return
     payload = error if isinstance(error, (dict, list)) else {"message": str(error)}
-    with closing(_connect()) as conn:
-        with conn.cursor() as cur:
+    with _connect() as conn:
+        with conn.cursor(row_factory=dict_row) as cur:
             cur.execute(
                 """
                 UPDATE jobs_v2
@@ -221,9 +1101,329 @@ def fail_job(job_id: str, error: Any) -> None:
                 """,
                 (Jsonb(payload), str(job_id)),
             )
+            notify_tasks(cur, _settle_failed(cur, [str(job_id)]))
             conn.commit()
 
 
 
+def retry_job(job_id: str, error: Any, *, policy: retry.RetryPolicy) -> str | None:
+    """
+    Record a failed attempt: requeue with backoff (``run_at``) while the policy has
+    attempts left, else dead-letter. Returns the new status (None if the job is
+    no longer working).
+    """
+    if not job_id:
+        return None
+    payload = error if isinstance(error, (dict, list)) else {"message": str(error)}
+    with _connect() as conn:
+        with conn.cursor(row_factory=dict_row) as cur:
+            cur.execute(
+                "SELECT attempts FROM jobs_v2 WHERE id=%s::uuid AND status='working' FOR UPDATE;",
+                (str(job_id),),
+            )
+            row = cur.fetchone()
+            if not row:
+                conn.commit()
+                return None
+            status, delay = policy.decide(int(row["attempts"] or 0))
+            if status == "queued":
+                cur.execute(
+                    """
+                    UPDATE jobs_v2
+                    SET status='queued',
+                        error=%s::jsonb,
+                        run_at=now() + (%s::float8 * interval '1 second'),
+                        claimed_by=NULL,
+                        claimed_at=NULL,
+                        lease_expires_at=NULL,
+                        updated_at=now()
+                    WHERE id=%s::uuid;
+                    """,
+                    (Jsonb(payload), float(delay or 0.0), str(job_id)),
+                )
+            else:
+                cur.execute(
+                    """
+                    UPDATE jobs_v2
+                    SET status=%s,
+                        error=%s::jsonb,
+                        finished_at=now(),
+                        lease_expires_at=NULL,
+                        updated_at=now()
+                    WHERE id=%s::uuid;
+                    """,
+                    (status, Jsonb(payload), str(job_id)),
+                )
+                notify_tasks(cur, _settle_failed(cur, [str(job_id)]))
+            conn.commit()
+            return status
+
+
+def defer_job(job_id: str, *, payload: dict[str, Any], wait_on: list[str], wait_for: str = "finished") -> str | None:
+    """
+    Park a working job on ``wait_on`` with a new payload (see services.queue.defer).
+    Its attempt count restarts, since a deferral is progress rather than a failure.
+    Returns the new status, or None if the job is no longer working.
+    """
+    if not job_id:
+        return None
+    deps = _uuids([str(w) for w in wait_on])
+    with _connect() as conn:
+        with conn.cursor(row_factory=dict_row) as cur:
+            parents = _parent_states(cur, deps)
+            status = "queued" if all(parent_settled(st, wait_for) for st in parents.values()) else "blocked"
+            cur.execute(
+                """
+                UPDATE jobs_v2
+                SET status=%s,
+                    payload=%s::jsonb,
+                    attempts=0,
+                    run_at=now(),
+                    claimed_by=NULL,
+                    claimed_at=NULL,
+                    lease_expires_at=NULL,
+                    updated_at=now()
+                WHERE id=%s::uuid AND status='working'
+                RETURNING task;
+                """,
+                (status, Jsonb(blobs.offload(payload or {})), str(job_id)),
+            )
+            row = cur.fetchone()
+            if not row:
+                conn.commit()
+                return None
+            cur.execute("DELETE FROM job_deps WHERE job_id=%s::uuid;", (str(job_id),))
+            _link(cur, [(str(job_id), p, wait_for) for p in parents])
+            woken = _settle_failed(cur, [p for p, st in parents.items() if st in FAILED_STATUSES])
+            notify_tasks(cur, ([row["task"]] if status == "queued" else []) + woken)
+            cur.execute("SELECT status FROM jobs_v2 WHERE id=%s::uuid;", (str(job_id),))
+            status = cur.fetchone()["status"]
+            conn.commit()
+            return status
+
+
+TERMINAL_STATUSES = ("done", "error", "dead", "cancelled")
+_TERMINAL_SQL = "status IN ({})".format(", ".join(f"'{s}'" for s in TERMINAL_STATUSES))
+
+_ARCHIVE_COLUMNS = (
+    "id, org_id, project_id, task, status, payload, result, error, priority, attempts, "
+    "created_at, updated_at, actor_type, actor_id, claimed_by, claimed_at, lease_expires_at, finished_at, run_at"
+)
+_PARTITION_RE = re.compile(r"^jobs_v2_archive_p(\d{4})(\d{2})$")
+
+
+def archive_finished_jobs(*, older_than_seconds: int, batch_size: int = 1000, max_batches: int = 50) -> int:
+    """
+    Move terminal jobs finished more than ``older_than_seconds`` ago from jobs_v2 to
+    jobs_v2_archive, one DELETE ... RETURNING -> INSERT transaction per batch.
+    Returns the number of rows moved.
+    """
+    batch_size = max(1, int(batch_size))
+    moved = 0
+    with _connect() as conn:
+        with conn.cursor(row_factory=dict_row) as cur:
+            cur.execute(
+                f"""
+                SELECT min(finished_at) AS oldest, now() - (%s::int * interval '1 second') AS cutoff
+                FROM jobs_v2
+                WHERE {_TERMINAL_SQL};
+                """,
+                (int(older_than_seconds),),
+            )
+            bounds = cur.fetchone() or {}
+            oldest, cutoff = bounds.get("oldest"), bounds.get("cutoff")
+            if oldest is None or oldest >= cutoff:
+                return 0
+            cur.execute("SELECT jobs_v2_archive_ensure_partitions(%s, %s);", (oldest, cutoff))
+            conn.commit()
+
+            for _ in range(max(1, int(max_batches))):
+                cur.execute(
+                    f"""
+                    WITH moved AS (
+                      DELETE FROM jobs_v2
+                      WHERE id IN (
+                        SELECT id
+                        FROM jobs_v2
+                        WHERE {_TERMINAL_SQL}
+                          AND finished_at < %s
+                        ORDER BY finished_at ASC
+                        FOR UPDATE SKIP LOCKED
+                        LIMIT %s
+                      )
+                      RETURNING {_ARCHIVE_COLUMNS}
+                    )
+                    INSERT INTO jobs_v2_archive ({_ARCHIVE_COLUMNS})
+                    SELECT {_ARCHIVE_COLUMNS} FROM moved;
+                    """,
+                    (cutoff, batch_size),
+                )
+                n = int(cur.rowcount or 0)
+                conn.commit()
+                moved += n
+                if n < batch_size:
+                    break
+    return moved
+
+
+def drop_archive_partitions(*, retention_seconds: int) -> list[str]:
+    """
+    Retention: drop whole monthly archive partitions whose range ends before
+    now() - retention. Returns the dropped partition names.
+    """
+    cutoff = datetime.now(timezone.utc).timestamp() - int(retention_seconds)
+    dropped: list[str] = []
+    with _connect() as conn:
+        with conn.cursor(row_factory=dict_row) as cur:
+            cur.execute(
+                """
+                SELECT c.relname AS name
+                FROM pg_inherits i
+                JOIN pg_class c ON c.oid = i.inhrelid
+                WHERE i.inhparent = 'jobs_v2_archive'::regclass;
+                """
+            )
+            for row in cur.fetchall() or []:
+                m = _PARTITION_RE.match(str(row["name"]))
+                if not m:
+                    continue
+                year, month = int(m.group(1)), int(m.group(2))
+                upper = datetime(year + month // 12, month % 12 + 1, 1, tzinfo=timezone.utc)
+                if upper.timestamp() <= cutoff:
+                    cur.execute(f'DROP TABLE IF EXISTS "{row["name"]}";')
+                    dropped.append(str(row["name"]))
+            conn.commit()
+    return dropped
+
+
+_MEMO_HIT_SQL = """
+UPDATE job_result_cache
+SET hits = hits + 1, last_used_at = now()
+WHERE key = %s AND created_at > now() - (%s::int * interval '1 second')
+RETURNING result;
+"""
+
+
+_MEMO_PEEK_SQL = """
+SELECT result FROM job_result_cache
+WHERE key = %s AND created_at > now() - (%s::int * interval '1 second');
+"""
+
+
+def _memo_hit(cur: psycopg.Cursor, key: str, *, at_enqueue: bool = False) -> dict[str, Any] | None:
+    """Stored result for ``key`` (still within its TTL), counting the hit; None on a miss."""
+    if at_enqueue:
+        cur.execute(_MEMO_PEEK_SQL, (key, memo.ttl_seconds()))
+        row = cur.fetchone()
+        if row is None or memo.writes_files(row["result"]):
+            return None
+    cur.execute(_MEMO_HIT_SQL, (key, memo.ttl_seconds()))
+    row = cur.fetchone()
+    return row["result"] if row is not None else None
+
+
+def memo_get(key: str) -> dict[str, Any] | None:
+    with _connect() as conn:
+        with conn.cursor(row_factory=dict_row) as cur:
+            hit = _memo_hit(cur, key)
+            conn.commit()
+    return blobs.resolve(hit) if hit is not None else None
+
+
+def memo_put(key: str, task: str, result: dict[str, Any]) -> None:
+    with _connect() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                INSERT INTO job_result_cache (key, task, result, size_bytes)
+                VALUES (%s, %s, %s::jsonb, %s)
+                ON CONFLICT (key) DO UPDATE
+                SET result = EXCLUDED.result,
+                    size_bytes = EXCLUDED.size_bytes,
+                    created_at = now(),
+                    last_used_at = now();
+                """,
+                (key, task, Jsonb(blobs.offload(result)), memo.size_of(result)),
+            )
+            conn.commit()
+
+
+def evict_memo(*, ttl_seconds: int, max_bytes: int) -> int:
+    """Drop expired cache entries, then the least recently used beyond ``max_bytes``."""
+    with _connect() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                "DELETE FROM job_result_cache WHERE created_at <= now() - (%s::int * interval '1 second');",
+                (int(ttl_seconds),),
+            )
+            n = int(cur.rowcount or 0)
+            cur.execute(
+                """
+                DELETE FROM job_result_cache
+                WHERE key IN (
+                  SELECT key FROM (
+                    SELECT key, sum(size_bytes) OVER (ORDER BY last_used_at DESC, key) AS running
+                    FROM job_result_cache
+                  ) s
+                  WHERE running > %s
+                );
+                """,
+                (int(max_bytes),),
+            )
+            n += int(cur.rowcount or 0)
+            conn.commit()
+    return n
+
+
+def clear_expired_idempotency_keys(*, batch_size: int = 1000, max_batches: int = 50) -> int:
+    """Release Idempotency-Keys past their TTL so clients may reuse them."""
+    cleared = 0
+    with _connect() as conn:
+        with conn.cursor() as cur:
+            for _ in range(max(1, int(max_batches))):
+                cur.execute(
+                    """
+                    UPDATE jobs_v2
+                    SET idempotency_key = NULL, idempotency_expires_at = NULL
+                    WHERE id IN (
+                      SELECT id
+                      FROM jobs_v2
+                      WHERE idempotency_key IS NOT NULL
+                        AND idempotency_expires_at <= now()
+                      ORDER BY idempotency_expires_at
+                      FOR UPDATE SKIP LOCKED
+                      LIMIT %s
+                    );
+                    """,
+                    (max(1, int(batch_size)),),
+                )
+                n = int(cur.rowcount or 0)
+                conn.commit()
+                cleared += n
+                if n < batch_size:
+                    break
+    return cleared
+
+
+def run_maintenance(
+    *, archive_after_seconds: int, retention_seconds: int | None, batch_size: int = 1000
+) -> dict[str, Any] | None:
+    """One leader-only maintenance pass; None when another node holds the lock."""
+    with _connect() as conn:
+        with _leader(conn, MAINTENANCE_LOCK_KEY) as leader:
+            if not leader:
+                return None
+            archived = archive_finished_jobs(older_than_seconds=archive_after_seconds, batch_size=batch_size)
+            dropped = drop_archive_partitions(retention_seconds=retention_seconds) if retention_seconds else []
+            keys = clear_expired_idempotency_keys(batch_size=batch_size)
+            evicted = evict_memo(ttl_seconds=memo.ttl_seconds(), max_bytes=memo.max_bytes())
+            return {
+                "archived": archived,
+                "dropped_partitions": dropped,
+                "idempotency_keys_cleared": keys,
+                "memo_evicted": evicted,
+            }
+
+
 load = get_job
 get = get_job
@@ -0,0 +1,147 @@
+# services/queue/jobs_postgres_async.py
+"""
+Async counterparts of the jobs_postgres calls on the API's request path (job
+reads, the project/org check and single enqueues), on the per-event-loop
+AsyncConnectionPool from services.db.pool. SQL is shared with jobs_postgres.
+
+Enqueues with dependency edges are not handled here; services.queue.queue_async
+sends those through the sync path on a worker thread.
+"""
+from __future__ import annotations
+
+from typing import Any
+
+import psycopg
+from psycopg import errors as pg_errors
+from psycopg.rows import dict_row
+
+from services.db import pool as db_pool
+from services.queue import memo
+from services.queue.jobs_postgres import (
+    _ENQUEUE_SQL,
+    _FREE_IDEMPOTENCY_KEY_SQL,
+    _MEMO_HIT_SQL,
+    _MEMO_PEEK_SQL,
+    _PROJECT_IN_ORG_SQL,
+    _db_url,
+    _enqueue_params,
+    _get_sql,
+    _list_query,
+)
+from services.queue.notify import anotify_tasks
+
+
+async def _fetch_job(cur: psycopg.AsyncCursor, job_id: str, org_id: str | None, view: str) -> dict[str, Any] | None:
+    if org_id is None:
+        await cur.execute(_get_sql(view), (job_id,))
+    else:
+        await cur.execute(_get_sql(view, for_org=True), (job_id, org_id))
+    row = await cur.fetchone()
+    if row:
+        return dict(row)
+    try:
+        await cur.execute(_get_sql(view, archive=True), (job_id, org_id, org_id))
+    except pg_errors.UndefinedTable:
+        return None
+    row = await cur.fetchone()
+    return dict(row) if row else None
+
+
+async def get_job(job_id: str, *, view: str = "full") -> dict[str, Any] | None:
+    if not job_id:
+        return None
+    async with db_pool.async_connection(_db_url()) as conn:
+        async with conn.cursor(row_factory=dict_row) as cur:
+            return await _fetch_job(cur, str(job_id), None, view)
+
+
+async def get_job_for_org(job_id: str, org_id: str, *, view: str = "full") -> dict[str, Any] | None:
+    if not job_id or not org_id:
+        return None
+    async with db_pool.async_connection(_db_url()) as conn:
+        async with conn.cursor(row_factory=dict_row) as cur:
+            return await _fetch_job(cur, str(job_id), str(org_id), view)
+
+
+async def project_belongs_to_org(project_id: str, org_id: str) -> bool:
+    if not project_id or not org_id:
+        return False
+    async with db_pool.async_connection(_db_url()) as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(_PROJECT_IN_ORG_SQL, (str(project_id), str(org_id)))
+            return (await cur.fetchone()) is not None
+
+
+async def list_recent_for_org(
+    *,
+    org_id: str,
+    limit: int = 50,
+    view: str = "full",
+    after: tuple[Any, str] | None = None,
+    status: str | None = None,
+    task: str | None = None,
+    project_id: str | None = None,
+) -> list[dict[str, Any]]:
+    query, args = _list_query(
+        org_id=org_id, limit=limit, view=view, after=after, status=status, task=task, project_id=project_id
+    )
+    async with db_pool.async_connection(_db_url()) as conn:
+        async with conn.cursor(row_factory=dict_row) as cur:
+            await cur.execute(query, args)
+            return [dict(r) for r in await cur.fetchall()]
+
+
+async def enqueue_job(
+    task_obj: dict[str, Any],
+    *,
+    org_id: str,
+    project_id: str | None = None,
+    actor_type: str = "api_key",
+    actor_id: str | None = None,
+    priority: int = 0,
+    idempotency_key: str | None = None,
+    memo_key: str | None = None,
+) -> str:
+    """
+    jobs_postgres.enqueue_job for a job without dependencies. The payload must
+    already be offloaded (services.queue.blobs), which may touch the blob store.
+    """
+    async with db_pool.async_connection(_db_url()) as conn:
+        async with conn.cursor(row_factory=dict_row) as cur:
+            cached = None
+            if memo_key:
+                await cur.execute(_MEMO_PEEK_SQL, (memo_key, memo.ttl_seconds()))
+                hit = await cur.fetchone()
+                if hit is not None and not memo.writes_files(hit["result"]):
+                    await cur.execute(_MEMO_HIT_SQL, (memo_key, memo.ttl_seconds()))
+                    hit = await cur.fetchone()
+                    cached = hit["result"] if hit is not None else None
+            params = _enqueue_params(
+                task_obj,
+                task_obj.get("payload") or {},
+                org_id=org_id,
+                project_id=project_id,
+                actor_type=actor_type,
+                actor_id=actor_id,
+                priority=priority,
+                status="done" if cached is not None else "queued",
+                idempotency_key=idempotency_key,
+                cached=cached,
+            )
+            row = None
+            for _ in range(3):
+                await cur.execute(_ENQUEUE_SQL, params)
+                row = await cur.fetchone()
+                if row is not None and not row["expired"]:
+                    break
+                if row is not None:
+                    await cur.execute(_FREE_IDEMPOTENCY_KEY_SQL, (row["id"],))
+            if row is None or row["expired"]:
+                raise RuntimeError(f"enqueue: could not resolve idempotency key {idempotency_key!r}")
+            if not row["duplicate"] and params["status"] == "queued":
+                await anotify_tasks(cur, [params["task"]])
+            await conn.commit()
+            return str(row["id"])
+
+
+__all__ = ["enqueue_job", "get_job", "get_job_for_org", "list_recent_for_org", "project_belongs_to_org"]
@@ -11,6 +11,9 @@ from contextlib import closing
 from pathlib import Path
 from typing import Any, Dict, Iterable, Optional
 
+from services.queue import blobs, idempotency, memo, retry
+from services.queue.base import FAILED_STATUSES, dependency_ids, parent_settled, payload_with_deps, wait_for
+
 
 SCHEMA = """
 CREATE TABLE IF NOT EXISTS jobs (
@@ -27,7 +30,34 @@ CREATE TABLE IF NOT EXISTS jobs (
     priority    INTEGER NOT NULL DEFAULT 0,
     created_at  REAL,
     updated_at  REAL,
-    key         TEXT
+    key         TEXT,
+    run_id      TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+# Dependency edges: job_id stays 'blocked' until every depends_on parent is done
+# (or, for wait_for='finished', has settled either way).
+DEPS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS job_deps (
+    job_id     INTEGER NOT NULL,
+    depends_on INTEGER NOT NULL,
+    wait_for   TEXT NOT NULL DEFAULT 'done',
+    PRIMARY KEY (job_id, depends_on)
+);
+"""
+
+
+# Memoized results of deterministic tasks (services.queue.memo).
+MEMO_SCHEMA = """
+CREATE TABLE IF NOT EXISTS job_result_cache (
+    key          TEXT PRIMARY KEY,
+    task         TEXT NOT NULL,
+    result       TEXT NOT NULL,
+    size_bytes   INTEGER NOT NULL DEFAULT 0,
+    hits         INTEGER NOT NULL DEFAULT 0,
+    created_at   REAL NOT NULL,
+    last_used_at REAL NOT NULL
 );
 """
 
@@ -165,6 +195,8 @@ def _sqlite_ensure_columns(conn: sqlite3.Connection) -> None:
         ("created_at", "REAL"),
         ("updated_at", "REAL"),
         ("key", "TEXT"),
+        ("run_id", "TEXT"),
+        ("cancel_requested", "INTEGER NOT NULL DEFAULT 0"),
     ]
     for name, decl in add:
         if name not in cols:
@@ -181,12 +213,22 @@ def _sqlite_ensure_columns(conn: sqlite3.Connection) -> None:
     if "priority" in cols2:
         conn.execute("UPDATE jobs SET priority = 0 WHERE priority IS NULL")
 
+    dep_cols = {row[1] for row in conn.execute("PRAGMA table_info(job_deps)").fetchall()}
+    if "wait_for" not in dep_cols:
+        conn.execute("ALTER TABLE job_deps ADD COLUMN wait_for TEXT NOT NULL DEFAULT 'done'")
+
 
 def _sqlite_ensure_indexes(conn: sqlite3.Connection) -> None:
     cols = _sqlite_columns(conn)
     conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status)")
-    conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_key ON jobs(key)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_key_created ON jobs(key, created_at)")
+    conn.execute("DROP INDEX IF EXISTS idx_jobs_key")  # superseded by idx_jobs_key_created
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_run_id ON jobs(run_id)")
     conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_next_run ON jobs(next_run_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_next_run ON jobs(status, next_run_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_job_deps_parent ON job_deps(depends_on)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_job_result_cache_created ON job_result_cache(created_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_job_result_cache_last_used ON job_result_cache(last_used_at)")
     if "priority" in cols:
         conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_priority ON jobs(priority)")
 
@@ -194,11 +236,25 @@ def _sqlite_ensure_indexes(conn: sqlite3.Connection) -> None:
 def ensure_schema() -> None:
     with closing(_sqlite_connect()) as conn:
         conn.execute(SCHEMA)
+        conn.execute(DEPS_SCHEMA)
+        conn.execute(MEMO_SCHEMA)
         _sqlite_ensure_columns(conn)
         _sqlite_ensure_indexes(conn)
         conn.commit()
 
 
+def _run_id(payload: Any) -> str | None:
+    """The pipeline run a job belongs to (``_velu.run_id``), kept as a column since _velu is not stored."""
+    velu = payload.get("_velu") if isinstance(payload, dict) else None
+    rid = velu.get("run_id") if isinstance(velu, dict) else None
+    return str(rid) if rid else None
+
+
+def _run_at(job: dict[str, Any], now: float) -> float:
+    at = retry.parse_run_at(job)
+    return at.timestamp() if at is not None else now
+
+
 def enqueue_job(
     task: dict[str, Any],
     key: str | None = None,
@@ -210,25 +266,190 @@ def enqueue_job(
     actor_id: str | None = None,
     *,
     require_tenant: bool = False,
+    memo_key: str | None = None,
 ) -> int:
     ensure_schema()
     now = _now()
+    key = idempotency.scoped_key(org_id, key)
     task_name = (task or {}).get("task") or "unknown"
     payload = (task or {}).get("payload") or {}
+    run_id = _run_id(payload)
     if isinstance(payload, dict):
         payload = dict(payload)
         payload.pop("_velu", None)
-    payload_json = json.dumps(sanitize_payload(payload), ensure_ascii=False)
+    payload_json = json.dumps(sanitize_payload(blobs.offload(payload)), ensure_ascii=False)
 
     with closing(_sqlite_connect()) as conn:
+        conn.isolation_level = None
+        conn.execute("BEGIN IMMEDIATE")
+        if key:
+            # Idempotent resubmission: hand back the live job holding this key.
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE key = ? AND created_at >= ? ORDER BY id DESC LIMIT 1",
+                (key, now - idempotency.ttl_seconds()),
+            ).fetchone()
+            if row:
+                conn.execute("COMMIT")
+                return int(row[0])
+        mode = wait_for(task or {})
+        status, parents, failed = _gate(conn, dependency_ids(payload), mode)
+        cached = _memo_hit(conn, memo_key, now, at_enqueue=True) if memo_key and status == "queued" else None
+        if cached is not None:
+            status = "done"
         cur = conn.execute(
-            "INSERT INTO jobs (ts, next_run_at, status, task, payload, result, err, last_error, attempts, priority, created_at, updated_at, key) "
-            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-            (now, None, "queued", str(task_name), payload_json, None, None, None, 0, int(priority), now, now, key),
+            "INSERT INTO jobs (ts, next_run_at, status, task, payload, result, err, last_error, attempts, priority, created_at, updated_at, key, run_id) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                now,
+                _run_at(task or {}, now),
+                status,
+                str(task_name),
+                payload_json,
+                cached,
+                None,
+                None,
+                0,
+                int(priority),
+                now,
+                now,
+                key,
+                run_id,
+            ),
         )
-        conn.commit()
-        return int(cur.lastrowid)
+        job_id = int(cur.lastrowid)
+        _link(conn, job_id, parents, mode)
+        _settle_failed(conn, failed)
+        conn.execute("COMMIT")
+        return job_id
+
+
+def enqueue_many(jobs: list[dict[str, Any]]) -> list[int]:
+    """
+    Insert a batch of jobs in a single transaction; returns ids in input order.
+    ``depends_on_idx`` entries are resolved to the ids of earlier jobs in the batch.
+    """
+    if not jobs:
+        return []
+    ensure_schema()
+    now = _now()
+    ids: list[int] = []
+    failed: list[int] = []
+    with closing(_sqlite_connect()) as conn:
+        conn.isolation_level = None
+        conn.execute("BEGIN IMMEDIATE")
+        for pos, job in enumerate(jobs):
+            payload: Any = payload_with_deps(job, ids, pos)
+            run_id = _run_id(payload)
+            payload.pop("_velu", None)
+            mode = wait_for(job)
+            status, parents, dead_parents = _gate(conn, dependency_ids(payload), mode)
+            cur = conn.execute(
+                "INSERT INTO jobs (ts, next_run_at, status, task, payload, result, err, last_error, attempts, priority, created_at, updated_at, key, run_id) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    now,
+                    _run_at(job, now),
+                    status,
+                    str(job.get("task") or "unknown"),
+                    json.dumps(sanitize_payload(blobs.offload(payload)), ensure_ascii=False),
+                    None,
+                    None,
+                    None,
+                    0,
+                    int(job.get("priority") or 0),
+                    now,
+                    now,
+                    job.get("key"),
+                    run_id,
+                ),
+            )
+            ids.append(int(cur.lastrowid))
+            _link(conn, ids[-1], parents, mode)
+            failed.extend(dead_parents)
+        _settle_failed(conn, failed)
+        conn.execute("COMMIT")
+    return ids
+
+
+def _gate(conn: sqlite3.Connection, deps: list[str], mode: str) -> tuple[str, list[int], list[int]]:
+    """
+    Initial status for a job depending on ``deps``, the parents that exist (edges to
+    record) and the failed ones that doom it. Unknown ids do not hold the job back.
+    """
+    pids = [int(d) for d in deps if d.isdigit()]
+    if not pids:
+        return "queued", [], []
+    marks = ",".join("?" for _ in pids)
+    rows = conn.execute(f"SELECT id, status FROM jobs WHERE id IN ({marks})", pids).fetchall()
+    pending = any(not parent_settled(r["status"], mode) for r in rows)
+    failed = [int(r["id"]) for r in rows if mode == "done" and r["status"] in FAILED_STATUSES]
+    return ("blocked" if pending else "queued"), [int(r["id"]) for r in rows], failed
+
+
+def _link(conn: sqlite3.Connection, job_id: int, parents: list[int], mode: str = "done") -> None:
+    conn.executemany(
+        "INSERT OR IGNORE INTO job_deps (job_id, depends_on, wait_for) VALUES (?, ?, ?)",
+        [(job_id, p, mode) for p in parents],
+    )
+
+
+_FAILED_SQL = ", ".join(f"'{s}'" for s in FAILED_STATUSES)
+
+
+def _promote_children(conn: sqlite3.Connection, parent_ids: list[int]) -> int:
+    """Queue blocked children of settled parents once none of their parents holds them back."""
+    if not parent_ids:
+        return 0
+    marks = ",".join("?" for _ in parent_ids)
+    now = _now()
+    # next_run_at doubles as "queued since" for the queue-wait metric.
+    cur = conn.execute(
+        "UPDATE jobs SET status='queued', next_run_at=MAX(COALESCE(next_run_at, 0), ?), updated_at=? "
+        f"WHERE status='blocked' AND id IN (SELECT job_id FROM job_deps WHERE depends_on IN ({marks})) "
+        "AND NOT EXISTS ("
+        "  SELECT 1 FROM job_deps d JOIN jobs p ON p.id = d.depends_on "
+        "  WHERE d.job_id = jobs.id AND p.status <> 'done' "
+        f"  AND (d.wait_for = 'done' OR p.status NOT IN ({_FAILED_SQL}))"
+        ")",
+        (now, now, *[int(p) for p in parent_ids]),
+    )
+    return int(cur.rowcount or 0)
+
+
+def _fail_dependants(conn: sqlite3.Connection, parent_ids: list[int]) -> list[int]:
+    """Fail every blocked job that needs ``parent_ids`` to succeed; returns their ids."""
+    if not parent_ids:
+        return []
+    marks = ",".join("?" for _ in parent_ids)
+    rows = conn.execute(
+        f"""
+        WITH RECURSIVE doomed(id, cause) AS (
+          SELECT job_id, depends_on FROM job_deps WHERE depends_on IN ({marks}) AND wait_for = 'done'
+          UNION
+          SELECT d.job_id, doomed.cause FROM job_deps d JOIN doomed ON d.depends_on = doomed.id
+          WHERE d.wait_for = 'done'
+        )
+        SELECT doomed.id, MIN(doomed.cause) AS cause
+        FROM doomed JOIN jobs j ON j.id = doomed.id
+        WHERE j.status = 'blocked'
+        GROUP BY doomed.id
+        """,
+        [int(p) for p in parent_ids],
+    ).fetchall()
+    now = _now()
+    for r in rows:
+        err_json = json.dumps({"error": "dependency failed", "dependency": int(r["cause"])})
+        conn.execute(
+            "UPDATE jobs SET status='error', err=?, last_error=?, updated_at=? WHERE id=? AND status='blocked'",
+            (err_json, err_json, now, int(r["id"])),
+        )
+    return [int(r["id"]) for r in rows]
+
 
+def _settle_failed(conn: sqlite3.Connection, failed: list[int]) -> None:
+    """After ``failed`` jobs failed: doom what needed them, wake what only waited for them."""
+    if failed:
+        _promote_children(conn, failed + _fail_dependants(conn, failed))
 
 
 def project_belongs_to_org(project_id: str, org_id: str) -> bool:
@@ -239,14 +460,25 @@ def project_belongs_to_org(project_id: str, org_id: str) -> bool:
     return True
 
 
-def get_job(job_id: str | int) -> Optional[Dict[str, Any]]:
-    ensure_schema()
-    with closing(_sqlite_connect()) as conn:
-        row = conn.execute("SELECT * FROM jobs WHERE id = ?", (int(job_id),)).fetchone()
-    if not row:
-        return None
+# Column projections for the cheap read views; "full" is SELECT * plus payload decoding.
+_ORG_SQL = (
+    "CASE WHEN json_valid(payload) THEN "
+    "COALESCE(json_extract(payload, '$._velu.org_id'), json_extract(payload, '$._org_id')) END AS org_id"
+)
+_OK_SQL = (
+    "CASE WHEN json_valid(result) THEN "
+    "CASE json_type(result, '$.ok') WHEN 'true' THEN 1 WHEN 'false' THEN 0 END END AS ok"
+)
+_VIEW_COLUMNS = {
+    "status": f"id, status, created_at, updated_at, {_ORG_SQL}",
+    "summary": f"id, task, status, attempts, priority, ts, created_at, updated_at, err, last_error, {_OK_SQL}, {_ORG_SQL}",
+}
 
+
+def _decode_row(row: sqlite3.Row) -> Dict[str, Any]:
     rec = dict(row)
+    if "ok" in rec and rec["ok"] is not None:
+        rec["ok"] = bool(rec["ok"])
     raw_payload = rec.get("payload")
     if isinstance(raw_payload, (bytes, bytearray)):
         raw_payload = raw_payload.decode("utf-8", errors="ignore")
@@ -259,14 +491,25 @@ def get_job(job_id: str | int) -> Optional[Dict[str, Any]]:
                     rec["payload"] = obj
             except Exception:
                 pass
-
     return rec
 
 
-def get_job_for_org(job_id: str, org_id: str) -> Optional[Dict[str, Any]]:
-    rec = get_job(job_id)
+def get_job(job_id: str | int, *, view: str = "full") -> Optional[Dict[str, Any]]:
+    ensure_schema()
+    cols = _VIEW_COLUMNS.get(view, "*")
+    with closing(_sqlite_connect()) as conn:
+        row = conn.execute(f"SELECT {cols} FROM jobs WHERE id = ?", (int(job_id),)).fetchone()
+    if not row:
+        return None
+    return _decode_row(row)
+
+
+def get_job_for_org(job_id: str, org_id: str, *, view: str = "full") -> Optional[Dict[str, Any]]:
+    rec = get_job(job_id, view=view)
     if not rec:
         return None
+    if view in _VIEW_COLUMNS:
+        return rec if str(rec.get("org_id") or "") == str(org_id) else None
     payload = rec.get("payload")
     if isinstance(payload, dict):
         velu = payload.get("_velu")
@@ -278,90 +521,207 @@ def get_job_for_org(job_id: str, org_id: str) -> Optional[Dict[str, Any]]:
 
 
 
-def list_recent(limit: int = 50) -> Iterable[Dict[str, Any]]:
-    ensure_schema()
-    with closing(_sqlite_connect()) as conn:
-        rows = conn.execute(
-            "SELECT * FROM jobs ORDER BY id DESC LIMIT ?",
-            (max(1, min(1000, int(limit))),),
-        ).fetchall()
+_PROJECT_SQL = (
+    "CASE WHEN json_valid(payload) THEN "
+    "COALESCE(json_extract(payload, '$._velu.project_id'), json_extract(payload, '$._project_id')) END"
+)
 
-    out: list[Dict[str, Any]] = []
-    for r in rows:
-        rec = dict(r)
-        raw_payload = rec.get("payload")
-        if isinstance(raw_payload, (bytes, bytearray)):
-            raw_payload = raw_payload.decode("utf-8", errors="ignore")
-        if isinstance(raw_payload, str):
-            s = raw_payload.strip()
-            if s:
-                try:
-                    obj = json.loads(s)
-                    if isinstance(obj, dict):
-                        rec["payload"] = obj
-                except Exception:
-                    pass
-        out.append(rec)
 
-    return out
+def list_recent(
+    limit: int = 50,
+    *,
+    view: str = "full",
+    after: tuple[Any, Any] | None = None,
+    status: str | None = None,
+    task: str | None = None,
+    project_id: str | None = None,
+) -> Iterable[Dict[str, Any]]:
+    """Newest first; ``after`` is the (created_at, id) of the previous page's last row (only id is used)."""
+    ensure_schema()
+    cols = _VIEW_COLUMNS.get(view, "*")
+    where: list[str] = []
+    args: list[Any] = []
+    if after is not None:
+        where.append("id < ?")
+        args.append(int(after[1]))
+    if status:
+        where.append("status = ?")
+        args.append(str(status))
+    if task:
+        where.append("task = ?")
+        args.append(str(task))
+    if project_id:
+        where.append(f"{_PROJECT_SQL} = ?")
+        args.append(str(project_id))
+    sql = f"SELECT {cols} FROM jobs"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    args.append(max(1, min(1000, int(limit))))
+    with closing(_sqlite_connect()) as conn:
+        rows = conn.execute(sql + " ORDER BY id DESC LIMIT ?", args).fetchall()
+    return [_decode_row(r) for r in rows]
 
 
-def list_recent_for_org(*, org_id: str, limit: int = 50) -> list[dict]:
-    items = list(list_recent(limit=limit))
+def list_recent_for_org(*, org_id: str, limit: int = 50, view: str = "full", **filters: Any) -> list[dict]:
+    items = list(list_recent(limit=limit, view=view, **filters))
     return [it for it in items if isinstance(it, dict)][: max(1, int(limit))]
 
 
-def claim_one_job() -> Dict[str, Any] | None:
+def claim_one_job(*, tasks: list[str] | None = None) -> Dict[str, Any] | None:
+    rows = claim_jobs(n=1, tasks=tasks)
+    return rows[0] if rows else None
+
+
+def _claim_rows(conn: sqlite3.Connection, n: int, tasks: list[str] | None = None) -> list[Dict[str, Any]]:
+    task_sql = ""
+    if tasks is not None:
+        task_sql = f" AND task IN ({','.join('?' for _ in tasks)})" if tasks else " AND 0"
+    conn.isolation_level = None
+    conn.execute("BEGIN IMMEDIATE")
+    picked = conn.execute(
+        "SELECT id FROM jobs WHERE status='queued' AND (next_run_at IS NULL OR next_run_at <= ?)"
+        f"{task_sql} ORDER BY priority DESC, id ASC LIMIT ?",
+        (_now(), *(tasks or ()), int(n)),
+    ).fetchall()
+    if not picked:
+        conn.execute("COMMIT")
+        return []
+    ids = [int(r["id"]) for r in picked]
+    marks = ",".join("?" for _ in ids)
+    now = _now()
+    conn.execute(
+        f"UPDATE jobs SET status='working', attempts=COALESCE(attempts, 0) + 1, updated_at=? "
+        f"WHERE id IN ({marks}) AND status='queued'",
+        (now, *ids),
+    )
+    fresh = conn.execute(f"SELECT * FROM jobs WHERE id IN ({marks})", tuple(ids)).fetchall()
+    conn.execute("COMMIT")
+    by_id = {int(r["id"]): dict(r) for r in fresh}
+    return [by_id[i] for i in ids if i in by_id]
+
+
+def claim_jobs(*, n: int = 1, tasks: list[str] | None = None) -> list[Dict[str, Any]]:
+    """Claim up to ``n`` queued jobs (only ``tasks``, if given) in a single IMMEDIATE transaction."""
+    limit = max(1, min(100, int(n or 1)))
     ensure_schema()
     try:
         with closing(_sqlite_connect()) as conn:
-            conn.isolation_level = None
-            conn.execute("BEGIN IMMEDIATE")
-            row = conn.execute(
-                "SELECT * FROM jobs WHERE status='queued' ORDER BY priority DESC, id ASC LIMIT 1"
-            ).fetchone()
-            if not row:
-                conn.execute("COMMIT")
-                return None
-            jid = int(row["id"])
-            now = _now()
-            cur = conn.execute(
-                "UPDATE jobs SET status='working', attempts=COALESCE(attempts, 0) + 1, updated_at=? WHERE id=? AND status='queued'",
-                (now, jid),
-            )
-            if cur.rowcount != 1:
-                conn.execute("ROLLBACK")
-                return None
-            fresh = conn.execute("SELECT * FROM jobs WHERE id=?", (jid,)).fetchone()
-            conn.execute("COMMIT")
-            return dict(fresh) if fresh else None
+            return _claim_rows(conn, limit, tasks)
     except sqlite3.OperationalError as e:
         if "no such table: jobs" not in str(e).lower():
             raise
         ensure_schema()
         with closing(_sqlite_connect()) as conn:
-            conn.isolation_level = None
-            conn.execute("BEGIN IMMEDIATE")
-            row = conn.execute(
-                "SELECT * FROM jobs WHERE status='queued' ORDER BY priority DESC, id ASC LIMIT 1"
-            ).fetchone()
-            if not row:
-                conn.execute("COMMIT")
-                return None
-            jid = int(row["id"])
-            now = _now()
+            return _claim_rows(conn, limit, tasks)
+
+
+def queue_depth_by_task() -> dict[str, dict[str, int]]:
+    ensure_schema()
+    with closing(_sqlite_connect()) as conn:
+        rows = conn.execute(
+            "SELECT task, status, COUNT(*) AS n FROM jobs WHERE status IN ('queued', 'working') GROUP BY task, status"
+        ).fetchall()
+    out: dict[str, dict[str, int]] = {}
+    for r in rows:
+        out.setdefault(str(r["task"]), {"queued": 0, "working": 0})[str(r["status"])] = int(r["n"])
+    return out
+
+
+def release_jobs(job_ids: list[str | int]) -> int:
+    """Put claimed-but-unstarted jobs back to 'queued' without charging an attempt."""
+    ids = [int(j) for j in (job_ids or []) if str(j).strip()]
+    if not ids:
+        return 0
+    ensure_schema()
+    marks = ",".join("?" for _ in ids)
+    now = _now()
+    with closing(_sqlite_connect()) as conn:
+        with conn:
             cur = conn.execute(
-                "UPDATE jobs SET status='working', attempts=COALESCE(attempts, 0) + 1, updated_at=? WHERE id=? AND status='queued'",
-                (now, jid),
+                f"UPDATE jobs SET status='queued', attempts=MAX(COALESCE(attempts, 0) - 1, 0), "
+                f"next_run_at=MAX(COALESCE(next_run_at, 0), ?), updated_at=? "
+                f"WHERE id IN ({marks}) AND status='working'",
+                (now, now, *ids),
             )
-            if cur.rowcount != 1:
-                conn.execute("ROLLBACK")
-                return None
-            fresh = conn.execute("SELECT * FROM jobs WHERE id=?", (jid,)).fetchone()
+            return int(cur.rowcount or 0)
+
+
+
+def heartbeat(job_id: str | int) -> str:
+    """"ok", "cancel" (a cancel was requested) or "lost" (no longer running)."""
+    if not str(job_id).isdigit():
+        return "lost"
+    ensure_schema()
+    with closing(_sqlite_connect()) as conn:
+        row = conn.execute("SELECT status, cancel_requested FROM jobs WHERE id=?", (int(job_id),)).fetchone()
+    if row is None or row["status"] != "working":
+        return "lost"
+    return "cancel" if row["cancel_requested"] else "ok"
+
+
+def cancel_job(job_id: str | int, *, org_id: str | None = None) -> Optional[Dict[str, Any]]:
+    """
+    Cancel a job, everything downstream of it and the rest of its run: queued and
+    blocked jobs become 'cancelled', running ones get cancel_requested for their
+    worker. None if the job does not exist (in ``org_id``).
+    """
+    if not str(job_id).isdigit():
+        return None
+    ensure_schema()
+    jid = int(job_id)
+    with closing(_sqlite_connect()) as conn:
+        conn.isolation_level = None
+        conn.execute("BEGIN IMMEDIATE")
+        job = conn.execute(f"SELECT id, status, run_id, {_ORG_SQL} FROM jobs WHERE id=?", (jid,)).fetchone()
+        if job is None or (org_id and str(job["org_id"] or "") != str(org_id)):
             conn.execute("COMMIT")
-            return dict(fresh) if fresh else None
+            return None
+        rows = conn.execute(
+            """
+            WITH RECURSIVE tree(id) AS (
+              SELECT ?
+              UNION
+              SELECT d.job_id FROM job_deps d JOIN tree t ON d.depends_on = t.id
+            )
+            SELECT id, status FROM jobs
+            WHERE status IN ('queued', 'blocked', 'working')
+              AND (id IN (SELECT id FROM tree) OR (? IS NOT NULL AND run_id = ?))
+            """,
+            (jid, job["run_id"], job["run_id"]),
+        ).fetchall()
+        cancelled = [int(r["id"]) for r in rows if r["status"] != "working"]
+        running = [int(r["id"]) for r in rows if r["status"] == "working"]
+        now = _now()
+        err_json = json.dumps({"error": "cancelled", "cancelled_by": jid})
+        conn.executemany(
+            "UPDATE jobs SET status='cancelled', cancel_requested=1, err=?, last_error=?, updated_at=? WHERE id=?",
+            [(err_json, err_json, now, i) for i in cancelled],
+        )
+        conn.executemany(
+            "UPDATE jobs SET cancel_requested=1, updated_at=? WHERE id=?", [(now, i) for i in running]
+        )
+        _settle_failed(conn, cancelled)
+        conn.execute("COMMIT")
+    status = "cancelled" if jid in cancelled else str(job["status"])
+    return {"id": jid, "status": status, "cancelled": cancelled, "cancel_requested": running}
 
 
+def mark_cancelled(job_id: str | int) -> bool:
+    """Record a running job whose cancel the worker acted on as 'cancelled'."""
+    ensure_schema()
+    err_json = json.dumps({"error": "cancelled"})
+    with closing(_sqlite_connect()) as conn:
+        with conn:
+            cur = conn.execute(
+                "UPDATE jobs SET status='cancelled', err=?, last_error=?, updated_at=? "
+                "WHERE id=? AND status='working' AND cancel_requested=1",
+                (err_json, err_json, _now(), int(job_id)),
+            )
+            if not cur.rowcount:
+                return False
+            _settle_failed(conn, [int(job_id)])
+    return True
+
 
 def finish_job(job_id: str | int, result: dict[str, Any]) -> None:
     ensure_schema()
@@ -369,19 +729,81 @@ def finish_job(job_id: str | int, result: dict[str, Any]) -> None:
         with conn:
             conn.execute(
                 "UPDATE jobs SET status='done', result=?, err=NULL, last_error=NULL, updated_at=? WHERE id=?",
-                (normalize_result_for_storage(result), _now(), int(job_id)),
+                (normalize_result_for_storage(blobs.offload(result)), _now(), int(job_id)),
             )
+            _promote_children(conn, [int(job_id)])
 
 
-def fail_job(job_id: str | int, error: Any) -> None:
+def _memo_hit(conn: sqlite3.Connection, key: str, now: float, *, at_enqueue: bool = False) -> str | None:
+    """Stored result JSON for ``key`` (still within its TTL), counting the hit."""
+    row = conn.execute(
+        "SELECT result FROM job_result_cache WHERE key = ? AND created_at > ?",
+        (key, now - memo.ttl_seconds()),
+    ).fetchone()
+    if row is None or (at_enqueue and memo.writes_files(row[0])):
+        return None
+    conn.execute("UPDATE job_result_cache SET hits = hits + 1, last_used_at = ? WHERE key = ?", (now, key))
+    return row[0]
+
+
+def memo_get(key: str) -> dict[str, Any] | None:
+    ensure_schema()
+    with closing(_sqlite_connect()) as conn:
+        with conn:
+            hit = _memo_hit(conn, key, _now())
+    return blobs.resolve(json.loads(hit)) if hit is not None else None
+
+
+def memo_put(key: str, task: str, result: dict[str, Any]) -> None:
     ensure_schema()
+    now = _now()
+    with closing(_sqlite_connect()) as conn:
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO job_result_cache (key, task, result, size_bytes, hits, created_at, last_used_at) "
+                "VALUES (?, ?, ?, ?, 0, ?, ?)",
+                (key, task, normalize_result_for_storage(blobs.offload(result)), memo.size_of(result), now, now),
+            )
+            _evict_memo(conn, now, memo.ttl_seconds(), memo.max_bytes())
+
+
+def _evict_memo(conn: sqlite3.Connection, now: float, ttl_seconds: int, max_bytes: int) -> int:
+    n = conn.execute("DELETE FROM job_result_cache WHERE created_at <= ?", (now - ttl_seconds,)).rowcount
+    n += conn.execute(
+        """
+        DELETE FROM job_result_cache
+        WHERE key IN (
+            SELECT key FROM (
+                SELECT key, sum(size_bytes) OVER (ORDER BY last_used_at DESC, key) AS running
+                FROM job_result_cache
+            )
+            WHERE running > ?
+        )
+        """,
+        (int(max_bytes),),
+    ).rowcount
+    return int(n or 0)
+
+
+def evict_memo(*, ttl_seconds: int, max_bytes: int) -> int:
+    ensure_schema()
+    with closing(_sqlite_connect()) as conn:
+        with conn:
+            return _evict_memo(conn, _now(), int(ttl_seconds), int(max_bytes))
+
+
+def _error_json(error: Any) -> str:
     if isinstance(error, str):
-        err_json = json.dumps({"error": error}, ensure_ascii=False)
-    else:
-        try:
-            err_json = json.dumps(error, ensure_ascii=False)
-        except Exception:
-            err_json = json.dumps({"error": str(error)}, ensure_ascii=False)
+        return json.dumps({"error": error}, ensure_ascii=False)
+    try:
+        return json.dumps(error, ensure_ascii=False)
+    except Exception:
+        return json.dumps({"error": str(error)}, ensure_ascii=False)
+
+
+def fail_job(job_id: str | int, error: Any) -> None:
+    ensure_schema()
+    err_json = _error_json(error)
 
     with closing(_sqlite_connect()) as conn:
         with conn:
@@ -389,6 +811,57 @@ def fail_job(job_id: str | int, error: Any) -> None:
                 "UPDATE jobs SET status='error', err=?, last_error=?, updated_at=? WHERE id=?",
                 (err_json, err_json, _now(), int(job_id)),
             )
+            _settle_failed(conn, [int(job_id)])
+
+
+def retry_job(job_id: str | int, error: Any, *, policy: retry.RetryPolicy) -> str | None:
+    """Requeue with backoff while attempts remain, else dead-letter; returns the new status."""
+    ensure_schema()
+    err_json = _error_json(error)
+    with closing(_sqlite_connect()) as conn:
+        conn.isolation_level = None
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute("SELECT attempts FROM jobs WHERE id=? AND status='working'", (int(job_id),)).fetchone()
+        if not row:
+            conn.execute("COMMIT")
+            return None
+        status, delay = policy.decide(int(row["attempts"] or 0))
+        now = _now()
+        conn.execute(
+            "UPDATE jobs SET status=?, err=?, last_error=?, next_run_at=COALESCE(?, next_run_at), updated_at=? "
+            "WHERE id=?",
+            (status, err_json, err_json, now + delay if delay is not None else None, now, int(job_id)),
+        )
+        if status != "queued":
+            _settle_failed(conn, [int(job_id)])
+        conn.execute("COMMIT")
+        return status
+
+
+def defer_job(
+    job_id: str | int, *, payload: dict[str, Any], wait_on: list[str | int], wait_for: str = "finished"
+) -> str | None:
+    """Park a working job on ``wait_on`` with a new payload; returns the new status."""
+    ensure_schema()
+    payload_json = json.dumps(sanitize_payload(blobs.offload(payload or {})), ensure_ascii=False)
+    with closing(_sqlite_connect()) as conn:
+        conn.isolation_level = None
+        conn.execute("BEGIN IMMEDIATE")
+        if not conn.execute("SELECT 1 FROM jobs WHERE id=? AND status='working'", (int(job_id),)).fetchone():
+            conn.execute("COMMIT")
+            return None
+        status, parents, failed = _gate(conn, [str(w) for w in wait_on], wait_for)
+        now = _now()
+        conn.execute(
+            "UPDATE jobs SET status=?, payload=?, attempts=0, next_run_at=?, updated_at=? WHERE id=?",
+            (status, payload_json, now, now, int(job_id)),
+        )
+        conn.execute("DELETE FROM job_deps WHERE job_id=?", (int(job_id),))
+        _link(conn, int(job_id), parents, wait_for)
+        _settle_failed(conn, failed)
+        status = conn.execute("SELECT status FROM jobs WHERE id=?", (int(job_id),)).fetchone()["status"]
+        conn.execute("COMMIT")
+        return status
 
 
 enqueue = enqueue_job
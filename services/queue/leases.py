@@ -0,0 +1,170 @@
+# services/queue/leases.py
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from typing import Callable
+
+from services.queue import cancel
+from services.queue import jobs as jobs_api
+
+logger = logging.getLogger(__name__)
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float((os.getenv(name) or "").strip() or default)
+    except Exception:
+        return default
+
+
+class LeasePolicy:
+    """
+    Per-task lease length from observed run time.
+
+    lease = clamp(p95 * factor, min_seconds, max_seconds), falling back to
+    ``max_seconds`` until a task has ``min_samples`` successful runs. With the
+    heartbeat keeping long jobs alive, this mostly bounds how long a crashed
+    worker's job stays invisible before it is reclaimed. Results are cached per
+    task for ``ttl`` seconds.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_seconds: int | None = None,
+        min_seconds: int | None = None,
+        factor: float | None = None,
+        min_samples: int | None = None,
+        ttl: float | None = None,
+        p95_fn: Callable[[str], tuple[float | None, int]] | None = None,
+    ) -> None:
+        self.max_seconds = int(max_seconds or _env_float("VELU_JOB_LEASE_SEC", 300))
+        self.min_seconds = max(5, int(min_seconds or _env_float("VELU_JOB_LEASE_MIN_SEC", 15)))
+        self.min_seconds = min(self.min_seconds, self.max_seconds)
+        self.factor = float(factor or _env_float("VELU_JOB_LEASE_P95_FACTOR", 2.0))
+        self.min_samples = int(min_samples or _env_float("VELU_JOB_LEASE_MIN_SAMPLES", 20))
+        self.ttl = float(ttl if ttl is not None else _env_float("VELU_JOB_LEASE_STATS_TTL_SEC", 300))
+        self._p95 = p95_fn or jobs_api.task_run_p95
+        self._cache: dict[str, tuple[float, int]] = {}
+        self._lock = threading.Lock()
+
+    def lease_for(self, task: str) -> int:
+        key = (task or "").strip()
+        now = time.monotonic()
+        with self._lock:
+            hit = self._cache.get(key)
+            if hit and now - hit[0] < self.ttl:
+                return hit[1]
+        try:
+            p95, n = self._p95(key)
+        except Exception as exc:
+            logger.warning("lease policy: p95 lookup failed for %s: %s", key, exc)
+            p95, n = None, 0
+        if p95 is None or n < self.min_samples:
+            lease = self.max_seconds
+        else:
+            lease = int(max(self.min_seconds, min(self.max_seconds, p95 * self.factor)))
+        with self._lock:
+            self._cache[key] = (now, lease)
+        return lease
+
+
+class Heartbeat:
+    """
+    Background thread that keeps a running job's lease alive and watches for
+    cancellation.
+
+    Beats once on entry (switching the claim's default lease to the task's lease)
+    and then every ``lease_seconds / 3``, at most ``VELU_CANCEL_CHECK_SEC`` (10)
+    apart. If the job is no longer ours, ``lost`` is set and the thread stops; the
+    worker must then not report a result for it. If a cancel was requested,
+    ``cancelled`` is set and ``scope`` is cancelled, which stops the handler's
+    child processes (services.queue.cancel).
+    """
+
+    def __init__(self, *, job_id: str, worker_id: str, lease_seconds: int) -> None:
+        self.job_id = str(job_id)
+        self.worker_id = worker_id
+        self.lease_seconds = max(5, int(lease_seconds))
+        self.interval = max(1.0, min(self.lease_seconds / 3.0, _env_float("VELU_CANCEL_CHECK_SEC", 10)))
+        self.lost = False
+        self.cancelled = False
+        self.scope = cancel.CancelScope()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"heartbeat-{self.job_id[:8]}", daemon=True)
+
+    def _beat(self) -> None:
+        try:
+            state = jobs_api.heartbeat(
+                job_id=self.job_id, worker_id=self.worker_id, lease_seconds=self.lease_seconds
+            )
+        except Exception as exc:
+            # Transient DB trouble: keep trying until the lease actually lapses.
+            logger.warning("heartbeat: %s failed: %s", self.job_id, exc)
+            return
+        if state == "lost":
+            self.lost = True
+            self._stop.set()
+            logger.warning("heartbeat: lost lease on job %s", self.job_id)
+        elif state == "cancel" and not self.cancelled:
+            self.cancelled = True
+            logger.info("heartbeat: cancelling job %s", self.job_id)
+            self.scope.cancel()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._beat()
+
+    def __enter__(self) -> "Heartbeat":
+        self._beat()
+        if not self.lost:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout=5)
+
+
+class LeaseSweeper:
+    """
+    Background thread that returns expired leases to the queue every ``interval``
+    seconds. Every worker runs one; the advisory lock in sweep_expired_leases
+    makes exactly one of them do the work on each tick.
+    """
+
+    def __init__(self, *, interval: float | None = None, batch_size: int | None = None) -> None:
+        self.interval = max(0.5, float(interval or _env_float("VELU_LEASE_SWEEP_SEC", 5)))
+        self.batch_size = max(1, int(batch_size or _env_float("VELU_LEASE_SWEEP_BATCH", 500)))
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="lease-sweeper", daemon=True)
+
+    def sweep_once(self) -> int | None:
+        try:
+            n = jobs_api.sweep_expired_leases(batch_size=self.batch_size)
+        except Exception as exc:
+            logger.warning("lease sweeper: sweep failed: %s", exc)
+            return None
+        if n:
+            logger.info("lease sweeper: requeued %d expired jobs", n)
+        return n
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.sweep_once()
+
+    def start(self) -> "LeaseSweeper":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout=5)
+
+
+__all__ = ["Heartbeat", "LeasePolicy", "LeaseSweeper"]
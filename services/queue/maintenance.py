@@ -0,0 +1,113 @@
+# services/queue/maintenance.py
+"""
+Background maintenance for the Postgres jobs backend.
+
+Every ``VELU_MAINTENANCE_INTERVAL_SEC`` (default 300) one node, picked by advisory
+lock, moves terminal jobs older than ``VELU_ARCHIVE_AFTER_DAYS`` (default 7) from
+jobs_v2 into the monthly-partitioned jobs_v2_archive in batches of
+``VELU_ARCHIVE_BATCH`` (default 1000), then drops archive partitions older than
+``VELU_ARCHIVE_RETENTION_DAYS`` (default 90; 0 keeps them forever), and clears
+Idempotency-Keys past their TTL (see services.queue.idempotency). Local blob-store
+files (see services.queue.blobs) outlive the rows that can reference them by a month
+and are pruned by mtime.
+
+    python -m services.queue.maintenance          # loop
+    python -m services.queue.maintenance --once   # single pass (cron)
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import threading
+from typing import Any
+
+from services.queue import using_postgres_jobs
+
+logger = logging.getLogger(__name__)
+
+_DAY = 24 * 60 * 60
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float((os.getenv(name) or "").strip() or default)
+    except Exception:
+        return default
+
+
+def settings() -> dict[str, Any]:
+    retention_days = _env_float("VELU_ARCHIVE_RETENTION_DAYS", 90)
+    return {
+        "archive_after_seconds": int(max(0.0, _env_float("VELU_ARCHIVE_AFTER_DAYS", 7)) * _DAY),
+        "retention_seconds": int(retention_days * _DAY) if retention_days > 0 else None,
+        "batch_size": max(1, int(_env_float("VELU_ARCHIVE_BATCH", 1000))),
+        "interval": max(1.0, _env_float("VELU_MAINTENANCE_INTERVAL_SEC", 300)),
+    }
+
+
+def run_once() -> dict[str, Any] | None:
+    """One maintenance pass. None when not on Postgres or another node is leader."""
+    if not using_postgres_jobs():
+        return None
+    from services.queue import jobs_postgres
+
+    cfg = settings()
+    out = jobs_postgres.run_maintenance(
+        archive_after_seconds=cfg["archive_after_seconds"],
+        retention_seconds=cfg["retention_seconds"],
+        batch_size=cfg["batch_size"],
+    )
+    if out is not None and cfg["retention_seconds"]:
+        out["pruned_blobs"] = _prune_blobs(cfg["archive_after_seconds"] + cfg["retention_seconds"] + 31 * _DAY)
+    if out and (out["archived"] or out["dropped_partitions"] or out.get("idempotency_keys_cleared")):
+        logger.info(
+            "maintenance: archived %d jobs, dropped partitions %s, cleared %d idempotency keys",
+            out["archived"],
+            out["dropped_partitions"],
+            out.get("idempotency_keys_cleared", 0),
+        )
+    return out
+
+
+def _prune_blobs(older_than_seconds: int) -> int:
+    from services.queue import blobs
+
+    store = blobs.get_store()
+    prune = getattr(store, "prune", None)
+    if prune is None:
+        return 0
+    try:
+        return int(prune(older_than_seconds=older_than_seconds))
+    except Exception as exc:
+        logger.warning("maintenance: blob prune failed: %s", exc)
+        return 0
+
+
+def run_forever(stop: threading.Event | None = None) -> None:
+    stop = stop or threading.Event()
+    interval = settings()["interval"]
+    while True:
+        try:
+            run_once()
+        except Exception as exc:
+            logger.warning("maintenance: pass failed: %s", exc)
+        if stop.wait(interval):
+            return
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description="jobs_v2 archive/retention maintenance")
+    ap.add_argument("--once", action="store_true", help="run a single pass and exit")
+    args = ap.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    if args.once:
+        print(run_once(), flush=True)
+        return 0
+    run_forever()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
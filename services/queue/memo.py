@@ -0,0 +1,126 @@
+# services/queue/memo.py
+"""
+Content-addressed memoization of deterministic handler results.
+
+Tasks whose handler is a pure template/rule function of its payload can opt in
+with ``VELU_MEMO_TASKS`` (comma-separated; ``*`` enables every task in
+``DETERMINISTIC_TASKS``). A successful result is cached under
+
+    sha256(task, handler version, canonical JSON of the payload minus "_" keys)
+
+so ``_velu`` routing metadata, run ids and workspaces never split the cache.
+The worker consults the cache before running the handler, and enqueue checks it
+too: a hit on a job without dependencies or a schedule is inserted already
+``done`` and is never claimed, unless the result carries ``files`` (those must
+be written to the job's workspace, so such jobs are left to the worker's hit).
+
+Entries expire after ``VELU_MEMO_TTL_SEC`` (default 7 days) and the cache is
+kept under ``VELU_MEMO_MAX_MB`` (default 256) by evicting least recently used
+entries (Postgres: maintenance pass; SQLite: on write).
+
+Bump a task's entry in ``DETERMINISTIC_TASKS`` whenever its handler output
+changes for the same input; old entries then simply stop matching.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from typing import Any, Mapping
+
+from services.queue import blobs
+from services.queue.base import dependency_ids
+from services.queue.defer import deferral
+
+# task -> handler version
+DETERMINISTIC_TASKS: dict[str, str] = {
+    "requirements": "1",
+    "architecture": "1",
+    "datamodel": "1",
+    "api_design": "1",
+    "ui_scaffold": "1",
+    "content_generator": "1",
+}
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float((os.getenv(name) or "").strip() or default)
+    except Exception:
+        return default
+
+
+def enabled_tasks() -> set[str]:
+    raw = {t.strip() for t in (os.getenv("VELU_MEMO_TASKS") or "").split(",") if t.strip()}
+    if "*" in raw:
+        raw.discard("*")
+        raw |= set(DETERMINISTIC_TASKS)
+    return raw
+
+
+def ttl_seconds() -> int:
+    return max(1, int(_env_float("VELU_MEMO_TTL_SEC", 7 * 24 * 60 * 60)))
+
+
+def max_bytes() -> int:
+    return max(1, int(_env_float("VELU_MEMO_MAX_MB", 256) * 1024 * 1024))
+
+
+def canonical_payload(payload: Mapping[str, Any] | None) -> str:
+    body = {k: v for k, v in (payload or {}).items() if not str(k).startswith("_")}
+    return json.dumps(body, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def key_for(task: str | None, payload: Mapping[str, Any] | None) -> str | None:
+    """Cache key for ``task``/``payload``, or None when the task is not memoized."""
+    task = (task or "").strip()
+    if not task or task not in enabled_tasks():
+        return None
+    version = DETERMINISTIC_TASKS.get(task, "0")
+    h = hashlib.sha256(f"{task}\0{version}\0".encode("utf-8"))
+    h.update(canonical_payload(payload).encode("utf-8"))
+    return f"{task}:{h.hexdigest()}"
+
+
+def enqueue_key(job: Mapping[str, Any]) -> str | None:
+    """Cache key to try at enqueue; jobs with parents or a schedule wait their turn."""
+    payload = job.get("payload") if isinstance(job.get("payload"), dict) else {}
+    if dependency_ids(payload) or job.get("run_at") is not None or job.get("delay_seconds") is not None:
+        return None
+    return key_for(job.get("task"), payload)
+
+
+def cacheable(result: Any) -> bool:
+    return isinstance(result, dict) and bool(result.get("ok", True)) and deferral(result) is None
+
+
+def writes_files(result: Any) -> bool:
+    """True if a cached result has files the worker must materialize (stubs included)."""
+    if isinstance(result, (str, bytes)):
+        try:
+            result = json.loads(result)
+        except ValueError:
+            return False
+    if not isinstance(result, dict):
+        return False
+    if blobs.is_stub(result):
+        return "files" in ((result.get("summary") or {}).get("keys") or [])
+    return bool(result.get("files"))
+
+
+def size_of(result: Any) -> int:
+    return len(json.dumps(result, ensure_ascii=False, default=str).encode("utf-8"))
+
+
+__all__ = [
+    "DETERMINISTIC_TASKS",
+    "cacheable",
+    "canonical_payload",
+    "enabled_tasks",
+    "enqueue_key",
+    "key_for",
+    "max_bytes",
+    "size_of",
+    "ttl_seconds",
+    "writes_files",
+]
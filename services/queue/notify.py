@@ -0,0 +1,125 @@
+# services/queue/notify.py
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+from typing import Any, Iterable
+
+import psycopg
+from psycopg import sql
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = "velu_jobs."
+_MAX_CHANNEL = 63  # NAMEDATALEN - 1
+
+
+def channel_for(task: str) -> str:
+    """
+    NOTIFY channel for one task class. Long names are shortened with a hash suffix
+    so they stay under Postgres' identifier limit and remain unique.
+    """
+    name = CHANNEL_PREFIX + (task or "").strip().lower()
+    if len(name.encode("utf-8")) <= _MAX_CHANNEL:
+        return name
+    digest = hashlib.sha1(name.encode("utf-8")).hexdigest()[:10]
+    return name.encode("utf-8")[: _MAX_CHANNEL - 11].decode("utf-8", "ignore") + "~" + digest
+
+
+def notify_tasks(cur: Any, tasks: Iterable[str]) -> None:
+    """
+    Queue a wakeup for each distinct task on the caller's transaction.
+    Postgres only delivers it on commit, so listeners never see uncommitted jobs.
+    """
+    for task in sorted({str(t) for t in tasks if t}):
+        cur.execute("SELECT pg_notify(%s, %s);", (channel_for(task), task))
+
+
+async def anotify_tasks(cur: Any, tasks: Iterable[str]) -> None:
+    """``notify_tasks`` for an async cursor."""
+    for task in sorted({str(t) for t in tasks if t}):
+        await cur.execute("SELECT pg_notify(%s, %s);", (channel_for(task), task))
+
+
+class JobWakeup:
+    """
+    Dedicated LISTEN connection for a worker.
+
+    It lives outside the pool (it is held for the life of the worker and must be in
+    autocommit mode). ``wait`` blocks until a NOTIFY arrives on any subscribed
+    channel or ``timeout`` expires; losing the connection degrades to plain polling
+    until the next successful reconnect.
+    """
+
+    def __init__(self, url: str, tasks: Iterable[str]) -> None:
+        self.url = url
+        self.channels = sorted({channel_for(t) for t in tasks if t})
+        self._conn: psycopg.Connection | None = None
+
+    def _ensure(self) -> psycopg.Connection | None:
+        if self._conn is not None and not self._conn.closed:
+            return self._conn
+        try:
+            conn = psycopg.connect(self.url, autocommit=True)
+            for ch in self.channels:
+                conn.execute(sql.SQL("LISTEN {}").format(sql.Identifier(ch)))
+        except Exception as exc:
+            logger.warning("job wakeup: LISTEN unavailable (%s); polling only", exc)
+            self._conn = None
+            return None
+        self._conn = conn
+        return conn
+
+    def wait(self, timeout: float) -> bool:
+        """True if woken by a notification, False on timeout or listener error."""
+        conn = self._ensure()
+        if conn is None:
+            return False
+        try:
+            woke = False
+            for _ in conn.notifies(timeout=max(0.0, timeout), stop_after=1):
+                woke = True
+            return woke
+        except Exception as exc:
+            logger.warning("job wakeup: listener dropped (%s)", exc)
+            self.close()
+            return False
+
+    def close(self) -> None:
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            try:
+                conn.close()
+            except Exception:
+                pass
+
+
+class IdleBackoff:
+    """
+    Exponential fallback poll interval for an idle worker: starts at ``base`` and
+    doubles up to ``cap``; ``reset`` after any successful claim or wakeup.
+    """
+
+    def __init__(self, base: float | None = None, cap: float | None = None) -> None:
+        self.base = base if base is not None else _env_float("VELU_WORKER_POLL_MIN_SEC", 0.1)
+        self.cap = max(self.base, cap if cap is not None else _env_float("VELU_WORKER_POLL_MAX_SEC", 5.0))
+        self.current = self.base
+
+    def next(self) -> float:
+        delay = self.current
+        self.current = min(self.cap, self.current * 2)
+        return delay
+
+    def reset(self) -> None:
+        self.current = self.base
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return max(0.01, float((os.getenv(name) or "").strip() or default))
+    except Exception:
+        return default
+
+
+__all__ = ["CHANNEL_PREFIX", "IdleBackoff", "JobWakeup", "anotify_tasks", "channel_for", "notify_tasks"]
@@ -2,7 +2,8 @@ from __future__ import annotations
 
 from typing import Any, Dict, Iterable, Optional
 
-from services.queue import jobs_postgres, jobs_sqlite, using_postgres_jobs
+from services.contracts.jobs import decode_cursor, encode_cursor
+from services.queue import blobs, jobs_postgres, jobs_sqlite, memo, retry, task_classes, using_postgres_jobs
 
 
 def ensure_schema() -> None:
@@ -12,6 +13,30 @@ def ensure_schema() -> None:
         jobs_sqlite.ensure_schema()
 
 
+_JOB_OPTIONS = ("run_at", "delay_seconds", "wait_for")
+
+
+def build_job(
+    task_obj: Dict[str, Any] | None, *, task: str | None = None, payload: Dict[str, Any] | None = None
+) -> Dict[str, Any]:
+    """The ``{"task", "payload", ...options}`` dict the backends take, from either calling style."""
+    if task is None:
+        if isinstance(task_obj, dict):
+            task = str(task_obj.get("task") or "")
+            pl = task_obj.get("payload")
+            if isinstance(pl, dict):
+                payload = pl
+        if task is None:
+            task = ""
+    if payload is None:
+        payload = {}
+    job: Dict[str, Any] = {"task": task, "payload": payload}
+    if isinstance(task_obj, dict):
+        # Scheduling options ride along on the task object.
+        job.update({k: task_obj[k] for k in _JOB_OPTIONS if task_obj.get(k) is not None})
+    return job
+
+
 def enqueue(
     task_obj: Dict[str, Any] | None = None,
     *,
@@ -26,35 +51,27 @@ def enqueue(
     actor_id: str | None = None,
     require_tenant: bool = False,
 ) -> str | int:
-    if task is None:
-        if isinstance(task_obj, dict):
-            task = str(task_obj.get("task") or "")
-            pl = task_obj.get("payload")
-            if isinstance(pl, dict):
-                payload = pl
-        if task is None:
-            task = ""
-    if payload is None:
-        payload = {}
+    job = build_job(task_obj, task=task, payload=payload)
+    memo_key = memo.enqueue_key(job)
 
     if using_postgres_jobs():
-        if require_tenant and not org_id:
-            raise RuntimeError("enqueue() requires org_id when using Postgres jobs backend")
         if not org_id:
             raise RuntimeError("enqueue() requires org_id when using Postgres jobs backend")
         at = str(actor_type or "api_key")
         aid = str(actor_id) if actor_id else (str(created_by) if created_by else None)
         return jobs_postgres.enqueue_job(
-            {"task": task, "payload": payload},
+            job,
             org_id=str(org_id),
             project_id=str(project_id) if project_id else None,
             actor_type=at,
             actor_id=aid,
             priority=int(priority),
+            idempotency_key=key,
+            memo_key=memo_key,
         )
 
     return jobs_sqlite.enqueue_job(
-        {"task": task, "payload": payload},
+        job,
         key=key,
         priority=int(priority),
         org_id=org_id,
@@ -63,88 +80,220 @@ def enqueue(
         actor_type=actor_type,
         actor_id=actor_id,
         require_tenant=require_tenant,
+        memo_key=memo_key,
     )
 
 
 enqueue_job = enqueue
 
 
+def enqueue_many(
+    jobs: list[Dict[str, Any]],
+    *,
+    org_id: str | None = None,
+    project_id: str | None = None,
+    created_by: str | None = None,
+    actor_type: str | None = None,
+    actor_id: str | None = None,
+) -> list[str | int]:
+    """
+    Enqueue a batch atomically and return the ids in input order.
+
+    Each job is ``{"task", "payload", "priority", "key", "depends_on_idx"}`` (plus
+    optional per-job tenant/actor overrides); ``depends_on_idx`` lists indexes of
+    earlier jobs in the batch and is stored as ``payload["depends_on"]`` ids. A job
+    with parents stays ``blocked`` until they are all done, or merely settled with
+    ``"wait_for": "finished"``.
+    """
+    jobs = [dict(j) for j in (jobs or [])]
+    if not jobs:
+        return []
+    if using_postgres_jobs():
+        aid = str(actor_id) if actor_id else (str(created_by) if created_by else None)
+        return list(
+            jobs_postgres.enqueue_many(
+                jobs,
+                org_id=str(org_id) if org_id else "",
+                project_id=str(project_id) if project_id else None,
+                actor_type=str(actor_type or "api_key"),
+                actor_id=aid,
+            )
+        )
+    return list(jobs_sqlite.enqueue_many(jobs))
+
+
 def load(job_id: Any) -> Dict[str, Any]:
     rec = get(job_id)
     return rec or {}
 
 
-def get(job_id: Any) -> Optional[Dict[str, Any]]:
+def _resolved(row: Optional[Dict[str, Any]], resolve: bool) -> Optional[Dict[str, Any]]:
+    # Large payloads/results live in the blob store; rows carry a stub + summary.
+    return blobs.resolve_row(row) if (row and resolve) else row
+
+
+def get(job_id: Any, *, resolve: bool = True, view: str = "full") -> Optional[Dict[str, Any]]:
+    """
+    ``view`` is "status", "summary" or "full" (services.contracts.jobs.JobView); the
+    cheap views never read payload/result bodies, so only "full" resolves blobs.
+    """
+    resolve = resolve and view == "full"
     if using_postgres_jobs():
-        return jobs_postgres.get_job(str(job_id))
-    return jobs_sqlite.get_job(job_id)
+        return _resolved(jobs_postgres.get_job(str(job_id), view=view), resolve)
+    return _resolved(jobs_sqlite.get_job(job_id, view=view), resolve)
 
 
-def get_job(job_id: Any) -> Optional[Dict[str, Any]]:
-    return get(job_id)
+def get_job(job_id: Any, *, resolve: bool = True, view: str = "full") -> Optional[Dict[str, Any]]:
+    return get(job_id, resolve=resolve, view=view)
 
 
-def get_job_for_org(job_id: str, org_id: str) -> Optional[Dict[str, Any]]:
+def get_job_for_org(
+    job_id: str, org_id: str, *, resolve: bool = True, view: str = "full"
+) -> Optional[Dict[str, Any]]:
+    resolve = resolve and view == "full"
     if using_postgres_jobs():
-        fn = getattr(jobs_postgres, "get_job_for_org", None)
-        if fn is None:
-            return jobs_postgres.get_job(str(job_id))
-        return fn(str(job_id), str(org_id))
-    fn2 = getattr(jobs_sqlite, "get_job_for_org", None)
-    if fn2 is None:
-        return jobs_sqlite.get_job(job_id)
-    return fn2(str(job_id), str(org_id))
+        return _resolved(jobs_postgres.get_job_for_org(str(job_id), str(org_id), view=view), resolve)
+    return _resolved(jobs_sqlite.get_job_for_org(str(job_id), str(org_id), view=view), resolve)
 
 
-def list_recent(limit: int = 50) -> Iterable[Dict[str, Any]]:
+def list_recent(limit: int = 50, *, view: str = "full") -> Iterable[Dict[str, Any]]:
     if using_postgres_jobs():
         return []
-    return jobs_sqlite.list_recent(limit=limit)
+    return jobs_sqlite.list_recent(limit=limit, view=view)
 
 
-def list_recent_for_org(*, org_id: str, limit: int = 50) -> Iterable[Dict[str, Any]]:
+def list_recent_for_org(
+    *,
+    org_id: str,
+    limit: int = 50,
+    view: str = "full",
+    after: Optional[tuple[Any, Any]] = None,
+    status: Optional[str] = None,
+    task: Optional[str] = None,
+    project_id: Optional[str] = None,
+) -> Iterable[Dict[str, Any]]:
+    filters = {"after": after, "status": status, "task": task, "project_id": project_id}
     if using_postgres_jobs():
-        fn = getattr(jobs_postgres, "jobs_list_recent_for_org", None) or getattr(
-            jobs_postgres, "list_recent_for_org", None
+        return jobs_postgres.list_recent_for_org(org_id=str(org_id), limit=int(limit), view=view, **filters)
+    return jobs_sqlite.list_recent_for_org(org_id=org_id, limit=limit, view=view, **filters)
+
+
+def list_page_for_org(
+    *,
+    org_id: str,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    view: str = "full",
+    status: Optional[str] = None,
+    task: Optional[str] = None,
+    project_id: Optional[str] = None,
+) -> tuple[list[Dict[str, Any]], Optional[str]]:
+    """
+    One page of an org's jobs plus the opaque cursor for the next page (None on the
+    last page). Raises ValueError for a malformed cursor.
+    """
+    after = decode_cursor(cursor) if cursor else None
+    lim = max(1, int(limit))
+    rows = list(
+        list_recent_for_org(
+            org_id=org_id,
+            limit=lim + 1,
+            view=view,
+            after=after,
+            status=status,
+            task=task,
+            project_id=project_id,
         )
-        if fn is None:
-            return []
-        return fn(org_id=str(org_id), limit=int(limit))
-    return jobs_sqlite.list_recent_for_org(org_id=org_id, limit=limit)
+    )
+    return split_page(rows, lim)
+
+
+def split_page(rows: list[Dict[str, Any]], limit: int) -> tuple[list[Dict[str, Any]], Optional[str]]:
+    """``limit`` rows plus the next cursor, from a ``limit + 1`` fetch."""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1].get("created_at"), rows[-1].get("id"))
+
+
+def claim_one_job(
+    *, worker_id: str = "worker", lease_seconds: int = 300, tasks: Optional[list[str]] = None
+) -> Dict[str, Any] | None:
+    rows = claim_jobs(worker_id=worker_id, n=1, lease_seconds=lease_seconds, tasks=tasks)
+    return rows[0] if rows else None
+
+
+def claim_jobs(
+    *, worker_id: str = "worker", n: int = 1, lease_seconds: int = 300, tasks: Optional[list[str]] = None
+) -> list[Dict[str, Any]]:
+    """``tasks`` restricts the claim to a worker's subscription (None = any task)."""
+    if using_postgres_jobs():
+        rows = jobs_postgres.claim_jobs(worker_id=worker_id, n=int(n), lease_seconds=lease_seconds, tasks=tasks)
+    else:
+        ensure_schema()
+        rows = jobs_sqlite.claim_jobs(n=int(n), tasks=tasks)
+    # whoever claims a job runs it, so it always needs the full payload
+    return [blobs.resolve_row(r, fields=("payload",)) for r in rows]
 
-def claim_one_job(*, worker_id: str = "worker", lease_seconds: int = 300) -> Dict[str, Any] | None:
+
+def queue_depth() -> Dict[str, Any]:
+    """Queued/working counts per task and per task class (see services.queue.task_classes)."""
+    by_task = jobs_postgres.queue_depth_by_task() if using_postgres_jobs() else jobs_sqlite.queue_depth_by_task()
+    return {"tasks": by_task, "classes": task_classes.depth_by_class(by_task)}
+
+
+def renew_leases(*, job_ids: list[str], worker_id: str, lease_seconds: int = 300) -> list[str]:
+    if not using_postgres_jobs():
+        return [str(j) for j in job_ids]
+    return jobs_postgres.renew_leases(
+        job_ids=[str(j) for j in job_ids], worker_id=worker_id, lease_seconds=int(lease_seconds)
+    )
+
+
+def release_jobs(*, job_ids: list[str], worker_id: str) -> int:
     if using_postgres_jobs():
-        return jobs_postgres.claim_one_job(worker_id=worker_id, lease_seconds=lease_seconds)
-    ensure_schema()
-    return jobs_sqlite.claim_one_job()
+        return jobs_postgres.release_jobs(job_ids=[str(j) for j in job_ids], worker_id=worker_id)
+    return jobs_sqlite.release_jobs(list(job_ids))
 
 
 
-def heartbeat(*, job_id: str, worker_id: str | None = None, lease_seconds: int = 300) -> bool:
+def heartbeat(*, job_id: str, worker_id: str | None = None, lease_seconds: int = 300) -> str:
+    """"ok", "cancel" (a cancel was requested) or "lost"; SQLite has no leases to extend."""
     if not using_postgres_jobs():
-        return True
-    fn = getattr(jobs_postgres, "heartbeat", None)
-    if fn is None:
-        return True
-    try:
-        return bool(fn(job_id=str(job_id), worker_id=worker_id, lease_seconds=int(lease_seconds)))
-    except TypeError:
-        try:
-            return bool(fn(job_id=str(job_id)))
-        except TypeError:
-            return True
+        return jobs_sqlite.heartbeat(job_id)
+    return jobs_postgres.heartbeat(job_id=str(job_id), worker_id=worker_id, lease_seconds=int(lease_seconds))
 
 
 def requeue_expired(limit: int = 25) -> int:
     if not using_postgres_jobs():
         return 0
-    fn = getattr(jobs_postgres, "requeue_expired", None)
-    if fn is None:
+    return jobs_postgres.requeue_expired(limit=int(limit))
+
+
+def sweep_expired_leases(*, batch_size: int = 500, max_batches: int = 20) -> int | None:
+    if not using_postgres_jobs():
         return 0
-    try:
-        return int(fn(limit=int(limit)))
-    except TypeError:
-        return int(fn())
+    return jobs_postgres.sweep_expired_leases(batch_size=int(batch_size), max_batches=int(max_batches))
+
+
+def task_run_p95(task: str) -> tuple[float | None, int]:
+    if not using_postgres_jobs():
+        return None, 0
+    return jobs_postgres.task_run_p95(str(task))
+
+
+def memo_get(key: str) -> Dict[str, Any] | None:
+    """Cached result of a deterministic task (see services.queue.memo)."""
+    if using_postgres_jobs():
+        return jobs_postgres.memo_get(key)
+    return jobs_sqlite.memo_get(key)
+
+
+def memo_put(key: str, task: str, result: Dict[str, Any]) -> None:
+    if using_postgres_jobs():
+        jobs_postgres.memo_put(key, task, result)
+    else:
+        jobs_sqlite.memo_put(key, task, result)
 
 
 def finish_job(job_id: str | int, result: Dict[str, Any]) -> None:
@@ -165,3 +314,33 @@ def fail_job(job_id: str | int, error: Any) -> None:
         fn(str(job_id), error)
         return
     jobs_sqlite.fail_job(job_id, error)
+
+
+def retry_job(job_id: str | int, error: Any, *, task: str | None = None) -> str | None:
+    """Record a failed attempt under the task's retry policy; returns queued/dead/error."""
+    policy = retry.policy_for(task)
+    if using_postgres_jobs():
+        return jobs_postgres.retry_job(str(job_id), error, policy=policy)
+    return jobs_sqlite.retry_job(job_id, error, policy=policy)
+
+
+def cancel_job(job_id: str | int, *, org_id: str | None = None) -> Optional[Dict[str, Any]]:
+    """Cancel a job and the rest of its run; see jobs_postgres.cancel_job. None if not found."""
+    if using_postgres_jobs():
+        return jobs_postgres.cancel_job(str(job_id), org_id=str(org_id) if org_id else None)
+    return jobs_sqlite.cancel_job(job_id, org_id=org_id)
+
+
+def mark_cancelled(job_id: str | int) -> bool:
+    if using_postgres_jobs():
+        return jobs_postgres.mark_cancelled(str(job_id))
+    return jobs_sqlite.mark_cancelled(job_id)
+
+
+def defer_job(
+    job_id: str | int, *, payload: Dict[str, Any], wait_on: list[Any], wait_for: str = "finished"
+) -> str | None:
+    """Park a working job until ``wait_on`` settle, storing ``payload``; see services.queue.defer."""
+    if using_postgres_jobs():
+        return jobs_postgres.defer_job(str(job_id), payload=payload, wait_on=list(wait_on), wait_for=wait_for)
+    return jobs_sqlite.defer_job(job_id, payload=payload, wait_on=list(wait_on), wait_for=wait_for)
@@ -0,0 +1,198 @@
+# services/queue/queue_async.py
+"""
+Async variant of services.queue.queue_api for code running on an event loop
+(the FastAPI app), so a database round-trip never stalls other requests.
+
+Postgres reads and dependency-free enqueues run natively on psycopg's
+AsyncConnectionPool (services.queue.jobs_postgres_async). Everything else
+(SQLite, blob-store I/O, enqueues with dependency edges) runs the sync
+queue_api call on a bounded thread pool of ``VELU_QUEUE_THREADS`` (default 8)
+threads, so a slow disk queues up there instead of on the loop or in
+AnyIO's shared pool.
+"""
+from __future__ import annotations
+
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+from services.contracts.jobs import decode_cursor
+from services.queue import blobs, jobs_postgres_async, memo, queue_api, using_postgres_jobs
+from services.queue.base import dependency_ids
+
+T = TypeVar("T")
+
+_lock = threading.Lock()
+_pool: ThreadPoolExecutor | None = None
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _pool
+    with _lock:
+        if _pool is None:
+            try:
+                n = int((os.getenv("VELU_QUEUE_THREADS") or "").strip() or 8)
+            except ValueError:
+                n = 8
+            _pool = ThreadPoolExecutor(max_workers=max(1, n), thread_name_prefix="velu-queue")
+        return _pool
+
+
+async def run_sync(fn: Callable[..., T], /, *args: Any, **kwargs: Any) -> T:
+    """Run a blocking queue call on the bounded queue thread pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor(), functools.partial(fn, *args, **kwargs))
+
+
+def shutdown() -> None:
+    global _pool
+    with _lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def _resolved(row: Optional[Dict[str, Any]], resolve: bool) -> Optional[Dict[str, Any]]:
+    if not (row and resolve and any(blobs.is_stub(row.get(f)) for f in ("payload", "result"))):
+        return row
+    return await run_sync(blobs.resolve_row, row)
+
+
+async def enqueue(
+    task_obj: Dict[str, Any] | None = None,
+    *,
+    task: str | None = None,
+    payload: Dict[str, Any] | None = None,
+    priority: int = 0,
+    key: str | None = None,
+    org_id: str | None = None,
+    project_id: str | None = None,
+    created_by: str | None = None,
+    actor_type: str | None = None,
+    actor_id: str | None = None,
+    require_tenant: bool = False,
+) -> str | int:
+    job = queue_api.build_job(task_obj, task=task, payload=payload)
+    if created_by is None and actor_id is not None:
+        created_by = str(actor_id)
+    if not using_postgres_jobs() or not org_id or dependency_ids(job["payload"]):
+        return await run_sync(
+            queue_api.enqueue,
+            job,
+            priority=priority,
+            key=key,
+            org_id=org_id,
+            project_id=project_id,
+            created_by=created_by,
+            actor_type=actor_type,
+            actor_id=actor_id,
+            require_tenant=require_tenant,
+        )
+    job["payload"] = await run_sync(blobs.offload, job["payload"])
+    return await jobs_postgres_async.enqueue_job(
+        job,
+        org_id=str(org_id),
+        project_id=str(project_id) if project_id else None,
+        actor_type=str(actor_type or "api_key"),
+        actor_id=str(actor_id) if actor_id else (str(created_by) if created_by else None),
+        priority=int(priority),
+        idempotency_key=key,
+        memo_key=memo.enqueue_key(job),
+    )
+
+
+enqueue_job = enqueue
+
+
+async def get(job_id: Any, *, resolve: bool = True, view: str = "full") -> Optional[Dict[str, Any]]:
+    if not using_postgres_jobs():
+        return await run_sync(queue_api.get, job_id, resolve=resolve, view=view)
+    row = await jobs_postgres_async.get_job(str(job_id), view=view)
+    return await _resolved(row, resolve and view == "full")
+
+
+get_job = get
+
+
+async def get_job_for_org(
+    job_id: str, org_id: str, *, resolve: bool = True, view: str = "full"
+) -> Optional[Dict[str, Any]]:
+    if not using_postgres_jobs():
+        return await run_sync(queue_api.get_job_for_org, job_id, org_id, resolve=resolve, view=view)
+    row = await jobs_postgres_async.get_job_for_org(str(job_id), str(org_id), view=view)
+    return await _resolved(row, resolve and view == "full")
+
+
+async def project_belongs_to_org(project_id: str, org_id: str) -> bool:
+    if not using_postgres_jobs():
+        from services.queue import jobs_sqlite
+
+        return bool(await run_sync(jobs_sqlite.project_belongs_to_org, project_id, org_id))
+    return await jobs_postgres_async.project_belongs_to_org(project_id, org_id)
+
+
+async def list_recent(limit: int = 50, *, view: str = "full") -> list[Dict[str, Any]]:
+    return list(await run_sync(queue_api.list_recent, limit, view=view))
+
+
+async def list_recent_for_org(
+    *,
+    org_id: str,
+    limit: int = 50,
+    view: str = "full",
+    after: Optional[tuple[Any, Any]] = None,
+    status: Optional[str] = None,
+    task: Optional[str] = None,
+    project_id: Optional[str] = None,
+) -> list[Dict[str, Any]]:
+    filters = {"after": after, "status": status, "task": task, "project_id": project_id}
+    if not using_postgres_jobs():
+        return list(await run_sync(queue_api.list_recent_for_org, org_id=org_id, limit=limit, view=view, **filters))
+    return await jobs_postgres_async.list_recent_for_org(org_id=str(org_id), limit=int(limit), view=view, **filters)
+
+
+async def list_page_for_org(
+    *,
+    org_id: str,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    view: str = "full",
+    status: Optional[str] = None,
+    task: Optional[str] = None,
+    project_id: Optional[str] = None,
+) -> tuple[list[Dict[str, Any]], Optional[str]]:
+    """See queue_api.list_page_for_org; raises ValueError for a malformed cursor."""
+    after = decode_cursor(cursor) if cursor else None
+    lim = max(1, int(limit))
+    rows = await list_recent_for_org(
+        org_id=org_id, limit=lim + 1, view=view, after=after, status=status, task=task, project_id=project_id
+    )
+    return queue_api.split_page(rows, lim)
+
+
+async def cancel_job(job_id: str, *, org_id: str | None = None) -> Optional[Dict[str, Any]]:
+    return await run_sync(queue_api.cancel_job, job_id, org_id=org_id)
+
+
+async def queue_depth() -> Dict[str, Any]:
+    return await run_sync(queue_api.queue_depth)
+
+
+__all__ = [
+    "cancel_job",
+    "enqueue",
+    "enqueue_job",
+    "get",
+    "get_job",
+    "get_job_for_org",
+    "list_page_for_org",
+    "list_recent",
+    "list_recent_for_org",
+    "project_belongs_to_org",
+    "queue_depth",
+    "run_sync",
+    "shutdown",
+]
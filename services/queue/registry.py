@@ -0,0 +1,158 @@
+# services/queue/registry.py
+"""
+Task name -> handler registry, resolved lazily.
+
+Handlers are declared as ``"module:attribute"`` strings and imported on first
+use, so code that only needs the task names (the API's allow-lists, task
+policies, subscriptions) never imports agent modules. The worker resolves a
+handler the first time it dispatches that task; the prefork supervisor calls
+:meth:`LazyHandlers.load_all` before forking.
+
+``local_tasks`` (repo root) may replace ``repo_summary``, and ``execute`` /
+``test`` too with ``VELU_ALLOW_LOCAL_CORE_TASKS=1``; it is imported on the
+first resolve of one of those tasks.
+"""
+from __future__ import annotations
+
+import importlib
+import logging
+import os
+import threading
+from typing import Any, Callable, Iterator, Mapping, MutableMapping
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[..., Any]
+
+TASK_HANDLERS: dict[str, str] = {
+    "requirements": "services.agents.requirements:handle",
+    "architecture": "services.agents.architecture:handle",
+    "datamodel": "services.agents.datamodel:handle",
+    "api_design": "services.agents.api_design:handle",
+    "ui_scaffold": "services.agents.ui_scaffold:handle",
+    "backend_scaffold": "services.agents.backend_scaffold:handle",
+    "ai_features": "services.agents.ai_features:handle",
+    "security_hardening": "services.agents.security_hardening:handle",
+    "testgen": "services.agents.testgen:handle",
+    "pipeline": "services.agents.pipeline_runner:handle",
+    "plan": "services.agents.planner:handle",
+    "aggregate": "services.agents.aggregate:handle",
+    "gitcommit": "services.agents.gitcommit:handle",
+    "codegen": "services.agents.codegen:handle",
+    "execute": "services.agents.executor:handle",
+    "test": "services.agents.tester:handle",
+    "report": "services.agents.report:handle",
+    "intake": "services.agents.intake:handle",
+    "chat": "services.agents.chat:handle_async",
+    "hospital_codegen": "services.agents.hospital_codegen:handle",
+    "hospital_apply_patches": "services.agents.hospital_apply_patches:handle",
+    "packager": "services.agents.packager:handle",
+    "autodev": "services.agents.autodev:handle",
+    "repo_summary": "services.agents.repo_summary:handle",
+    "security_scan": "services.agents.security_scan:handle",
+    "pipeline_waiter": "services.agents.pipeline_waiter:handle",
+    "sleep": "services.agents.sleep:handle",
+}
+
+LOCAL_TASKS = ("repo_summary",)
+LOCAL_CORE_TASKS = ("execute", "test")
+
+_local_lock = threading.Lock()
+_local_loaded = False
+_local_module: Any = None
+
+
+def _local_tasks() -> Any:
+    global _local_loaded, _local_module
+    with _local_lock:
+        if not _local_loaded:
+            _local_loaded = True
+            try:
+                _local_module = importlib.import_module("local_tasks")
+            except Exception as exc:
+                logger.warning("local_tasks overrides not loaded: %s", exc)
+        return _local_module
+
+
+def _local_override(name: str) -> Handler | None:
+    allowed = LOCAL_TASKS
+    if (os.getenv("VELU_ALLOW_LOCAL_CORE_TASKS") or "").strip().lower() in {"1", "true", "yes"}:
+        allowed = LOCAL_TASKS + LOCAL_CORE_TASKS
+    if name not in allowed:
+        return None
+    fn = getattr(_local_tasks(), name, None)
+    if fn is not None:
+        logger.info("local_tasks override: %s -> %r", name, fn)
+    return fn
+
+
+def resolve(spec: str) -> Handler:
+    """Import ``"package.module:attribute"`` and return the attribute."""
+    module, _, attr = spec.partition(":")
+    return getattr(importlib.import_module(module), attr or "handle")
+
+
+class LazyHandlers(MutableMapping[str, Handler]):
+    """
+    Mapping of task name to handler that imports each handler on first access.
+    Values may be set to callables (tests, plugins) or to ``"module:attr"`` specs.
+    Iterating, ``in`` and ``len`` only look at the names.
+    """
+
+    def __init__(self, specs: Mapping[str, str | Handler], *, local_overrides: bool = False) -> None:
+        self._specs: dict[str, str | Handler] = dict(specs)
+        self._loaded: dict[str, Handler] = {}
+        self._local_overrides = local_overrides
+        self._lock = threading.RLock()
+
+    def __getitem__(self, name: str) -> Handler:
+        fn = self._loaded.get(name)
+        if fn is not None:
+            return fn
+        with self._lock:
+            spec = self._specs[name]
+            if name not in self._loaded:
+                fn = _local_override(name) if self._local_overrides else None
+                self._loaded[name] = fn or (resolve(spec) if isinstance(spec, str) else spec)
+            return self._loaded[name]
+
+    def __setitem__(self, name: str, value: str | Handler) -> None:
+        with self._lock:
+            self._specs[name] = value
+            self._loaded.pop(name, None)
+
+    def __delitem__(self, name: str) -> None:
+        with self._lock:
+            del self._specs[name]
+            self._loaded.pop(name, None)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._specs))
+
+    def __len__(self) -> int:
+        return len(self._specs)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._specs
+
+    def spec(self, name: str) -> str | Handler:
+        return self._specs[name]
+
+    def load_all(self) -> None:
+        """Import every handler now (e.g. before forking workers)."""
+        for name in list(self._specs):
+            try:
+                self[name]
+            except Exception as exc:
+                logger.warning("handler %s failed to load: %s", name, exc)
+
+
+HANDLERS = LazyHandlers(TASK_HANDLERS, local_overrides=True)
+
+
+def task_names() -> list[str]:
+    """Every queue task name, without importing any handler."""
+    return list(HANDLERS)
+
+
+__all__ = ["HANDLERS", "LazyHandlers", "TASK_HANDLERS", "resolve", "task_names"]
@@ -0,0 +1,142 @@
+# services/queue/retry.py
+"""
+Per-task retry policy, delayed execution and dead-lettering.
+
+A failed attempt is retried while ``attempts < max_attempts``: the job goes back
+to ``queued`` with ``run_at`` pushed out by exponential backoff,
+
+    delay = min(max_delay, base_delay * 2 ** (attempts - 1)), minus up to ``jitter`` of it
+
+so a burst of failures does not retry in lockstep. Exhausted jobs become
+``dead`` (or ``error`` when the task has no retries at all). Jobs whose lease
+expires ``max_attempts`` times (crash loops) are dead-lettered by the sweeper.
+
+Defaults come from ``VELU_RETRY_MAX_ATTEMPTS`` (3), ``VELU_RETRY_BASE_SEC`` (5),
+``VELU_RETRY_MAX_SEC`` (300) and ``VELU_RETRY_JITTER`` (0.5). Per-task overrides:
+``VELU_RETRY_POLICIES="test=5:10:600;chat=2"`` (``max_attempts[:base[:max]]``).
+"""
+from __future__ import annotations
+
+import os
+import random
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Mapping
+
+
+class RetryLater(RuntimeError):
+    """
+    Raised by a handler that cannot make progress yet; the worker records a failed
+    attempt under the task's policy (requeue with backoff) instead of storing the
+    exception as the job's result.
+    """
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float((os.getenv(name) or "").strip() or default)
+    except Exception:
+        return default
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    max_attempts: int = 3
+    base_delay: float = 5.0
+    max_delay: float = 300.0
+    jitter: float = 0.5
+
+    def delay_for(self, attempts: int, rand: Callable[[], float] = random.random) -> float:
+        """Backoff before the attempt following ``attempts`` failed ones."""
+        d = min(self.max_delay, self.base_delay * (2 ** max(0, int(attempts) - 1)))
+        return max(0.0, d * (1.0 - min(1.0, max(0.0, self.jitter)) * rand()))
+
+    def decide(self, attempts: int) -> tuple[str, float | None]:
+        """("queued", delay) while attempts remain, else the terminal status."""
+        if int(attempts) < self.max_attempts:
+            return "queued", self.delay_for(attempts)
+        return ("dead" if self.max_attempts > 1 else "error"), None
+
+
+# Tasks with side effects that must not be replayed blindly (commits, enqueueing
+# whole pipelines/cycles).
+DEFAULT_TASK_POLICIES: dict[str, dict[str, Any]] = {
+    "gitcommit": {"max_attempts": 1},
+    "hospital_apply_patches": {"max_attempts": 1},
+    "pipeline": {"max_attempts": 1},
+    "autodev": {"max_attempts": 1},
+    # Only retried when run ahead of its stages (no dependency edges): re-check
+    # with backoff instead of holding a worker.
+    "pipeline_waiter": {"max_attempts": 20, "base_delay": 1.0, "max_delay": 30.0},
+}
+
+
+def default_policy() -> RetryPolicy:
+    return RetryPolicy(
+        max_attempts=max(1, int(_env_float("VELU_RETRY_MAX_ATTEMPTS", 3))),
+        base_delay=max(0.0, _env_float("VELU_RETRY_BASE_SEC", 5.0)),
+        max_delay=max(0.0, _env_float("VELU_RETRY_MAX_SEC", 300.0)),
+        jitter=_env_float("VELU_RETRY_JITTER", 0.5),
+    )
+
+
+def _env_overrides() -> dict[str, dict[str, Any]]:
+    out: dict[str, dict[str, Any]] = {}
+    for part in (os.getenv("VELU_RETRY_POLICIES") or "").split(";"):
+        task, _, spec = part.partition("=")
+        task = task.strip()
+        if not task or not spec.strip():
+            continue
+        fields = [f.strip() for f in spec.split(":")]
+        try:
+            o: dict[str, Any] = {"max_attempts": max(1, int(fields[0]))}
+            if len(fields) > 1 and fields[1]:
+                o["base_delay"] = float(fields[1])
+            if len(fields) > 2 and fields[2]:
+                o["max_delay"] = float(fields[2])
+        except ValueError:
+            continue
+        out[task] = o
+    return out
+
+
+def task_policies() -> dict[str, RetryPolicy]:
+    """Every task with a non-default policy."""
+    base = default_policy()
+    merged = {**DEFAULT_TASK_POLICIES, **_env_overrides()}
+    return {task: replace(base, **o) for task, o in merged.items()}
+
+
+def policy_for(task: str | None) -> RetryPolicy:
+    return task_policies().get((task or "").strip()) or default_policy()
+
+
+def parse_run_at(job: Mapping[str, Any]) -> datetime | None:
+    """
+    ``run_at`` (datetime, ISO-8601 string or epoch seconds) or ``delay_seconds``
+    from a job dict, as an aware UTC datetime. None means "now".
+    """
+    raw = job.get("run_at")
+    if raw is None or raw == "":
+        delay = job.get("delay_seconds")
+        if delay is None or delay == "":
+            return None
+        return datetime.now(timezone.utc) + timedelta(seconds=max(0.0, float(delay)))
+    if isinstance(raw, datetime):
+        dt = raw
+    elif isinstance(raw, (int, float)):
+        dt = datetime.fromtimestamp(float(raw), tz=timezone.utc)
+    else:
+        dt = datetime.fromisoformat(str(raw).strip().replace("Z", "+00:00"))
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+__all__ = [
+    "DEFAULT_TASK_POLICIES",
+    "RetryLater",
+    "RetryPolicy",
+    "default_policy",
+    "parse_run_at",
+    "policy_for",
+    "task_policies",
+]
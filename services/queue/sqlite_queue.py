@@ -130,7 +130,8 @@ def _ensure_jobs_schema(con: sqlite3.Connection) -> None:
             con.execute(f"ALTER TABLE jobs ADD COLUMN {name} {decl}")
 
     con.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status)")
-    con.execute("CREATE INDEX IF NOT EXISTS idx_jobs_key ON jobs(key)")
+    con.execute("CREATE INDEX IF NOT EXISTS idx_jobs_key_created ON jobs(key, created_at)")
+    con.execute("DROP INDEX IF EXISTS idx_jobs_key")  # superseded by idx_jobs_key_created
     con.execute("CREATE INDEX IF NOT EXISTS idx_jobs_next_run ON jobs(next_run_at)")
     con.execute("CREATE INDEX IF NOT EXISTS idx_jobs_priority ON jobs(priority)")
 
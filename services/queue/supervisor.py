@@ -0,0 +1,331 @@
+# services/queue/supervisor.py
+"""
+Prefork worker supervisor.
+
+``python -m services.queue.supervisor`` imports the handler registry once and
+forks pools of ordinary workers (worker_entry.worker_main) from it, so children
+start without paying the agent import cost again. Each pool claims one
+subscription (task classes or task names, see services.queue.task_classes) and
+keeps between ``min`` and ``max`` children::
+
+    VELU_SUPERVISOR_POOLS="heavy=1:2;fast,standard=2:8"
+
+Every ``VELU_SUPERVISOR_SCALE_SEC`` (5) the supervisor reads the queue backlog
+and sizes each pool to one child per ``VELU_SUPERVISOR_JOBS_PER_CHILD`` (1)
+queued jobs of its tasks, within bounds. It grows at once and shrinks by one
+child at a time once the backlog has stayed lower for
+``VELU_SUPERVISOR_SCALE_DOWN_SEC`` (60); a retired child finishes its current
+job first (SIGUSR1). Children exit and are replaced after
+``VELU_SUPERVISOR_MAX_JOBS`` (1000) jobs or once their RSS has grown by
+``VELU_SUPERVISOR_MAX_RSS_GROWTH_MB`` (512) since start; 0 disables either.
+
+Set ``PROMETHEUS_MULTIPROC_DIR`` so the children's metrics reach /metrics.
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import logging
+import math
+import multiprocessing
+import os
+import resource
+import signal
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+from services.queue import jobs as jobs_api
+from services.queue.drain import grace_seconds
+from services.queue.task_classes import parse_subscription
+
+logger = logging.getLogger(__name__)
+
+# A child that dies this soon after starting is crashing; restarts back off.
+_CRASH_WINDOW_SEC = 10.0
+_MAX_RESTART_DELAY_SEC = 60.0
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float((os.getenv(name) or "").strip() or default)
+    except ValueError:
+        return float(default)
+
+
+def rss_mb() -> float:
+    """Current resident set size of this process, in MiB."""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as fh:
+            pages = int(fh.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        # Peak RSS (KiB on Linux): still only grows, which is what the check needs.
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Recycle:
+    """
+    When a worker should exit so it can be replaced: after ``max_jobs`` jobs, once
+    its RSS grew by ``max_growth_mb``, or when retired. Checked between jobs.
+    """
+
+    def __init__(self, *, max_jobs: int = 0, max_growth_mb: float = 0) -> None:
+        self.max_jobs = max(0, int(max_jobs))
+        self.max_growth_mb = max(0.0, float(max_growth_mb))
+        self.baseline_mb = rss_mb()
+        self._retire = threading.Event()
+
+    def retire(self, *_: Any) -> None:
+        """Exit after the current job (usable as a signal handler)."""
+        self._retire.set()
+
+    @property
+    def retiring(self) -> bool:
+        return self._retire.is_set()
+
+    def reason(self, processed: int) -> str | None:
+        if self._retire.is_set():
+            return "retired"
+        if self.max_jobs and processed >= self.max_jobs:
+            return f"{processed} jobs"
+        if self.max_growth_mb:
+            grown = rss_mb() - self.baseline_mb
+            if grown >= self.max_growth_mb:
+                return f"rss grew {grown:.0f}MB"
+        return None
+
+
+@dataclass
+class PoolSpec:
+    subscription: str
+    min: int
+    max: int
+
+    @property
+    def name(self) -> str:
+        return self.subscription or "all"
+
+
+def parse_pools(spec: str | None = None, *, cpus: int | None = None) -> list[PoolSpec]:
+    """``"heavy=1:2;fast,standard=2:8"``; ``=n`` means a fixed size. Default: heavy and the rest."""
+    raw = (spec if spec is not None else os.getenv("VELU_SUPERVISOR_POOLS") or "").strip()
+    if not raw:
+        n = max(1, cpus or os.cpu_count() or 1)
+        return [PoolSpec("heavy", 1, max(1, n // 2)), PoolSpec("fast,standard", 1, n)]
+    out: list[PoolSpec] = []
+    for part in raw.split(";"):
+        sub, sep, size = part.strip().rpartition("=")
+        if not sep or not size.strip():
+            raise ValueError(f"pool {part!r}: expected <tasks>=<min>:<max>")
+        lo, _, hi = size.partition(":")
+        lo_n = int(lo)
+        hi_n = int(hi) if hi.strip() else lo_n
+        if lo_n < 0 or hi_n < max(1, lo_n):
+            raise ValueError(f"pool {part!r}: need 0 <= min <= max, max >= 1")
+        out.append(PoolSpec(sub.strip(), lo_n, hi_n))
+    return out
+
+
+def desired_size(pool: PoolSpec, backlog: int, per_child: int) -> int:
+    return max(pool.min, min(pool.max, math.ceil(max(0, backlog) / max(1, per_child))))
+
+
+_CHILD_SIGNALS = {signal.SIGTERM, signal.SIGINT, signal.SIGUSR1}
+
+
+def _child_main(subscription: str, max_jobs: int, max_growth_mb: float) -> None:
+    from services.queue import worker_entry
+
+    # One port can only be bound once; children report via PROMETHEUS_MULTIPROC_DIR.
+    os.environ.pop("VELU_WORKER_METRICS_PORT", None)
+    recycle = Recycle(max_jobs=max_jobs, max_growth_mb=max_growth_mb)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGUSR1, recycle.retire)
+    # Blocked by the parent around fork; anything sent meanwhile is delivered now.
+    signal.pthread_sigmask(signal.SIG_UNBLOCK, _CHILD_SIGNALS)
+    worker_entry.worker_main(subscription or None, recycle=recycle)
+
+
+@dataclass
+class _Pool:
+    spec: PoolSpec
+    tasks: list[str] | None
+    target: int
+    children: list[Any] = field(default_factory=list)
+    retiring: set[int] = field(default_factory=set)
+    started: dict[int, float] = field(default_factory=dict)
+    restart_delay: float = 0.0
+    restart_at: float = 0.0
+    lowered_since: float | None = None
+
+    def live(self) -> list[Any]:
+        return [p for p in self.children if p.pid not in self.retiring]
+
+
+class Supervisor:
+    def __init__(
+        self,
+        pools: list[PoolSpec],
+        *,
+        per_child: int | None = None,
+        scale_interval: float | None = None,
+        scale_down_after: float | None = None,
+        max_jobs: int | None = None,
+        max_growth_mb: float | None = None,
+    ) -> None:
+        self.per_child = int(per_child or _env_float("VELU_SUPERVISOR_JOBS_PER_CHILD", 1))
+        self.scale_interval = max(0.1, scale_interval or _env_float("VELU_SUPERVISOR_SCALE_SEC", 5))
+        self.scale_down_after = (
+            scale_down_after if scale_down_after is not None else _env_float("VELU_SUPERVISOR_SCALE_DOWN_SEC", 60)
+        )
+        self.max_jobs = int(max_jobs if max_jobs is not None else _env_float("VELU_SUPERVISOR_MAX_JOBS", 1000))
+        self.max_growth_mb = (
+            max_growth_mb if max_growth_mb is not None else _env_float("VELU_SUPERVISOR_MAX_RSS_GROWTH_MB", 512)
+        )
+        self._ctx = multiprocessing.get_context("fork")
+        self._stop = threading.Event()
+        self.pools = [_Pool(spec=s, tasks=None, target=s.min) for s in pools]
+
+    def preload(self) -> None:
+        """Import the worker and every handler in the parent so children inherit them."""
+        from services.queue import worker_entry
+
+        worker_entry.HANDLERS.load_all()
+        for pool in self.pools:
+            pool.tasks = parse_subscription(pool.spec.subscription or None, worker_entry.HANDLERS.keys())
+
+    def stop(self, *_: Any) -> None:
+        self._stop.set()
+
+    def _spawn(self, pool: _Pool) -> None:
+        proc = self._ctx.Process(
+            target=_child_main,
+            args=(pool.spec.subscription, self.max_jobs, self.max_growth_mb),
+            name=f"velu-worker[{pool.spec.name}]",
+            daemon=False,
+        )
+        # Until the child has installed its own handlers it would run the parent's.
+        signal.pthread_sigmask(signal.SIG_BLOCK, _CHILD_SIGNALS)
+        try:
+            proc.start()
+        finally:
+            signal.pthread_sigmask(signal.SIG_UNBLOCK, _CHILD_SIGNALS)
+        pool.children.append(proc)
+        pool.started[proc.pid] = time.monotonic()
+        print(f"supervisor: started {pool.spec.name} pid={proc.pid}", flush=True)
+
+    def _reap(self, pool: _Pool) -> None:
+        now = time.monotonic()
+        for proc in [p for p in pool.children if not p.is_alive()]:
+            proc.join(0)
+            pool.children.remove(proc)
+            pool.retiring.discard(proc.pid)
+            lived = now - pool.started.pop(proc.pid, now)
+            if proc.exitcode != 0 and lived < _CRASH_WINDOW_SEC:
+                pool.restart_delay = min(_MAX_RESTART_DELAY_SEC, max(1.0, pool.restart_delay * 2))
+                pool.restart_at = now + pool.restart_delay
+            elif proc.exitcode == 0:
+                pool.restart_delay = 0.0
+            print(f"supervisor: {pool.spec.name} pid={proc.pid} exited {proc.exitcode}", flush=True)
+
+    def scale(self, backlog_by_task: dict[str, dict[str, int]]) -> None:
+        now = time.monotonic()
+        for pool in self.pools:
+            backlog = sum(
+                int(c.get("queued", 0))
+                for task, c in backlog_by_task.items()
+                if pool.tasks is None or task in pool.tasks
+            )
+            want = desired_size(pool.spec, backlog, self.per_child)
+            if want >= pool.target:
+                pool.lowered_since = None
+                if want > pool.target:
+                    print(f"supervisor: {pool.spec.name} {pool.target} -> {want} (backlog {backlog})", flush=True)
+                    pool.target = want
+                continue
+            if pool.lowered_since is None:
+                pool.lowered_since = now
+            if now - pool.lowered_since >= self.scale_down_after:
+                print(f"supervisor: {pool.spec.name} {pool.target} -> {pool.target - 1} (backlog {backlog})", flush=True)
+                pool.target -= 1
+                pool.lowered_since = now
+
+    def _converge(self, pool: _Pool) -> None:
+        live = pool.live()
+        for proc in live[pool.target :]:
+            pool.retiring.add(proc.pid)
+            with contextlib.suppress(ProcessLookupError):
+                os.kill(proc.pid, signal.SIGUSR1)
+        if len(live) < pool.target and time.monotonic() >= pool.restart_at:
+            for _ in range(pool.target - len(live)):
+                self._spawn(pool)
+
+    def _scale_from_queue(self) -> None:
+        try:
+            depth = jobs_api.queue_depth()["tasks"]
+        except Exception as exc:
+            logger.warning("supervisor: queue depth unavailable: %s", exc)
+            return
+        self.scale(depth)
+
+    def run(self) -> None:
+        jobs_api.ensure_schema()
+        self.preload()
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        print(
+            "supervisor: pools "
+            + " ".join(f"{p.spec.name}={p.spec.min}:{p.spec.max}" for p in self.pools),
+            flush=True,
+        )
+        next_scale = 0.0
+        try:
+            while not self._stop.is_set():
+                if time.monotonic() >= next_scale:
+                    self._scale_from_queue()
+                    next_scale = time.monotonic() + self.scale_interval
+                for pool in self.pools:
+                    self._reap(pool)
+                    self._converge(pool)
+                self._stop.wait(min(1.0, self.scale_interval))
+        finally:
+            self.shutdown()
+
+    def shutdown(self, timeout: float | None = None) -> None:
+        # Children drain on SIGTERM; give them their grace period before SIGKILL.
+        if timeout is None:
+            timeout = grace_seconds() + 5.0
+        procs = [p for pool in self.pools for p in pool.children if p.is_alive()]
+        for proc in procs:
+            proc.terminate()
+        deadline = time.monotonic() + timeout
+        for proc in procs:
+            proc.join(max(0.0, deadline - time.monotonic()))
+            if proc.is_alive():
+                proc.kill()
+                proc.join()
+        for pool in self.pools:
+            pool.children.clear()
+            pool.retiring.clear()
+        print("supervisor: stopped", flush=True)
+
+
+def main(argv: list[str] | None = None) -> None:
+    ap = argparse.ArgumentParser(description="velu prefork worker supervisor")
+    ap.add_argument(
+        "--pools",
+        default=None,
+        help="pools as <tasks>=<min>:<max> separated by ';' (VELU_SUPERVISOR_POOLS), e.g. 'heavy=1:2;fast,standard=2:8'",
+    )
+    args = ap.parse_args(argv)
+    Supervisor(parse_pools(args.pools)).run()
+
+
+__all__ = ["PoolSpec", "Recycle", "Supervisor", "desired_size", "parse_pools", "rss_mb"]
+
+
+if __name__ == "__main__":
+    main()
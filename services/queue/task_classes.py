@@ -0,0 +1,116 @@
+# services/queue/task_classes.py
+"""
+Task classes and worker subscriptions.
+
+A worker started with ``VELU_WORKER_TASKS`` (or ``--tasks``) only claims the
+listed tasks; entries are task names or class names, e.g. ``fast`` or
+``heavy,report``. Empty, ``*`` or ``all`` means every task.
+
+Classes default to ``fast`` (short, latency-sensitive) and ``heavy`` (subprocess /
+CPU-bound); anything else is ``standard``. ``VELU_TASK_CLASSES`` replaces the
+defaults, e.g. ``fast=chat,plan,intake;heavy=test,security_scan,packager``.
+"""
+from __future__ import annotations
+
+import os
+from typing import Iterable
+
+DEFAULT_CLASS = "standard"
+
+DEFAULT_TASK_CLASSES: dict[str, tuple[str, ...]] = {
+    "fast": (
+        "chat",
+        "plan",
+        "intake",
+        "requirements",
+        "architecture",
+        "datamodel",
+        "api_design",
+        "report",
+        "aggregate",
+        "pipeline_waiter",
+    ),
+    "heavy": (
+        "test",
+        "security_scan",
+        "packager",
+        "execute",
+        "codegen",
+        "hospital_codegen",
+        "hospital_apply_patches",
+        "repo_summary",
+        "autodev",
+    ),
+}
+
+_ALL = {"", "*", "all"}
+
+
+def task_classes() -> dict[str, tuple[str, ...]]:
+    raw = (os.getenv("VELU_TASK_CLASSES") or "").strip()
+    if not raw:
+        return dict(DEFAULT_TASK_CLASSES)
+    out: dict[str, tuple[str, ...]] = {}
+    for part in raw.split(";"):
+        name, _, tasks = part.partition("=")
+        name = name.strip().lower()
+        if name:
+            out[name] = tuple(t.strip() for t in tasks.split(",") if t.strip())
+    return out
+
+
+def class_of(task: str, classes: dict[str, tuple[str, ...]] | None = None) -> str:
+    for name, tasks in (classes if classes is not None else task_classes()).items():
+        if task in tasks:
+            return name
+    return DEFAULT_CLASS
+
+
+def parse_subscription(spec: str | None, known: Iterable[str] | None = None) -> list[str] | None:
+    """
+    Resolve a subscription spec to a sorted list of task names (None = all tasks).
+    With ``known`` given, names that are neither a known task nor a class raise
+    ValueError; without it, any non-class name is taken as a task name.
+    """
+    if spec is None or spec.strip().lower() in _ALL:
+        return None
+    known_set = set(known) if known is not None else None
+    classes = task_classes()
+    out: set[str] = set()
+    for item in (s.strip() for s in spec.split(",")):
+        if not item:
+            continue
+        if known_set is not None and item in known_set:
+            out.add(item)
+        elif item.lower() in classes:
+            out.update(t for t in classes[item.lower()] if known_set is None or t in known_set)
+        elif item.lower() == DEFAULT_CLASS and known_set is not None:
+            out.update(t for t in known_set if class_of(t, classes) == DEFAULT_CLASS)
+        elif known_set is None and item.lower() != DEFAULT_CLASS:
+            out.add(item)
+        else:
+            raise ValueError(f"unknown task or task class in subscription: {item!r}")
+    if not out:
+        raise ValueError(f"subscription {spec!r} matches no known task")
+    return sorted(out)
+
+
+def depth_by_class(by_task: dict[str, dict[str, int]]) -> dict[str, dict[str, int]]:
+    """Fold per-task {"queued", "working"} counts into per-class totals."""
+    classes = task_classes()
+    out: dict[str, dict[str, int]] = {}
+    for task, counts in by_task.items():
+        agg = out.setdefault(class_of(task, classes), {"queued": 0, "working": 0})
+        for k in ("queued", "working"):
+            agg[k] += int(counts.get(k, 0))
+    return out
+
+
+__all__ = [
+    "DEFAULT_CLASS",
+    "DEFAULT_TASK_CLASSES",
+    "class_of",
+    "depth_by_class",
+    "parse_subscription",
+    "task_classes",
+]
@@ -1,7 +1,10 @@
 # services/queue/worker_entry.py
 from __future__ import annotations
 
+import argparse
+import asyncio
 import contextlib
+import inspect
 import logging
 import os
 import socket  # noqa: F401
@@ -9,96 +12,28 @@ import sys
 import tempfile
 import time
 import traceback
+from collections import deque
 from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Callable, Dict, Iterator, Mapping
-
-from services.agents import pipeline_waiter
-from services.agents import (
-    aggregate,
-    ai_features,
-    api_design,
-    architecture,
-    autodev,
-    backend_scaffold,
-    chat,
-    codegen,
-    datamodel,
-    executor,
-    gitcommit,
-    hospital_apply_patches,
-    hospital_codegen,
-    intake,
-    packager,
-    planner,
-    report,
-    repo_summary,
-    requirements,
-    security_hardening,
-    tester,
-    testgen,
-    ui_scaffold,
-    sleep,
-)
-from services.agents import pipeline_runner, security_scan
+from typing import Any, Dict, Iterator, Mapping
+
+from services import metrics
+from services.db import pool as db_pool
+from services.queue.leases import Heartbeat, LeasePolicy, LeaseSweeper
+from services.queue import cancel, memo
+from services.queue.context import JobContext, bind as bind_context
+from services.queue.defer import deferral, resumed_payload
+from services.queue.drain import Drain
+from services.queue.notify import IdleBackoff, JobWakeup
+from services.queue.registry import HANDLERS
+from services.queue.retry import RetryLater
+from services.queue.supervisor import Recycle
+from services.queue.task_classes import parse_subscription
 from services.contracts.jobs import decode_task_and_payload
 from services.queue import jobs as jobs_api
 
 logger = logging.getLogger(__name__)
 
-HANDLERS: dict[str, Callable[[dict[str, Any]], dict[str, Any]]] = {
-    "requirements": requirements.handle,
-    "architecture": architecture.handle,
-    "datamodel": datamodel.handle,
-    "api_design": api_design.handle,
-    "ui_scaffold": ui_scaffold.handle,
-    "backend_scaffold": backend_scaffold.handle,
-    "ai_features": ai_features.handle,
-    "security_hardening": security_hardening.handle,
-    "testgen": testgen.handle,
-    "pipeline": pipeline_runner.handle,
-    "plan": planner.handle,
-    "aggregate": aggregate.handle,
-    "gitcommit": gitcommit.handle,
-    "codegen": codegen.handle,
-    "execute": executor.handle,
-    "test": tester.handle,
-    "report": report.handle,
-    "intake": intake.handle,
-    "chat": chat.handle,
-    "hospital_codegen": hospital_codegen.handle,
-    "hospital_apply_patches": hospital_apply_patches.handle,
-    "packager": packager.handle,
-    "autodev": autodev.handle,
-    "repo_summary": repo_summary.handle,
-    "security_scan": security_scan.handle,
-    "pipeline_waiter": pipeline_waiter.handle,
-    "sleep": sleep.handle,
-}
-
-try:
-    import local_tasks as _local  # type: ignore[import]
-
-    allow_core_override = (os.getenv("VELU_ALLOW_LOCAL_CORE_TASKS") or "").strip().lower() in {
-        "1",
-        "true",
-        "yes",
-    }
-
-    for _name in ("repo_summary",):
-        if hasattr(_local, _name):
-            HANDLERS[_name] = getattr(_local, _name)
-            logger.info("local_tasks override/extend: %s -> %r", _name, HANDLERS[_name])
-
-    if allow_core_override:
-        for _name in ("execute", "test"):
-            if hasattr(_local, _name):
-                HANDLERS[_name] = getattr(_local, _name)
-                logger.info("local_tasks CORE override enabled: %s -> %r", _name, HANDLERS[_name])
-
-except Exception as exc:
-    logger.warning("local_tasks overrides not loaded: %s", exc)
-
 def _default_worker_id() -> str:
     wid = (os.getenv("VELU_WORKER_ID") or "").strip()
     if wid:
@@ -263,7 +198,12 @@ def _materialize_files(workspace: Path, files: Any) -> list[str]:
     return sorted(wrote)
 
 
-def _process_task(row: Any, workspace: Path | None = None) -> Dict[str, Any]:
+def is_async_handler(handler: Any) -> bool:
+    """``async def handle(ctx, payload)`` handlers; everything else is ``handle(payload)``."""
+    return inspect.iscoroutinefunction(handler) or inspect.iscoroutinefunction(getattr(handler, "__call__", None))
+
+
+def _task_payload(row: Any, workspace: Path | None) -> tuple[str, Dict[str, Any]]:
     task, payload = decode_task_and_payload(_row_get(row, "task"), _row_get(row, "payload"))
     task = (task or "").strip()
     payload = dict(payload or {})
@@ -275,21 +215,200 @@ def _process_task(row: Any, workspace: Path | None = None) -> Dict[str, Any]:
         if "workspace" not in velu:
             velu["workspace"] = str(workspace)
         payload["_velu"] = velu
+    return task, payload
+
+
+def _job_context(row: Any, workspace: Path, tmpdir: Path, scope: cancel.CancelScope | None = None) -> JobContext:
+    _, payload = decode_task_and_payload(_row_get(row, "task"), _row_get(row, "payload"))
+    velu = payload.get("_velu") if isinstance(payload, dict) else None
+    run_id = velu.get("run_id") if isinstance(velu, dict) else None
+    org_id = _row_get(row, "org_id")
+    return JobContext(
+        job_id=_job_id(row),
+        task=str(_row_get(row, "task", "") or ""),
+        workspace=Path(workspace),
+        tmpdir=Path(tmpdir),
+        org_id=str(org_id) if org_id else None,
+        run_id=run_id if isinstance(run_id, str) else None,
+        scope=scope or cancel.current() or cancel.CancelScope(),
+    )
+
+
+def _memo_lookup(task: str, payload: Dict[str, Any]) -> tuple[str | None, Dict[str, Any] | None]:
+    key = memo.key_for(task, payload)
+    if not key:
+        return None, None
+    try:
+        return key, jobs_api.memo_get(key)
+    except Exception as exc:
+        logger.warning("memo lookup failed for %s: %s", task, exc)
+        return key, None
+
+
+def _memo_store(key: str | None, task: str, result: Any) -> None:
+    if key and memo.cacheable(result):
+        try:
+            jobs_api.memo_put(key, task, result)
+        except Exception as exc:
+            logger.warning("memo store failed for %s: %s", task, exc)
+
+
+def _handler_error(task: str, exc: Exception, payload: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "ok": False,
+        "stage": f"{task}_error",
+        "error": f"{exc.__class__.__name__}: {exc}",
+        "trace": traceback.format_exc(),
+        "payload": payload,
+    }
+
+
+class HandlerFailed(Exception):
+    """A handler raised; ``error`` is what retry_job records for the attempt."""
+
+    def __init__(self, error: Dict[str, Any]) -> None:
+        super().__init__(error.get("error"))
+        self.error = error
+
+
+def _job_error(exc: Exception, jid: str) -> Dict[str, Any]:
+    if isinstance(exc, HandlerFailed):
+        return dict(exc.error, job_id=jid)
+    return {"error": f"{exc.__class__.__name__}: {exc}", "trace": traceback.format_exc(), "job_id": jid}
+
+
+async def _await_handler(handler: Any, ctx: JobContext, payload: Dict[str, Any]) -> Any:
+    """Run an async handler; cancelling ``ctx.scope`` cancels it with JobCancelled."""
+    loop = asyncio.get_running_loop()
+    task = asyncio.ensure_future(handler(ctx, payload))
+    ctx.scope.on_cancel(lambda: loop.call_soon_threadsafe(task.cancel))
+    try:
+        return await task
+    except asyncio.CancelledError:
+        if ctx.scope.cancelled:
+            raise cancel.JobCancelled("job cancelled") from None
+        raise
+
+
+def _process_task(row: Any, workspace: Path | None = None, ctx: JobContext | None = None) -> Dict[str, Any]:
+    task, payload = _task_payload(row, workspace)
 
     handler = HANDLERS.get(task)
     if handler is None:
         return {"ok": False, "error": f"unknown task: {task}"}
+    cancel.check()
+
+    key, cached = _memo_lookup(task, payload)
+    if cached is not None:
+        return cached
 
     try:
-        return handler(payload)
+        if is_async_handler(handler):
+            if ctx is None:
+                base = workspace or Path.cwd()
+                ctx = _job_context(row, base, Path(tempfile.gettempdir()))
+            with bind_context(ctx):
+                result = asyncio.run(_await_handler(handler, ctx, payload))
+        else:
+            result = handler(payload)
+        _memo_store(key, task, result)
+        return result
+    except (RetryLater, cancel.JobCancelled):
+        raise
     except Exception as exc:
-        return {
-            "ok": False,
-            "stage": f"{task}_error",
-            "error": f"{exc.__class__.__name__}: {exc}",
-            "trace": traceback.format_exc(),
-            "payload": payload,
-        }
+        raise HandlerFailed(_handler_error(task, exc, payload)) from exc
+
+
+async def _process_task_async(row: Any, ctx: JobContext) -> Dict[str, Any]:
+    """_process_task for the asyncio worker: the handler runs on the loop, DB calls in threads."""
+    task, payload = _task_payload(row, ctx.workspace)
+
+    handler = HANDLERS.get(task)
+    if handler is None:
+        return {"ok": False, "error": f"unknown task: {task}"}
+    if not is_async_handler(handler):
+        return {"ok": False, "error": f"task {task} has no async handler"}
+    ctx.check()
+
+    key, cached = await asyncio.to_thread(_memo_lookup, task, payload)
+    if cached is not None:
+        return cached
+
+    try:
+        result = await _await_handler(handler, ctx, payload)
+        await asyncio.to_thread(_memo_store, key, task, result)
+        return result
+    except (RetryLater, cancel.JobCancelled):
+        raise
+    except Exception as exc:
+        raise HandlerFailed(_handler_error(task, exc, payload)) from exc
+
+
+def _run_outcome(result: Any) -> str:
+    return "failed" if isinstance(result, dict) and result.get("ok") is False else "ok"
+
+
+def _timed_process(row: Any, workspace: Path, task: str, ctx: JobContext | None = None) -> Dict[str, Any]:
+    """_process_task, recording the handler's run time by outcome."""
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        result = _process_task(row, workspace, ctx)
+        outcome = _run_outcome(result)
+        return result
+    except HandlerFailed:
+        outcome = "failed"
+        raise
+    except cancel.JobCancelled:
+        outcome = "cancelled"
+        raise
+    finally:
+        metrics.observe_run(task, outcome, time.perf_counter() - started)
+
+
+async def _timed_process_async(row: Any, ctx: JobContext) -> Dict[str, Any]:
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        result = await _process_task_async(row, ctx)
+        outcome = _run_outcome(result)
+        return result
+    except HandlerFailed:
+        outcome = "failed"
+        raise
+    except cancel.JobCancelled:
+        outcome = "cancelled"
+        raise
+    finally:
+        metrics.observe_run(ctx.task, outcome, time.perf_counter() - started)
+
+
+def _finalize_result(row: Any, workspace: Path, task: str, result: Any, worker_id: str) -> Dict[str, Any]:
+    if not isinstance(result, dict):
+        result = {"ok": True, "data": result}
+
+    with metrics.phase(task, "materialize"):
+        wrote = _materialize_files(workspace, result.get("files"))
+    result["wrote"] = wrote
+    result["cwd"] = str(workspace)
+
+    return _attach_result_meta(result, row, worker_id)
+
+
+def _report(jid: str, row: Any, result: Dict[str, Any]) -> str:
+    """Store a handler result: finish the job, or park it if the handler deferred."""
+    d = deferral(result)
+    if d is None:
+        jobs_api.finish_job(jid, result)
+        return "done"
+    _, payload = decode_task_and_payload(_row_get(row, "task"), _row_get(row, "payload"))
+    status = jobs_api.defer_job(
+        jid,
+        payload=resumed_payload(payload or {}, d.get("state") or {}),
+        wait_on=list(d.get("wait_on") or []),
+        wait_for=str(d.get("wait_for") or "finished"),
+    )
+    return f"deferred ({status})"
 
 
 def run_one_job() -> bool:
@@ -307,8 +426,10 @@ def run_one_job() -> bool:
 
     try:
         workspace, tmpdir = _job_workspace(row)
-        with _isolated_env(tmpdir, workspace):
-            result = _process_task(row, workspace)
+        ctx = _job_context(row, workspace, tmpdir)
+        isolate = not is_async_handler(HANDLERS.get(str(_row_get(row, "task", "") or "")))
+        with _isolated_env(tmpdir, workspace) if isolate else contextlib.nullcontext():
+            result = _process_task(row, workspace, ctx)
 
         if not isinstance(result, dict):
             result = {"ok": True, "data": result}
@@ -317,12 +438,9 @@ def run_one_job() -> bool:
         result["wrote"] = wrote
         result["cwd"] = str(workspace)
 
-        jobs_api.finish_job(jid, result)
+        _report(jid, row, result)
     except Exception as exc:
-        jobs_api.fail_job(
-            jid,
-            {"error": f"{exc.__class__.__name__}: {exc}", "trace": traceback.format_exc(), "job_id": jid},
-        )
+        jobs_api.retry_job(jid, _job_error(exc, jid), task=str(_row_get(row, "task", "") or ""))
 
     return True
 
@@ -523,15 +641,125 @@ def _attach_result_meta(result: Dict[str, Any], row: Any, worker_id: str) -> Dic
         return dict(result or {})
 
 
-def worker_main() -> None:
+class _PrefetchBuffer:
+    """
+    Opt-in claim-ahead buffer for the Postgres backend.
+
+    Jobs are claimed ``size`` at a time with a short lease so an idle fleet does not
+    hoard work; a buffered job's lease is extended to the full lease only when it is
+    about to run. Anything still buffered at shutdown is released back to 'queued'.
+    """
+
+    def __init__(
+        self,
+        *,
+        worker_id: str,
+        size: int,
+        lease_seconds: int,
+        buffer_lease_seconds: int,
+        tasks: list[str] | None = None,
+    ) -> None:
+        self.worker_id = worker_id
+        self.tasks = tasks
+        self.size = max(1, int(size))
+        self.lease_seconds = int(lease_seconds)
+        self.buffer_lease_seconds = max(5, min(int(buffer_lease_seconds), int(lease_seconds)))
+        self._rows: deque[Any] = deque()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _activate(self, row: Any) -> bool:
+        jid = _job_id(row)
+        renewed = jobs_api.renew_leases(job_ids=[jid], worker_id=self.worker_id, lease_seconds=self.lease_seconds)
+        return jid in renewed
+
+    def next(self) -> Any | None:
+        while self._rows:
+            row = self._rows.popleft()
+            if self._activate(row):
+                return row
+            logger.info("worker: dropped buffered job %s (lease lost)", _job_id(row))
+
+        rows = jobs_api.claim_jobs(
+            worker_id=self.worker_id, n=self.size, lease_seconds=self.buffer_lease_seconds, tasks=self.tasks
+        )
+        if not rows:
+            return None
+        self._rows.extend(rows[1:])
+        first = rows[0]
+        if self._activate(first):
+            return first
+        return self.next() if self._rows else None
+
+    def buffered_ids(self) -> list[str]:
+        return [_job_id(r) for r in self._rows if _job_id(r)]
+
+    def release(self) -> int:
+        ids = self.buffered_ids()
+        self._rows.clear()
+        if not ids:
+            return 0
+        try:
+            return jobs_api.release_jobs(job_ids=ids, worker_id=self.worker_id)
+        except Exception as exc:
+            logger.warning("worker: failed to release %d buffered jobs: %s", len(ids), exc)
+            return 0
+
+
+def _prefetch_size() -> int:
+    try:
+        return max(0, int((os.getenv("VELU_WORKER_PREFETCH") or "0").strip() or 0))
+    except Exception:
+        return 0
+
+
+def _listen_enabled() -> bool:
+    return (os.getenv("VELU_WORKER_LISTEN") or "1").strip().lower() not in {"0", "false", "no", "off"}
+
+
+def _async_mode_enabled() -> bool:
+    return (os.getenv("VELU_WORKER_ASYNC") or "").strip().lower() in {"1", "true", "yes", "on"}
+
+
+def worker_main(
+    subscription: str | None = None,
+    *,
+    async_mode: bool | None = None,
+    concurrency: int | None = None,
+    recycle: Recycle | None = None,
+) -> None:
+    """
+    ``subscription``: task/class list to claim (default ``VELU_WORKER_TASKS``; empty = all).
+    ``async_mode`` (default ``VELU_WORKER_ASYNC``): run the subscribed tasks that have
+    ``async def handle(ctx, payload)`` handlers, ``concurrency`` (``VELU_WORKER_CONCURRENCY``)
+    at a time on one event loop, instead of one job at a time.
+    ``recycle``: return between jobs when it says so (services.queue.supervisor).
+    """
     jobs_api.ensure_schema()
     using_pg = bool(jobs_api.using_postgres())
     mode = "postgres" if using_pg else "sqlite"
     print(f"worker: online backend={mode}", flush=True)
 
+    spec = subscription if subscription is not None else os.getenv("VELU_WORKER_TASKS")
+    tasks = parse_subscription(spec, HANDLERS.keys())
+    if async_mode is None:
+        async_mode = _async_mode_enabled()
+    if async_mode:
+        tasks = [t for t in (tasks if tasks is not None else sorted(HANDLERS)) if is_async_handler(HANDLERS.get(t))]
+        if not tasks:
+            print("worker: async mode, but no subscribed task has an async handler", flush=True)
+            return
+        concurrency = max(1, int(concurrency or _concurrency()))
+        print(f"worker: async concurrency={concurrency}", flush=True)
+    if tasks is not None:
+        print(f"worker: tasks={','.join(tasks)}", flush=True)
+
     
     wid = _default_worker_id()
     print(f"worker: id={wid}", flush=True)
+    if metrics.serve_worker_metrics():
+        print(f"worker: metrics on :{os.getenv('VELU_WORKER_METRICS_PORT')}", flush=True)
 
     
     lease_seconds = int(os.getenv("VELU_JOB_LEASE_SEC", "300") or "300")
@@ -539,25 +767,161 @@ def worker_main() -> None:
     in_pytest = ("pytest" in sys.modules) or bool(os.getenv("PYTEST_CURRENT_TEST"))
     max_jobs = int(os.getenv("VELU_WORKER_MAX_JOBS", "1")) if in_pytest else 0
 
+    prefetch: _PrefetchBuffer | None = None
+    if using_pg and _prefetch_size() > 1 and not async_mode:
+        prefetch = _PrefetchBuffer(
+            worker_id=wid,
+            size=_prefetch_size(),
+            lease_seconds=lease_seconds,
+            buffer_lease_seconds=int(os.getenv("VELU_WORKER_PREFETCH_LEASE_SEC", "30") or "30"),
+            tasks=tasks,
+        )
+        print(f"worker: prefetch={prefetch.size} buffer_lease={prefetch.buffer_lease_seconds}s", flush=True)
+
+    wakeup: JobWakeup | None = None
+    if using_pg and _listen_enabled():
+        wakeup = JobWakeup(db_pool.dsn(), tasks if tasks is not None else HANDLERS.keys())
+
+    # VELU_LEASE_SWEEP_SEC=0 leaves sweeping to other nodes.
+    sweeper: LeaseSweeper | None = None
+    if using_pg and (os.getenv("VELU_LEASE_SWEEP_SEC") or "5").strip() not in {"0", "0.0"}:
+        sweeper = LeaseSweeper().start()
+
+    backoff = IdleBackoff()
+    if in_pytest:
+        backoff = IdleBackoff(base=0.1, cap=0.1)
+
+    lease_policy = LeasePolicy(max_seconds=lease_seconds) if using_pg else None
+    drain = Drain(worker_id=wid).install()
+    if prefetch is not None:
+        drain.add_source(prefetch.buffered_ids)
+    try:
+        if async_mode:
+            asyncio.run(
+                _async_worker_loop(
+                    wid=wid,
+                    using_pg=using_pg,
+                    lease_seconds=lease_seconds,
+                    in_pytest=in_pytest,
+                    max_jobs=max_jobs,
+                    wakeup=wakeup,
+                    backoff=backoff,
+                    tasks=list(tasks or []),
+                    concurrency=int(concurrency or 1),
+                    limits=_task_limits(),
+                    lease_policy=lease_policy,
+                    recycle=recycle,
+                    drain=drain,
+                )
+            )
+        else:
+            _worker_loop(
+                wid=wid,
+                using_pg=using_pg,
+                lease_seconds=lease_seconds,
+                in_pytest=in_pytest,
+                max_jobs=max_jobs,
+                prefetch=prefetch,
+                wakeup=wakeup,
+                backoff=backoff,
+                lease_policy=lease_policy,
+                tasks=tasks,
+                recycle=recycle,
+                drain=drain,
+            )
+    finally:
+        drain.restore()
+        if sweeper is not None:
+            sweeper.stop()
+        if wakeup is not None:
+            wakeup.close()
+        if prefetch is not None:
+            released = prefetch.release()
+            if released:
+                print(f"worker: released {released} buffered jobs", flush=True)
+
+
+def _holding(drain: Drain | None, jid: str, scope: cancel.CancelScope) -> Any:
+    return drain.track(jid, scope) if drain is not None else contextlib.nullcontext()
+
+
+def _reporting(drain: Drain | None) -> Any:
+    return drain.reporting() if drain is not None else contextlib.nullcontext()
+
+
+def _settle(
+    jid: str, row: Any, task_name: str, heartbeat: Heartbeat, result: Dict[str, Any], error: Dict[str, Any] | None
+) -> None:
+    """Record how a job ended: done/deferred, retried, cancelled, or nothing if the lease was lost."""
+    if heartbeat.lost:
+        # Another worker owns the job now; reporting would clobber its run.
+        print(f"worker: lease lost {jid}, result dropped", flush=True)
+    elif heartbeat.cancelled:
+        jobs_api.mark_cancelled(jid)
+        print(f"worker: cancelled {jid}", flush=True)
+    elif error is None:
+        with metrics.phase(task_name, "finish"):
+            outcome = _report(jid, row, result)
+        print(f"worker: {outcome} {jid}", flush=True)
+    else:
+        with metrics.phase(task_name, "finish"):
+            status = jobs_api.retry_job(jid, error, task=task_name)
+        print(f"worker: {status or 'error'} {jid}: {error['error']}", flush=True)
+
+
+def _worker_loop(
+    *,
+    wid: str,
+    using_pg: bool,
+    lease_seconds: int,
+    in_pytest: bool,
+    max_jobs: int,
+    prefetch: _PrefetchBuffer | None,
+    wakeup: JobWakeup | None,
+    backoff: IdleBackoff,
+    lease_policy: LeasePolicy | None = None,
+    tasks: list[str] | None = None,
+    recycle: Recycle | None = None,
+    drain: Drain | None = None,
+) -> None:
     processed = 0
     idle_loops = 0
 
     while True:
+        if drain is not None and drain.stopping:
+            print("worker: drained", flush=True)
+            return
         
-        if using_pg:
-            row = jobs_api.claim_one_job(worker_id=wid, lease_seconds=lease_seconds)
+        if prefetch is not None:
+            row = prefetch.next()
+        elif using_pg:
+            row = jobs_api.claim_one_job(worker_id=wid, lease_seconds=lease_seconds, tasks=tasks)
         else:
-            row = jobs_api.claim_one_job()
+            row = jobs_api.claim_one_job(tasks=tasks)
 
         if not row:
+            metrics.claim_empty()
             if in_pytest:
                 idle_loops += 1
                 if idle_loops >= 50:
                     return
-            time.sleep(0.1)
+            # Block on LISTEN when available; the timeout doubles as the fallback
+            # poll (expired leases and missed notifications) and backs off while idle.
+            delay = backoff.next()
+            if wakeup is not None:
+                if wakeup.wait(delay):
+                    backoff.reset()
+            elif drain is not None:
+                drain.wait(delay)
+            else:
+                time.sleep(delay)
+            if recycle is not None and recycle.retiring:
+                print("worker: retired", flush=True)
+                return
             continue
 
         idle_loops = 0
+        backoff.reset()
 
         jid = _job_id(row)
         if not jid:
@@ -567,41 +931,196 @@ def worker_main() -> None:
         
         _debug_hold_after_claim(in_pytest=in_pytest, using_postgres=using_pg)
 
+        task_name = str(_row_get(row, "task", "") or "")
+        metrics.observe_claim(row)
+        job_lease = lease_policy.lease_for(task_name) if lease_policy is not None else lease_seconds
+        heartbeat = Heartbeat(job_id=jid, worker_id=wid, lease_seconds=job_lease)
+
+        with _holding(drain, jid, heartbeat.scope):
+            with heartbeat, cancel.scope(heartbeat.scope):
+                try:
+                    with metrics.phase(task_name, "workspace"):
+                        workspace, tmpdir = _job_workspace(row)
+                    ctx = _job_context(row, workspace, tmpdir, heartbeat.scope)
+                    # Sync handlers still expect the job's workspace as cwd and TMPDIR in
+                    # os.environ; that is safe here because this loop runs one job at a time.
+                    isolate = not is_async_handler(HANDLERS.get(task_name))
+                    with _isolated_env(tmpdir, workspace) if isolate else contextlib.nullcontext():
+                        result = _timed_process(row, workspace, task_name, ctx)
+
+                    result = _finalize_result(row, workspace, task_name, result, wid)
+                    error: Dict[str, Any] | None = None
+                except Exception as exc:
+                    result = {}
+                    error = _job_error(exc, jid)
+
+            with _reporting(drain):
+                _settle(jid, row, task_name, heartbeat, result, error)
+
+        processed += 1
+        if in_pytest and processed >= max_jobs:
+            return
+        reason = recycle.reason(processed) if recycle is not None else None
+        if reason:
+            print(f"worker: exiting for restart ({reason})", flush=True)
+            return
+
+
+
+def _concurrency() -> int:
+    try:
+        return max(1, int((os.getenv("VELU_WORKER_CONCURRENCY") or "8").strip() or 8))
+    except ValueError:
+        return 8
+
+
+def _task_limits(spec: str | None = None) -> dict[str, int]:
+    """``VELU_TASK_CONCURRENCY="chat=4,sleep=2"``: per-task caps inside one async worker."""
+    raw = spec if spec is not None else os.getenv("VELU_TASK_CONCURRENCY") or ""
+    out: dict[str, int] = {}
+    for part in raw.split(","):
+        name, _, n = part.partition("=")
         try:
-            workspace, tmpdir = _job_workspace(row)
-            with _isolated_env(tmpdir, workspace):
-                result = _process_task(row, workspace)
+            out[name.strip()] = max(1, int(n.strip()))
+        except ValueError:
+            if part.strip():
+                logger.warning("worker: ignoring VELU_TASK_CONCURRENCY entry %r", part)
+    return out
 
-            if not isinstance(result, dict):
-                result = {"ok": True, "data": result}
 
-            wrote = _materialize_files(workspace, result.get("files"))
-            result["wrote"] = wrote
-            result["cwd"] = str(workspace)
+async def _run_job_async(row: Any, *, wid: str, job_lease: int, drain: Drain | None = None) -> None:
+    jid = _job_id(row)
+    task_name = str(_row_get(row, "task", "") or "")
+    metrics.observe_claim(row)
+    heartbeat = Heartbeat(job_id=jid, worker_id=wid, lease_seconds=job_lease)
 
-            
-            result = _attach_result_meta(result, row, wid)
+    def _report() -> None:
+        with _reporting(drain):
+            _settle(jid, row, task_name, heartbeat, result, error)
 
-            jobs_api.finish_job(jid, result)
-            print(f"worker: done {jid}", flush=True)
+    with _holding(drain, jid, heartbeat.scope):
+        await asyncio.to_thread(heartbeat.__enter__)
+        try:
+            try:
+                with metrics.phase(task_name, "workspace"):
+                    workspace, tmpdir = await asyncio.to_thread(_job_workspace, row)
+                ctx = _job_context(row, workspace, tmpdir, heartbeat.scope)
+                with bind_context(ctx):
+                    result = await _timed_process_async(row, ctx)
+                result = await asyncio.to_thread(_finalize_result, row, workspace, task_name, result, wid)
+                error: Dict[str, Any] | None = None
+            except Exception as exc:
+                result = {}
+                error = _job_error(exc, jid)
+        finally:
+            await asyncio.to_thread(heartbeat.__exit__, None, None, None)
+
+        await asyncio.to_thread(_report)
+
+
+async def _async_worker_loop(
+    *,
+    wid: str,
+    using_pg: bool,
+    lease_seconds: int,
+    in_pytest: bool,
+    max_jobs: int,
+    wakeup: JobWakeup | None,
+    backoff: IdleBackoff,
+    tasks: list[str],
+    concurrency: int,
+    limits: dict[str, int],
+    lease_policy: LeasePolicy | None = None,
+    recycle: Recycle | None = None,
+    drain: Drain | None = None,
+) -> None:
+    """
+    Run up to ``concurrency`` jobs of async-handler ``tasks`` at once on one event
+    loop, at most ``limits[task]`` of each. Jobs are claimed one at a time, only
+    for tasks with a free slot, so the caps hold across the queue. On drain, stop
+    claiming and wait for the running jobs.
+    """
+    running: dict[asyncio.Task, str] = {}
+    claimed = 0
+    idle_loops = 0
 
-        except Exception as exc:
-            jobs_api.fail_job(
-                jid,
-                {"error": f"{exc.__class__.__name__}: {exc}", "trace": traceback.format_exc(), "job_id": jid},
-            )
-            print(f"worker: error {jid}: {exc}", flush=True)
+    def _reap(done: set[asyncio.Task]) -> None:
+        for t in done:
+            running.pop(t, None)
+            if not t.cancelled() and t.exception() is not None:
+                logger.error("worker: async job crashed", exc_info=t.exception())
 
-        if in_pytest:
-            processed += 1
-            if processed >= max_jobs:
-                return
+    def _open_tasks() -> list[str]:
+        busy: dict[str, int] = {}
+        for name in running.values():
+            busy[name] = busy.get(name, 0) + 1
+        return [t for t in tasks if busy.get(t, 0) < limits.get(t, concurrency)]
 
+    try:
+        while True:
+            if in_pytest and claimed >= max_jobs:
+                break
+            if drain is not None and drain.stopping:
+                print(f"worker: drained, waiting for {len(running)} running job(s)", flush=True)
+                break
+            reason = recycle.reason(claimed) if recycle is not None else None
+            if reason:
+                print(f"worker: exiting for restart ({reason})", flush=True)
+                break
+
+            open_tasks = _open_tasks() if len(running) < concurrency else []
+            if not open_tasks:
+                done, _ = await asyncio.wait(set(running), return_when=asyncio.FIRST_COMPLETED)
+                _reap(done)
+                continue
+
+            if using_pg:
+                row = await asyncio.to_thread(
+                    jobs_api.claim_one_job, worker_id=wid, lease_seconds=lease_seconds, tasks=open_tasks
+                )
+            else:
+                row = await asyncio.to_thread(jobs_api.claim_one_job, tasks=open_tasks)
+
+            if not row:
+                metrics.claim_empty()
+                if in_pytest and not running:
+                    idle_loops += 1
+                    if idle_loops >= 50:
+                        break
+                delay = backoff.next()
+                if running:
+                    done, _ = await asyncio.wait(set(running), timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+                    _reap(done)
+                elif wakeup is not None:
+                    if await asyncio.to_thread(wakeup.wait, delay):
+                        backoff.reset()
+                elif drain is not None:
+                    await asyncio.to_thread(drain.wait, delay)
+                else:
+                    await asyncio.sleep(delay)
+                continue
+
+            idle_loops = 0
+            backoff.reset()
+            if not _job_id(row):
+                continue
+
+            claimed += 1
+            task_name = str(_row_get(row, "task", "") or "")
+            job_lease = lease_policy.lease_for(task_name) if lease_policy is not None else lease_seconds
+            running[asyncio.create_task(_run_job_async(row, wid=wid, job_lease=job_lease, drain=drain))] = task_name
+    finally:
+        if running:
+            done, _ = await asyncio.wait(set(running))
+            _reap(done)
 
 
 __all__ = [
     "HANDLERS",
+    "HandlerFailed",
+    "JobContext",
     "enqueue",
+    "is_async_handler",
     "load",
     "run_one_job",
     "worker_main",
@@ -610,8 +1129,28 @@ __all__ = [
 ]
 
 
-def main() -> None:
-    worker_main()
+def main(argv: list[str] | None = None) -> None:
+    ap = argparse.ArgumentParser(description="velu queue worker")
+    ap.add_argument(
+        "--tasks",
+        default=None,
+        help="comma-separated task names or classes to claim (e.g. 'fast' or 'heavy,report'); default: all",
+    )
+    ap.add_argument(
+        "--async",
+        dest="async_mode",
+        action="store_true",
+        default=None,
+        help="run async handlers concurrently on one event loop (VELU_WORKER_ASYNC)",
+    )
+    ap.add_argument(
+        "--concurrency",
+        type=int,
+        default=None,
+        help="jobs in flight in --async mode (VELU_WORKER_CONCURRENCY, default 8)",
+    )
+    args = ap.parse_args(argv)
+    worker_main(args.tasks, async_mode=args.async_mode, concurrency=args.concurrency)
 
 
 if __name__ == "__main__":
@@ -7,7 +7,6 @@ import json
 import os
 import sys
 import tempfile
-import time
 import traceback
 from contextlib import contextmanager, redirect_stderr, redirect_stdout
 from pathlib import Path
@@ -305,36 +304,74 @@ def _attach_workspace(job: dict[str, Any], workspace: Path) -> dict[str, Any]:
 
 
 def worker_main() -> None:
+    from services.queue import cancel
+    from services.queue.defer import deferral, resumed_payload
+    from services.queue.drain import Drain
+    from services.queue.leases import Heartbeat
+    from services.queue.task_classes import parse_subscription
+    from services.queue.worker_entry import _default_worker_id
+
     q = _q()
     q.ensure_schema()
+    # VELU_WORKER_TASKS: task names / classes this worker claims (empty = all)
+    tasks = parse_subscription(os.getenv("VELU_WORKER_TASKS"))
+    wid = _default_worker_id()
+    lease_seconds = int(os.getenv("VELU_JOB_LEASE_SEC", "300") or "300")
+    # SIGTERM/SIGINT: stop claiming, finish or release the current job (services.queue.drain)
+    drain = Drain(worker_id=wid).install()
 
     max_iters = int(os.getenv("WORKER_MAX_ITERS", "0") or "0")
     iters = 0
 
-    while True:
-        if max_iters and iters >= max_iters:
-            return
-        iters += 1
-
-        job = q.claim_one_job()
-        if not job:
-            time.sleep(0.1)
-            if max_iters:
+    try:
+        while True:
+            if drain.stopping:
+                print("worker: drained", flush=True)
                 return
-            continue
-
-        job_id = job.get("id")
-        try:
-            workspace, tmpdir = _job_workspace(job)
-            job = _attach_workspace(job, workspace)
-            with _isolated_env(tmpdir, workspace):
-                result = process_job(job)
-            q.finish_job(job_id, result)
-        except Exception as e:
-            q.fail_job(
-                job_id,
-                {"ok": False, "error": str(e), "trace": traceback.format_exc()},
-            )
+            if max_iters and iters >= max_iters:
+                return
+            iters += 1
+
+            job = q.claim_one_job(worker_id=wid, lease_seconds=lease_seconds, tasks=tasks)
+            if not job:
+                drain.wait(0.1)
+                if max_iters:
+                    return
+                continue
+
+            job_id = job.get("id")
+            # Keeps the lease alive and cancels the job's scope when a cancel is requested.
+            heartbeat = Heartbeat(job_id=str(job_id), worker_id=wid, lease_seconds=lease_seconds)
+            result: dict[str, Any] = {}
+            error: dict[str, Any] | None = None
+            with drain.track(str(job_id), heartbeat.scope):
+                with heartbeat, cancel.scope(heartbeat.scope):
+                    try:
+                        workspace, tmpdir = _job_workspace(job)
+                        job = _attach_workspace(job, workspace)
+                        with _isolated_env(tmpdir, workspace):
+                            result = process_job(job)
+                    except Exception as e:
+                        error = {"ok": False, "error": str(e), "trace": traceback.format_exc()}
+
+                with drain.reporting():
+                    if heartbeat.lost:
+                        continue  # another worker owns the job now
+                    if heartbeat.cancelled:
+                        q.mark_cancelled(job_id)
+                    elif error is not None:
+                        q.retry_job(job_id, error, task=job.get("task"))
+                    elif (d := deferral(result)) is not None:
+                        q.defer_job(
+                            job_id,
+                            payload=resumed_payload(_as_dict_payload(job.get("payload")), d.get("state") or {}),
+                            wait_on=list(d.get("wait_on") or []),
+                            wait_for=str(d.get("wait_for") or "finished"),
+                        )
+                    else:
+                        q.finish_job(job_id, result)
+    finally:
+        drain.restore()
 
 
 def main() -> None:
@@ -144,6 +144,14 @@ def test_jobs_api_org_scoped_and_scoped(monkeypatch: pytest.MonkeyPatch) -> None
     assert item.get("actor_type") == "api_key"
     assert item.get("actor_id") == admin1_id
 
+    # org1 listing pages by cursor; a malformed cursor is a 400
+    r5 = c.get(f"/orgs/{org1}/jobs?limit=1&view=status", headers={"X-API-Key": raw_admin_1})
+    assert r5.status_code == 200, r5.text
+    assert [it["id"] for it in r5.json()["items"]] == [job_id]
+    assert r5.json()["next_cursor"] is None
+    r6 = c.get(f"/orgs/{org1}/jobs?cursor=bogus", headers={"X-API-Key": raw_admin_1})
+    assert r6.status_code == 400, r6.text
+
     # org2 admin cannot read org1 job (404, no leakage)
     r4 = c.get(f"/orgs/{org1}/jobs/{job_id}", headers={"X-API-Key": raw_admin_2})
     assert r4.status_code == 404, r4.text
@@ -14,22 +14,36 @@ def test_job_roundtrip(monkeypatch, tmp_path):
     app = create_app()
     c = TestClient(app)
 
-    # start worker in background
-    t = threading.Thread(target=worker_main, daemon=True)
-    t.start()
+    # start worker in background; one claim per pass so it can be stopped
+    monkeypatch.setenv("WORKER_MAX_ITERS", "1")
+    stop = threading.Event()
+
+    def _run() -> None:
+        while not stop.is_set():
+            worker_main()
 
-    # submit a task
-    r = c.post("/tasks", json={"task": "plan", "payload": {"idea": "test"}})
-    assert r.status_code == 200
-    job_id = r.json()["job_id"]
-
-    # poll result
-    for _ in range(40):
-        time.sleep(0.1)
-        rr = c.get(f"/results/{job_id}")
-        assert rr.status_code == 200
-        item = rr.json()["item"]
-        if item["status"] == "done":
-            assert item["result"]["ok"] is True
-            return
-    raise AssertionError("job not finished in time")
+    t = threading.Thread(target=_run, daemon=True)
+    t.start()
+    try:
+        # submit a task
+        r = c.post("/tasks", json={"task": "plan", "payload": {"idea": "test"}})
+        assert r.status_code == 200
+        job_id = r.json()["job_id"]
+
+        # poll result
+        for _ in range(40):
+            time.sleep(0.1)
+            rr = c.get(f"/results/{job_id}")
+            assert rr.status_code == 200
+            item = rr.json()["item"]
+            if item["status"] == "done":
+                # default view is the summary: ok flag, no result body
+                assert item["ok"] is True
+                assert "result" not in item
+                full = c.get(f"/results/{job_id}?view=full").json()["item"]
+                assert full["result"]["ok"] is True
+                return
+        raise AssertionError("job not finished in time")
+    finally:
+        stop.set()
+        t.join(timeout=5)
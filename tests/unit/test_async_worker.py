@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import sys
+import time
+
+from services.queue import cancel, jobs_sqlite, worker_entry
+from services.queue.notify import IdleBackoff
+
+
+def _run_async_loop(tasks: list[str], *, jobs: int, concurrency: int, limits: dict[str, int]) -> None:
+    asyncio.run(
+        worker_entry._async_worker_loop(
+            wid="w",
+            using_pg=False,
+            lease_seconds=30,
+            in_pytest=True,
+            max_jobs=jobs,
+            wakeup=None,
+            backoff=IdleBackoff(base=0.01, cap=0.01),
+            tasks=tasks,
+            concurrency=concurrency,
+            limits=limits,
+        )
+    )
+
+
+def _result(jid: int) -> dict:
+    return json.loads(jobs_sqlite.get_job(jid)["result"])
+
+
+def test_async_worker_runs_jobs_concurrently_within_task_limits(tmp_path, monkeypatch):
+    monkeypatch.setenv("TASK_DB", str(tmp_path / "jobs.db"))
+    monkeypatch.setenv("WORKSPACE_BASE", str(tmp_path / "ws"))
+    active: dict[str, int] = {"slow": 0, "fast": 0}
+    peak: dict[str, int] = {"slow": 0, "fast": 0, "total": 0}
+
+    def make(name: str):
+        async def handle(ctx, payload):
+            active[name] += 1
+            peak[name] = max(peak[name], active[name])
+            peak["total"] = max(peak["total"], sum(active.values()))
+            await asyncio.sleep(0.2)
+            active[name] -= 1
+            return {"ok": True, "workspace": str(ctx.workspace)}
+
+        return handle
+
+    monkeypatch.setitem(worker_entry.HANDLERS, "slow", make("slow"))
+    monkeypatch.setitem(worker_entry.HANDLERS, "fast", make("fast"))
+    ids = [jobs_sqlite.enqueue_job({"task": t, "payload": {}}) for t in ["slow"] * 4 + ["fast"] * 2]
+    cwd = os.getcwd()
+
+    started = time.monotonic()
+    _run_async_loop(["fast", "slow"], jobs=6, concurrency=3, limits={"slow": 2})
+
+    assert time.monotonic() - started < 1.2  # 6 x 0.2s one at a time would be 1.2s
+    assert peak["slow"] == 2 and peak["total"] == 3
+    assert [jobs_sqlite.get_job(j)["status"] for j in ids] == ["done"] * 6
+    assert len({_result(j)["workspace"] for j in ids}) == 6
+    assert os.getcwd() == cwd
+
+
+def test_context_replaces_cwd_and_environ(tmp_path, monkeypatch):
+    monkeypatch.setenv("TASK_DB", str(tmp_path / "jobs.db"))
+    monkeypatch.setenv("WORKSPACE_BASE", str(tmp_path / "ws"))
+    probe = "import os, tempfile; print(os.getcwd()); print(tempfile.gettempdir())"
+
+    async def handle(ctx, payload):
+        assert os.getcwd() != str(ctx.workspace)
+        out = await asyncio.to_thread(cancel.run, [sys.executable, "-c", probe], capture_output=True, text=True)
+        cwd, tmp = out.stdout.split()
+        return {"ok": True, "cwd_seen": cwd, "tmp_seen": tmp, "tmpdir": str(ctx.tmpdir), "ws": str(ctx.workspace)}
+
+    monkeypatch.setitem(worker_entry.HANDLERS, "probe", handle)
+    # The one-at-a-time worker runs async handlers too, without chdir/environ changes.
+    jid = jobs_sqlite.enqueue_job({"task": "probe", "payload": {}})
+    worker_entry._worker_loop(
+        wid="w",
+        using_pg=False,
+        lease_seconds=30,
+        in_pytest=True,
+        max_jobs=1,
+        prefetch=None,
+        wakeup=None,
+        backoff=IdleBackoff(base=0.01, cap=0.01),
+    )
+
+    res = _result(jid)
+    assert os.path.realpath(res["cwd_seen"]) == os.path.realpath(res["ws"])
+    assert res["tmp_seen"] == res["tmpdir"] and res["cwd"] == res["ws"]
+
+
+def test_async_job_cancelled_by_heartbeat(tmp_path, monkeypatch):
+    monkeypatch.setenv("TASK_DB", str(tmp_path / "jobs.db"))
+    monkeypatch.setenv("WORKSPACE_BASE", str(tmp_path / "ws"))
+    monkeypatch.setenv("VELU_CANCEL_CHECK_SEC", "1")
+
+    async def handle(ctx, payload):
+        # Cancelled from the API while running; the next heartbeat stops it.
+        await asyncio.to_thread(jobs_sqlite.cancel_job, int(ctx.job_id))
+        await asyncio.sleep(30)
+        return {"ok": True}
+
+    monkeypatch.setitem(worker_entry.HANDLERS, "hang", handle)
+    jid = jobs_sqlite.enqueue_job({"task": "hang", "payload": {}})
+
+    started = time.monotonic()
+    _run_async_loop(["hang"], jobs=1, concurrency=2, limits={})
+
+    assert time.monotonic() - started < 10
+    assert jobs_sqlite.get_job(jid)["status"] == "cancelled"
+
+
+def test_chat_remote_backend_awaits_async_client(tmp_path, monkeypatch):
+    from services.agents import chat
+
+    monkeypatch.setattr(chat, "_session_dir", lambda: tmp_path)
+    seen: list[list[dict]] = []
+
+    async def fake_completion(messages, **kw):
+        seen.append(messages)
+        return "Rewritten reply"
+
+    monkeypatch.setattr(chat.llm_client, "remote_chat_completion_async", fake_completion)
+    payload = {"message": "I want a todo app", "session_id": "s1", "backend": "remote_llm"}
+
+    out = asyncio.run(chat.handle_async(None, payload))
+
+    assert out["message"] == "Rewritten reply" and out["backend"] == "remote_llm"
+    assert "I want a todo app" in seen[0][1]["content"]
+    assert json.loads((tmp_path / "s1.json").read_text())["history"][-1]["content"] == "Rewritten reply"
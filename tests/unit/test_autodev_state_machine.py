@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import json
+
+from services.agents import autodev
+from services.queue import jobs_sqlite, worker_entry
+
+
+def _fake_step(task: str, n_tests: list[int]) -> dict:
+    if task == "test":
+        n_tests.append(1)
+        if len(n_tests) == 1:
+            return {"returncode": 1, "stdout": "FAILED tests/test_m.py::test_a - AssertionError: nope"}
+        return {"returncode": 0, "stdout": "1 passed"}
+    if task == "codegen":
+        return {"ok": True, "files": [{"path": "src/m.py", "content": "x = 1\n"}]}
+    if task == "execute":
+        return {"ok": True, "wrote": ["src/m.py"]}
+    return {"ok": True}
+
+
+def test_autodev_advances_one_step_per_completion(tmp_path, monkeypatch):
+    monkeypatch.setenv("TASK_DB", str(tmp_path / "jobs.db"))
+    monkeypatch.setattr(autodev, "_detect_project_root", lambda: tmp_path)
+    monkeypatch.setattr(autodev, "_detect_git_root", lambda: None)
+
+    jid = jobs_sqlite.enqueue_job({"task": "autodev", "payload": {"idea": "x", "module": "m", "max_cycles": 3}})
+    steps: list[str] = []
+    n_tests: list[int] = []
+    for _ in range(30):
+        rows = jobs_sqlite.claim_jobs(n=1)
+        if not rows:
+            break
+        row = rows[0]
+        if row["task"] == "autodev":
+            # Only the autodev job itself is ever parked; it never waits in a worker.
+            worker_entry._report(row["id"], row, worker_entry._process_task(row))
+            if jobs_sqlite.get_job(jid)["status"] != "done":
+                assert jobs_sqlite.get_job(jid)["status"] == "blocked"
+        else:
+            steps.append(row["task"])
+            jobs_sqlite.finish_job(row["id"], _fake_step(row["task"], n_tests))
+
+    assert steps == ["pipeline", "lint", "test", "codegen", "execute", "lint", "test"]
+    rec = jobs_sqlite.get_job(jid)
+    assert rec["status"] == "done"
+    result = json.loads(rec["result"])
+    assert result["green"] is True
+    cycles = result["steps"]["cycles"]
+    assert [c.get("index") for c in cycles] == [None, 0, 1]
+    assert cycles[1]["patched_files"] == ["src/m.py"]
+    assert cycles[1]["failures"][0]["nodeid"] == "tests/test_m.py::test_a"
+    assert result["commit"] == {"skipped": True, "reason": "no git repo present"}
+
+
+def test_autodev_resumes_after_failed_step(tmp_path, monkeypatch):
+    monkeypatch.setenv("TASK_DB", str(tmp_path / "jobs.db"))
+    monkeypatch.setattr(autodev, "_detect_project_root", lambda: tmp_path)
+    monkeypatch.setattr(autodev, "_detect_git_root", lambda: None)
+
+    jid = jobs_sqlite.enqueue_job({"task": "autodev", "payload": {"max_cycles": 1, "tests": False}})
+    (row,) = jobs_sqlite.claim_jobs(n=1)
+    worker_entry._report(jid, row, worker_entry._process_task(row))
+    (seed,) = jobs_sqlite.claim_jobs(n=1)
+    jobs_sqlite.fail_job(seed["id"], "pipeline exploded")
+
+    # A failed step still settles, so the run carries on instead of hanging.
+    (row,) = jobs_sqlite.claim_jobs(n=1)
+    assert row["id"] == jid
+    state = json.loads(row["payload"])["_state"]
+    assert state["stage"] == "seed"
+    worker_entry._report(jid, row, worker_entry._process_task(row))
+    assert jobs_sqlite.get_job(jid)["status"] == "blocked"
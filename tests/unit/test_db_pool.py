@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import pytest
+
+from services.db import pool as db_pool
+
+
+@pytest.mark.parametrize(
+    "raw, expected",
+    [
+        ("postgresql+psycopg://u:p@h:5432/db", "postgresql://u:p@h:5432/db"),
+        ("postgres://u:p@h/db", "postgresql://u:p@h/db"),
+        ("postgresql://u:p@h/db", "postgresql://u:p@h/db"),
+    ],
+)
+def test_normalize_dsn(raw, expected):
+    assert db_pool.normalize_dsn(raw) == expected
+
+
+def test_dsn_optional_ignores_sqlite(monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", "sqlite:///./data/app.db")
+    assert db_pool.dsn_optional() is None
+    with pytest.raises(RuntimeError):
+        db_pool.dsn()
+
+
+def test_dsn_optional_from_db_engine(monkeypatch):
+    monkeypatch.delenv("DATABASE_URL", raising=False)
+    monkeypatch.setenv("DB_ENGINE", "postgres")
+    monkeypatch.setenv("APP_POSTGRES_HOST", "db")
+    assert db_pool.dsn_optional() == "postgresql://app_user:app_pass@db:5432/app_db"
+
+
+def test_pool_settings_from_env(monkeypatch):
+    monkeypatch.setenv("VELU_DB_POOL_MIN_SIZE", "4")
+    monkeypatch.setenv("VELU_DB_POOL_MAX_SIZE", "2")
+    monkeypatch.setenv("VELU_DB_POOL_MAX_IDLE_SEC", "120")
+    monkeypatch.setenv("VELU_DB_POOL_CHECK", "0")
+    cfg = db_pool.pool_settings()
+    assert cfg["min_size"] == 4
+    assert cfg["max_size"] == 4
+    assert cfg["max_idle"] == 120.0
+    assert cfg["check"] is False
+
+
+def test_pool_stats_empty_without_pools():
+    db_pool.close_pools()
+    assert db_pool.pool_stats() == []
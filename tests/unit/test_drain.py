@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import pytest
+
+from services.queue import cancel, jobs_sqlite, worker_entry
+from services.queue.drain import Drain
+from services.queue.notify import IdleBackoff
+
+
+def test_drain_finishes_current_job_and_stops_claiming(tmp_path, monkeypatch):
+    monkeypatch.setenv("TASK_DB", str(tmp_path / "jobs.db"))
+    monkeypatch.setenv("WORKSPACE_BASE", str(tmp_path / "ws"))
+    drain = Drain(worker_id="w", grace=60)
+
+    def handle(payload):
+        drain.request()  # SIGTERM arrives while the job runs
+        return {"ok": True}
+
+    monkeypatch.setitem(worker_entry.HANDLERS, "echo", handle)
+    ids = [jobs_sqlite.enqueue_job({"task": "echo", "payload": {}}) for _ in range(2)]
+    try:
+        worker_entry._worker_loop(
+            wid="w",
+            using_pg=False,
+            lease_seconds=30,
+            in_pytest=True,
+            max_jobs=10,
+            prefetch=None,
+            wakeup=None,
+            backoff=IdleBackoff(base=0.01, cap=0.01),
+            drain=drain,
+        )
+    finally:
+        drain.restore()
+    assert [jobs_sqlite.get_job(j)["status"] for j in ids] == ["done", "queued"]
+
+
+def test_release_requeues_held_jobs_without_an_attempt(tmp_path, monkeypatch):
+    monkeypatch.setenv("TASK_DB", str(tmp_path / "jobs.db"))
+    held, other = (jobs_sqlite.enqueue_job({"task": "echo", "payload": {}}) for _ in range(2))
+    assert jobs_sqlite.claim_one_job()["id"] == held
+    assert jobs_sqlite.claim_one_job()["id"] == other
+
+    drain = Drain(worker_id="w", grace=60)
+    scope = cancel.CancelScope()
+    with drain.track(str(held), scope):
+        assert drain.held() == [str(held)]
+        assert drain.release() == 1
+    assert drain.held() == []
+
+    job = jobs_sqlite.get_job(held)
+    assert (job["status"], job["attempts"]) == ("queued", 0)
+    assert jobs_sqlite.get_job(other)["status"] == "working"
+    assert not scope.cancelled  # released, not cancelled
+
+
+_LEGACY_WORKER = (
+    "from services import agents; agents.HANDLERS['sleep'] = 'services.agents.sleep:handle'; "
+    "from services.worker.main import main; main()"
+)
+
+
+@pytest.mark.skipif(sys.platform != "linux", reason="needs POSIX signals")
+@pytest.mark.parametrize("argv", [["-m", "services.queue.worker_entry"], ["-c", _LEGACY_WORKER]], ids=["queue", "legacy"])
+def test_sigterm_releases_running_job_after_grace(tmp_path, monkeypatch, argv):
+    db = tmp_path / "jobs.db"
+    env = {k: v for k, v in os.environ.items() if not k.startswith("PYTEST")}
+    env.update(
+        TASK_DB=str(db),
+        WORKSPACE_BASE=str(tmp_path / "ws"),
+        PYTHONPATH=os.getcwd(),
+        VELU_JOBS_BACKEND="sqlite",
+        VELU_WORKER_DRAIN_SEC="1",
+        VELU_WORKER_TASKS="sleep",
+    )
+    monkeypatch.setenv("TASK_DB", str(db))
+    jid = jobs_sqlite.enqueue_job({"task": "sleep", "payload": {"seconds": 60}})
+    proc = subprocess.Popen(
+        [sys.executable, *argv],
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+    )
+    try:
+        deadline = time.monotonic() + 30
+        while jobs_sqlite.get_job(jid)["status"] != "working" and time.monotonic() < deadline:
+            time.sleep(0.1)
+        proc.send_signal(signal.SIGTERM)
+        out, _ = proc.communicate(timeout=20)
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.communicate()
+
+    assert proc.returncode == 128 + signal.SIGTERM, out
+    assert "draining, grace 1s" in out and "released 1 job(s)" in out
+    job = jobs_sqlite.get_job(jid)
+    assert (job["status"], job["attempts"]) == ("queued", 0)
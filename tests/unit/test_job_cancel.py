@@ -0,0 +1,101 @@
+from __future__ import annotations
+
+import json
+import sys
+import threading
+import time
+
+import pytest
+
+from services.queue import cancel, jobs_sqlite, leases, worker_entry
+
+
+def _status(jid: int) -> str:
+    return jobs_sqlite.get_job(jid)["status"]
+
+
+def test_cancel_cascades_to_run_and_dependants(tmp_path, monkeypatch):
+    monkeypatch.setenv("TASK_DB", str(tmp_path / "jobs.db"))
+    velu = {"run_id": "run-1"}
+    ex, te, sec, waiter = jobs_sqlite.enqueue_many(
+        [
+            {"task": "execute", "payload": {"_velu": velu}},
+            {"task": "test", "payload": {"_velu": velu}, "depends_on_idx": [0]},
+            {"task": "security_scan", "payload": {"_velu": velu}},
+            {"task": "pipeline_waiter", "payload": {"_velu": velu}, "depends_on_idx": [0, 1, 2], "wait_for": "finished"},
+        ]
+    )
+    other = jobs_sqlite.enqueue_job({"task": "plan", "payload": {"_velu": {"run_id": "run-2"}}})
+    (row,) = jobs_sqlite.claim_jobs(n=1, tasks=["security_scan"])
+    assert row["id"] == sec
+
+    out = jobs_sqlite.cancel_job(ex)
+    assert out["status"] == "cancelled"
+    assert sorted(out["cancelled"]) == sorted([ex, te, waiter]) and out["cancel_requested"] == [sec]
+    assert [_status(j) for j in (ex, te, sec, waiter, other)] == ["cancelled", "cancelled", "working", "cancelled", "queued"]
+    assert json.loads(jobs_sqlite.get_job(te)["err"])["error"] == "cancelled"
+
+    # The running stage is stopped by its worker at the next heartbeat.
+    assert jobs_sqlite.heartbeat(sec) == "cancel"
+    assert jobs_sqlite.mark_cancelled(sec) and _status(sec) == "cancelled"
+    assert jobs_sqlite.heartbeat(sec) == "lost"
+
+    # Terminal jobs stay as they are; unknown ids are not found.
+    assert jobs_sqlite.cancel_job(sec) == {"id": sec, "status": "cancelled", "cancelled": [], "cancel_requested": []}
+    assert jobs_sqlite.cancel_job(10_000) is None
+    assert not jobs_sqlite.mark_cancelled(other)
+
+
+def test_run_terminates_child_on_cancel():
+    s = cancel.CancelScope()
+    threading.Timer(0.2, s.cancel).start()
+    started = time.monotonic()
+    with cancel.scope(s), pytest.raises(cancel.JobCancelled):
+        cancel.run([sys.executable, "-c", "import time; time.sleep(30)"], timeout=30)
+    assert time.monotonic() - started < 10
+    assert cancel.current() is None
+
+    out = cancel.run([sys.executable, "-c", "print('hi')"], capture_output=True, text=True)
+    assert out.returncode == 0 and out.stdout.strip() == "hi"
+
+
+def test_heartbeat_cancel_stops_handler(tmp_path, monkeypatch):
+    monkeypatch.setenv("TASK_DB", str(tmp_path / "jobs.db"))
+    monkeypatch.setenv("VELU_CANCEL_CHECK_SEC", "1")
+    states = iter(["ok", "cancel"])
+    monkeypatch.setattr(leases.jobs_api, "heartbeat", lambda **kw: next(states, "cancel"))
+
+    def handler(payload):
+        cancel.run([sys.executable, "-c", "import time; time.sleep(30)"])
+        return {"ok": True}
+
+    monkeypatch.setitem(worker_entry.HANDLERS, "test", handler)
+    jid = jobs_sqlite.enqueue_job({"task": "test", "payload": {}})
+    (row,) = jobs_sqlite.claim_jobs(n=1)
+
+    with leases.Heartbeat(job_id=str(jid), worker_id="w", lease_seconds=30) as hb, cancel.scope(hb.scope):
+        with pytest.raises(cancel.JobCancelled):
+            worker_entry._process_task(row)
+    assert hb.cancelled and not hb.lost
+
+
+def test_legacy_worker_cancels_running_job(tmp_path, monkeypatch):
+    from services import agents
+    from services.worker import main as legacy
+
+    monkeypatch.setenv("TASK_DB", str(tmp_path / "jobs.db"))
+    monkeypatch.setenv("WORKSPACE_BASE", str(tmp_path / "ws"))
+    monkeypatch.setenv("VELU_CANCEL_CHECK_SEC", "1")
+    monkeypatch.setenv("WORKER_MAX_ITERS", "1")
+
+    def handler(payload):
+        jobs_sqlite.cancel_job(jid)
+        cancel.run([sys.executable, "-c", "import time; time.sleep(30)"])
+        return {"ok": True}
+
+    monkeypatch.setitem(agents.HANDLERS, "security_scan", handler)
+    jid = jobs_sqlite.enqueue_job({"task": "security_scan", "payload": {}})
+    started = time.monotonic()
+    legacy.worker_main()
+    assert time.monotonic() - started < 10
+    assert _status(jid) == "cancelled"
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import json
+
+from services.queue import jobs_sqlite
+from services.queue.base import dependency_ids
+
+
+def _status(jid: int) -> str:
+    return jobs_sqlite.get_job(jid)["status"]
+
+
+def test_dependency_ids_normalizes():
+    assert dependency_ids({"depends_on": [1, "1", " 2 ", None, ""]}) == ["1", "2"]
+    assert dependency_ids({"depends_on": 7}) == ["7"]
+    assert dependency_ids({}) == [] and dependency_ids(None) == []
+
+
+def test_children_blocked_until_all_parents_done(tmp_path, monkeypatch):
+    monkeypatch.setenv("TASK_DB", str(tmp_path / "jobs.db"))
+    ex, te, pk = jobs_sqlite.enqueue_many(
+        [
+            {"task": "execute", "payload": {}},
+            {"task": "test", "payload": {}, "depends_on_idx": [0]},
+            {"task": "packager", "payload": {}, "depends_on_idx": [0, 1]},
+        ]
+    )
+    assert [_status(j) for j in (ex, te, pk)] == ["queued", "blocked", "blocked"]
+    assert [r["id"] for r in jobs_sqlite.claim_jobs(n=5)] == [ex]
+
+    jobs_sqlite.finish_job(ex, {"ok": True})
+    assert [_status(j) for j in (te, pk)] == ["queued", "blocked"]
+    assert [r["id"] for r in jobs_sqlite.claim_jobs(n=5)] == [te]
+
+    jobs_sqlite.finish_job(te, {"ok": True})
+    assert _status(pk) == "queued"
+
+
+def test_failure_propagates_downstream(tmp_path, monkeypatch):
+    monkeypatch.setenv("TASK_DB", str(tmp_path / "jobs.db"))
+    a, b, c = jobs_sqlite.enqueue_many(
+        [
+            {"task": "execute", "payload": {}},
+            {"task": "test", "payload": {}, "depends_on_idx": [0]},
+            {"task": "packager", "payload": {}, "depends_on_idx": [1]},
+        ]
+    )
+    jobs_sqlite.claim_jobs(n=1)
+    jobs_sqlite.fail_job(a, "boom")
+    assert [_status(j) for j in (b, c)] == ["error", "error"]
+    assert json.loads(jobs_sqlite.get_job(c)["err"]) == {"error": "dependency failed", "dependency": a}
+
+    # New work depending on a failed parent never runs.
+    late = jobs_sqlite.enqueue_job({"task": "report", "payload": {"depends_on": [a]}})
+    assert _status(late) == "error"
+
+
+def test_done_or_unknown_parents_do_not_block(tmp_path, monkeypatch):
+    monkeypatch.setenv("TASK_DB", str(tmp_path / "jobs.db"))
+    parent = jobs_sqlite.enqueue_job({"task": "plan", "payload": {}})
+    jobs_sqlite.claim_jobs(n=1)
+    jobs_sqlite.finish_job(parent, {"ok": True})
+    child = jobs_sqlite.enqueue_job({"task": "report", "payload": {"depends_on": [parent, 999, "x"]}})
+    assert _status(child) == "queued"
+
+
+def test_retry_keeps_children_blocked_until_dead(tmp_path, monkeypatch):
+    monkeypatch.setenv("TASK_DB", str(tmp_path / "jobs.db"))
+    monkeypatch.setenv("VELU_RETRY_POLICIES", "execute=2:0:0")
+    from services.queue import queue_api
+
+    a, b = jobs_sqlite.enqueue_many(
+        [{"task": "execute", "payload": {}}, {"task": "test", "payload": {}, "depends_on_idx": [0]}]
+    )
+    jobs_sqlite.claim_jobs(n=1)
+    assert queue_api.retry_job(a, "flaky", task="execute") == "queued"
+    assert _status(b) == "blocked"
+    jobs_sqlite.claim_jobs(n=1)
+    assert queue_api.retry_job(a, "flaky", task="execute") == "dead"
+    assert _status(b) == "error"
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import datetime as dt
+
+import pytest
+
+from services.contracts.jobs import decode_cursor, encode_cursor
+from services.queue import jobs_sqlite, queue_api
+
+
+def test_cursor_roundtrip_and_rejects_garbage():
+    ts = dt.datetime(2026, 1, 2, 3, 4, 5, tzinfo=dt.timezone.utc)
+    cur = encode_cursor(ts, "abc")
+    assert "=" not in cur
+    assert decode_cursor(cur) == (ts.isoformat(), "abc")
+    for bad in ("garbage", encode_cursor(None, "x"), encode_cursor(ts, "")):
+        with pytest.raises(ValueError):
+            decode_cursor(bad)
+
+
+def test_sqlite_keyset_pages_cover_everything_once(tmp_path, monkeypatch):
+    monkeypatch.setenv("TASK_DB", str(tmp_path / "jobs.db"))
+    ids = [jobs_sqlite.enqueue_job({"task": "plan" if i % 2 else "test", "payload": {"i": i}}) for i in range(7)]
+
+    seen: list[int] = []
+    cursor = None
+    pages = 0
+    while True:
+        rows, cursor = queue_api.list_page_for_org(org_id="local", limit=3, cursor=cursor, view="status")
+        seen.extend(r["id"] for r in rows)
+        pages += 1
+        if cursor is None:
+            break
+    assert pages == 3
+    assert seen == sorted(ids, reverse=True)
+
+    rows, cursor = queue_api.list_page_for_org(org_id="local", limit=10, task="plan", view="summary")
+    assert cursor is None
+    assert [r["id"] for r in rows] == [i for i in sorted(ids, reverse=True) if (i - ids[0]) % 2]
+    assert all(r["task"] == "plan" for r in rows)
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from services.contracts.jobs import job_item_from_row, normalize_view
+from services.queue import jobs_sqlite, queue_api
+
+
+def test_normalize_view_defaults_and_legacy_expand():
+    assert normalize_view(None) == "summary"
+    assert normalize_view("STATUS") == "status"
+    assert normalize_view("bogus") == "summary"
+    assert normalize_view("", expand=1) == "full"
+    assert normalize_view("status", expand=1) == "status"
+
+
+def test_sqlite_views_project_columns(tmp_path, monkeypatch):
+    monkeypatch.setenv("TASK_DB", str(tmp_path / "jobs.db"))
+    ok_id = jobs_sqlite.enqueue_job({"task": "plan", "payload": {"idea": "x", "_org_id": "o1"}})
+    jobs_sqlite.finish_job(ok_id, {"ok": True, "files": [{"path": "a.py", "content": "x" * 1000}]})
+    bad_id = jobs_sqlite.enqueue_job({"task": "plan", "payload": {"idea": "y"}})
+    jobs_sqlite.fail_job(bad_id, "boom")
+
+    status = queue_api.get(ok_id, view="status")
+    assert "payload" not in status and "result" not in status
+    assert job_item_from_row(status, "status") == {"id": ok_id, "status": "done"}
+
+    summary = job_item_from_row(queue_api.get(ok_id, view="summary"), "summary")
+    assert summary["ok"] is True and summary["task"] == "plan" and summary["error"] is None
+    assert "result" not in summary and "payload" not in summary
+
+    failed = job_item_from_row(queue_api.get(bad_id, view="summary"), "summary")
+    assert failed["status"] == "error" and failed["error"] == "boom" and failed["ok"] is None
+
+    assert queue_api.get_job_for_org(str(ok_id), "o1", view="summary")["id"] == ok_id
+    assert queue_api.get_job_for_org(str(ok_id), "o2", view="summary") is None
+
+    rows = list(queue_api.list_recent(limit=10, view="summary"))
+    assert [r["id"] for r in rows] == [bad_id, ok_id]
+    assert all("result" not in r for r in rows)
+
+    full = job_item_from_row(queue_api.get(ok_id), "full")
+    assert full["result"]["files"][0]["path"] == "a.py"
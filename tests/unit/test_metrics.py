@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import subprocess
+import sys
+import textwrap
+import time
+from contextlib import closing
+
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from services import metrics
+from services.app_server.main import create_app
+from services.queue import jobs_sqlite, worker_entry
+from services.queue.notify import IdleBackoff
+
+
+def _sample(name: str, **labels: str) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_requests_are_labelled_by_route_template(tmp_path, monkeypatch):
+    monkeypatch.setenv("TASK_DB", str(tmp_path / "jobs.db"))
+    client = TestClient(create_app())
+    before = _sample("http_requests_total", method="GET", path="/results/{job_id}", status="200")
+
+    client.get("/results/123456")
+    client.get("/results/987654")
+
+    assert _sample("http_requests_total", method="GET", path="/results/{job_id}", status="200") == before + 2
+    assert _sample("http_request_duration_seconds_count", method="GET", path="/results/{job_id}") >= 2
+    body = client.get("/metrics").text
+    assert 'http_requests_total{method="GET",path="/results/{job_id}",status="200"}' in body
+    assert "velu_queue_jobs" in body and "velu_db_pool_in_use" in body
+
+
+def test_worker_records_wait_run_and_phases(tmp_path, monkeypatch):
+    monkeypatch.setenv("TASK_DB", str(tmp_path / "jobs.db"))
+    monkeypatch.setenv("WORKSPACE_BASE", str(tmp_path / "ws"))
+    monkeypatch.setitem(worker_entry.HANDLERS, "echo", lambda payload: {"ok": True, "echo": payload.get("x")})
+    runs = _sample("velu_job_run_seconds_count", task="echo", outcome="ok")
+    empty = _sample("velu_worker_claims_empty_total")
+
+    jobs_sqlite.enqueue_job({"task": "echo", "payload": {"x": 1}})
+    worker_entry._worker_loop(
+        wid="w",
+        using_pg=False,
+        lease_seconds=30,
+        in_pytest=True,
+        max_jobs=1,
+        prefetch=None,
+        wakeup=None,
+        backoff=IdleBackoff(base=0.01, cap=0.01),
+    )
+
+    assert _sample("velu_job_run_seconds_count", task="echo", outcome="ok") == runs + 1
+    assert _sample("velu_job_wait_seconds_count", task="echo") >= 1
+    for phase in ("workspace", "materialize", "finish"):
+        assert _sample("velu_job_phase_seconds_count", task="echo", phase=phase) >= 1
+    assert _sample("velu_worker_claims_empty_total") == empty
+
+
+def test_wait_counts_from_when_a_job_was_queued(tmp_path, monkeypatch):
+    monkeypatch.setenv("TASK_DB", str(tmp_path / "jobs.db"))
+    parent = jobs_sqlite.enqueue_job({"task": "stage1", "payload": {}})
+    child = jobs_sqlite.enqueue_job({"task": "stage2", "payload": {"depends_on": [parent]}})
+    hour_ago = time.time() - 3600
+    with closing(jobs_sqlite._sqlite_connect()) as conn, conn:
+        conn.execute("UPDATE jobs SET created_at=?, next_run_at=?", (hour_ago, hour_ago))
+
+    (row,) = jobs_sqlite.claim_jobs(n=1)
+    jobs_sqlite.finish_job(row["id"], {"ok": True})
+    before = _sample("velu_job_wait_seconds_sum", task="stage2")
+    (row,) = jobs_sqlite.claim_jobs(n=1)
+    assert row["id"] == child
+    metrics.observe_claim(row)
+    assert _sample("velu_job_wait_seconds_sum", task="stage2") - before < 60
+
+    assert jobs_sqlite.release_jobs([child]) == 1
+    assert jobs_sqlite.get_job(child)["next_run_at"] >= time.time() - 60
+
+
+def test_multiprocess_dir_merges_processes(tmp_path):
+    # Each child writes to the shared directory; a fresh process renders the sum.
+    env = {"PROMETHEUS_MULTIPROC_DIR": str(tmp_path), "PATH": "", "PYTHONPATH": "."}
+    write = "from services import metrics; metrics.claim_empty()"
+    for _ in range(2):
+        subprocess.run([sys.executable, "-c", write], env=env, check=True)
+    read = textwrap.dedent(
+        """
+        from unittest import mock
+        from services import metrics
+        with mock.patch.object(metrics.QueueDepthCollector, "_read", return_value={}):
+            print(metrics.render()[0].decode())
+        """
+    )
+    out = subprocess.run([sys.executable, "-c", read], env=env, check=True, capture_output=True, text=True).stdout
+    assert "velu_worker_claims_empty_total 2.0" in out
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import pytest
+
+from services.agents import pipeline_waiter
+from services.queue import jobs_sqlite
+
+
+def _batch():
+    return jobs_sqlite.enqueue_many(
+        [
+            {"task": "execute", "payload": {}},
+            {"task": "test", "payload": {}, "depends_on_idx": [0]},
+            {"task": "packager", "payload": {}, "depends_on_idx": [0, 1]},
+            {
+                "task": "pipeline_waiter",
+                "payload": {"stage_names": ["execute", "test", "packager"], "gates": {"unit_tests": "", "build": ""}},
+                "depends_on_idx": [0, 1, 2],
+                "wait_for": "finished",
+            },
+        ]
+    )
+
+
+def test_waiter_runs_once_after_all_stages_done(tmp_path, monkeypatch):
+    monkeypatch.setenv("TASK_DB", str(tmp_path / "jobs.db"))
+    ex, te, pk, waiter = _batch()
+    for jid, res in ((ex, {"ok": True}), (te, {"ok": True}), (pk, {"ok": True, "artifact_path": "/tmp/a.zip"})):
+        assert jobs_sqlite.get_job(waiter)["status"] == "blocked"
+        assert [r["id"] for r in jobs_sqlite.claim_jobs(n=5)] == [jid]
+        jobs_sqlite.finish_job(jid, res)
+
+    (row,) = jobs_sqlite.claim_jobs(n=5)
+    assert row["id"] == waiter
+    out = pipeline_waiter.handle(jobs_sqlite.get_job(waiter)["payload"])
+    assert out["ok"] is True
+    assert out["gates"] == {"unit_tests": "pass", "build": "pass"}
+    assert out["artifact_path"] == "/tmp/a.zip"
+
+
+def test_waiter_reports_failed_stages(tmp_path, monkeypatch):
+    monkeypatch.setenv("TASK_DB", str(tmp_path / "jobs.db"))
+    ex, te, pk, waiter = _batch()
+    jobs_sqlite.claim_jobs(n=1)
+    jobs_sqlite.fail_job(ex, "boom")
+    # test/packager fail with their parent; the waiter only needed them to settle.
+    assert jobs_sqlite.get_job(waiter)["status"] == "queued"
+
+    out = pipeline_waiter.handle(jobs_sqlite.get_job(waiter)["payload"])
+    assert out["ok"] is False
+    assert out["failed_stages"] == ["execute", "packager", "test"]
+    assert out["gates"] == {"unit_tests": "fail", "build": "fail"}
+
+
+def test_waiter_without_edges_does_not_spin(tmp_path, monkeypatch):
+    monkeypatch.setenv("TASK_DB", str(tmp_path / "jobs.db"))
+    jid = jobs_sqlite.enqueue_job({"task": "execute", "payload": {}})
+    with pytest.raises(pipeline_waiter.StagesPending):
+        pipeline_waiter.handle({"stage_jobs": {"execute": jid}})
+
+
+def test_worker_requeues_pending_waiter(tmp_path, monkeypatch):
+    monkeypatch.setenv("TASK_DB", str(tmp_path / "jobs.db"))
+    from services.queue import worker_entry
+
+    stage = jobs_sqlite.enqueue_job({"task": "execute", "payload": {}}, priority=-1)
+    waiter = jobs_sqlite.enqueue_job({"task": "pipeline_waiter", "payload": {"stage_jobs": {"execute": stage}}})
+    (row,) = jobs_sqlite.claim_jobs(n=1)
+    assert row["id"] == waiter
+    with pytest.raises(pipeline_waiter.StagesPending):
+        worker_entry._process_task(row)
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+
+from services.queue import jobs_sqlite, queue_async
+
+
+def test_sqlite_calls_run_on_the_bounded_pool(tmp_path, monkeypatch):
+    monkeypatch.setenv("TASK_DB", str(tmp_path / "jobs.db"))
+    monkeypatch.setenv("VELU_QUEUE_THREADS", "2")
+    queue_async.shutdown()
+    seen: set[str] = set()
+    real_get = jobs_sqlite.get_job
+
+    def get_job(job_id, **kw):
+        seen.add(threading.current_thread().name)
+        return real_get(job_id, **kw)
+
+    monkeypatch.setattr(jobs_sqlite, "get_job", get_job)
+
+    async def main():
+        jid = await queue_async.enqueue_job({"task": "plan", "payload": {"idea": "x"}}, key="k")
+        again = await queue_async.enqueue_job({"task": "plan", "payload": {"idea": "x"}}, key="k")
+        rows = await asyncio.gather(*[queue_async.get_job(jid) for _ in range(6)])
+        recent = await queue_async.list_recent(limit=5)
+        return jid, again, rows, recent
+
+    try:
+        jid, again, rows, recent = asyncio.run(main())
+    finally:
+        queue_async.shutdown()
+    assert again == jid
+    assert all(r["id"] == jid and r["status"] == "queued" for r in rows)
+    assert [r["id"] for r in recent] == [jid]
+    assert seen and all(n.startswith("velu-queue") for n in seen) and len(seen) <= 2
+
+
+def test_native_enqueue_attributes_like_the_sync_path(monkeypatch):
+    calls: list[dict] = []
+
+    async def enqueue_job(job, **kw):
+        calls.append(kw)
+        return "j1"
+
+    monkeypatch.setattr(queue_async, "using_postgres_jobs", lambda: True)
+    monkeypatch.setattr(queue_async.jobs_postgres_async, "enqueue_job", enqueue_job)
+
+    async def main():
+        await queue_async.enqueue(task="plan", payload={}, org_id="o", created_by="svc", actor_id="u1")
+        await queue_async.enqueue(task="plan", payload={}, org_id="o", created_by="svc")
+
+    asyncio.run(main())
+    assert [c["actor_id"] for c in calls] == ["u1", "svc"]
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import json
+
+from services.queue import blobs, jobs_sqlite, queue_api
+
+
+def _big_result(n: int = 200) -> dict:
+    return {
+        "ok": True,
+        "agent": "codegen",
+        "artifact_path": "/tmp/out.zip",
+        "files": [{"path": f"src/f{i}.py", "content": "x = 1\n" * 200} for i in range(n)],
+    }
+
+
+def test_offload_roundtrip_keeps_scalars_inline(tmp_path):
+    store = blobs.LocalBlobStore(tmp_path)
+    doc = _big_result()
+    stub = blobs.offload(doc, threshold=1024, store=store)
+    assert blobs.is_stub(stub)
+    assert stub["ok"] is True and stub["artifact_path"] == "/tmp/out.zip"
+    assert "files" not in stub
+    assert stub["summary"]["files"]["count"] == 200
+    assert stub["_blob"]["stored_bytes"] < stub["_blob"]["bytes"]
+    assert blobs.resolve(stub, store=store) == doc
+
+
+def test_small_documents_stay_inline(tmp_path):
+    store = blobs.LocalBlobStore(tmp_path)
+    doc = {"ok": True, "files": []}
+    assert blobs.offload(doc, threshold=1024, store=store) is doc
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_sqlite_result_offloaded_and_resolved_lazily(tmp_path, monkeypatch):
+    monkeypatch.setenv("TASK_DB", str(tmp_path / "jobs.db"))
+    monkeypatch.setenv("VELU_BLOB_DIR", str(tmp_path / "blobs"))
+    monkeypatch.setenv("VELU_BLOB_THRESHOLD_BYTES", "4096")
+    jid = jobs_sqlite.enqueue_job({"task": "codegen", "payload": {"idea": "x"}})
+    jobs_sqlite.finish_job(jid, _big_result())
+
+    stored = json.loads(jobs_sqlite.get_job(jid)["result"])
+    assert blobs.is_stub(stored)
+    assert stored["ok"] is True
+
+    assert json.loads(queue_api.get(jid, resolve=False)["result"]) == stored
+    assert len(queue_api.get(jid)["result"]["files"]) == 200
@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+from services.queue import jobs_sqlite
+
+
+def test_claim_jobs_batch_and_release(tmp_path, monkeypatch):
+    monkeypatch.setenv("TASK_DB", str(tmp_path / "jobs.db"))
+    ids = [jobs_sqlite.enqueue_job({"task": "plan", "payload": {"i": i}}, priority=i % 2) for i in range(4)]
+
+    rows = jobs_sqlite.claim_jobs(n=3)
+    assert len(rows) == 3
+    assert {r["status"] for r in rows} == {"working"}
+    # priority DESC, then oldest first
+    assert [r["id"] for r in rows] == [ids[1], ids[3], ids[0]]
+
+    assert jobs_sqlite.release_jobs([rows[1]["id"], rows[2]["id"]]) == 2
+    for jid in (ids[3], ids[0]):
+        row = jobs_sqlite.get_job(jid)
+        assert row["status"] == "queued"
+        assert int(row["attempts"] or 0) == 0
+
+    again = jobs_sqlite.claim_jobs(n=10)
+    assert sorted(r["id"] for r in again) == sorted([ids[0], ids[2], ids[3]])
+    assert jobs_sqlite.claim_jobs(n=10) == []
@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+import pytest
+
+from services.queue import jobs_sqlite, queue_api
+
+
+def test_enqueue_many_returns_ids_in_order_and_resolves_deps(tmp_path, monkeypatch):
+    monkeypatch.setenv("TASK_DB", str(tmp_path / "jobs.db"))
+    ids = queue_api.enqueue_many(
+        [
+            {"task": "execute", "payload": {"a": 1}},
+            {"task": "test", "payload": {}, "depends_on_idx": [0]},
+            {"task": "packager", "payload": {"depends_on": ["x"]}, "priority": 3, "depends_on_idx": [0, 1]},
+        ]
+    )
+    assert len(ids) == 3 and ids == sorted(ids)
+    rows = [jobs_sqlite.get_job(i) for i in ids]
+    assert [r["task"] for r in rows] == ["execute", "test", "packager"]
+    assert rows[1]["payload"]["depends_on"] == [ids[0]]
+    assert rows[2]["payload"]["depends_on"] == ["x", ids[0], ids[1]]
+    assert rows[2]["priority"] == 3
+
+
+def test_enqueue_many_rejects_forward_refs_atomically(tmp_path, monkeypatch):
+    monkeypatch.setenv("TASK_DB", str(tmp_path / "jobs.db"))
+    with pytest.raises(ValueError):
+        queue_api.enqueue_many([{"task": "a"}, {"task": "b", "depends_on_idx": [1]}])
+    assert jobs_sqlite.claim_jobs(n=10) == []
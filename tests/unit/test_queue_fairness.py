@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+from services.queue import fairness
+
+
+def test_caps_follow_plan_and_env(monkeypatch):
+    assert fairness.cap_for_plan("base") == fairness.cap_for_plan("starter") == 2
+    assert fairness.cap_for_plan("hero") == 8
+    assert fairness.cap_for_plan("SuperHero") == 32
+    assert fairness.cap_for_plan(None) == 2
+    monkeypatch.setenv("VELU_ORG_CAP_GROWTH", "3")
+    assert fairness.cap_for_plan("growth") == 3
+
+
+def test_mode_defaults_to_priority(monkeypatch):
+    monkeypatch.delenv("VELU_SCHEDULER", raising=False)
+    assert fairness.mode() == "priority"
+    monkeypatch.setenv("VELU_SCHEDULER", "fair")
+    assert fairness.mode() == "fair"
+
+
+def test_fair_order_by_cap_share_then_least_recently_served():
+    cands = [
+        {"org_id": "busy", "working": 2, "cap": 2, "last_claimed_at": None},
+        {"org_id": "half", "working": 4, "cap": 8, "last_claimed_at": 1.0},
+        {"org_id": "recent", "working": 0, "cap": 2, "last_claimed_at": 5.0},
+        {"org_id": "stale", "working": 0, "cap": 2, "last_claimed_at": 1.0},
+        {"org_id": "new", "working": 0, "cap": 2, "last_claimed_at": None},
+    ]
+    assert [c["org_id"] for c in fairness.fair_order(cands)] == ["new", "stale", "recent", "half"]
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+from contextlib import closing
+
+import pytest
+from fastapi.testclient import TestClient
+
+from services.queue import idempotency, jobs_sqlite, queue_api
+
+
+def test_normalize_key():
+    assert idempotency.normalize_key(None) is None
+    assert idempotency.normalize_key("  ") is None
+    assert idempotency.normalize_key(" abc ") == "abc"
+    with pytest.raises(ValueError):
+        idempotency.normalize_key("x" * 256)
+    with pytest.raises(ValueError):
+        idempotency.normalize_key("a\nb")
+    assert idempotency.scoped_key("org1", "k") == "org1/k"
+    assert idempotency.scoped_key(None, "k") == "k"
+
+
+def test_sqlite_duplicate_returns_original_per_org(tmp_path, monkeypatch):
+    monkeypatch.setenv("TASK_DB", str(tmp_path / "jobs.db"))
+    job = {"task": "plan", "payload": {}}
+    first = queue_api.enqueue(job, key="k1", org_id="a")
+    assert queue_api.enqueue(job, key="k1", org_id="a") == first
+    assert queue_api.enqueue(job, key="k1", org_id="b") != first
+    assert queue_api.enqueue(job, org_id="a") != first
+    assert len(jobs_sqlite.claim_jobs(n=10)) == 3
+
+
+def test_sqlite_key_expires(tmp_path, monkeypatch):
+    monkeypatch.setenv("TASK_DB", str(tmp_path / "jobs.db"))
+    monkeypatch.setenv("VELU_IDEMPOTENCY_TTL_SEC", "60")
+    first = jobs_sqlite.enqueue_job({"task": "plan", "payload": {}}, key="k")
+    monkeypatch.setattr(jobs_sqlite, "_now", lambda: jobs_sqlite.time.time() + 120)
+    assert jobs_sqlite.enqueue_job({"task": "plan", "payload": {}}, key="k") != first
+
+
+def test_post_tasks_honours_idempotency_key(tmp_path, monkeypatch):
+    monkeypatch.setenv("TASK_DB", str(tmp_path / "jobs.db"))
+    from services.app_server.main import create_app
+
+    c = TestClient(create_app())
+    body = {"task": "plan", "payload": {"idea": "x"}}
+    r1 = c.post("/tasks", json=body, headers={"Idempotency-Key": "retry-1"})
+    r2 = c.post("/tasks", json=body, headers={"Idempotency-Key": "retry-1"})
+    r3 = c.post("/tasks", json=body)
+    assert r1.status_code == r2.status_code == r3.status_code == 200
+    assert r1.json()["job_id"] == r2.json()["job_id"] != r3.json()["job_id"]
+    assert c.post("/tasks", json=body, headers={"Idempotency-Key": "x" * 300}).status_code == 400
+
+
+def test_sqlite_upgrade_drops_superseded_key_index(tmp_path, monkeypatch):
+    monkeypatch.setenv("TASK_DB", str(tmp_path / "jobs.db"))
+    jobs_sqlite.ensure_schema()
+    with closing(jobs_sqlite._sqlite_connect()) as conn, conn:
+        conn.execute("CREATE INDEX idx_jobs_key ON jobs(key)")  # what older releases created
+    jobs_sqlite.ensure_schema()
+    with closing(jobs_sqlite._sqlite_connect()) as conn:
+        names = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='index'")}
+    assert "idx_jobs_key_created" in names and "idx_jobs_key" not in names
@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+from services.queue.leases import LeasePolicy
+
+
+def _policy(p95, n, **kw):
+    calls = []
+
+    def fake(task):
+        calls.append(task)
+        return p95, n
+
+    return LeasePolicy(max_seconds=300, min_seconds=15, factor=2.0, min_samples=20, p95_fn=fake, **kw), calls
+
+
+def test_lease_defaults_to_max_without_enough_samples():
+    policy, _ = _policy(4.0, 3)
+    assert policy.lease_for("plan") == 300
+
+
+def test_lease_scales_with_p95_and_is_clamped():
+    assert _policy(40.0, 100)[0].lease_for("plan") == 80
+    assert _policy(1.0, 100)[0].lease_for("plan") == 15
+    assert _policy(900.0, 100)[0].lease_for("plan") == 300
+
+
+def test_lease_is_cached_per_task():
+    policy, calls = _policy(40.0, 100, ttl=60)
+    policy.lease_for("plan")
+    policy.lease_for("plan")
+    policy.lease_for("test")
+    assert calls == ["plan", "test"]
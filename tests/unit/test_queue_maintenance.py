@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+from services.queue import maintenance
+
+
+def test_settings_from_env(monkeypatch):
+    monkeypatch.setenv("VELU_ARCHIVE_AFTER_DAYS", "2")
+    monkeypatch.setenv("VELU_ARCHIVE_RETENTION_DAYS", "0")
+    monkeypatch.setenv("VELU_ARCHIVE_BATCH", "250")
+    cfg = maintenance.settings()
+    assert cfg["archive_after_seconds"] == 2 * 24 * 3600
+    assert cfg["retention_seconds"] is None
+    assert cfg["batch_size"] == 250
+
+
+def test_run_once_is_noop_on_sqlite(monkeypatch):
+    monkeypatch.setenv("VELU_JOBS_BACKEND", "sqlite")
+    assert maintenance.run_once() is None
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import json
+
+from services.queue import jobs_sqlite, memo, queue_api, worker_entry
+
+
+def test_key_ignores_metadata_and_order(monkeypatch):
+    monkeypatch.setenv("VELU_MEMO_TASKS", "requirements")
+    a = memo.key_for("requirements", {"idea": "x", "tags": [1, 2], "_velu": {"run_id": "r1"}})
+    b = memo.key_for("requirements", {"tags": [1, 2], "idea": "x", "_velu": {"run_id": "r2"}})
+    assert a == b and a.startswith("requirements:")
+    assert memo.key_for("requirements", {"idea": "y"}) != a
+    assert memo.key_for("architecture", {"idea": "x"}) is None
+
+    monkeypatch.setenv("VELU_MEMO_TASKS", "*")
+    assert memo.enabled_tasks() >= set(memo.DETERMINISTIC_TASKS)
+    monkeypatch.setitem(memo.DETERMINISTIC_TASKS, "requirements", "2")
+    assert memo.key_for("requirements", {"idea": "x", "tags": [1, 2]}) != a
+
+
+def test_enqueue_key_skips_dependent_and_scheduled_jobs(monkeypatch):
+    monkeypatch.setenv("VELU_MEMO_TASKS", "*")
+    assert memo.enqueue_key({"task": "datamodel", "payload": {}})
+    assert memo.enqueue_key({"task": "datamodel", "payload": {"depends_on": ["1"]}}) is None
+    assert memo.enqueue_key({"task": "datamodel", "payload": {}, "delay_seconds": 5}) is None
+
+
+def test_worker_memoizes_and_enqueue_completes_hits(tmp_path, monkeypatch):
+    monkeypatch.setenv("TASK_DB", str(tmp_path / "jobs.db"))
+    monkeypatch.setenv("VELU_MEMO_TASKS", "datamodel")
+    calls: list[dict] = []
+
+    def handler(payload):
+        calls.append(payload)
+        return {"ok": True, "entities": payload.get("entities")}
+
+    monkeypatch.setitem(worker_entry.HANDLERS, "datamodel", handler)
+    job = {"task": "datamodel", "payload": {"entities": ["User"]}}
+
+    first = queue_api.enqueue(job)
+    (row,) = jobs_sqlite.claim_jobs(n=1)
+    jobs_sqlite.finish_job(first, worker_entry._process_task(row))
+    assert len(calls) == 1
+
+    # Same payload: done at enqueue, never claimed, handler not re-run.
+    second = queue_api.enqueue(job)
+    rec = jobs_sqlite.get_job(second)
+    assert rec["status"] == "done"
+    assert json.loads(rec["result"]) == {"ok": True, "entities": ["User"]}
+    assert jobs_sqlite.claim_jobs(n=1) == []
+
+    # A claimed job (e.g. enqueued before the first finished) hits in the worker.
+    jobs_sqlite.enqueue_job(job)
+    (row,) = jobs_sqlite.claim_jobs(n=1)
+    assert worker_entry._process_task(row) == {"ok": True, "entities": ["User"]}
+    assert len(calls) == 1
+
+
+def test_failures_are_not_cached_and_lru_evicts(tmp_path, monkeypatch):
+    monkeypatch.setenv("TASK_DB", str(tmp_path / "jobs.db"))
+    assert not memo.cacheable({"ok": False, "error": "x"})
+    assert not memo.cacheable({"ok": True, "_defer": {"wait_on": []}})
+
+    monkeypatch.setenv("VELU_MEMO_MAX_MB", str(150 / (1024 * 1024)))
+    # Room for two entries: touching k0 makes k1 the least recently used.
+    jobs_sqlite.memo_put("k0", "datamodel", {"ok": True, "pad": "x" * 40})
+    jobs_sqlite.memo_put("k1", "datamodel", {"ok": True, "pad": "x" * 40})
+    assert jobs_sqlite.memo_get("k0") is not None
+    jobs_sqlite.memo_put("k2", "datamodel", {"ok": True, "pad": "x" * 40})
+    assert jobs_sqlite.memo_get("k1") is None
+    assert jobs_sqlite.memo_get("k0") is not None and jobs_sqlite.memo_get("k2") is not None
+
+
+def test_hits_with_files_are_left_to_the_worker(tmp_path, monkeypatch):
+    monkeypatch.setenv("TASK_DB", str(tmp_path / "jobs.db"))
+    monkeypatch.setenv("WORKSPACE_BASE", str(tmp_path / "ws"))
+    monkeypatch.setenv("VELU_MEMO_TASKS", "ui_scaffold")
+    files = [{"path": "web/App.tsx", "content": "export {}\n"}]
+    job = {"task": "ui_scaffold", "payload": {"module": "crm"}}
+    jobs_sqlite.memo_put(memo.enqueue_key(job), "ui_scaffold", {"ok": True, "files": files})
+    assert memo.writes_files({"_blob": {"ref": "r"}, "summary": {"keys": ["files", "ok"]}})
+
+    jid = queue_api.enqueue(job)
+    assert jobs_sqlite.get_job(jid)["status"] == "queued"
+    (row,) = jobs_sqlite.claim_jobs(n=1)
+    ws = tmp_path / "ws" / "job"
+    result = worker_entry._finalize_result(row, ws, "ui_scaffold", worker_entry._process_task(row, ws), "w")
+    assert result["wrote"] == ["web/App.tsx"] and (ws / "web" / "App.tsx").exists()
@@ -0,0 +1,19 @@
+from __future__ import annotations
+
+from services.queue.notify import CHANNEL_PREFIX, IdleBackoff, channel_for
+
+
+def test_channel_for_is_stable_and_bounded():
+    assert channel_for("Plan") == CHANNEL_PREFIX + "plan"
+    long_a = channel_for("a" * 100)
+    long_b = channel_for("a" * 99 + "b")
+    assert len(long_a.encode()) <= 63
+    assert long_a != long_b
+    assert channel_for("a" * 100) == long_a
+
+
+def test_idle_backoff_doubles_to_cap_and_resets():
+    b = IdleBackoff(base=0.1, cap=0.5)
+    assert [round(b.next(), 2) for _ in range(5)] == [0.1, 0.2, 0.4, 0.5, 0.5]
+    b.reset()
+    assert b.next() == 0.1
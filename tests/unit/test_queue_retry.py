@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import datetime as dt
+import time
+from contextlib import closing
+
+from services.queue import jobs_sqlite, queue_api, retry
+
+
+def test_backoff_doubles_caps_and_jitters_down():
+    p = retry.RetryPolicy(max_attempts=5, base_delay=2.0, max_delay=10.0, jitter=0.5)
+    assert [p.delay_for(n, rand=lambda: 0.0) for n in (1, 2, 3, 4)] == [2.0, 4.0, 8.0, 10.0]
+    assert p.delay_for(2, rand=lambda: 1.0) == 2.0
+    assert p.decide(4)[0] == "queued"
+    assert p.decide(5) == ("dead", None)
+    assert retry.RetryPolicy(max_attempts=1).decide(1) == ("error", None)
+
+
+def test_policy_overrides(monkeypatch):
+    monkeypatch.setenv("VELU_RETRY_MAX_ATTEMPTS", "4")
+    monkeypatch.setenv("VELU_RETRY_POLICIES", "test=6:1:30;bogus=x")
+    assert retry.policy_for("plan").max_attempts == 4
+    assert retry.policy_for("gitcommit").max_attempts == 1
+    t = retry.policy_for("test")
+    assert (t.max_attempts, t.base_delay, t.max_delay) == (6, 1.0, 30.0)
+    assert "bogus" not in retry.task_policies()
+
+
+def test_parse_run_at_forms():
+    assert retry.parse_run_at({}) is None
+    assert retry.parse_run_at({"run_at": "2030-01-01T00:00:00Z"}) == dt.datetime(2030, 1, 1, tzinfo=dt.timezone.utc)
+    assert retry.parse_run_at({"run_at": 0}) == dt.datetime(1970, 1, 1, tzinfo=dt.timezone.utc)
+    soon = retry.parse_run_at({"delay_seconds": 60})
+    assert 55 < (soon - dt.datetime.now(dt.timezone.utc)).total_seconds() <= 60
+
+
+def test_sqlite_delayed_jobs_are_not_claimed_early(tmp_path, monkeypatch):
+    monkeypatch.setenv("TASK_DB", str(tmp_path / "jobs.db"))
+    later = jobs_sqlite.enqueue_job({"task": "plan", "payload": {}, "delay_seconds": 3600})
+    now = jobs_sqlite.enqueue_job({"task": "plan", "payload": {}})
+    assert [r["id"] for r in jobs_sqlite.claim_jobs(n=5)] == [now]
+    assert jobs_sqlite.claim_jobs(n=5) == []
+    assert jobs_sqlite.get_job(later)["status"] == "queued"
+
+
+def test_sqlite_retry_then_dead(tmp_path, monkeypatch):
+    monkeypatch.setenv("TASK_DB", str(tmp_path / "jobs.db"))
+    monkeypatch.setenv("VELU_RETRY_POLICIES", "plan=2:0:0")
+    jid = jobs_sqlite.enqueue_job({"task": "plan", "payload": {}})
+
+    assert jobs_sqlite.claim_jobs(n=1)[0]["id"] == jid
+    assert queue_api.retry_job(jid, "boom", task="plan") == "queued"
+    row = jobs_sqlite.get_job(jid)
+    assert row["status"] == "queued" and row["next_run_at"] <= time.time()
+
+    assert jobs_sqlite.claim_jobs(n=1)[0]["id"] == jid
+    assert queue_api.retry_job(jid, "boom again", task="plan") == "dead"
+    assert jobs_sqlite.get_job(jid)["status"] == "dead"
+    # Not working any more: nothing to record.
+    assert queue_api.retry_job(jid, "late", task="plan") is None
+
+
+def test_sqlite_backoff_pushes_next_run(tmp_path, monkeypatch):
+    monkeypatch.setenv("TASK_DB", str(tmp_path / "jobs.db"))
+    monkeypatch.setenv("VELU_RETRY_POLICIES", "plan=3:120")
+    jid = jobs_sqlite.enqueue_job({"task": "plan", "payload": {}})
+    jobs_sqlite.claim_jobs(n=1)
+    assert queue_api.retry_job(jid, "boom", task="plan") == "queued"
+    assert jobs_sqlite.get_job(jid)["next_run_at"] >= time.time() + 55
+    assert jobs_sqlite.claim_jobs(n=1) == []
+
+
+def test_schedule_survives_the_enqueue_wrappers(tmp_path, monkeypatch):
+    monkeypatch.setenv("TASK_DB", str(tmp_path / "jobs.db"))
+    from services.queue import jobs
+
+    jid = jobs.enqueue_job({"task": "plan", "payload": {}, "delay_seconds": 600})
+    assert jobs_sqlite.get_job(jid)["next_run_at"] >= time.time() + 550
+    assert jobs_sqlite.claim_jobs(n=1) == []
+
+
+def test_raising_handler_is_retried_then_dead(tmp_path, monkeypatch):
+    from services.queue import worker_entry
+    from services.queue.notify import IdleBackoff
+
+    monkeypatch.setenv("TASK_DB", str(tmp_path / "jobs.db"))
+    monkeypatch.setenv("WORKSPACE_BASE", str(tmp_path / "ws"))
+    monkeypatch.setenv("VELU_RETRY_POLICIES", "poison=2:120")
+
+    def poison(payload):
+        raise RuntimeError("poison")
+
+    monkeypatch.setitem(worker_entry.HANDLERS, "poison", poison)
+    jid = jobs_sqlite.enqueue_job({"task": "poison", "payload": {}})
+
+    def run_once() -> None:
+        worker_entry._worker_loop(
+            wid="w",
+            using_pg=False,
+            lease_seconds=30,
+            in_pytest=True,
+            max_jobs=1,
+            prefetch=None,
+            wakeup=None,
+            backoff=IdleBackoff(base=0.01, cap=0.01),
+        )
+
+    run_once()
+    row = jobs_sqlite.get_job(jid)
+    assert (row["status"], row["attempts"]) == ("queued", 1)
+    assert row["next_run_at"] > time.time() + 30
+    assert "RuntimeError: poison" in row["last_error"]
+
+    with closing(jobs_sqlite._sqlite_connect()) as conn, conn:
+        conn.execute("UPDATE jobs SET next_run_at=0 WHERE id=?", (jid,))
+    run_once()
+    row = jobs_sqlite.get_job(jid)
+    assert (row["status"], row["attempts"]) == ("dead", 2)
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import importlib.util
+import sys
+from pathlib import Path
+
+import pytest
+
+from services.queue import registry, worker_entry
+from services.queue.registry import LazyHandlers
+
+
+def test_handlers_import_on_first_use(monkeypatch):
+    monkeypatch.delitem(sys.modules, "services.agents.sleep", raising=False)
+    handlers = LazyHandlers({"sleep": "services.agents.sleep:handle", "missing": "services.agents.nope:handle"})
+
+    assert "sleep" in handlers and sorted(handlers) == ["missing", "sleep"]
+    assert "services.agents.sleep" not in sys.modules
+    assert handlers["sleep"] is sys.modules["services.agents.sleep"].handle
+    assert handlers.get("unknown") is None
+    with pytest.raises(ModuleNotFoundError):
+        handlers["missing"]
+
+    handlers["sleep"] = fn = lambda payload: {"ok": True}
+    assert handlers["sleep"] is fn
+    del handlers["missing"]
+    assert list(handlers) == ["sleep"]
+
+
+def test_worker_registry_covers_every_task():
+    assert worker_entry.HANDLERS is registry.HANDLERS
+    assert set(registry.task_names()) == set(registry.TASK_HANDLERS)
+    for name, spec in registry.TASK_HANDLERS.items():
+        module, _, attr = spec.partition(":")
+        assert importlib.util.find_spec(module) is not None, name
+    assert worker_entry.is_async_handler(registry.HANDLERS["chat"])
+
+
+def test_api_startup_imports_no_agent_code():
+    path = Path(__file__).resolve().parents[2] / "scripts" / "check_import_budget.py"
+    spec = importlib.util.spec_from_file_location("check_import_budget", path)
+    budget = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(budget)
+
+    _, forbidden = budget.CHECKS["services.app_server.main"]
+    profile = budget.import_profile("services.app_server.main")
+    assert "services.queue.registry" in profile
+    assert budget.forbidden_imports(profile, forbidden) == []
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import pytest
+
+from services.queue import jobs_sqlite, worker_entry
+from services.queue.notify import IdleBackoff
+from services.queue.supervisor import PoolSpec, Recycle, Supervisor, desired_size, parse_pools
+
+
+def test_pools_and_backlog_scaling():
+    assert parse_pools("heavy=1:2;fast,standard=2:8") == [PoolSpec("heavy", 1, 2), PoolSpec("fast,standard", 2, 8)]
+    assert parse_pools("sleep=3") == [PoolSpec("sleep", 3, 3)]
+    assert parse_pools("", cpus=4) == [PoolSpec("heavy", 1, 2), PoolSpec("fast,standard", 1, 4)]
+    with pytest.raises(ValueError):
+        parse_pools("heavy=3:1")
+    assert [desired_size(PoolSpec("x", 1, 4), n, 2) for n in (0, 1, 3, 7, 50)] == [1, 1, 2, 4, 4]
+
+    sup = Supervisor([PoolSpec("heavy", 1, 4), PoolSpec("", 0, 2)], scale_down_after=0)
+    heavy, rest = sup.pools
+    heavy.tasks = ["test", "packager"]
+    sup.scale({"test": {"queued": 3, "working": 1}, "chat": {"queued": 5}})
+    assert (heavy.target, rest.target) == (3, 2)
+    # Shrinks one child per scale step once the backlog drops.
+    sup.scale({})
+    sup.scale({})
+    assert (heavy.target, rest.target) == (1, 0)
+    sup.scale({})
+    assert heavy.target == 1
+
+
+def test_worker_exits_for_restart_after_max_jobs(tmp_path, monkeypatch):
+    monkeypatch.setenv("TASK_DB", str(tmp_path / "jobs.db"))
+    monkeypatch.setenv("WORKSPACE_BASE", str(tmp_path / "ws"))
+    monkeypatch.setitem(worker_entry.HANDLERS, "echo", lambda payload: {"ok": True})
+    ids = [jobs_sqlite.enqueue_job({"task": "echo", "payload": {}}) for _ in range(3)]
+
+    recycle = Recycle(max_jobs=2)
+    worker_entry._worker_loop(
+        wid="w",
+        using_pg=False,
+        lease_seconds=30,
+        in_pytest=True,
+        max_jobs=10,
+        prefetch=None,
+        wakeup=None,
+        backoff=IdleBackoff(base=0.01, cap=0.01),
+        recycle=recycle,
+    )
+    assert [jobs_sqlite.get_job(j)["status"] for j in ids] == ["done", "done", "queued"]
+
+    retired = Recycle()
+    retired.retire()
+    assert retired.reason(0) == "retired"
+    assert Recycle(max_growth_mb=1e9).reason(100) is None
+
+
+@pytest.mark.skipif(sys.platform != "linux", reason="prefork supervisor needs fork")
+def test_supervisor_scales_up_and_replaces_children(tmp_path):
+    db = tmp_path / "jobs.db"
+    env = {k: v for k, v in os.environ.items() if not k.startswith("PYTEST")}
+    env.update(
+        TASK_DB=str(db),
+        WORKSPACE_BASE=str(tmp_path / "ws"),
+        PYTHONPATH=os.getcwd(),
+        VELU_SUPERVISOR_SCALE_SEC="0.2",
+        VELU_SUPERVISOR_MAX_JOBS="1",
+    )
+    os.environ["TASK_DB"] = str(db)
+    try:
+        ids = [jobs_sqlite.enqueue_job({"task": "sleep", "payload": {"seconds": 1}}) for _ in range(4)]
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "services.queue.supervisor", "--pools", "sleep=1:4"],
+            env=env,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+        )
+        try:
+            deadline = time.monotonic() + 30
+            while time.monotonic() < deadline:
+                if all(jobs_sqlite.get_job(j)["status"] == "done" for j in ids):
+                    break
+                time.sleep(0.2)
+        finally:
+            proc.send_signal(signal.SIGTERM)
+            out = proc.communicate(timeout=30)[0]
+    finally:
+        del os.environ["TASK_DB"]
+
+    assert [jobs_sqlite.get_job(j)["status"] for j in ids] == ["done"] * 4, out
+    assert "sleep 1 -> 4" in out and "exiting for restart (1 jobs)" in out
+    assert proc.returncode == 0 and "supervisor: stopped" in out
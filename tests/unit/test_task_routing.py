@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import pytest
+
+from services.queue import jobs_sqlite, queue_api
+from services.queue.task_classes import class_of, depth_by_class, parse_subscription
+
+KNOWN = ["chat", "plan", "test", "packager", "report", "sleep"]
+
+
+def test_parse_subscription_expands_classes(monkeypatch):
+    monkeypatch.delenv("VELU_TASK_CLASSES", raising=False)
+    assert parse_subscription(None, KNOWN) is None
+    assert parse_subscription(" * ", KNOWN) is None
+    assert parse_subscription("fast", KNOWN) == ["chat", "plan", "report"]
+    assert parse_subscription("heavy,sleep", KNOWN) == ["packager", "sleep", "test"]
+    assert parse_subscription("standard", KNOWN) == ["sleep"]
+    with pytest.raises(ValueError):
+        parse_subscription("fats", KNOWN)
+    assert parse_subscription("fast,custom_task") == sorted(
+        {"custom_task", *[t for t in parse_subscription("fast") or []]}
+    )
+
+
+def test_env_overrides_classes(monkeypatch):
+    monkeypatch.setenv("VELU_TASK_CLASSES", "lane1=chat,plan;lane2=test")
+    assert class_of("plan") == "lane1"
+    assert class_of("report") == "standard"
+    assert parse_subscription("lane2", KNOWN) == ["test"]
+
+
+def test_sqlite_claim_honours_subscription_and_depth(tmp_path, monkeypatch):
+    monkeypatch.setenv("TASK_DB", str(tmp_path / "jobs.db"))
+    monkeypatch.delenv("VELU_TASK_CLASSES", raising=False)
+    heavy = jobs_sqlite.enqueue_job({"task": "test", "payload": {}, "priority": 10})
+    fast = jobs_sqlite.enqueue_job({"task": "chat", "payload": {}})
+
+    depth = queue_api.queue_depth()
+    assert depth["tasks"]["test"] == {"queued": 1, "working": 0}
+    assert depth["classes"]["fast"]["queued"] == 1 and depth["classes"]["heavy"]["queued"] == 1
+
+    row = queue_api.claim_one_job(tasks=["chat", "plan"])
+    assert row["id"] == fast
+    assert queue_api.claim_one_job(tasks=["chat"]) is None
+    assert queue_api.claim_one_job()["id"] == heavy
+    assert depth_by_class(queue_api.queue_depth()["tasks"])["heavy"] == {"queued": 0, "working": 1}